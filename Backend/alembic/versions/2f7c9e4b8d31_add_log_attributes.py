@@ -0,0 +1,30 @@
+"""Add attributes column to logs
+
+Revision ID: 2f7c9e4b8d31
+Revises: 8b3f6d1e2a54
+Create Date: 2026-10-19 21:04:52.113870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7c9e4b8d31'
+down_revision: Union[str, None] = '8b3f6d1e2a54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('logs', sa.Column('attributes', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_index('ix_logs_attributes', 'logs', ['attributes'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'attributes': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_logs_attributes', table_name='logs')
+    op.drop_column('logs', 'attributes')
@@ -0,0 +1,41 @@
+"""Add log_sketches table
+
+Revision ID: 3c5e8a91d2f4
+Revises: 1f920b4d6059
+Create Date: 2026-10-19 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e8a91d2f4'
+down_revision: Union[str, None] = '1f920b4d6059'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'log_sketches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bucket_start', 'kind', 'dimension')
+    )
+    op.create_index(op.f('ix_log_sketches_id'), 'log_sketches', ['id'], unique=False)
+    op.create_index(op.f('ix_log_sketches_bucket_start'), 'log_sketches', ['bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_log_sketches_bucket_start'), table_name='log_sketches')
+    op.drop_index(op.f('ix_log_sketches_id'), table_name='log_sketches')
+    op.drop_table('log_sketches')
@@ -0,0 +1,40 @@
+"""Add log_token_blooms table
+
+Revision ID: 5e8d2a7c4b19
+Revises: c6b1e4f09a27
+Create Date: 2026-10-19 19:12:27.640918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8d2a7c4b19'
+down_revision: Union[str, None] = 'c6b1e4f09a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'log_token_blooms',
+        sa.Column('chunk', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('rows', sa.Integer(), nullable=False),
+        sa.Column('min_timestamp', sa.DateTime(), nullable=False),
+        sa.Column('max_timestamp', sa.DateTime(), nullable=False),
+        sa.Column('bits', sa.LargeBinary(), nullable=False),
+        sa.Column('hashes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('chunk')
+    )
+    op.create_index(op.f('ix_log_token_blooms_min_timestamp'), 'log_token_blooms', ['min_timestamp'], unique=False)
+    op.create_index(op.f('ix_log_token_blooms_max_timestamp'), 'log_token_blooms', ['max_timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_log_token_blooms_max_timestamp'), table_name='log_token_blooms')
+    op.drop_index(op.f('ix_log_token_blooms_min_timestamp'), table_name='log_token_blooms')
+    op.drop_table('log_token_blooms')
@@ -0,0 +1,50 @@
+"""Add log_templates and template columns on logs
+
+Revision ID: 7a1d4f0c9b36
+Revises: 3c5e8a91d2f4
+Create Date: 2026-10-19 11:02:17.904431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1d4f0c9b36'
+down_revision: Union[str, None] = '3c5e8a91d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'log_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('template', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('first_seen', sa.DateTime(), nullable=True),
+        sa.Column('last_seen', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_log_templates_id'), 'log_templates', ['id'], unique=False)
+    op.create_index(op.f('ix_log_templates_first_seen'), 'log_templates', ['first_seen'], unique=False)
+    op.create_index(op.f('ix_log_templates_last_seen'), 'log_templates', ['last_seen'], unique=False)
+    op.add_column('logs', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.add_column('logs', sa.Column('template_params', sa.JSON(), nullable=True))
+    op.create_foreign_key('logs_template_id_fkey', 'logs', 'log_templates', ['template_id'], ['id'])
+    op.create_index(op.f('ix_logs_template_id'), 'logs', ['template_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_logs_template_id'), table_name='logs')
+    op.drop_constraint('logs_template_id_fkey', 'logs', type_='foreignkey')
+    op.drop_column('logs', 'template_params')
+    op.drop_column('logs', 'template_id')
+    op.drop_index(op.f('ix_log_templates_last_seen'), table_name='log_templates')
+    op.drop_index(op.f('ix_log_templates_first_seen'), table_name='log_templates')
+    op.drop_index(op.f('ix_log_templates_id'), table_name='log_templates')
+    op.drop_table('log_templates')
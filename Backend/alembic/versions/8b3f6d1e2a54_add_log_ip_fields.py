@@ -0,0 +1,39 @@
+"""Add src/dst IP and port columns to logs
+
+Revision ID: 8b3f6d1e2a54
+Revises: 5e8d2a7c4b19
+Create Date: 2026-10-19 20:21:03.418852
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f6d1e2a54'
+down_revision: Union[str, None] = '5e8d2a7c4b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('logs', sa.Column('src_ip', postgresql.INET(), nullable=True))
+    op.add_column('logs', sa.Column('dst_ip', postgresql.INET(), nullable=True))
+    op.add_column('logs', sa.Column('src_port', sa.Integer(), nullable=True))
+    op.add_column('logs', sa.Column('dst_port', sa.Integer(), nullable=True))
+    op.create_index('ix_logs_src_ip', 'logs', ['src_ip'], unique=False,
+                    postgresql_using='gist', postgresql_ops={'src_ip': 'inet_ops'})
+    op.create_index('ix_logs_dst_ip', 'logs', ['dst_ip'], unique=False,
+                    postgresql_using='gist', postgresql_ops={'dst_ip': 'inet_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_logs_dst_ip', table_name='logs')
+    op.drop_index('ix_logs_src_ip', table_name='logs')
+    op.drop_column('logs', 'dst_port')
+    op.drop_column('logs', 'src_port')
+    op.drop_column('logs', 'dst_ip')
+    op.drop_column('logs', 'src_ip')
@@ -0,0 +1,36 @@
+"""Add dashboards table
+
+Revision ID: a83d5e2c7f10
+Revises: f17b3c9a2e45
+Create Date: 2026-10-19 16:48:12.093771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d5e2c7f10'
+down_revision: Union[str, None] = 'f17b3c9a2e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dashboards',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('widgets', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_dashboards_id'), 'dashboards', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_dashboards_id'), table_name='dashboards')
+    op.drop_table('dashboards')
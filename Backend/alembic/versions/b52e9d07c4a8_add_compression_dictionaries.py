@@ -0,0 +1,50 @@
+"""Add compression_dictionaries and compressed message columns on logs
+
+Revision ID: b52e9d07c4a8
+Revises: 7a1d4f0c9b36
+Create Date: 2026-10-19 12:20:44.561093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52e9d07c4a8'
+down_revision: Union[str, None] = '7a1d4f0c9b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'compression_dictionaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vendor', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('compression_ratio', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('vendor', 'version')
+    )
+    op.create_index(op.f('ix_compression_dictionaries_id'), 'compression_dictionaries', ['id'], unique=False)
+    op.create_index(op.f('ix_compression_dictionaries_vendor'), 'compression_dictionaries', ['vendor'], unique=False)
+    op.add_column('logs', sa.Column('message_compressed', sa.LargeBinary(), nullable=True))
+    op.add_column('logs', sa.Column('dictionary_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('logs_dictionary_id_fkey', 'logs', 'compression_dictionaries', ['dictionary_id'], ['id'])
+    op.alter_column('logs', 'message', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    # Compressed rows have no plain message and would violate NOT NULL
+    op.alter_column('logs', 'message', existing_type=sa.String(), nullable=False)
+    op.drop_constraint('logs_dictionary_id_fkey', 'logs', type_='foreignkey')
+    op.drop_column('logs', 'dictionary_id')
+    op.drop_column('logs', 'message_compressed')
+    op.drop_index(op.f('ix_compression_dictionaries_vendor'), table_name='compression_dictionaries')
+    op.drop_index(op.f('ix_compression_dictionaries_id'), table_name='compression_dictionaries')
+    op.drop_table('compression_dictionaries')
@@ -0,0 +1,37 @@
+"""Add bucket_invalidations table
+
+Revision ID: c6b1e4f09a27
+Revises: a83d5e2c7f10
+Create Date: 2026-10-19 18:05:41.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6b1e4f09a27'
+down_revision: Union[str, None] = 'a83d5e2c7f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'bucket_invalidations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bucket_invalidations_id'), 'bucket_invalidations', ['id'], unique=False)
+    op.create_index(op.f('ix_bucket_invalidations_created_at'), 'bucket_invalidations', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_bucket_invalidations_created_at'), table_name='bucket_invalidations')
+    op.drop_index(op.f('ix_bucket_invalidations_id'), table_name='bucket_invalidations')
+    op.drop_table('bucket_invalidations')
@@ -0,0 +1,28 @@
+"""Add repeat_count and last_seen to logs
+
+Revision ID: d4f1a6b3e820
+Revises: b52e9d07c4a8
+Create Date: 2026-10-19 13:05:12.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a6b3e820'
+down_revision: Union[str, None] = 'b52e9d07c4a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('logs', sa.Column('repeat_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('logs', sa.Column('last_seen', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('logs', 'last_seen')
+    op.drop_column('logs', 'repeat_count')
@@ -0,0 +1,44 @@
+"""Add ingest_drops table
+
+Revision ID: e9c27b5f1d63
+Revises: d4f1a6b3e820
+Create Date: 2026-10-19 13:48:30.215876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c27b5f1d63'
+down_revision: Union[str, None] = 'd4f1a6b3e820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingest_drops',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('cnnid', sa.String(), nullable=True),
+        sa.Column('vendor', sa.String(), nullable=True),
+        sa.Column('product', sa.String(), nullable=True),
+        sa.Column('severity', sa.String(), nullable=True),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bucket_start', 'cnnid', 'vendor', 'product', 'severity', 'action')
+    )
+    op.create_index(op.f('ix_ingest_drops_id'), 'ingest_drops', ['id'], unique=False)
+    op.create_index(op.f('ix_ingest_drops_bucket_start'), 'ingest_drops', ['bucket_start'], unique=False)
+    op.create_index(op.f('ix_ingest_drops_cnnid'), 'ingest_drops', ['cnnid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ingest_drops_cnnid'), table_name='ingest_drops')
+    op.drop_index(op.f('ix_ingest_drops_bucket_start'), table_name='ingest_drops')
+    op.drop_index(op.f('ix_ingest_drops_id'), table_name='ingest_drops')
+    op.drop_table('ingest_drops')
@@ -0,0 +1,36 @@
+"""Add ingest_batches table
+
+Revision ID: f17b3c9a2e45
+Revises: e9c27b5f1d63
+Create Date: 2026-10-19 14:31:08.402519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f17b3c9a2e45'
+down_revision: Union[str, None] = 'e9c27b5f1d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingest_batches',
+        sa.Column('key', sa.LargeBinary(length=16), nullable=False),
+        sa.Column('logs_created', sa.Integer(), nullable=False),
+        sa.Column('logs_dropped', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_ingest_batches_expires_at'), 'ingest_batches', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ingest_batches_expires_at'), table_name='ingest_batches')
+    op.drop_table('ingest_batches')
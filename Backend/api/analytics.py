@@ -0,0 +1,170 @@
+"""
+Vectorized in-memory analytics over the filtered log set.
+
+The dimension columns (timestamp, severity, vendor, device_type, cnnid) are
+pulled once from Postgres, plus the cold tier, and held as NumPy arrays.
+String columns are dictionary-encoded so every histogram, time bucket and
+top-N breakdown is a ``np.bincount`` over integer codes, computed in the
+same pass instead of one GROUP BY query per facet. Each row is weighted by
+its ``repeat_count`` so logs collapsed at ingest are still counted.
+"""
+import enum
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import String, cast, func, or_, select
+from sqlalchemy.orm import Session
+
+from .cold_storage import cold_store
+from .message_codec import message_contains
+from .models import LogEntry
+
+DIMENSIONS = ["severity", "vendor", "device_type", "cnnid"]
+
+INTERVAL_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Same bucket labels /logs/time-series has always returned
+INTERVAL_FORMATS = {"minute": "%Y-%m-%d %H:%M:00", "hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d"}
+
+
+class LogColumns:
+    """Dictionary-encoded column arrays for one filtered set of logs."""
+
+    def __init__(self, timestamps: np.ndarray, weights: np.ndarray, dimensions: Dict[str, pa.DictionaryArray]):
+        self.timestamps = timestamps
+        self.weights = weights
+        self.codes = {name: array.indices.fill_null(-1).to_numpy(zero_copy_only=False) for name, array in dimensions.items()}
+        self.values = {name: array.dictionary.to_pylist() for name, array in dimensions.items()}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def between(self, start_seconds: int, end_seconds: int) -> "LogColumns":
+        """The rows with timestamps in [start_seconds, end_seconds], sharing this set's dictionaries."""
+        mask = (self.timestamps >= start_seconds) & (self.timestamps <= end_seconds)
+        subset = LogColumns.__new__(LogColumns)
+        subset.timestamps = self.timestamps[mask]
+        subset.weights = self.weights[mask]
+        subset.codes = {name: codes[mask] for name, codes in self.codes.items()}
+        subset.values = self.values
+        return subset
+
+
+def _conditions(db: Session, start_time=None, end_time=None, cnnid=None, vendor=None, device_type=None, severity=None, query=None):
+    conditions = []
+    if query:
+        search_term = f"%{query}%"
+        conditions.append(or_(
+            message_contains(db, query, start_time, end_time),
+            LogEntry.vendor.ilike(search_term),
+            LogEntry.cnnid.ilike(search_term),
+            LogEntry.device_type.ilike(search_term),
+            func.lower(cast(LogEntry.severity, String)).like(func.lower(search_term)),
+            LogEntry.product.ilike(search_term)
+        ))
+    if vendor:
+        conditions.append(func.lower(LogEntry.vendor) == func.lower(vendor))
+    if severity:
+        conditions.append(func.lower(cast(LogEntry.severity, String)) == func.lower(severity))
+    if device_type:
+        conditions.append(func.lower(LogEntry.device_type) == func.lower(device_type))
+    if cnnid:
+        conditions.append(LogEntry.cnnid == cnnid)
+    if start_time:
+        conditions.append(LogEntry.timestamp >= start_time)
+    if end_time:
+        conditions.append(LogEntry.timestamp <= end_time)
+    return conditions
+
+
+def load_columns(db: Session, dimensions: List[str] = DIMENSIONS, **filters) -> LogColumns:
+    """Fetch timestamp plus ``dimensions`` for the filtered logs from both tiers in one query each."""
+    table = LogEntry.__table__
+    columns = [table.c.timestamp, table.c.repeat_count] + [table.c[name] for name in dimensions]
+    rows = db.execute(select(*columns).where(*_conditions(db, **filters))).fetchall()
+    hot = list(zip(*rows)) if rows else [[] for _ in columns]
+
+    cold = cold_store.scan(["timestamp", "repeat_count"] + dimensions, **filters)
+
+    timestamps = pa.chunked_array([
+        pa.array(hot[0], type=pa.timestamp("us")),
+        cold["timestamp"].combine_chunks(),
+    ], type=pa.timestamp("us"))
+    seconds = pc.cast(timestamps, pa.int64()).to_numpy() // 1000000
+    weights = np.concatenate([
+        np.asarray(hot[1], dtype=np.int64),
+        cold["repeat_count"].to_numpy().astype(np.int64),
+    ])
+
+    encoded = {}
+    for index, name in enumerate(dimensions, start=2):
+        values = [value.value if isinstance(value, enum.Enum) else value for value in hot[index]]
+        combined = pa.chunked_array([pa.array(values, type=pa.string()), cold[name].combine_chunks()], type=pa.string())
+        encoded[name] = combined.combine_chunks().dictionary_encode()
+    return LogColumns(seconds, weights, encoded)
+
+
+def _label(bucket_start: int, interval: str) -> str:
+    return datetime.fromtimestamp(int(bucket_start), tz=timezone.utc).strftime(INTERVAL_FORMATS[interval])
+
+
+def _top(values: List[str], counts: np.ndarray, top_n: Optional[int]) -> Dict[str, int]:
+    order = np.argsort(-counts, kind="stable")
+    if top_n:
+        order = order[:top_n]
+    return {values[i]: int(counts[i]) for i in order if counts[i] > 0}
+
+
+def compute(columns: LogColumns, facets: List[str] = DIMENSIONS, interval: Optional[str] = None,
+            top_n: Optional[int] = None, series_by: Optional[str] = None) -> dict:
+    """
+    Compute the total, one histogram per facet (truncated to ``top_n`` values),
+    and optionally a time series bucketed by ``interval``, split per value of
+    ``series_by`` for the top ``top_n`` values of that dimension.
+    """
+    weights = columns.weights
+    result = {"total": int(weights.sum()), "facets": {}}
+    for name in facets:
+        codes = columns.codes[name]
+        valid = codes >= 0
+        counts = np.bincount(codes[valid], weights=weights[valid], minlength=len(columns.values[name])).astype(np.int64)
+        result["facets"][name] = _top(columns.values[name], counts, top_n)
+
+    if interval:
+        step = INTERVAL_SECONDS[interval]
+        buckets, bucket_index = np.unique(columns.timestamps // step, return_inverse=True)
+        bucket_counts = np.bincount(bucket_index, weights=weights, minlength=len(buckets)).astype(np.int64)
+        labels = [_label(bucket * step, interval) for bucket in buckets]
+        result["time_series"] = {label: int(count) for label, count in zip(labels, bucket_counts)}
+
+        if series_by:
+            codes = columns.codes[series_by]
+            width = len(columns.values[series_by])
+            valid = codes >= 0
+            grid = np.bincount(
+                bucket_index[valid] * width + codes[valid], weights=weights[valid], minlength=len(buckets) * width
+            ).astype(np.int64).reshape(len(buckets), width)
+            values = columns.values[series_by]
+            keep = _top(values, grid.sum(axis=0), top_n)
+            positions = {value: i for i, value in enumerate(values)}
+            result["series_by"] = {
+                value: dict(zip(labels, grid[:, positions[value]].tolist()))
+                for value in keep
+            }
+    return result
+
+
+def bucketed_time_series(columns: LogColumns, interval: str, bucket_seconds: int) -> Dict[int, Dict[str, int]]:
+    """compute()'s time series, as one partial series per ``bucket_seconds`` bucket (see api/bucket_cache.py)."""
+    if not len(columns):
+        return {}
+    step = INTERVAL_SECONDS[interval]
+    keys, index = np.unique(np.stack([columns.timestamps // bucket_seconds, columns.timestamps // step]), axis=1, return_inverse=True)
+    counts = np.bincount(index.ravel(), weights=columns.weights, minlength=keys.shape[1]).astype(np.int64)
+    partials: Dict[int, Dict[str, int]] = {}
+    for (bucket, point), count in zip(keys.T.tolist(), counts.tolist()):
+        partials.setdefault(bucket, {})[_label(point * step, interval)] = count
+    return partials
@@ -0,0 +1,125 @@
+"""
+Vendor-specific fields of a log, kept in ``logs.attributes``.
+
+Parsed records carry more than the columns of ``logs``: parse_devid.lua adds
+``devid``, ``devname`` and ``country``, and FortiGate sends dozens of
+key=value fields. create_log keeps every record field it has no column for
+in the JSON(B) ``attributes`` column, at most ATTRIBUTES_MAX_KEYS per log.
+
+``/logs`` and ``/search`` filter them with ``attr.<key>=<value>`` query
+parameters. On PostgreSQL a filter is a containment test
+(``attributes @> '{"devid": "FGT60E"}'``) that the GIN jsonb_path_ops index
+answers. Keys in ATTRIBUTES_INDEXED_KEYS are compared as
+``attributes ->> 'key' = value`` instead, which is what their expression
+indexes (created by ``index_logs.py --promote-attributes``) are built on.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, cast, literal, or_, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from . import ip_fields
+from .config import ATTRIBUTES_INDEXED_KEYS, ATTRIBUTES_MAX_KEYS
+from .parsers.registry import PORT_FIELD
+
+logger = logging.getLogger(__name__)
+
+# Query parameter prefix of attribute filters
+FILTER_PREFIX = "attr."
+
+# Record fields create_log already stores in columns of their own, and the
+# listener port the parser registry adds to pick a vendor parser
+COLUMN_KEYS = {"timestamp", "message", "severity", "cnnid", "vendor", "product", "device_type",
+               *ip_fields.IP_COLUMNS, *ip_fields.PORT_COLUMNS, PORT_FIELD}
+
+# Keys that may be filtered on; they end up in SQL expressions and index names
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]{0,63}$")
+
+PROMOTED_KEYS = [key.strip() for key in ATTRIBUTES_INDEXED_KEYS.split(",") if key.strip()]
+
+
+def extract(record: dict, max_keys: int = ATTRIBUTES_MAX_KEYS) -> Optional[Dict[str, Any]]:
+    """The fields of an ingested record that have no column; None if there are none."""
+    attributes = {}
+    for key, value in record.items():
+        key = str(key)
+        if key in COLUMN_KEYS or value is None:
+            continue
+        if len(attributes) >= max_keys:
+            logger.debug("Dropping attributes beyond the first %d", max_keys)
+            break
+        attributes[key] = value
+    return attributes or None
+
+
+def parse_filters(params: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """(key, value) of the ``attr.<key>=<value>`` query parameters; raises ValueError for a bad key."""
+    filters = []
+    for name, value in params:
+        if not name.startswith(FILTER_PREFIX):
+            continue
+        key = name[len(FILTER_PREFIX):]
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid attribute key: {key!r}")
+        filters.append((key, value))
+    return filters
+
+
+def _candidates(value: str) -> list:
+    """The JSON values a query string stands for: itself, and the number or boolean it spells."""
+    candidates = [value]
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return candidates
+    if isinstance(parsed, (bool, int, float)):
+        candidates.append(parsed)
+    return candidates
+
+
+def attribute_condition(column, key: str, value: str, dialect: str):
+    """Filter for attribute ``key`` equal to ``value``."""
+    if dialect == "postgresql":
+        if key in PROMOTED_KEYS:
+            return column.op("->>", return_type=String)(literal(key, String)) == value
+        return or_(*[column.op("@>")(cast({key: candidate}, JSONB)) for candidate in _candidates(value)])
+    return column[key].as_string().in_(_candidates(value))
+
+
+def _same(stored, candidate) -> bool:
+    # JSON true is not the number 1, and "1" is not 1
+    if isinstance(stored, bool) != isinstance(candidate, bool) or isinstance(stored, str) != isinstance(candidate, str):
+        return False
+    return stored == candidate
+
+
+def matches(attributes: Optional[dict], filters: List[Tuple[str, str]]) -> bool:
+    """Python side of attribute_condition, e.g. for the cold tier."""
+    for key, value in filters:
+        stored = (attributes or {}).get(key)
+        if stored is None or not any(_same(stored, candidate) for candidate in _candidates(value)):
+            return False
+    return True
+
+
+def index_name(key: str) -> str:
+    return "ix_logs_attr_" + re.sub(r"[^A-Za-z0-9_]", "_", key).lower()
+
+
+def create_promoted_indexes(bind, keys: List[str] = PROMOTED_KEYS) -> List[str]:
+    """Build the expression index of each promoted key that has none; the names of the indexes."""
+    if bind.dialect.name != "postgresql":
+        return []
+    names = []
+    # CONCURRENTLY keeps ingest running while a large table is indexed; it cannot run in a transaction
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for key in keys:
+            if not KEY_PATTERN.match(key):
+                raise ValueError(f"Invalid attribute key: {key!r}")
+            name = index_name(key)
+            connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON logs ((attributes ->> '{key}'))"))
+            names.append(name)
+    return names
@@ -0,0 +1,31 @@
+"""
+External authentication providers, imported when their AuthMethod is first used.
+
+Each provider module pulls in its own client library (python-ldap, ldap3,
+msal, authlib) at import, so none of them are imported by the routes up
+front; authenticator() loads the module on the first login that needs it.
+"""
+import importlib
+from typing import Callable
+
+from ..models import AuthMethod
+
+# AuthMethod -> (module in this package, authentication function)
+PROVIDERS = {
+    AuthMethod.ldap: ("ldap_auth", "authenticate_ldap"),
+    AuthMethod.active_directory: ("ad_auth", "authenticate_active_directory"),
+    AuthMethod.sso: ("sso_auth", "authenticate_sso"),
+    AuthMethod.azure_ad: ("azure_ad_auth", "authenticate_azure_ad"),
+}
+
+
+def load_provider(method: AuthMethod):
+    """The provider module for ``method``, imported on first use."""
+    if method not in PROVIDERS:
+        raise ValueError(f"No authentication provider for {method}")
+    module_name, _ = PROVIDERS[method]
+    return importlib.import_module(f"{__name__}.{module_name}")
+
+
+def authenticator(method: AuthMethod) -> Callable:
+    return getattr(load_provider(method), PROVIDERS[method][1])
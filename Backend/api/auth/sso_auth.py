@@ -1,17 +1,27 @@
+import threading
+
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 
-config = Config('.env')
-oauth = OAuth(config)
+_oauth = None
+_lock = threading.Lock()
 
-oauth.register(
-    name='google',
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'}
-)
+def get_oauth() -> OAuth:
+    """The OAuth registry with the Google client, created on first use."""
+    global _oauth
+    with _lock:
+        if _oauth is None:
+            oauth = OAuth(Config('.env'))
+            oauth.register(
+                name='google',
+                server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+                client_kwargs={'scope': 'openid email profile'}
+            )
+            _oauth = oauth
+    return _oauth
 
 async def authenticate_sso(request):
+    oauth = get_oauth()
     token = await oauth.google.authorize_access_token(request)
     user = await oauth.google.parse_id_token(request, token)
     return user
-
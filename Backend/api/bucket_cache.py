@@ -0,0 +1,270 @@
+"""
+Cached aggregates of closed time buckets.
+
+/logs/time-series, /logs/severity-distribution and /logs/vendor-counts sum
+counts over a time range, and the counts of an hour that has ended do not
+change. BucketCache cuts a request at BUCKET_CACHE_SECONDS boundaries:
+
+    [start, first boundary)  [closed buckets ...)  [last closed boundary, end]
+            live                   cached                 live
+
+Closed buckets entirely inside the range are looked up by the query's
+fingerprint (the endpoint and its parameters) and the bucket. Missing ones
+are computed in runs of consecutive buckets, one grouped query per run (in
+parallel day slices for long runs), and stored. The unaligned edges and the
+buckets that are still open are always computed live. A bucket's partial
+result is a dict of counts, and partials are summed.
+
+A bucket is closed BUCKET_CACHE_GRACE_SECONDS after its end. Cached buckets
+never expire. They are dropped when a log is stored in or a repeat counted
+into a closed bucket, or the cold tier archives a day: these write a row to
+bucket_invalidations in the same transaction, and every worker reads the
+new rows at most every BUCKET_CACHE_SYNC_SECONDS. Beyond
+BUCKET_CACHE_MAX_ENTRIES the least recently used buckets are evicted.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .cold_storage import naive_utc
+from .config import (BUCKET_CACHE_GRACE_SECONDS, BUCKET_CACHE_MAX_ENTRIES, BUCKET_CACHE_SECONDS,
+                     BUCKET_CACHE_SYNC_SECONDS, BUCKET_INVALIDATION_TTL_SECONDS)
+from .models import BucketInvalidation, LogEntry
+from .sliced_query import EPOCH, SlicedExecutor, TimeSlice, sliced_executor, sum_counts
+
+logger = logging.getLogger(__name__)
+
+# Invalidation IDs are assigned at flush but committed later, so a sync looks
+# this far back for rows of transactions that committed after a higher ID was seen
+SYNC_LOOKBACK_IDS = 1000
+PURGE_SECONDS = 300
+
+# Counts of one bucket, and a query's counts by bucket number
+Partial = Dict[str, int]
+Buckets = Dict[int, Partial]
+
+
+def fingerprint(kind: str, **params) -> str:
+    """Cache key of a query: its kind plus every parameter that changes its result."""
+    return json.dumps([kind, {name: value for name, value in params.items() if value is not None}],
+                      sort_keys=True, default=str)
+
+
+def merge_buckets(parts: List[Buckets]) -> Buckets:
+    """Partials of the same bucket from different slices, summed."""
+    merged: Buckets = {}
+    for part in parts:
+        for bucket, counts in part.items():
+            merged[bucket] = sum_counts([merged[bucket], counts]) if bucket in merged else counts
+    return merged
+
+
+class BucketCache:
+    def __init__(self, bucket_seconds: int, grace_seconds: int, max_entries: int, sync_seconds: float,
+                 ttl_seconds: int, executor: SlicedExecutor):
+        self.bucket_seconds = bucket_seconds
+        self.grace_seconds = grace_seconds
+        self.max_entries = max_entries
+        self.sync_seconds = sync_seconds
+        self.ttl_seconds = ttl_seconds
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._last_purge = 0.0
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def clear(self):
+        with self._lock:
+            self._entries: "OrderedDict[Tuple[str, int], Partial]" = OrderedDict()
+            self._by_bucket: Dict[int, Set[str]] = {}
+            # Bumped by every invalidation; results computed across one are not stored
+            self._generation = 0
+            self._max_id: Optional[int] = None
+            self._seen: Set[int] = set()
+            self._synced = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Buckets
+
+    def bucket(self, timestamp: datetime) -> int:
+        """Number of the bucket holding ``timestamp``."""
+        return int((naive_utc(timestamp) - EPOCH).total_seconds() // self.bucket_seconds)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        return EPOCH + timedelta(seconds=bucket * self.bucket_seconds)
+
+    def bucket_column(self, column=LogEntry.timestamp):
+        """SQL expression for the bucket number of ``column``; group partials by it."""
+        return func.floor(func.extract("epoch", column) / self.bucket_seconds)
+
+    def first_open(self, now: datetime) -> int:
+        """The oldest bucket that is not closed yet at ``now``."""
+        return self.bucket(now - timedelta(seconds=self.grace_seconds))
+
+    # Invalidation
+
+    def record(self, db: Session, timestamps: Iterable[datetime], now: Optional[datetime] = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Add an invalidation of every closed bucket among ``timestamps`` (of
+        logs stored or changed) to the caller's transaction. Returns the
+        ranges, for invalidate() once the transaction committed.
+        """
+        first_open = self.first_open(naive_utc(now) or datetime.utcnow())
+        late = sorted({bucket for bucket in map(self.bucket, timestamps) if bucket < first_open})
+        ranges = [(self.bucket_start(bucket), self.bucket_start(bucket + 1)) for bucket in late]
+        for start, end in ranges:
+            db.add(BucketInvalidation(start_time=start, end_time=end))
+        if ranges:
+            logger.debug("Invalidating %d closed buckets", len(ranges))
+        return ranges
+
+    def invalidate(self, start: datetime, end: datetime):
+        """Drop cached buckets overlapping [start, end)."""
+        first, last = self.bucket(start), self.bucket(end - timedelta(microseconds=1))
+        with self._lock:
+            self._generation += 1
+            for bucket in [bucket for bucket in self._by_bucket if first <= bucket <= last]:
+                for key in self._by_bucket.pop(bucket):
+                    self._entries.pop((key, bucket), None)
+
+    def _purge_if_due(self, db: Session):
+        if time.monotonic() - self._last_purge < PURGE_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        purged = db.query(BucketInvalidation).filter(BucketInvalidation.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        if purged:
+            logger.debug("Purged %d bucket invalidations", purged)
+
+    def _sync(self, db: Session):
+        """Apply invalidations written by other workers and processes since the last sync."""
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if now - self._synced < self.sync_seconds:
+                return
+            if self._synced and now - self._synced > self.ttl_seconds / 2:
+                # Invalidations this worker has not read may have been purged already
+                logger.info("Bucket cache was not synced for %.0f seconds, clearing it", now - self._synced)
+                self.clear()
+            if self._max_id is None:
+                # Nothing is cached yet, so older invalidations do not matter
+                self._max_id = db.query(func.max(BucketInvalidation.id)).scalar() or 0
+            else:
+                rows = (
+                    db.query(BucketInvalidation.id, BucketInvalidation.start_time, BucketInvalidation.end_time)
+                    .filter(BucketInvalidation.id > self._max_id - SYNC_LOOKBACK_IDS)
+                    .all()
+                )
+                for invalidation_id, start, end in rows:
+                    if invalidation_id not in self._seen:
+                        self._seen.add(invalidation_id)
+                        self.invalidate(start, end)
+                self._max_id = max([self._max_id] + [row[0] for row in rows])
+                self._seen = {seen for seen in self._seen if seen > self._max_id - SYNC_LOOKBACK_IDS}
+            self._synced = time.monotonic()
+            self._purge_if_due(db)
+        finally:
+            self._sync_lock.release()
+
+    # Queries
+
+    def _store(self, key: str, computed: Buckets, buckets: List[int], generation: int):
+        with self._lock:
+            if generation != self._generation:
+                # An invalidation came in while these were computed
+                return
+            for bucket in buckets:
+                self._entries[(key, bucket)] = computed.get(bucket, {})
+                self._entries.move_to_end((key, bucket))
+                self._by_bucket.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                (evicted_key, evicted_bucket), _ = self._entries.popitem(last=False)
+                keys = self._by_bucket.get(evicted_bucket)
+                if keys is not None:
+                    keys.discard(evicted_key)
+                    if not keys:
+                        del self._by_bucket[evicted_bucket]
+
+    def aggregate(self, db: Session, key: str, compute: Callable[[Session, TimeSlice], Buckets],
+                  start: Optional[datetime], end: Optional[datetime], now: Optional[datetime] = None) -> Partial:
+        """
+        The counts of [start, end] (None bounds are open). ``compute(session,
+        slice)`` returns the counts of a slice by bucket number, grouped by
+        bucket_column(); ``key`` is the query's fingerprint().
+        """
+        start, end = naive_utc(start), naive_utc(end)
+        if not self.enabled:
+            return sum_counts(list(self.executor.aggregate(db, compute, merge_buckets, start, end).values()))
+
+        self._sync(db)
+        if start is None:
+            # Nothing is older than the oldest row but late logs, which the live head finds
+            start = db.query(func.min(LogEntry.timestamp)).scalar()
+            if start is None:
+                return sum_counts(list(compute(db, TimeSlice(None, end, True)).values()))
+            first = self.bucket(start)
+            head = TimeSlice(None, self.bucket_start(first), False)
+        else:
+            first = self.bucket(start)
+            head = None
+            if self.bucket_start(first) < start:
+                # The unaligned part of the first bucket
+                first += 1
+                head = TimeSlice(start, self.bucket_start(first), False)
+        last = self.first_open(naive_utc(now) or datetime.utcnow())
+        if end is not None:
+            last = min(last, self.bucket(end))
+        if first >= last:
+            return sum_counts(list(compute(db, TimeSlice(head.start if head else start, end, True)).values()))
+
+        buckets = list(range(first, last))
+        with self._lock:
+            generation = self._generation
+            cached = {}
+            for bucket in buckets:
+                partial = self._entries.get((key, bucket))
+                if partial is not None:
+                    self._entries.move_to_end((key, bucket))
+                    cached[bucket] = partial
+        parts = list(cached.values())
+
+        # Consecutive missing buckets are computed together
+        runs: List[List[int]] = []
+        for bucket in buckets:
+            if bucket in cached:
+                continue
+            if runs and runs[-1][-1] == bucket - 1:
+                runs[-1].append(bucket)
+            else:
+                runs.append([bucket])
+        for run in runs:
+            run_start, run_end = self.bucket_start(run[0]), self.bucket_start(run[-1] + 1)
+            computed = self.executor.aggregate(db, compute, merge_buckets, run_start, run_end - timedelta(microseconds=1))
+            self._store(key, computed, run, generation)
+            parts.extend(computed.get(bucket, {}) for bucket in run)
+
+        for live in (head, TimeSlice(self.bucket_start(last), end, True)):
+            if live is not None:
+                parts.extend(compute(db, live).values())
+        logger.debug("Bucket cache: %d of %d buckets cached for %s", len(cached), len(buckets), key)
+        return sum_counts(parts)
+
+
+bucket_cache = BucketCache(BUCKET_CACHE_SECONDS, BUCKET_CACHE_GRACE_SECONDS, BUCKET_CACHE_MAX_ENTRIES,
+                           BUCKET_CACHE_SYNC_SECONDS, BUCKET_INVALIDATION_TTL_SECONDS, sliced_executor)
@@ -0,0 +1,457 @@
+"""
+Columnar cold tier for aged log rows.
+
+Rows older than COLD_TIER_AFTER_DAYS are moved out of the ``logs`` table into
+zstd-compressed Parquet files under COLD_STORAGE_DIR, one or more part files
+per UTC day. A JSON manifest next to the files keeps a zone map per file
+(row count, min/max timestamp and id, distinct values of low-cardinality
+columns, a bloom filter of message tokens) so readers can skip files
+without opening them. Inside the files
+the timestamp predicate is pushed down to Parquet row-group statistics and
+only the requested columns are read.
+"""
+import base64
+import heapq
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .config import COLD_STORAGE_DIR, TOKEN_INDEX_FALSE_POSITIVE_RATE
+from .attributes import matches as attributes_match
+from .ip_fields import IP_COLUMNS, in_network, parse_network
+from .message_codec import message_codec
+from .models import BucketInvalidation, LogEntry, SeverityEnum
+from .token_index import BloomFilter, token_pattern, tokenize
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("us")),
+    ("message", pa.string()),
+    ("severity", pa.string()),
+    ("device_id", pa.int64()),
+    ("cnnid", pa.string()),
+    ("location", pa.string()),
+    ("city", pa.string()),
+    ("product", pa.string()),
+    ("device_number", pa.string()),
+    ("vendor", pa.string()),
+    ("device_type", pa.string()),
+    ("template_id", pa.int64()),
+    ("repeat_count", pa.int64()),
+    ("last_seen", pa.timestamp("us")),
+    ("created_at", pa.timestamp("us")),
+    ("src_ip", pa.string()),
+    ("dst_ip", pa.string()),
+    ("src_port", pa.int64()),
+    ("dst_port", pa.int64()),
+    # JSON text of logs.attributes
+    ("attributes", pa.string()),
+])
+
+# Columns needed to build a LogEntryResponse
+RESPONSE_COLUMNS = [
+    "id", "timestamp", "message", "severity", "vendor", "cnnid", "product",
+    "device_type", "location", "city", "device_number", "template_id",
+    "repeat_count", "last_seen", "src_ip", "dst_ip", "src_port", "dst_port",
+    "attributes",
+]
+
+# Low-cardinality columns whose distinct values are kept in the zone map
+ZONE_MAP_COLUMNS = ["severity", "vendor", "device_type", "cnnid"]
+ZONE_MAP_MAX_DISTINCT = 64
+
+# Columns the hot path compares case-insensitively
+CASE_INSENSITIVE_COLUMNS = ["vendor", "device_type", "severity"]
+
+# Columns matched by the free-text ``query`` filter, same as get_logs
+QUERY_COLUMNS = ["message", "vendor", "cnnid", "device_type", "severity", "product"]
+
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_BATCH_ROWS = 50000
+SEVERITY_ORDER = {severity.value: index for index, severity in enumerate(SeverityEnum)}
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _plain(value):
+    if isinstance(value, SeverityEnum):
+        return value.value
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def _decoded(row, message_index: int, connection) -> tuple:
+    """Replace a NULL message with the decompressed message_compressed (the two trailing columns)."""
+    row = tuple(row)
+    if row[message_index] is None and row[-2] is not None:
+        message = message_codec.decompress(connection, row[-1], row[-2])
+        row = row[:message_index] + (message,) + row[message_index + 1:]
+    return row
+
+
+def _filled(table: pa.Table) -> pa.Table:
+    if "repeat_count" in table.column_names:
+        # Files written before deduplication have no repeat_count: one row per log
+        index = table.column_names.index("repeat_count")
+        table = table.set_column(index, "repeat_count", pc.fill_null(table["repeat_count"], 1))
+    return table
+
+
+class ColdStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._manifest = {"files": []}
+        self._manifest_mtime = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def files(self) -> List[dict]:
+        """Return the zone map entries, reloading the manifest if it changed on disk."""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                with open(self.manifest_path) as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+            return list(self._manifest["files"])
+
+    def _write_manifest(self, files: List[dict]):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": files}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    # Writing
+
+    def archive_range(self, db: Session, start: datetime, end: datetime) -> int:
+        """
+        Move rows with start <= timestamp < end into a new part file.
+
+        The file and manifest entry are written before the DELETE is committed;
+        if the delete does not remove exactly the rows that were written (a late
+        row arrived in between) or the commit fails, the part file is discarded
+        and the rows stay in Postgres for the next run.
+        """
+        table = LogEntry.__table__
+        columns = [table.c[name] for name in SCHEMA.names] + [table.c.message_compressed, table.c.dictionary_id]
+        message_index = SCHEMA.names.index("message")
+        in_range = (table.c.timestamp >= start) & (table.c.timestamp < end)
+
+        day_dir = os.path.join(self.root, start.strftime("%Y/%m"))
+        os.makedirs(day_dir, exist_ok=True)
+        relative_path = os.path.join(start.strftime("%Y/%m"), f"logs-{start.strftime('%Y%m%d')}-{uuid.uuid4().hex[:8]}.parquet")
+        path = os.path.join(self.root, relative_path)
+
+        zone = {"rows": 0, "min_timestamp": None, "max_timestamp": None, "min_id": None, "max_id": None}
+        distinct = {name: set() for name in ZONE_MAP_COLUMNS}
+        tokens = set()
+
+        connection = db.connection()
+        result = connection.execution_options(stream_results=True).execute(
+            select(*columns).where(in_range).order_by(table.c.timestamp)
+        )
+        writer = None
+        try:
+            for rows in result.partitions(ARCHIVE_BATCH_ROWS):
+                rows = [_decoded(row, message_index, connection) for row in rows]
+                data = {name: [_plain(row[i]) for row in rows] for i, name in enumerate(SCHEMA.names)}
+                batch = pa.RecordBatch.from_pydict(data, schema=SCHEMA)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+                writer.write_batch(batch)
+
+                # Rows arrive ordered by timestamp, so the first and last batch bound it
+                if zone["rows"] == 0:
+                    zone["min_timestamp"] = data["timestamp"][0]
+                    zone["min_id"] = min(data["id"])
+                    zone["max_id"] = max(data["id"])
+                zone["rows"] += len(rows)
+                zone["max_timestamp"] = data["timestamp"][-1]
+                zone["min_id"] = min(zone["min_id"], min(data["id"]))
+                zone["max_id"] = max(zone["max_id"], max(data["id"]))
+                for name in ZONE_MAP_COLUMNS:
+                    if distinct[name] is not None:
+                        distinct[name].update(data[name])
+                        if len(distinct[name]) > ZONE_MAP_MAX_DISTINCT:
+                            distinct[name] = None
+                for message in data["message"]:
+                    tokens.update(tokenize(message))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if zone["rows"] == 0:
+            db.rollback()
+            return 0
+
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+        entry = {
+            "path": relative_path,
+            "rows": zone["rows"],
+            "bytes": os.path.getsize(path),
+            "min_timestamp": zone["min_timestamp"].isoformat(),
+            "max_timestamp": zone["max_timestamp"].isoformat(),
+            "min_id": zone["min_id"],
+            "max_id": zone["max_id"],
+            "distinct": {
+                name: sorted(value for value in values if value is not None) if values is not None else None
+                for name, values in distinct.items()
+            },
+        }
+        bloom = BloomFilter.build(tokens, TOKEN_INDEX_FALSE_POSITIVE_RATE)
+        entry["token_bloom"] = {"bits": base64.b64encode(bloom.to_bytes()).decode("ascii"), "hashes": bloom.hashes}
+        files = self.files()
+        try:
+            deleted = db.execute(delete(table).where(in_range)).rowcount
+            if deleted != zone["rows"]:
+                raise RuntimeError(f"Expected to delete {zone['rows']} rows, deleted {deleted}")
+            # Hot-tier aggregates cached for this range are stale now
+            db.add(BucketInvalidation(start_time=start, end_time=end))
+            self._write_manifest(files + [entry])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._write_manifest(files)
+            os.remove(path)
+            raise
+
+        logger.info(f"Archived {zone['rows']} logs from {start} to {end} into {relative_path}")
+        return zone["rows"]
+
+    def run_tiering(self, db: Session, older_than_days: int) -> int:
+        """Archive every full UTC day older than ``older_than_days``, one day per transaction."""
+        cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=older_than_days)
+        oldest = db.query(func.min(LogEntry.timestamp)).filter(LogEntry.timestamp < cutoff).scalar()
+        db.rollback()
+        if oldest is None:
+            return 0
+
+        archived = 0
+        day = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < cutoff:
+            try:
+                archived += self.archive_range(db, day, day + timedelta(days=1))
+            except Exception as e:
+                logger.error(f"Failed to archive logs for {day.date()}: {str(e)}")
+            day += timedelta(days=1)
+        return archived
+
+    # Reading
+
+    def _candidate_files(self, start_time=None, end_time=None, token=None, **filters) -> List[str]:
+        start_time, end_time = naive_utc(start_time), naive_utc(end_time)
+        tokens = tokenize(token)
+        paths = []
+        for entry in self.files():
+            if start_time and datetime.fromisoformat(entry["max_timestamp"]) < start_time:
+                continue
+            if end_time and datetime.fromisoformat(entry["min_timestamp"]) > end_time:
+                continue
+            # Files archived before token filters were kept have none and are always read
+            bloom = entry.get("token_bloom")
+            if tokens and bloom and not BloomFilter.from_bytes(base64.b64decode(bloom["bits"]), bloom["hashes"]).contains_all(tokens):
+                continue
+            skip = False
+            for name, value in filters.items():
+                known = entry["distinct"].get(name) if name in ZONE_MAP_COLUMNS else None
+                if value is None or known is None:
+                    continue
+                if name in CASE_INSENSITIVE_COLUMNS:
+                    skip = value.lower() not in {v.lower() for v in known}
+                else:
+                    skip = value not in known
+                if skip:
+                    break
+            if not skip:
+                paths.append(os.path.join(self.root, entry["path"]))
+        return paths
+
+    def _expression(self, start_time=None, end_time=None, query=None, token=None, **filters):
+        expression = None
+
+        def conjoin(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        if start_time:
+            conjoin(ds.field("timestamp") >= pa.scalar(naive_utc(start_time), type=pa.timestamp("us")))
+        if end_time:
+            conjoin(ds.field("timestamp") <= pa.scalar(naive_utc(end_time), type=pa.timestamp("us")))
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name in CASE_INSENSITIVE_COLUMNS:
+                conjoin(pc.utf8_lower(ds.field(name)) == value.lower())
+            else:
+                conjoin(ds.field(name) == value)
+        if query:
+            matches = [pc.match_substring(ds.field(name), query, ignore_case=True) for name in QUERY_COLUMNS]
+            any_match = matches[0]
+            for match in matches[1:]:
+                any_match = any_match | match
+            conjoin(any_match)
+        if token:
+            conjoin(pc.match_substring_regex(ds.field("message"), token_pattern(token)))
+        return expression
+
+    def _dataset(self, start_time=None, end_time=None, query=None, token=None, **filters):
+        paths = self._candidate_files(start_time, end_time, token, **filters)
+        if not paths:
+            return None, None
+        dataset = ds.dataset(paths, schema=SCHEMA, format="parquet")
+        return dataset, self._expression(start_time, end_time, query, token, **filters)
+
+    def has_data(self, start_time=None, end_time=None) -> bool:
+        return bool(self._candidate_files(start_time, end_time))
+
+    def scan(self, columns: List[str], attributes=None, **filters) -> pa.Table:
+        # Subnet and attribute filters have no Arrow kernel; they are applied to the rows read
+        networks = {name: parse_network(filters[name]) for name in IP_COLUMNS if filters.get(name)}
+        filters = {name: value for name, value in filters.items() if name not in IP_COLUMNS}
+        dataset, expression = self._dataset(**filters)
+        if dataset is None:
+            return SCHEMA.empty_table().select(columns)
+        checked = list(networks) + (["attributes"] if attributes else [])
+        table = dataset.to_table(columns=columns + [name for name in checked if name not in columns], filter=expression)
+        if checked:
+            mask = [
+                all(in_network(row[name], network) for name, network in networks.items())
+                and (not attributes or attributes_match(json.loads(row["attributes"] or "null"), attributes))
+                for row in table.select(checked).to_pylist()
+            ]
+            table = table.filter(pa.array(mask, type=pa.bool_())).select(columns)
+        return _filled(table)
+
+    def _rows_by_id(self, ids: List[int], columns: List[str]) -> pa.Table:
+        """``columns`` of the rows with the given ids, in the order of ``ids``."""
+        if not ids:
+            return SCHEMA.empty_table().select(columns)
+        # The zone map's id range leaves only the files holding the rows
+        paths = [
+            os.path.join(self.root, entry["path"]) for entry in self.files()
+            if any(entry["min_id"] <= id_ <= entry["max_id"] for id_ in ids)
+        ]
+        dataset = ds.dataset(paths, schema=SCHEMA, format="parquet")
+        read = list(dict.fromkeys(columns + ["id"]))
+        table = dataset.to_table(columns=read, filter=ds.field("id").isin(pa.array(ids, type=pa.int64())))
+        position = {id_: index for index, id_ in enumerate(ids)}
+        read_ids = table["id"].to_pylist()
+        order = sorted(range(table.num_rows), key=lambda row: position[read_ids[row]])
+        return _filled(table.take(pa.array(order, type=pa.int64())).select(columns))
+
+    def count(self, **filters) -> int:
+        """Number of stored rows, e.g. for pagination."""
+        if filters.get("attributes") or any(filters.get(name) for name in IP_COLUMNS):
+            return self.scan(["id"], **filters).num_rows
+        filters = {name: value for name, value in filters.items() if name not in IP_COLUMNS and name != "attributes"}
+        dataset, expression = self._dataset(**filters)
+        if dataset is None:
+            return 0
+        return dataset.count_rows(filter=expression)
+
+    def event_count(self, **filters) -> int:
+        """Number of logs, counting every repeat collapsed into a row."""
+        table = self.scan(["repeat_count"], **filters)
+        return pc.sum(table["repeat_count"]).as_py() or 0
+
+    def value_counts(self, column: str, **filters) -> Dict[str, int]:
+        """Number of logs per value of ``column``."""
+        table = self.scan([column, "repeat_count"], **filters)
+        if table.num_rows == 0:
+            return {}
+        counts = table.group_by(column).aggregate([("repeat_count", "sum")])
+        return {value: count for value, count in zip(counts[column].to_pylist(), counts["repeat_count_sum"].to_pylist()) if value is not None}
+
+    def bucket_counts(self, date_format: str, **filters) -> Dict[str, int]:
+        """Number of logs per time bucket, keyed by ``timestamp`` formatted with ``date_format``."""
+        table = self.scan(["timestamp", "repeat_count"], **filters)
+        if table.num_rows == 0:
+            return {}
+        buckets = pa.table({"bucket": pc.strftime(table["timestamp"], format=date_format), "repeat_count": table["repeat_count"]})
+        counts = buckets.group_by("bucket").aggregate([("repeat_count", "sum")])
+        return dict(zip(counts["bucket"].to_pylist(), counts["repeat_count_sum"].to_pylist()))
+
+    def top_rows(self, sort_by: str, descending: bool, limit: Optional[int], columns: List[str] = RESPONSE_COLUMNS,
+                 boundary: Optional[datetime] = None, **filters) -> List[dict]:
+        """
+        Return the first ``limit`` matching rows (all of them if None) in the given sort order.
+
+        Only the sort key and id are scanned to find them; the other columns
+        are read for those rows alone. ``boundary`` is the timestamp of the
+        last row of a full hot-tier window in timestamp order: cold rows past
+        it cannot make the merged window, so files beyond it are skipped.
+        """
+        if boundary is not None and sort_by == "timestamp":
+            filters = dict(filters)
+            boundary = naive_utc(boundary)
+            if descending:
+                start_time = naive_utc(filters.get("start_time"))
+                filters["start_time"] = boundary if start_time is None else max(start_time, boundary)
+            else:
+                end_time = naive_utc(filters.get("end_time"))
+                filters["end_time"] = boundary if end_time is None else min(end_time, boundary)
+        scanned = columns if limit is None else list(dict.fromkeys([sort_by, "id"]))
+        table = self.scan(scanned, **filters)
+        if table.num_rows == 0:
+            return []
+        keys = table[sort_by]
+        if sort_by == "severity":
+            keys = pa.array([SEVERITY_ORDER.get(value) for value in keys.to_pylist()], type=pa.int8())
+        indices = pc.array_sort_indices(keys, order="descending" if descending else "ascending")
+        # sort_indices puts NULLs last; Postgres puts them first in descending order
+        nulls = keys.null_count
+        if descending and nulls:
+            indices = pa.concat_arrays([indices[-nulls:], indices[:-nulls]])
+        if limit is None:
+            rows = table.take(indices).to_pylist()
+        else:
+            rows = self._rows_by_id(table["id"].take(indices[:limit]).to_pylist(), columns).to_pylist()
+        if "attributes" in columns:
+            for row in rows:
+                row["attributes"] = json.loads(row["attributes"]) if row["attributes"] else None
+        return rows
+
+def sort_key(sort_by: str):
+    """Key matching Postgres ordering of ``sort_by`` (NULLs sort as the largest value)."""
+    def key(row):
+        value = getattr(row, sort_by)
+        if sort_by == "severity" and value is not None:
+            value = SEVERITY_ORDER[_plain(value)]
+        return (value is None, value)
+    return key
+
+
+def merge_sorted(hot: list, cold: list, sort_by: str, descending: bool) -> list:
+    """Merge two lists that are each already sorted by ``sort_by``."""
+    return list(heapq.merge(hot, cold, key=sort_key(sort_by), reverse=descending))
+
+
+cold_store = ColdStore(COLD_STORAGE_DIR)
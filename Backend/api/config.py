@@ -33,3 +33,156 @@ AZURE_AD_CLIENT_ID = os.getenv("AZURE_AD_CLIENT_ID")
 AZURE_AD_CLIENT_SECRET = os.getenv("AZURE_AD_CLIENT_SECRET")
 AZURE_AD_TENANT_ID = os.getenv("AZURE_AD_TENANT_ID")
 
+
+# Cold tier: rows older than COLD_TIER_AFTER_DAYS are moved into Parquet files
+# under COLD_STORAGE_DIR by Backend/tier_logs.py
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "/app/cold_storage")
+COLD_TIER_AFTER_DAYS = int(os.getenv("COLD_TIER_AFTER_DAYS", "7"))
+
+# Ingest-time sketches: bucket width and how often each worker merges its
+# in-memory deltas into the log_sketches table
+SKETCH_BUCKET_SECONDS = int(os.getenv("SKETCH_BUCKET_SECONDS", "300"))
+SKETCH_FLUSH_SECONDS = int(os.getenv("SKETCH_FLUSH_SECONDS", "10"))
+
+# Drain template miner: parse tree depth, similarity needed to join a cluster
+# and maximum children per tree node
+TEMPLATE_MINER_DEPTH = int(os.getenv("TEMPLATE_MINER_DEPTH", "4"))
+TEMPLATE_MINER_SIMILARITY = float(os.getenv("TEMPLATE_MINER_SIMILARITY", "0.4"))
+TEMPLATE_MINER_MAX_CHILDREN = int(os.getenv("TEMPLATE_MINER_MAX_CHILDREN", "100"))
+
+# Compressed message storage: when enabled, create_log stores messages as zstd
+# frames using the vendor's latest dictionary (trained with
+# Backend/train_dictionaries.py). Compressed rows are decoded on read; message
+# filters (query, token) decode the compressed rows in their time range, which
+# makes them slower over wide ranges.
+MESSAGE_COMPRESSION = os.getenv("MESSAGE_COMPRESSION", "false").lower() == "true"
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "3"))
+
+# Ingest deduplication: exact repeats of a message within this many seconds of
+# its first occurrence are counted on the first row (0 disables it), keeping at
+# most DEDUP_MAX_KEYS recent keys per worker
+DEDUP_WINDOW_SECONDS = float(os.getenv("DEDUP_WINDOW_SECONDS", "60"))
+DEDUP_MAX_KEYS = int(os.getenv("DEDUP_MAX_KEYS", "100000"))
+
+# Ingest rate limiting: JSON file with per-cnnid/vendor/device token-bucket
+# rules (see api/rate_limiter.py), how often it is checked for changes, and how
+# often each worker writes its counts of rejected messages to ingest_drops
+INGEST_POLICY_FILE = os.getenv("INGEST_POLICY_FILE", "/app/Backend/ingest_policies.json")
+INGEST_POLICY_RELOAD_SECONDS = float(os.getenv("INGEST_POLICY_RELOAD_SECONDS", "5"))
+INGEST_DROP_FLUSH_SECONDS = int(os.getenv("INGEST_DROP_FLUSH_SECONDS", "10"))
+
+# Idempotent ingest: how long a batch key is remembered, and whether batches
+# without an Idempotency-Key header are keyed by a hash of their body
+INGEST_BATCH_TTL_SECONDS = int(os.getenv("INGEST_BATCH_TTL_SECONDS", "21600"))
+INGEST_HASH_BODIES = os.getenv("INGEST_HASH_BODIES", "true").lower() == "true"
+
+# Parallel ingest parsing: processes in the parser pool (0 = one per CPU, 1
+# parses on the event loop) and the size of the NDJSON chunks handed to them
+INGEST_PARSE_PROCESSES = int(os.getenv("INGEST_PARSE_PROCESSES", "0"))
+INGEST_PARSE_CHUNK_BYTES = int(os.getenv("INGEST_PARSE_CHUNK_BYTES", str(1024 * 1024)))
+
+# Request instrumentation: requests slower than this are kept with their SQL
+# statements in a ring buffer of the last SLOW_REQUEST_BUFFER_SIZE
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_BUFFER_SIZE = int(os.getenv("SLOW_REQUEST_BUFFER_SIZE", "100"))
+
+# Query profiler: per-fingerprint statement stats on the shared engine, and an
+# EXPLAIN ANALYZE sample (at most one per fingerprint per interval) of SELECTs
+# slower than SLOW_QUERY_SECONDS, see api/query_profiler.py
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "true").lower() == "true"
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.5"))
+EXPLAIN_SAMPLE_INTERVAL_SECONDS = float(os.getenv("EXPLAIN_SAMPLE_INTERVAL_SECONDS", "300"))
+QUERY_PROFILER_MAX_FINGERPRINTS = int(os.getenv("QUERY_PROFILER_MAX_FINGERPRINTS", "1000"))
+QUERY_PROFILER_MAX_PLANS = int(os.getenv("QUERY_PROFILER_MAX_PLANS", "200"))
+
+# Logging: root level, per-logger levels ("name=LEVEL,name=LEVEL"), json or
+# text output, an optional file next to stderr, and the size of the queue in
+# front of the writer thread (records beyond it are dropped, see
+# api/logging_config.py). Hot-path debug logs let one in LOG_HOT_PATH_EVERY
+# calls through, at most LOG_HOT_PATH_PER_SECOND per second
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_HOT_PATH_EVERY = int(os.getenv("LOG_HOT_PATH_EVERY", "100"))
+LOG_HOT_PATH_PER_SECOND = float(os.getenv("LOG_HOT_PATH_PER_SECOND", "5"))
+
+# Startup: the schema is managed by alembic migrations (init_db.py for a new
+# database); set CREATE_SCHEMA_ON_STARTUP=true to have each worker run
+# create_all on startup instead. Warmup opens up to DB_WARMUP_CONNECTIONS
+# pooled connections and preloads the template cache, see api/startup.py
+CREATE_SCHEMA_ON_STARTUP = os.getenv("CREATE_SCHEMA_ON_STARTUP", "false").lower() == "true"
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "5"))
+
+# Recent logs buffer: the newest RECENT_LOGS_BUFFER_SIZE rows kept in memory
+# per worker to answer first pages of /logs and /search/recent (0 disables
+# it). Rows committed by other workers are picked up at most every
+# RECENT_LOGS_SYNC_SECONDS, and page totals are recounted in the database
+# every RECENT_LOGS_COUNT_SECONDS, see api/recent_logs.py
+RECENT_LOGS_BUFFER_SIZE = int(os.getenv("RECENT_LOGS_BUFFER_SIZE", "10000"))
+RECENT_LOGS_SYNC_SECONDS = float(os.getenv("RECENT_LOGS_SYNC_SECONDS", "1.0"))
+RECENT_LOGS_COUNT_SECONDS = float(os.getenv("RECENT_LOGS_COUNT_SECONDS", "30"))
+
+# Dashboards: range of widgets that set neither "last" nor start/end times,
+# and how many widget groups (one scan or sketch read each) run at once when
+# a dashboard's data is loaded, see api/dashboard_query.py
+DASHBOARD_DEFAULT_RANGE = os.getenv("DASHBOARD_DEFAULT_RANGE", "24h")
+DASHBOARD_PARALLEL_GROUPS = int(os.getenv("DASHBOARD_PARALLEL_GROUPS", "4"))
+
+# Sliced queries: wide time ranges are split at QUERY_SLICE_SECONDS
+# boundaries (whole UTC days) and the slices run in parallel, at most
+# QUERY_SLICE_PARALLELISM per query and QUERY_SLICE_BUDGET across all
+# queries of a worker (each running slice holds a pool connection). Ranges
+# of fewer than QUERY_MIN_SLICES slices run as one query
+QUERY_SLICE_SECONDS = int(os.getenv("QUERY_SLICE_SECONDS", "86400"))
+QUERY_SLICE_PARALLELISM = int(os.getenv("QUERY_SLICE_PARALLELISM", "4"))
+QUERY_SLICE_BUDGET = int(os.getenv("QUERY_SLICE_BUDGET", "8"))
+QUERY_MIN_SLICES = int(os.getenv("QUERY_MIN_SLICES", "3"))
+
+# Bucket cache: aggregates of closed BUCKET_CACHE_SECONDS buckets (whole UTC
+# hours) are cached per worker, at most BUCKET_CACHE_MAX_ENTRIES of them
+# (0 disables the cache). A bucket is closed BUCKET_CACHE_GRACE_SECONDS after
+# its end. Late logs invalidate their bucket in every worker through the
+# bucket_invalidations table, read at most every BUCKET_CACHE_SYNC_SECONDS
+# and kept for BUCKET_INVALIDATION_TTL_SECONDS, see api/bucket_cache.py
+BUCKET_CACHE_SECONDS = int(os.getenv("BUCKET_CACHE_SECONDS", "3600"))
+BUCKET_CACHE_GRACE_SECONDS = int(os.getenv("BUCKET_CACHE_GRACE_SECONDS", "300"))
+BUCKET_CACHE_MAX_ENTRIES = int(os.getenv("BUCKET_CACHE_MAX_ENTRIES", "100000"))
+BUCKET_CACHE_SYNC_SECONDS = float(os.getenv("BUCKET_CACHE_SYNC_SECONDS", "5"))
+BUCKET_INVALIDATION_TTL_SECONDS = int(os.getenv("BUCKET_INVALIDATION_TTL_SECONDS", "86400"))
+
+# Token index: every TOKEN_INDEX_CHUNK_ROWS log IDs form a chunk, and a
+# sealed chunk gets a bloom filter of its message tokens sized for
+# TOKEN_INDEX_FALSE_POSITIVE_RATE (0 rows disables it). /logs?token= skips
+# chunks whose filter rules the token out. Ingest checks for chunks to seal
+# every TOKEN_INDEX_SEAL_SECONDS; a chunk is sealed once a row after it is
+# TOKEN_INDEX_SEAL_DELAY_SECONDS old. Filters read by a worker are cached up
+# to TOKEN_INDEX_CACHE_MB, see api/token_index.py
+TOKEN_INDEX_CHUNK_ROWS = int(os.getenv("TOKEN_INDEX_CHUNK_ROWS", "65536"))
+TOKEN_INDEX_FALSE_POSITIVE_RATE = float(os.getenv("TOKEN_INDEX_FALSE_POSITIVE_RATE", "0.01"))
+TOKEN_INDEX_SEAL_SECONDS = float(os.getenv("TOKEN_INDEX_SEAL_SECONDS", "30"))
+TOKEN_INDEX_SEAL_DELAY_SECONDS = int(os.getenv("TOKEN_INDEX_SEAL_DELAY_SECONDS", "60"))
+TOKEN_INDEX_CACHE_MB = int(os.getenv("TOKEN_INDEX_CACHE_MB", "64"))
+
+# IP fields: create_log fills logs.src_ip/dst_ip/src_port/dst_port from parsed
+# record fields (src_ip, dst_port, source.ip, ...) and, with
+# IP_FIELDS_FROM_MESSAGE, from key=value pairs in the message such as
+# SRC=10.0.0.1 DPT=22, see api/ip_fields.py
+IP_FIELDS_FROM_MESSAGE = os.getenv("IP_FIELDS_FROM_MESSAGE", "true").lower() == "true"
+
+# Attributes: record fields without a column of their own (devid, devname,
+# FortiGate key=value fields, ...) are kept in logs.attributes, at most
+# ATTRIBUTES_MAX_KEYS per log. /logs and /search filter them with
+# attr.<key>=<value> through the GIN index; the comma-separated
+# ATTRIBUTES_INDEXED_KEYS are hot keys with an expression index of their own,
+# built by index_logs.py --promote-attributes, see api/attributes.py
+ATTRIBUTES_MAX_KEYS = int(os.getenv("ATTRIBUTES_MAX_KEYS", "128"))
+ATTRIBUTES_INDEXED_KEYS = os.getenv("ATTRIBUTES_INDEXED_KEYS", "devid,devname")
+
+# Vendor parsers: create_log parses FortiGate, Cisco ASA, Palo Alto, F5 and
+# Check Point messages into fields. The parser is chosen by the record's
+# ingest_port field (VENDOR_PARSER_PORTS, e.g. "5514=fortigate,5515=cisco_asa"),
+# its vendor, or the message prefix, see api/parsers/
+VENDOR_PARSERS_ENABLED = os.getenv("VENDOR_PARSERS_ENABLED", "true").lower() == "true"
+VENDOR_PARSER_PORTS = os.getenv("VENDOR_PARSER_PORTS", "")
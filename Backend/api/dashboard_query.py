@@ -0,0 +1,226 @@
+"""
+Data for all widgets of a dashboard in one request.
+
+Each widget resolves to an absolute time range (relative ranges against one
+``now`` per request) and is planned into a group:
+
+* total, facet and time_series widgets with the same filters share one
+  analytics.load_columns scan when their ranges overlap. The scan covers the
+  union of the ranges and the dimensions, and each widget computes its result
+  from the shared columns, cut to its own range to the second.
+* top, distinct and quantiles widgets over the same range share one read of
+  the log_sketches rollup.
+
+Groups run concurrently, each in its own session on the threadpool, at most
+DASHBOARD_PARALLEL_GROUPS at a time. A failing group only fails its own
+widgets.
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import analytics, sketches
+from .config import DASHBOARD_DEFAULT_RANGE, DASHBOARD_PARALLEL_GROUPS
+from .models import WidgetSpec
+from .sketches import sketch_aggregator
+
+logger = logging.getLogger(__name__)
+
+SCAN_TYPES = ["total", "facet", "time_series"]
+# Widget type -> sketch kind
+SKETCH_TYPES = {"top": "topk", "distinct": "hll", "quantiles": "tdigest"}
+FILTERS = ["query", "cnnid", "vendor", "device_type", "severity"]
+RANGE_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+DEFAULT_QUANTILES = [0.5, 0.9, 0.99]
+DEFAULT_TOP_K = 10
+
+
+class WidgetError(ValueError):
+    pass
+
+
+def validate(widget: WidgetSpec):
+    """Raise WidgetError if ``widget`` cannot be computed."""
+    unknown = [name for name in widget.filters if name not in FILTERS]
+    if unknown:
+        raise WidgetError(f"Invalid filters: {unknown}. Must be one of {FILTERS}.")
+    if widget.type == "facet" and widget.dimension not in analytics.DIMENSIONS:
+        raise WidgetError(f"Invalid dimension: {widget.dimension}. Must be one of {analytics.DIMENSIONS}.")
+    if widget.type == "time_series":
+        if widget.interval not in analytics.INTERVAL_SECONDS:
+            raise WidgetError("Invalid interval. Must be 'day', 'hour', or 'minute'.")
+        if widget.series_by is not None and widget.series_by not in analytics.DIMENSIONS:
+            raise WidgetError(f"Invalid series_by: {widget.series_by}. Must be one of {analytics.DIMENSIONS}.")
+    if widget.type in SKETCH_TYPES:
+        if widget.filters:
+            raise WidgetError("Sketch widgets cover all logs and take no filters")
+        allowed = sketches.METRICS if widget.type == "quantiles" else sketches.DIMENSIONS
+        if (widget.dimension or allowed[0]) not in allowed:
+            raise WidgetError(f"Invalid dimension: {widget.dimension}. Must be one of {allowed}.")
+        if any(value < 0 or value > 1 for value in widget.quantiles or []):
+            raise WidgetError("Quantiles must be between 0 and 1")
+    if widget.start_time and widget.end_time and _utc(widget.start_time) > _utc(widget.end_time):
+        raise WidgetError("start_time must be before end_time")
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _duration(last: str) -> timedelta:
+    match = re.fullmatch(r"([1-9][0-9]*)([mhd])", last)
+    if match is None:
+        raise WidgetError(f"Invalid range: {last}")
+    return timedelta(**{RANGE_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def resolve_range(widget: WidgetSpec, now: datetime, start_time: Optional[datetime] = None,
+                  end_time: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """The widget's absolute range; ``start_time``/``end_time`` (the dashboard's time picker) override it."""
+    end = _utc(end_time or widget.end_time or now)
+    if start_time or widget.start_time:
+        start = _utc(start_time or widget.start_time)
+    else:
+        start = end - _duration(widget.last or DASHBOARD_DEFAULT_RANGE)
+    return start, end
+
+
+class PlannedWidget:
+    def __init__(self, index: int, spec: WidgetSpec, start: datetime, end: datetime):
+        self.index = index
+        self.spec = spec
+        self.start = start
+        self.end = end
+
+
+class Group:
+    """Widgets answered by one scan or one sketch read."""
+
+    def __init__(self, kind: str, filters: Tuple[Tuple[str, str], ...] = ()):
+        self.kind = kind
+        self.filters = filters
+        self.widgets: List[PlannedWidget] = []
+
+    @property
+    def start(self) -> datetime:
+        return min(widget.start for widget in self.widgets)
+
+    @property
+    def end(self) -> datetime:
+        return max(widget.end for widget in self.widgets)
+
+
+def plan(widgets: List[WidgetSpec], now: datetime, start_time: Optional[datetime] = None,
+         end_time: Optional[datetime] = None) -> List[Group]:
+    scans: Dict[tuple, List[PlannedWidget]] = {}
+    sketch_groups: Dict[tuple, Group] = {}
+    for index, spec in enumerate(widgets):
+        start, end = resolve_range(spec, now, start_time, end_time)
+        widget = PlannedWidget(index, spec, start, end)
+        if spec.type in SKETCH_TYPES:
+            sketch_groups.setdefault((start, end), Group("sketch")).widgets.append(widget)
+        else:
+            scans.setdefault(tuple(sorted(spec.filters.items())), []).append(widget)
+
+    groups = []
+    for filters, planned in scans.items():
+        # Overlapping ranges with the same filters become one scan of their union
+        group = None
+        for widget in sorted(planned, key=lambda planned_widget: planned_widget.start):
+            if group is None or widget.start > group.end:
+                group = Group("scan", filters)
+                groups.append(group)
+            group.widgets.append(widget)
+    return groups + list(sketch_groups.values())
+
+
+def _scan_result(spec: WidgetSpec, columns: analytics.LogColumns):
+    if spec.type == "total":
+        return int(columns.weights.sum())
+    if spec.type == "facet":
+        return analytics.compute(columns, facets=[spec.dimension], top_n=spec.top_n)["facets"][spec.dimension]
+    result = analytics.compute(columns, facets=[], interval=spec.interval, top_n=spec.top_n, series_by=spec.series_by)
+    return {key: result[key] for key in ("time_series", "series_by") if key in result}
+
+
+def _sketch_key(spec: WidgetSpec) -> Tuple[str, str]:
+    allowed = sketches.METRICS if spec.type == "quantiles" else sketches.DIMENSIONS
+    return SKETCH_TYPES[spec.type], spec.dimension or allowed[0]
+
+
+def _sketch_result(spec: WidgetSpec, sketch):
+    if spec.type == "top":
+        return [{"key": key, "count": count} for key, count in sketch.top(spec.top_n or DEFAULT_TOP_K)]
+    if spec.type == "distinct":
+        return sketch.cardinality()
+    quantiles = spec.quantiles or DEFAULT_QUANTILES
+    return {"count": sketch.count, "quantiles": {str(value): sketch.quantile(value) for value in quantiles}}
+
+
+def run_group(db: Session, group: Group) -> Dict[int, object]:
+    """Results of the group's widgets by widget index."""
+    results = {}
+    start, end = group.start, group.end
+    if group.kind == "sketch":
+        merged = sketch_aggregator.query_many(db, [_sketch_key(widget.spec) for widget in group.widgets], start, end)
+        for widget in group.widgets:
+            results[widget.index] = _sketch_result(widget.spec, merged[_sketch_key(widget.spec)])
+        return results
+
+    dimensions = set()
+    for widget in group.widgets:
+        dimensions.update(name for name in (widget.spec.dimension, widget.spec.series_by) if name)
+    columns = analytics.load_columns(db, dimensions=sorted(dimensions), start_time=start, end_time=end, **dict(group.filters))
+    for widget in group.widgets:
+        widget_columns = columns
+        if (widget.start, widget.end) != (start, end):
+            widget_columns = columns.between(int(widget.start.timestamp()), int(widget.end.timestamp()))
+        results[widget.index] = _scan_result(widget.spec, widget_columns)
+    return results
+
+
+def _run_in_session(session_factory: Callable[[], Session], group: Group) -> Dict[int, object]:
+    db = session_factory()
+    try:
+        return run_group(db, group)
+    finally:
+        db.close()
+
+
+async def load(widgets: List[WidgetSpec], session_factory: Callable[[], Session], now: Optional[datetime] = None,
+               start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+               parallel: int = DASHBOARD_PARALLEL_GROUPS) -> dict:
+    """Every widget's data, in widget order, plus how many groups (scans or sketch reads) it took."""
+    now = now or datetime.now(timezone.utc)
+    groups = plan(widgets, now, start_time, end_time)
+    semaphore = asyncio.Semaphore(max(parallel, 1))
+
+    async def run(group: Group):
+        async with semaphore:
+            return await run_in_threadpool(_run_in_session, session_factory, group)
+
+    outcomes = await asyncio.gather(*(run(group) for group in groups), return_exceptions=True)
+    entries: List[Optional[dict]] = [None] * len(widgets)
+    for group, outcome in zip(groups, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Dashboard widget group failed: %s", outcome)
+        for widget in group.widgets:
+            entry = {
+                "id": widget.spec.id or str(widget.index),
+                "type": widget.spec.type,
+                "start_time": widget.start,
+                "end_time": widget.end,
+            }
+            if isinstance(outcome, Exception):
+                entry["error"] = str(outcome)
+            else:
+                entry["data"] = outcome[widget.index]
+            entries[widget.index] = entry
+    return {"widgets": entries, "groups": len(groups)}
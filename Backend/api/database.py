@@ -1,11 +1,16 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
 from .models import Base
-from .config import DATABASE_URL
+from .config import DATABASE_URL, QUERY_PROFILER_ENABLED
+from .query_profiler import query_profiler
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if QUERY_PROFILER_ENABLED:
+    query_profiler.attach(engine)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -13,3 +18,25 @@ def get_db():
     finally:
         db.close()
 
+def get_or_create(db: Session, model, values: dict, **filters):
+    """
+    The first ``model`` row matching ``filters``, created with ``values`` if
+    there is none.
+
+    The row is created and committed in a short session of its own, so a
+    request's transaction (e.g. an ingest batch and its idempotency key) is
+    never committed halfway. A concurrent insert of the same unique row is
+    rolled back and the winner's row returned.
+    """
+    row = db.query(model).filter_by(**filters).first()
+    if row is not None:
+        return row, False
+    creator = Session(bind=db.get_bind())
+    try:
+        creator.add(model(**filters, **values))
+        creator.commit()
+    except IntegrityError:
+        creator.rollback()
+    finally:
+        creator.close()
+    return db.query(model).filter_by(**filters).first(), True
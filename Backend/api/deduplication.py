@@ -0,0 +1,79 @@
+"""
+Ingest-side deduplication of repeated messages.
+
+During storms devices resend the same line thousands of times a minute.
+create_log collapses exact repeats, keyed on (cnnid, product, severity,
+whitespace-normalized message), into the row of the first occurrence:
+``repeat_count`` counts the occurrences and ``last_seen`` holds the latest
+timestamp, while ``timestamp`` stays the first one.
+
+The window is per worker and slides from each key's first occurrence, so a
+key that keeps repeating gets a new row every DEDUP_WINDOW_SECONDS. Aggregate
+endpoints sum ``repeat_count`` instead of counting rows.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import DEDUP_MAX_KEYS, DEDUP_WINDOW_SECONDS
+
+
+def dedup_key(cnnid: Optional[str], product: Optional[str], severity: Optional[str], message: str) -> bytes:
+    normalized = " ".join(message.split())
+    parts = [cnnid or "", product or "", str(severity or "").lower(), normalized]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).digest()
+
+
+class DedupWindow:
+    """
+    Keys seen in the last ``window_seconds``, oldest first, each with the ID
+    and column values of the row it was stored in. The column values let a
+    repeat be inserted as a new row if that row is gone by the time the
+    repeat is counted.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[bytes, Tuple[float, int, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now: float):
+        while self._entries:
+            key, (first_seen, _, _) = next(iter(self._entries.items()))
+            if now - first_seen < self.window_seconds and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[key]
+
+    def lookup(self, key: bytes) -> Optional[Tuple[int, dict]]:
+        """Return (log_id, row values) if ``key`` was stored within the window."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(key)
+            return (entry[1], entry[2]) if entry else None
+
+    def remember(self, key: bytes, log_id: int, values: dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), log_id, values)
+            self._expire(time.monotonic())
+
+    def forget(self, key: bytes):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+dedup_window = DedupWindow(DEDUP_WINDOW_SECONDS, DEDUP_MAX_KEYS)
@@ -0,0 +1,97 @@
+"""
+Idempotent ingest batches.
+
+Each POST /logs batch is identified by its ``Idempotency-Key`` (or
+``X-Batch-Id``) header or, when the client sends neither, by a hash of the
+raw body and its content headers; Fluent Bit resends a failed chunk byte for
+byte, so retries hash to the same key. The body is hashed chunk by chunk as
+it is decoded, so the raw body is never buffered whole; its key is known once
+the body is consumed, and the decoded records are held until it is looked
+up, before any of them is rate limited, templated or stored. The key is
+stored as a 16-byte digest in ``ingest_batches`` in the same transaction as
+the batch's logs, so a batch is either stored together with its key or not
+at all; only the customers, devices and templates it introduces are
+committed on their own, as reference data a retry finds and reuses. A replay
+finds the key and is acknowledged with the original result without storing
+anything; two copies racing each other collide on the primary key and the
+loser is acknowledged the same way.
+
+Keys expire after INGEST_BATCH_TTL_SECONDS and are purged lazily.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.orm import Session
+
+from .config import INGEST_BATCH_TTL_SECONDS
+from .models import IngestBatch
+
+logger = logging.getLogger(__name__)
+
+PURGE_SECONDS = 300
+
+
+def body_hasher(content_type: Optional[str], content_encoding: Optional[str]):
+    """blake2b of a body and its content headers, to be fed the raw body chunk by chunk."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(b"body\x00" + (content_type or "").encode("utf-8") + b"\x00" + (content_encoding or "").encode("utf-8") + b"\x00")
+    return digest
+
+
+async def hashed_chunks(chunks: AsyncIterator[bytes], digest) -> AsyncIterator[bytes]:
+    """``chunks`` unchanged, each fed to ``digest`` as it is consumed."""
+    async for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def batch_key(idempotency_key: Optional[str], body: Optional[bytes], content_type: Optional[str],
+              content_encoding: Optional[str]) -> Optional[bytes]:
+    """Digest identifying a batch, or None if there is neither a header key nor a body to hash."""
+    if idempotency_key:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(b"key\x00" + idempotency_key.strip().encode("utf-8"))
+    elif body is not None:
+        digest = body_hasher(content_type, content_encoding)
+        digest.update(body)
+    else:
+        return None
+    return digest.digest()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._last_purge = 0.0
+
+    def lookup(self, db: Session, key: bytes) -> Optional[IngestBatch]:
+        return (
+            db.query(IngestBatch)
+            .filter(IngestBatch.key == key, IngestBatch.expires_at > datetime.utcnow())
+            .first()
+        )
+
+    def record(self, db: Session, key: bytes, logs_created: int, logs_dropped: int):
+        """Add the batch key to the caller's transaction."""
+        now = datetime.utcnow()
+        # A key that expired but was not purged yet is simply replaced
+        db.query(IngestBatch).filter(IngestBatch.key == key, IngestBatch.expires_at <= now).delete(synchronize_session=False)
+        db.add(IngestBatch(
+            key=key, logs_created=logs_created, logs_dropped=logs_dropped,
+            created_at=now, expires_at=now + timedelta(seconds=self.ttl_seconds),
+        ))
+
+    def purge_if_due(self, db: Session):
+        if time.monotonic() - self._last_purge < PURGE_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        purged = db.query(IngestBatch).filter(IngestBatch.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.commit()
+        if purged:
+            logger.debug(f"Purged {purged} expired ingest batch keys")
+
+
+idempotency_store = IdempotencyStore(INGEST_BATCH_TTL_SECONDS)
@@ -0,0 +1,209 @@
+"""
+Parallel parsing stage for large NDJSON ingest bodies.
+
+JSON decoding and timestamp parsing are CPU bound and would otherwise run
+on the event loop thread, one core per API worker. Once a decompressed
+NDJSON body grows past INGEST_PARSE_CHUNK_BYTES it is cut at line
+boundaries into chunks that a process pool parses concurrently. Each
+worker builds an Arrow record batch of the columns create_log reads and
+writes it in Arrow IPC format to a shared memory segment; only the
+segment name crosses the process boundary. The API process maps the
+segment, reads the columns and unlinks it. Records come back in body
+order, and at most two chunks per process are in flight, so memory stays
+bounded while create_log writes the earlier records.
+
+Bodies smaller than one chunk, and msgpack bodies, are decoded inline by
+api/wire_formats.py.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timezone
+from multiprocessing import shared_memory
+from typing import AsyncIterator, List, Optional, Tuple
+
+import pyarrow as pa
+from pydantic.datetime_parse import parse_datetime
+
+from . import wire_formats
+from .config import INGEST_PARSE_CHUNK_BYTES, INGEST_PARSE_PROCESSES
+
+logger = logging.getLogger(__name__)
+
+# The fields create_log reads from each record
+SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us")),
+    # Set instead of timestamp when the value could not be parsed, so create_log reports it
+    ("timestamp_raw", pa.string()),
+    ("message", pa.string()),
+    ("severity", pa.string()),
+    ("cnnid", pa.string()),
+    ("vendor", pa.string()),
+    ("product", pa.string()),
+    ("device_type", pa.string()),
+    # JSON object of the other fields (addresses, vendor attributes), None if there are none
+    ("extra", pa.string()),
+])
+TEXT_FIELDS = ["message", "severity", "cnnid", "vendor", "product", "device_type"]
+COLUMN_FIELDS = set(TEXT_FIELDS) | {"timestamp"}
+
+
+def _timestamp(value):
+    """Parse to naive UTC like Postgres stores it; return (timestamp, raw) with one of them set."""
+    if value is None:
+        return None, None
+    try:
+        parsed = parse_datetime(value)
+    except (TypeError, ValueError):
+        return None, str(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed, None
+
+
+def _text(value) -> Optional[str]:
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def parse_chunk(data: bytes) -> pa.RecordBatch:
+    """Decode complete NDJSON lines into a record batch of the fields create_log uses."""
+    decoder = wire_formats.record_decoder("application/x-ndjson")
+    records = decoder.feed(data) + decoder.close()
+    columns = {name: [] for name in SCHEMA.names}
+    for record in records:
+        timestamp, raw = _timestamp(record.get("timestamp"))
+        columns["timestamp"].append(timestamp)
+        columns["timestamp_raw"].append(raw)
+        for name in TEXT_FIELDS:
+            columns[name].append(_text(record.get(name)))
+        extra = {key: value for key, value in record.items() if key not in COLUMN_FIELDS}
+        columns["extra"].append(json.dumps(extra) if extra else None)
+    return pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+
+def _parse_to_shared_memory(data: bytes) -> Tuple[str, int]:
+    """Pool entry point: parse ``data`` and return the shared memory segment holding the batch."""
+    batch = parse_chunk(data)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, SCHEMA) as writer:
+        writer.write_batch(batch)
+    buffer = sink.getvalue()
+    segment = shared_memory.SharedMemory(create=True, size=max(buffer.size, 1))
+    try:
+        segment.buf[:buffer.size] = memoryview(buffer).cast("B")
+        return segment.name, buffer.size
+    finally:
+        segment.close()
+
+
+def _records(batch) -> List[dict]:
+    records = batch.to_pylist()
+    for record in records:
+        raw = record.pop("timestamp_raw")
+        if record["timestamp"] is None:
+            if raw is None:
+                del record["timestamp"]
+            else:
+                record["timestamp"] = raw
+        for name in TEXT_FIELDS:
+            if record[name] is None:
+                del record[name]
+        extra = record.pop("extra")
+        if extra is not None:
+            record.update(json.loads(extra))
+    return records
+
+
+def _read_shared_memory(name: str, size: int) -> List[dict]:
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        view = segment.buf[:size]
+        try:
+            table = pa.ipc.open_stream(pa.py_buffer(view)).read_all()
+            # to_pylist copies the values out, so the segment can go right after
+            records = _records(table)
+            del table
+        finally:
+            view.release()
+        return records
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+class ParallelParser:
+    def __init__(self, processes: int, chunk_bytes: int):
+        self.processes = processes
+        self.chunk_bytes = chunk_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 1
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, so workers do not inherit the API process's DB connections and threads
+            self._pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(self.shutdown)
+            logger.info(f"Started ingest parser pool with {self.processes} processes")
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _parse(self, data: bytes) -> List[dict]:
+        loop = asyncio.get_event_loop()
+        name, size = await loop.run_in_executor(self._executor(), _parse_to_shared_memory, data)
+        return _read_shared_memory(name, size)
+
+    async def iter_records(self, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                           content_encoding: Optional[str]) -> AsyncIterator[dict]:
+        """Same records as wire_formats.iter_records, parsed in the pool for large NDJSON bodies."""
+        if not self.enabled or not wire_formats.is_ndjson(content_type):
+            async for record in wire_formats.iter_records(chunks, content_type, content_encoding):
+                yield record
+            return
+
+        stages = wire_formats.decompressor(content_encoding)
+        in_flight = deque()
+        buffer = b""
+        try:
+            async for chunk in chunks:
+                buffer += stages.decompress(chunk)
+                while len(buffer) >= self.chunk_bytes:
+                    cut = buffer.rfind(b"\n", 0, max(self.chunk_bytes, buffer.find(b"\n") + 1))
+                    if cut < 0:
+                        if len(buffer) > wire_formats.MAX_RECORD_BYTES:
+                            raise wire_formats.WireFormatError(f"Line longer than {wire_formats.MAX_RECORD_BYTES} bytes")
+                        break
+                    in_flight.append(asyncio.ensure_future(self._parse(buffer[:cut + 1])))
+                    buffer = buffer[cut + 1:]
+                    while len(in_flight) > 2 * self.processes:
+                        for record in await in_flight.popleft():
+                            yield record
+            buffer += stages.flush()
+            if buffer.strip():
+                if in_flight:
+                    in_flight.append(asyncio.ensure_future(self._parse(buffer)))
+                else:
+                    # Small body: not worth a round trip to the pool
+                    for record in _records(pa.Table.from_batches([parse_chunk(buffer)])):
+                        yield record
+            while in_flight:
+                for record in await in_flight.popleft():
+                    yield record
+        finally:
+            # On error or early exit, wait for the chunks in flight so their segments are unlinked
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+parallel_parser = ParallelParser(INGEST_PARSE_PROCESSES or (os.cpu_count() or 1), INGEST_PARSE_CHUNK_BYTES)
@@ -0,0 +1,214 @@
+"""
+Request-level performance metrics in Prometheus format.
+
+InstrumentationMiddleware times every request and, through SQLAlchemy
+cursor events on the shared engine, counts the queries it ran, their time
+and the rows they returned. Per route it records histograms of latency,
+queries, DB time, rows and response bytes; create_log adds the size of each
+ingest batch, and the connection pool's state is read at scrape time. Route
+labels are the route templates (``/api/v1/logs/{id}``), never raw paths, so
+the number of series stays bounded.
+
+Requests slower than SLOW_REQUEST_SECONDS are kept, with their statements
+and timings, in a ring buffer of the last SLOW_REQUEST_BUFFER_SIZE. Metrics
+and the buffer are per process.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from .config import SLOW_REQUEST_BUFFER_SIZE, SLOW_REQUEST_SECONDS
+from .database import engine
+
+# Statements kept per slow request, and how much of each
+MAX_CAPTURED_QUERIES = 200
+MAX_STATEMENT_LENGTH = 2000
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+BATCH_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency", ["method", "route", "status"],
+                            buckets=LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements per request", ["method", "route"],
+                            buckets=COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL statements per request", ["method", "route"],
+                               buckets=LATENCY_BUCKETS)
+REQUEST_DB_ROWS = Histogram("http_request_db_rows", "Rows returned or affected by SQL statements per request",
+                            ["method", "route"], buckets=ROW_BUCKETS)
+RESPONSE_BYTES = Histogram("http_response_bytes", "Response body size", ["method", "route"], buckets=BYTE_BUCKETS)
+SLOW_REQUESTS = Counter("http_slow_requests", "Requests slower than SLOW_REQUEST_SECONDS", ["method", "route"])
+INGEST_BATCH_RECORDS = Histogram("ingest_batch_records", "Records per ingest batch", buckets=BATCH_BUCKETS)
+INGEST_RECORDS = Counter("ingest_records", "Ingested records by outcome", ["outcome"])
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "rows", "captured")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.captured: List[tuple] = []
+
+    def add(self, statement: str, seconds: float, rows: int):
+        self.queries += 1
+        self.query_seconds += seconds
+        self.rows += max(rows, 0)
+        if len(self.captured) < MAX_CAPTURED_QUERIES:
+            self.captured.append((statement[:MAX_STATEMENT_LENGTH], seconds, rows))
+
+
+_current: "ContextVar[Optional[RequestStats]]" = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.add(statement, time.perf_counter() - started, cursor.rowcount)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def instrument_engine(target):
+    """Attribute the statements run on ``target`` to the current request."""
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+instrument_engine(engine)
+
+
+class SlowRequestLog:
+    """The last ``size`` slow requests with the statements they ran."""
+
+    def __init__(self, threshold_seconds: float, size: int):
+        self.threshold_seconds = threshold_seconds
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, method: str, path: str, route: str, status: int, seconds: float, stats: RequestStats):
+        if seconds < self.threshold_seconds:
+            return False
+        entry = {
+            "time": datetime.utcnow().isoformat(),
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 3),
+            "db_queries": stats.queries,
+            "db_ms": round(stats.query_seconds * 1000, 3),
+            "db_rows": stats.rows,
+            "queries": [
+                {"statement": statement, "duration_ms": round(query_seconds * 1000, 3), "rows": rows}
+                for statement, query_seconds, rows in stats.captured
+            ],
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return True
+
+    def entries(self, limit: Optional[int] = None) -> List[dict]:
+        """Most recent first."""
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+
+slow_requests = SlowRequestLog(SLOW_REQUEST_SECONDS, SLOW_REQUEST_BUFFER_SIZE)
+
+
+def observe_ingest_batch(stored: int, dropped: int):
+    INGEST_BATCH_RECORDS.observe(stored + dropped)
+    INGEST_RECORDS.labels("stored").inc(stored)
+    INGEST_RECORDS.labels("dropped").inc(dropped)
+
+
+class PoolCollector:
+    """Connection pool state, read when Prometheus scrapes."""
+
+    def collect(self):
+        pool = engine.pool
+        gauges = {
+            "db_pool_size": ("Configured pool size", getattr(pool, "size", None)),
+            "db_pool_checked_out": ("Connections in use", getattr(pool, "checkedout", None)),
+            "db_pool_checked_in": ("Idle connections in the pool", getattr(pool, "checkedin", None)),
+            "db_pool_overflow": ("Connections open beyond the pool size", getattr(pool, "overflow", None)),
+        }
+        for name, (documentation, value) in gauges.items():
+            if callable(value):
+                yield GaugeMetricFamily(name, documentation, value=value())
+
+
+REGISTRY.register(PoolCollector())
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware; counts the body bytes actually sent, so streamed responses are measured too."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            app = scope.get("app")
+            self._routes = {}
+            for route in getattr(app, "routes", []):
+                self._routes.setdefault(getattr(route, "endpoint", None), route.path)
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        response = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            _current.reset(token)
+            method, route = scope["method"], self._route(scope)
+            REQUEST_SECONDS.labels(method, route, str(response["status"])).observe(seconds)
+            REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route).observe(stats.query_seconds)
+            REQUEST_DB_ROWS.labels(method, route).observe(stats.rows)
+            RESPONSE_BYTES.labels(method, route).observe(response["bytes"])
+            if slow_requests.record(method, scope["path"], route, response["status"], seconds, stats):
+                SLOW_REQUESTS.labels(method, route).inc()
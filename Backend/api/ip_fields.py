@@ -0,0 +1,129 @@
+"""
+Source and destination addresses of firewall and network logs.
+
+create_log stores them in the typed ``src_ip``/``dst_ip`` (inet) and
+``src_port``/``dst_port`` columns of ``logs``. Values come from the parsed
+record first (Fluent Bit parsers emit fields such as ``src_ip``, ``dpt`` or
+ECS-style ``{"source": {"ip": ...}}``) and otherwise, with
+IP_FIELDS_FROM_MESSAGE, from key=value pairs in the message, as written by
+iptables (``SRC=10.0.0.1 DST=10.0.0.2 SPT=5353 DPT=22``) and most firewall
+syslog formats (``src=10.0.0.1:5353 dst=10.0.0.2``).
+
+Filters take an address or a CIDR block: ``src_ip=10.0.0.0/8`` matches
+``src_ip <<= '10.0.0.0/8'``, which the GiST inet_ops indexes answer. Other
+databases (the tests' SQLite) store plain text and can only match single
+addresses and IPv4 blocks on octet boundaries.
+"""
+import ipaddress
+import re
+from typing import Dict, Optional, Union
+
+from sqlalchemy import cast
+from sqlalchemy.dialects.postgresql import INET
+
+from .config import IP_FIELDS_FROM_MESSAGE
+
+IP_COLUMNS = ["src_ip", "dst_ip"]
+PORT_COLUMNS = ["src_port", "dst_port"]
+
+# Record keys per column, most specific first; compared case-insensitively
+FIELD_KEYS = {
+    "src_ip": ["src_ip", "source_ip", "srcip", "src_addr", "client_ip", "src"],
+    "dst_ip": ["dst_ip", "dest_ip", "destination_ip", "dstip", "dst_addr", "server_ip", "dst"],
+    "src_port": ["src_port", "source_port", "srcport", "sport", "spt"],
+    "dst_port": ["dst_port", "dest_port", "destination_port", "dstport", "dport", "dpt"],
+}
+# ECS-style nested objects: {"source": {"ip": ..., "port": ...}}
+NESTED_KEYS = {"src_ip": ("source", "ip"), "dst_ip": ("destination", "ip"),
+               "src_port": ("source", "port"), "dst_port": ("destination", "port")}
+
+MESSAGE_PAIR = re.compile(r"(?<![\w.-])([A-Za-z_]+)=\"?([0-9A-Fa-f.:\[\]]+)")
+# 10.0.0.1:514, [2001:db8::1]:514
+ADDRESS_WITH_PORT = re.compile(r"^(?:\[([0-9A-Fa-f:.]+)\]|(\d{1,3}(?:\.\d{1,3}){3})):(\d{1,5})$")
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def _address(value) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(str(value).strip().strip("[]")))
+    except ValueError:
+        return None
+
+
+def _port(value) -> Optional[int]:
+    try:
+        port = int(str(value).strip())
+    except ValueError:
+        return None
+    return port if 0 <= port <= 65535 else None
+
+
+def _assign(fields: dict, column: str, value):
+    """Set ``column`` from a raw value unless it is already set; an address may carry its port."""
+    if fields.get(column) is not None or value is None or isinstance(value, (dict, list, bool)):
+        return
+    if column in PORT_COLUMNS:
+        fields[column] = _port(value)
+        return
+    match = ADDRESS_WITH_PORT.match(str(value).strip())
+    if match:
+        fields[column] = _address(match.group(1) or match.group(2))
+        port_column = column.replace("_ip", "_port")
+        if fields.get(port_column) is None:
+            fields[port_column] = _port(match.group(3))
+    else:
+        fields[column] = _address(value)
+
+
+def extract(record: dict, message: Optional[str], from_message: bool = IP_FIELDS_FROM_MESSAGE) -> Dict[str, Optional[Union[str, int]]]:
+    """src_ip, dst_ip, src_port and dst_port of one ingested record; None where unknown."""
+    fields: Dict[str, Optional[Union[str, int]]] = {column: None for column in IP_COLUMNS + PORT_COLUMNS}
+    lowered = {str(key).lower(): value for key, value in record.items()}
+    for column, keys in FIELD_KEYS.items():
+        for key in keys:
+            _assign(fields, column, lowered.get(key))
+        parent, child = NESTED_KEYS[column]
+        if isinstance(lowered.get(parent), dict):
+            _assign(fields, column, lowered[parent].get(child))
+
+    if from_message and message and None in fields.values():
+        pairs = {}
+        for key, value in MESSAGE_PAIR.findall(message):
+            # The first occurrence of a key wins, like the record fields
+            pairs.setdefault(key.lower(), value)
+        for column, keys in FIELD_KEYS.items():
+            for key in keys:
+                _assign(fields, column, pairs.get(key))
+    return fields
+
+
+def parse_network(value: str) -> IPNetwork:
+    """An address or CIDR block; raises ValueError for anything else."""
+    return ipaddress.ip_network(value.strip(), strict=False)
+
+
+def ip_condition(column, value: str, dialect: str):
+    """Filter for ``column`` inside the block (or equal to the address) ``value``."""
+    network = parse_network(value)
+    if dialect == "postgresql":
+        return column.op("<<=")(cast(str(network), INET))
+    if network.num_addresses == 1:
+        return column == str(network.network_address)
+    if network.prefixlen == 0:
+        # Every address of the family
+        return column.like("%.%") if network.version == 4 else column.like("%:%")
+    if network.version == 4 and network.prefixlen % 8 == 0:
+        octets = str(network.network_address).split(".")[:network.prefixlen // 8]
+        return column.like(".".join(octets) + ".%")
+    raise ValueError(f"Subnet {network} needs PostgreSQL inet support")
+
+
+def in_network(address: Optional[str], network: IPNetwork) -> bool:
+    """Python side of ip_condition, e.g. for the cold tier."""
+    if address is None:
+        return False
+    try:
+        return ipaddress.ip_address(address) in network
+    except ValueError:
+        return False
@@ -0,0 +1,193 @@
+"""
+Application logging: queued, structured and sampled.
+
+configure_logging() gives the root logger a single QueueHandler. Records
+are put on a bounded in-memory queue and a QueueListener thread formats and
+writes them, so a request only pays for creating the record; when the
+queue is full records are dropped and counted instead of blocking. Output
+is one JSON object per line (LOG_FORMAT=json, the default) or plain text,
+to stderr and optionally LOG_FILE. The root level comes from LOG_LEVEL and
+per-logger levels from LOG_LEVELS, e.g.
+``Backend.api.routes.logs=DEBUG,sqlalchemy.engine=WARNING``.
+
+Messages should use %-style arguments (``logger.debug("Found %s rows",
+total)``) so nothing is formatted for records that are filtered out, and
+simple arguments are only formatted on the listener thread. Per-row or
+per-request debug logs on hot paths go through a SampledLogger, which lets
+one in ``every`` calls and at most ``per_second`` calls per second through
+and reports how many it suppressed.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from .config import LOG_FILE, LOG_FORMAT, LOG_HOT_PATH_EVERY, LOG_HOT_PATH_PER_SECOND, LOG_LEVEL, LOG_LEVELS, LOG_QUEUE_SIZE
+
+# Arguments of these types are safe to format later, on the listener thread
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None), datetime, date)
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: records that do not fit in the queue are dropped and counted."""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue stays in this process, so the record does not need to be pickled. Only
+        # arguments that could change before the listener gets to them are merged here.
+        if record.args and not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in _args(record.args)):
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            # Tracebacks keep frames alive; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _args(args):
+    return args.values() if isinstance(args, dict) else args
+
+
+class SampledLogger:
+    """Wraps a logger for hot paths: at most one in ``every`` calls and ``per_second`` calls per second are logged."""
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_HOT_PATH_EVERY, per_second: float = LOG_HOT_PATH_PER_SECOND):
+        self.logger = logger
+        self.every = max(int(every), 1)
+        self.per_second = per_second
+        self._calls = 0
+        self._suppressed = 0
+        self._tokens = per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _allow(self) -> Optional[int]:
+        """None if this call is suppressed, otherwise how many were suppressed since the last one let through."""
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.every:
+                self._suppressed += 1
+                return None
+            if self.per_second:
+                now = time.monotonic()
+                self._tokens = min(self.per_second, self._tokens + (now - self._updated) * self.per_second)
+                self._updated = now
+                if self._tokens < 1:
+                    self._suppressed += 1
+                    return None
+                self._tokens -= 1
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+    def log(self, level: int, msg: str, *args, **kwargs):
+        # Check the level first, so disabled hot-path logs cost a single comparison
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._allow()
+        if suppressed is None:
+            return
+        extra = dict(kwargs.pop("extra", None) or {}, suppressed=suppressed)
+        self.logger.log(level, msg, *args, extra=extra, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+
+def parse_levels(levels: str) -> Dict[str, str]:
+    """``name=LEVEL,name=LEVEL`` into a dict; malformed entries are ignored."""
+    parsed = {}
+    for item in levels.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, log_format: str = LOG_FORMAT,
+                      log_file: str = LOG_FILE, queue_size: int = LOG_QUEUE_SIZE) -> DroppingQueueHandler:
+    """Route all logging through a queue to a listener thread; safe to call more than once."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(levelname)s %(asctime)s %(name)s %(process)d %(thread)d %(message)s")
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+    for name, logger_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+    return _queue_handler
+
+
+def shutdown_logging():
+    """Flush the queue and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None and _queue_handler.dropped:
+        sys.stderr.write(f"{_queue_handler.dropped} log records were dropped because the log queue was full\n")
+
+
+atexit.register(shutdown_logging)
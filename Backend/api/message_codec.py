@@ -0,0 +1,207 @@
+"""
+Dictionary-compressed message storage.
+
+Short vendor syslog lines compress poorly on their own, so each vendor gets a
+zstd dictionary trained on a sample of its messages. Dictionaries are
+versioned in ``compression_dictionaries``; a new training run adds a version
+and new rows use it, while existing rows keep pointing at the version they
+were written with through ``logs.dictionary_id``.
+
+With MESSAGE_COMPRESSION enabled create_log stores the frame in
+``message_compressed`` and leaves ``message`` NULL. A load listener on
+LogEntry decodes it back into ``message``, so routes that read ORM rows
+(get_logs, export, search) see plain text without changes. Filters on the
+message text use message_contains or compressed_matches, which decode the
+compressed rows in range.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import zstandard as zstd
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .config import COMPRESSION_LEVEL
+from .models import CompressionDictionary, LogEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DICTIONARY_SIZE = 64 * 1024
+DEFAULT_SAMPLE_SIZE = 20000
+MIN_TRAINING_SAMPLES = 100
+# How long a worker trusts its cached "latest dictionary per vendor" before
+# checking for a version trained by another process
+LATEST_TTL_SECONDS = 60
+# Compressed rows decoded per round trip by compressed_matches
+MATCH_BATCH_ROWS = 10000
+
+
+class MessageCodec:
+    def __init__(self, level: int = 3):
+        self.level = level
+        self._dictionaries: Dict[int, zstd.ZstdCompressionDict] = {}
+        self._latest: Dict[str, Optional[int]] = {}
+        self._latest_checked = time.monotonic()
+        self._lock = threading.Lock()
+        # Compressor and decompressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def _dictionary(self, connection, dictionary_id: int) -> zstd.ZstdCompressionDict:
+        dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None:
+            table = CompressionDictionary.__table__
+            data = connection.execute(select(table.c.data).where(table.c.id == dictionary_id)).scalar()
+            if data is None:
+                raise LookupError(f"Compression dictionary {dictionary_id} does not exist")
+            dictionary = zstd.ZstdCompressionDict(data)
+            with self._lock:
+                self._dictionaries[dictionary_id] = dictionary
+        return dictionary
+
+    def _cached(self, name: str, dictionary_id: int, factory):
+        cache = getattr(self._local, name, None)
+        if cache is None:
+            cache = {}
+            setattr(self._local, name, cache)
+        if dictionary_id not in cache:
+            cache[dictionary_id] = factory()
+        return cache[dictionary_id]
+
+    def latest_dictionary_id(self, db: Session, vendor: str) -> Optional[int]:
+        if time.monotonic() - self._latest_checked > LATEST_TTL_SECONDS:
+            with self._lock:
+                self._latest = {}
+                self._latest_checked = time.monotonic()
+        if vendor not in self._latest:
+            latest = (
+                db.query(CompressionDictionary.id)
+                .filter(CompressionDictionary.vendor == vendor)
+                .order_by(CompressionDictionary.version.desc())
+                .first()
+            )
+            with self._lock:
+                self._latest[vendor] = latest[0] if latest else None
+        return self._latest[vendor]
+
+    def compress(self, connection, dictionary_id: int, message: str) -> bytes:
+        compressor = self._cached("compressors", dictionary_id, lambda: zstd.ZstdCompressor(
+            level=self.level, dict_data=self._dictionary(connection, dictionary_id), write_content_size=True
+        ))
+        return compressor.compress(message.encode("utf-8"))
+
+    def decompress(self, connection, dictionary_id: int, data: bytes) -> str:
+        decompressor = self._cached("decompressors", dictionary_id, lambda: zstd.ZstdDecompressor(
+            dict_data=self._dictionary(connection, dictionary_id)
+        ))
+        return decompressor.decompress(data).decode("utf-8")
+
+    def compress_entries(self, db: Session, entries: List[LogEntry]) -> int:
+        """
+        Move the message of every entry whose vendor has a dictionary into
+        message_compressed. Entries of other vendors are left as plain text.
+        """
+        connection = db.connection()
+        compressed = 0
+        for entry in entries:
+            dictionary_id = self.latest_dictionary_id(db, entry.vendor)
+            if dictionary_id is None or entry.message is None:
+                continue
+            entry.message_compressed = self.compress(connection, dictionary_id, entry.message)
+            entry.dictionary_id = dictionary_id
+            entry.message = None
+            compressed += 1
+        return compressed
+
+    def train(self, db: Session, vendor: str, samples: List[str],
+              dictionary_size: int = DEFAULT_DICTIONARY_SIZE) -> Tuple[CompressionDictionary, zstd.ZstdCompressionDict]:
+        """Train a dictionary on ``samples`` and store it as the vendor's next version."""
+        if len(samples) < MIN_TRAINING_SAMPLES:
+            raise ValueError(f"Need at least {MIN_TRAINING_SAMPLES} samples to train a dictionary for {vendor}, got {len(samples)}")
+        dictionary = zstd.train_dictionary(dictionary_size, [sample.encode("utf-8") for sample in samples], level=self.level)
+        version = (db.query(func.max(CompressionDictionary.version)).filter(CompressionDictionary.vendor == vendor).scalar() or 0) + 1
+        row = CompressionDictionary(vendor=vendor, version=version, data=dictionary.as_bytes(), sample_count=len(samples))
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        with self._lock:
+            self._dictionaries[row.id] = dictionary
+            self._latest[vendor] = row.id
+        logger.info(f"Trained compression dictionary {row.id} for {vendor} (version {version}, {len(samples)} samples)")
+        return row, dictionary
+
+
+def sample_messages(db: Session, vendor: str, limit: int = DEFAULT_SAMPLE_SIZE) -> List[str]:
+    """Return up to ``limit`` of the vendor's most recent messages, compressed ones decoded, shuffled."""
+    table = LogEntry.__table__
+    connection = db.connection()
+    rows = connection.execute(
+        select(table.c.message, table.c.message_compressed, table.c.dictionary_id)
+        .where(table.c.vendor == vendor, or_(table.c.message.isnot(None), table.c.message_compressed.isnot(None)))
+        .order_by(table.c.id.desc())
+        .limit(limit)
+    )
+    messages = [
+        message if message is not None else message_codec.decompress(connection, dictionary_id, data)
+        for message, data, dictionary_id in rows
+    ]
+    random.shuffle(messages)
+    return messages
+
+
+def compressed_matches(db: Session, predicate: Callable[[str], bool], *conditions) -> List[int]:
+    """
+    IDs of the compressed rows matching ``conditions`` whose decoded message
+    satisfies ``predicate``. SQL cannot see into message_compressed, so a
+    filter on the message text adds these IDs to its condition on ``message``.
+    """
+    table = LogEntry.__table__
+    connection = db.connection()
+    result = connection.execution_options(stream_results=True).execute(
+        select(table.c.id, table.c.message_compressed, table.c.dictionary_id)
+        .where(table.c.message.is_(None), table.c.message_compressed.isnot(None), *conditions)
+    )
+    ids = []
+    for batch in result.partitions(MATCH_BATCH_ROWS):
+        for log_id, data, dictionary_id in batch:
+            if predicate(message_codec.decompress(connection, dictionary_id, data)):
+                ids.append(log_id)
+    return ids
+
+
+def message_contains(db: Session, text: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None):
+    """
+    Condition for logs whose message contains ``text``, case-insensitively,
+    compressed or not; compressed rows in [start_time, end_time] are decoded
+    to check them.
+    """
+    lowered = text.lower()
+    bounds = []
+    if start_time:
+        bounds.append(LogEntry.timestamp >= start_time)
+    if end_time:
+        bounds.append(LogEntry.timestamp <= end_time)
+    ids = compressed_matches(db, lambda message: lowered in message.lower(), *bounds)
+    contains = LogEntry.message.ilike(f"%{text}%")
+    return or_(contains, LogEntry.id.in_(ids)) if ids else contains
+
+
+message_codec = MessageCodec(COMPRESSION_LEVEL)
+
+
+@event.listens_for(LogEntry, "load")
+def _decode_message(target: LogEntry, context):
+    # Only look at loaded attributes so decoding never triggers another load
+    loaded = target.__dict__
+    if loaded.get("message") is None and loaded.get("message_compressed") is not None:
+        text = message_codec.decompress(context.session.connection(), loaded["dictionary_id"], loaded["message_compressed"])
+        set_committed_value(target, "message", text)
+
+
+@event.listens_for(LogEntry, "refresh")
+def _decode_refreshed_message(target: LogEntry, context, attrs):
+    _decode_message(target, context)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON, Boolean, Enum, Table
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON, Boolean, Enum, Table, LargeBinary, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import INET, JSONB
 from sqlalchemy.orm import declarative_base, relationship
 from pydantic import BaseModel, Field, validator, EmailStr
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 import re
 import enum
 
@@ -60,12 +61,26 @@ class Device(Base):
     vendor = relationship("Vendor", back_populates="devices")
     logs = relationship("LogEntry", back_populates="device")
 
+# inet in Postgres; plain text elsewhere (tests)
+IPAddressType = String().with_variant(INET(), "postgresql")
+AttributesType = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
 class LogEntry(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        # GiST inet_ops serve subnet containment (<<=) as well as equality
+        Index("ix_logs_src_ip", "src_ip", postgresql_using="gist", postgresql_ops={"src_ip": "inet_ops"}),
+        Index("ix_logs_dst_ip", "dst_ip", postgresql_using="gist", postgresql_ops={"dst_ip": "inet_ops"}),
+        # jsonb_path_ops only serves @>, which is all attribute filters use
+        Index("ix_logs_attributes", "attributes", postgresql_using="gin", postgresql_ops={"attributes": "jsonb_path_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, index=True, nullable=False)
-    message = Column(String, nullable=False)
+    # NULL when the message is stored in message_compressed instead
+    message = Column(String, nullable=True)
+    message_compressed = Column(LargeBinary, nullable=True)
+    dictionary_id = Column(Integer, ForeignKey("compression_dictionaries.id"), nullable=True)
     severity = Column(Enum(SeverityEnum), index=True, nullable=False)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     cnnid = Column(String, index=True, nullable=True)
@@ -75,10 +90,79 @@ class LogEntry(Base):
     device_number = Column(String)
     vendor = Column(String, index=True, nullable=True)
     device_type = Column(String, index=True, nullable=True)
+    template_id = Column(Integer, ForeignKey("log_templates.id"), index=True, nullable=True)
+    template_params = Column(JSON, nullable=True)
+    # Exact repeats collapsed into this row at ingest; timestamp is the first occurrence
+    repeat_count = Column(Integer, default=1, server_default="1", nullable=False)
+    last_seen = Column(DateTime, nullable=True)
+    # Addresses and ports from parsed fields or the message, see api/ip_fields.py
+    src_ip = Column(IPAddressType, nullable=True)
+    dst_ip = Column(IPAddressType, nullable=True)
+    src_port = Column(Integer, nullable=True)
+    dst_port = Column(Integer, nullable=True)
+    # Record fields without a column, see api/attributes.py
+    attributes = Column(AttributesType, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     device = relationship("Device", back_populates="logs")
 
+class LogTemplate(Base):
+    __tablename__ = "log_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    first_seen = Column(DateTime, index=True, default=datetime.utcnow)
+    last_seen = Column(DateTime, index=True, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+    __table_args__ = (UniqueConstraint("vendor", "version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    vendor = Column(String, index=True, nullable=False)
+    version = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    compression_ratio = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class LogSketch(Base):
+    __tablename__ = "log_sketches"
+    __table_args__ = (UniqueConstraint("bucket_start", "kind", "dimension"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, index=True, nullable=False)
+    kind = Column(String, nullable=False)
+    dimension = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IngestDrop(Base):
+    __tablename__ = "ingest_drops"
+    __table_args__ = (UniqueConstraint("bucket_start", "cnnid", "vendor", "product", "severity", "action"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, index=True, nullable=False)
+    cnnid = Column(String, index=True, nullable=True)
+    vendor = Column(String, nullable=True)
+    product = Column(String, nullable=True)
+    severity = Column(String, nullable=True)
+    action = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+class IngestBatch(Base):
+    __tablename__ = "ingest_batches"
+
+    key = Column(LargeBinary(16), primary_key=True)
+    logs_created = Column(Integer, nullable=False)
+    logs_dropped = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True, nullable=False)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -137,6 +221,38 @@ class ChangelogEntry(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class Dashboard(Base):
+    __tablename__ = "dashboards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    # Widget specs as saved by the frontend, see WidgetSpec
+    widgets = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BucketInvalidation(Base):
+    """Time range whose cached aggregates are stale, e.g. after a late log; see api/bucket_cache.py."""
+    __tablename__ = "bucket_invalidations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, index=True, default=datetime.utcnow)
+
+class LogTokenBloom(Base):
+    """Bloom filter of the message tokens of one sealed block of log IDs; see api/token_index.py."""
+    __tablename__ = "log_token_blooms"
+
+    # Rows with chunk * TOKEN_INDEX_CHUNK_ROWS <= id < (chunk + 1) * TOKEN_INDEX_CHUNK_ROWS
+    chunk = Column(Integer, primary_key=True, autoincrement=False)
+    rows = Column(Integer, nullable=False)
+    min_timestamp = Column(DateTime, index=True, nullable=False)
+    max_timestamp = Column(DateTime, index=True, nullable=False)
+    bits = Column(LargeBinary, nullable=False)
+    hashes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # Pydantic models
 
 class LogEntryCreate(BaseModel):
@@ -151,6 +267,15 @@ class LogEntryCreate(BaseModel):
     product: Optional[str] = None
     device_number: Optional[str] = None
     device_type: Optional[str] = None
+    template_id: Optional[int] = None
+    template_params: Optional[List[str]] = None
+    repeat_count: int = 1
+    last_seen: Optional[datetime] = None
+    src_ip: Optional[str] = None
+    dst_ip: Optional[str] = None
+    src_port: Optional[int] = None
+    dst_port: Optional[int] = None
+    attributes: Optional[Dict[str, Any]] = None
 
 class LogEntryResponse(BaseModel):
     id: int
@@ -164,6 +289,14 @@ class LogEntryResponse(BaseModel):
     location: Optional[str] = None
     city: Optional[str] = None
     device_number: Optional[str] = None
+    template_id: Optional[int] = None
+    repeat_count: int = 1
+    last_seen: Optional[datetime] = None
+    src_ip: Optional[str] = None
+    dst_ip: Optional[str] = None
+    src_port: Optional[int] = None
+    dst_port: Optional[int] = None
+    attributes: Optional[Dict[str, Any]] = None
 
     class Config:
         orm_mode = True
@@ -183,11 +316,28 @@ class SearchQuery(BaseModel):
     vendor: Optional[str] = None
     device_type: Optional[str] = None
     severity: Optional[SeverityEnum] = None
+    template_id: Optional[int] = None
     page: int = 1
     page_size: int = 10
     sort_by: str = "timestamp"
     sort_order: str = "desc"
 
+class LogTemplateResponse(BaseModel):
+    id: int
+    template: str
+    count: int
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class PatternCount(BaseModel):
+    template_id: int
+    template: str
+    count: int
+    first_seen: Optional[datetime] = None
+
 class CustomerResponse(BaseModel):
     id: int
     cnnid: str
@@ -324,3 +474,33 @@ class ChangelogEntryResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class WidgetSpec(BaseModel):
+    id: Optional[str] = None
+    type: str = Field(..., regex="^(total|facet|time_series|top|distinct|quantiles)$")
+    # Facet dimension, sketch dimension ("customer", "device") or quantile metric
+    dimension: Optional[str] = None
+    interval: Optional[str] = None
+    series_by: Optional[str] = None
+    top_n: Optional[int] = Field(None, ge=1)
+    quantiles: Optional[List[float]] = None
+    # Relative range ("15m", "24h", "7d"), or an absolute start_time/end_time
+    last: Optional[str] = Field(None, regex="^[1-9][0-9]*[mhd]$")
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    filters: Dict[str, str] = {}
+
+    class Config:
+        # Layout and display settings of the frontend are stored as given
+        extra = "allow"
+
+class DashboardCreate(BaseModel):
+    name: str
+    widgets: List[WidgetSpec] = []
+
+class DashboardResponse(DashboardCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
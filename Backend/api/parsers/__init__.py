@@ -0,0 +1,28 @@
+"""
+Vendor parsers: fields parsed from the message of firewall and load
+balancer logs at ingest.
+
+create_log passes every record to ``vendor_parsers.enrich`` before reading
+it. The registry (see registry.py) picks one parser for the record by its
+ingest port, vendor or message prefix, and the parser's fields (vendor,
+device_type, severity, addresses and ports, vendor-specific keys) fill in
+what the record does not already have. Fields without a column end up in
+``logs.attributes``.
+
+To add a vendor, subclass VendorParser in a module of this package, give it
+a name, vendors and literal prefixes, add it to PARSERS and measure it with
+``python -m Backend.benchmarks.parser_bench run``.
+"""
+from ..config import VENDOR_PARSER_PORTS, VENDOR_PARSERS_ENABLED
+from .check_point import CheckPointParser
+from .cisco_asa import CiscoASAParser
+from .f5 import F5Parser
+from .fortigate import FortiGateParser
+from .palo_alto import PaloAltoParser
+from .registry import ParserRegistry, VendorParser
+
+PARSERS = [FortiGateParser, CiscoASAParser, PaloAltoParser, F5Parser, CheckPointParser]
+
+vendor_parsers = ParserRegistry([parser() for parser in PARSERS], VENDOR_PARSER_PORTS, VENDOR_PARSERS_ENABLED)
+
+__all__ = ["PARSERS", "ParserRegistry", "VendorParser", "vendor_parsers"]
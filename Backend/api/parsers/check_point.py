@@ -0,0 +1,39 @@
+"""
+Check Point Log Exporter logs in syslog format, a bracketed list of
+``key:"value"`` pairs:
+
+    [action:"Drop"; flags:"411908"; ifdir:"inbound"; origin:"10.0.0.1"; src:"198.51.100.7"; dst:"10.0.0.10";
+     proto:"6"; s_port:"4444"; service:"22"; product:"VPN-1 & FireWall-1"; rule_name:"Cleanup rule"]
+"""
+import re
+from typing import Optional
+
+from .registry import VendorParser, severity_from_name
+
+PAIR = re.compile(r'(\w+):"((?:[^"\\]|\\.)*)"')
+
+# Check Point names of the record fields api/ip_fields.py reads. ``product`` is
+# the blade that logged, not the device product create_log files logs under.
+RENAMED = {"src": "src_ip", "dst": "dst_ip", "s_port": "src_port", "product": "blade", "severity": "event_severity"}
+# At least one of these tells a Check Point log from other bracketed text
+KNOWN_KEYS = ("action", "origin", "ifdir", "loguid", "product")
+
+
+class CheckPointParser(VendorParser):
+    name = "check_point"
+    vendors = ("check point", "checkpoint")
+    prefixes = ("[",)
+
+    def parse(self, message: str) -> Optional[dict]:
+        pairs = dict(PAIR.findall(message))
+        if not any(key in pairs for key in KNOWN_KEYS):
+            return None
+        fields = {RENAMED.get(key, key): value for key, value in pairs.items()}
+        # service is the destination port of TCP/UDP connections
+        if fields.get("service", "").isdigit():
+            fields["dst_port"] = fields["service"]
+        severity = severity_from_name(fields.get("event_severity"))
+        fields["severity"] = severity or ("medium" if fields.get("action", "").lower() in ("drop", "reject", "block") else "low")
+        fields["vendor"] = "Check Point"
+        fields["device_type"] = "Firewall"
+        return fields
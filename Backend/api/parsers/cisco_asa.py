@@ -0,0 +1,43 @@
+"""
+Cisco ASA / Firepower Threat Defense syslog messages:
+
+    %ASA-6-302013: Built inbound TCP connection 1234 for outside:203.0.113.5/51234 (203.0.113.5/51234) to inside:10.0.0.10/443 (10.0.0.10/443)
+    %ASA-4-106023: Deny tcp src outside:198.51.100.7/4444 dst inside:10.0.0.10/22 by access-group "outside_in" [0x0, 0x0]
+"""
+import re
+from typing import Optional
+
+from .registry import SYSLOG_SEVERITY, VendorParser
+
+HEADER = re.compile(r"%(ASA|FTD|FWSM|PIX)-(\d)-(\d{6}): ?")
+# interface:address/port; the first one is the source except in outbound connections.
+# NAT-mapped addresses follow in parentheses without an interface and are not matched.
+ENDPOINT = re.compile(r"([\w-]+):(\d{1,3}(?:\.\d{1,3}){3})/(\d{1,5})")
+
+
+class CiscoASAParser(VendorParser):
+    name = "cisco_asa"
+    vendors = ("cisco", "cisco asa", "cisco ftd")
+    prefixes = ("%ASA-", "%FTD-", "%FWSM-", "%PIX-")
+
+    def parse(self, message: str) -> Optional[dict]:
+        header = HEADER.match(message)
+        if header is None:
+            return None
+        text = message[header.end():]
+        fields = {
+            "vendor": "Cisco",
+            "device_type": "Firewall",
+            "severity": SYSLOG_SEVERITY[int(header.group(2))],
+            "asa_message_id": header.group(3),
+            "action": text.split(" ", 1)[0].lower(),
+        }
+        endpoints = ENDPOINT.findall(text, 0, 400)
+        if len(endpoints) >= 2:
+            source, destination = endpoints[0], endpoints[1]
+            # "Built outbound ... for outside:<server> to inside:<client>": the inside host started it
+            if text.startswith("Built outbound"):
+                source, destination = destination, source
+            fields["src_interface"], fields["src_ip"], fields["src_port"] = source
+            fields["dst_interface"], fields["dst_ip"], fields["dst_port"] = destination
+        return fields
@@ -0,0 +1,43 @@
+"""
+F5 BIG-IP syslog messages, ``<level> <process>[<pid>]: <message id>:<severity>: <text>``:
+
+    err tmm1[11424]: 01010028:3: No members available for pool /Common/pool_web
+    notice mcpd[5789]: 01070638:5: Pool /Common/pool_web member /Common/10.0.0.21:80 monitor status down.
+"""
+import re
+from typing import Optional
+
+from .registry import SYSLOG_SEVERITY, VendorParser
+
+LEVELS = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+LINE = re.compile(r"(emerg|alert|crit|err|warning|notice|info|debug) ([\w.-]+?)(?:\[(\d+)\])?: ([0-9a-fA-F]{8}):(\d): ?")
+# /Partition/name of the pool, virtual server or node the message is about
+OBJECT = re.compile(r"/[\w.-]+/[\w.%:-]+")
+# Pool member or virtual server address, with an optional %route-domain
+MEMBER = re.compile(r"/[\w.-]+/(\d{1,3}(?:\.\d{1,3}){3})(?:%\d+)?:(\d{1,5})")
+
+
+class F5Parser(VendorParser):
+    name = "f5"
+    vendors = ("f5", "f5 networks")
+    prefixes = tuple(f"{level} " for level in LEVELS)
+
+    def parse(self, message: str) -> Optional[dict]:
+        line = LINE.match(message)
+        if line is None:
+            return None
+        text = message[line.end():]
+        fields = {
+            "vendor": "F5",
+            "device_type": "Load Balancer",
+            "severity": SYSLOG_SEVERITY[int(line.group(5))],
+            "process": line.group(2),
+            "f5_message_id": line.group(4).lower(),
+        }
+        obj = OBJECT.search(text)
+        if obj:
+            fields["object"] = obj.group(0)
+        member = MEMBER.search(text)
+        if member:
+            fields["dst_ip"], fields["dst_port"] = member.groups()
+        return fields
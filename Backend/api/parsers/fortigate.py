@@ -0,0 +1,39 @@
+"""
+FortiGate / FortiProxy key=value logs:
+
+    date=2026-05-01 time=12:00:00 devname="fw-01" devid="FGT60E0000000001" logid="0000000013"
+    type="traffic" subtype="forward" level="notice" srcip=10.0.0.1 srcport=51234 dstip=8.8.8.8
+    dstport=53 action="accept" policyid=1
+"""
+import re
+from typing import Optional
+
+from .registry import VendorParser, severity_from_name
+
+# key=value or key="value"; one findall per message
+PAIR = re.compile(r'(\w+)=(?:"([^"]*)"|(\S*))')
+
+# FortiGate names of the record fields api/ip_fields.py reads
+RENAMED = {"srcip": "src_ip", "dstip": "dst_ip", "srcport": "src_port", "dstport": "dst_port"}
+
+
+class FortiGateParser(VendorParser):
+    name = "fortigate"
+    vendors = ("fortinet", "fortigate")
+    prefixes = ("date=", "logver=", "devname=", "devid=")
+
+    def parse(self, message: str) -> Optional[dict]:
+        fields = {}
+        for key, quoted, plain in PAIR.findall(message):
+            fields[RENAMED.get(key, key)] = quoted or plain
+        if "devid" not in fields and "logid" not in fields:
+            return None
+        # UTM logs have their own severity scale; the record's comes from level
+        if "severity" in fields:
+            fields["event_severity"] = fields.pop("severity")
+        severity = severity_from_name(fields.get("level"))
+        if severity:
+            fields["severity"] = severity
+        fields["vendor"] = "Fortinet"
+        fields["device_type"] = "Proxy" if fields.get("devid", "").startswith("FPX") else "Firewall"
+        return fields
@@ -0,0 +1,49 @@
+"""
+Palo Alto Networks PAN-OS CSV logs (syslog format "BSD", default field
+layout). Fields are positional and depend on the log type in field 3:
+
+    1,2026/05/01 12:00:00,012801000001,TRAFFIC,end,2561,2026/05/01 12:00:00,10.0.0.1,8.8.8.8,...
+"""
+import csv
+from typing import Dict, Optional
+
+from .registry import VendorParser, severity_from_name
+
+# Position -> record field, per log type
+TRAFFIC_FIELDS = {
+    2: "serial", 4: "subtype", 7: "src_ip", 8: "dst_ip", 11: "rule", 12: "src_user", 13: "dst_user",
+    14: "application", 15: "vsys", 16: "src_zone", 17: "dst_zone", 18: "inbound_interface",
+    19: "outbound_interface", 22: "session_id", 24: "src_port", 25: "dst_port", 29: "protocol", 30: "action",
+}
+THREAT_FIELDS = {**TRAFFIC_FIELDS, 31: "url", 32: "threat_id", 33: "category", 34: "threat_severity"}
+SYSTEM_FIELDS = {2: "serial", 4: "subtype", 7: "vsys", 8: "event_id", 9: "object", 12: "module", 13: "event_severity", 14: "description"}
+
+LAYOUTS: Dict[str, Dict[int, str]] = {"TRAFFIC": TRAFFIC_FIELDS, "THREAT": THREAT_FIELDS, "SYSTEM": SYSTEM_FIELDS}
+MIN_COLUMNS = {log_type: max(layout) + 1 for log_type, layout in LAYOUTS.items()}
+
+
+class PaloAltoParser(VendorParser):
+    name = "palo_alto"
+    vendors = ("palo alto networks", "palo alto", "paloalto")
+    # The first column is FUTURE_USE, written as 1 (0 and empty by older releases)
+    prefixes = ("1,", "0,", ",")
+
+    def parse(self, message: str) -> Optional[dict]:
+        # Cheap check of the type column before splitting the whole line
+        if message.count(",", 0, 80) < 4:
+            return None
+        columns = next(csv.reader((message,)))
+        log_type = columns[3] if len(columns) > 3 else None
+        layout = LAYOUTS.get(log_type)
+        if layout is None or len(columns) < MIN_COLUMNS[log_type]:
+            return None
+        fields = {"vendor": "Palo Alto Networks", "device_type": "Firewall", "log_type": log_type}
+        for position, name in layout.items():
+            if columns[position]:
+                fields[name] = columns[position]
+        severity = severity_from_name(fields.get("threat_severity") or fields.get("event_severity"))
+        if severity:
+            fields["severity"] = severity
+        elif log_type == "TRAFFIC":
+            fields["severity"] = "low"
+        return fields
@@ -0,0 +1,150 @@
+"""
+Dispatch of ingested records to vendor parsers.
+
+A parser is chosen without trying patterns in turn: first by the record's
+ingest port (VENDOR_PARSER_PORTS), then by its vendor field (set by
+Fluent Bit's parse_devid.lua or the sender), then by the first characters
+of the message, which select at most a few literal prefixes from a table
+keyed by the first character. Only the chosen parser's precompiled pattern
+runs, so messages of no known vendor cost one dict lookup.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Record field with the port the message was received on, e.g. added by a
+# Fluent Bit record_modifier per input
+PORT_FIELD = "ingest_port"
+
+# Syslog severities 0 (emergency) to 7 (debug)
+SYSLOG_SEVERITY = ["critical", "critical", "critical", "high", "medium", "low", "low", "low"]
+
+SEVERITY_NAMES = {
+    "emerg": "critical", "emergency": "critical", "alert": "critical", "crit": "critical", "critical": "critical",
+    "err": "high", "error": "high", "high": "high",
+    "warn": "medium", "warning": "medium", "medium": "medium",
+    "notice": "low", "info": "low", "information": "low", "informational": "low", "debug": "low", "low": "low",
+}
+
+
+def severity_from_name(name: Optional[str]) -> Optional[str]:
+    """The SeverityEnum value of a vendor level name, None if it is not one."""
+    return SEVERITY_NAMES.get(name.lower()) if name else None
+
+
+class VendorParser:
+    """
+    Base class of the parsers. ``parse`` gets the message without its
+    syslog <PRI> and returns the fields to add to the record (None if the
+    message is not in this parser's format); fields the record already has
+    are kept.
+    """
+    # Registry key, also used in VENDOR_PARSER_PORTS
+    name = ""
+    # Lowercase vendor field values handled by this parser
+    vendors: Tuple[str, ...] = ()
+    # Literal message prefixes handled by this parser
+    prefixes: Tuple[str, ...] = ()
+
+    def parse(self, message: str) -> Optional[dict]:
+        raise NotImplementedError
+
+
+def message_body(message: str) -> str:
+    """``message`` without a leading syslog <PRI>."""
+    if message.startswith("<"):
+        end = message.find(">", 1, 5)
+        if end > 1 and message[1:end].isdigit():
+            return message[end + 1:]
+    return message
+
+
+class ParserRegistry:
+    def __init__(self, parsers: Iterable[VendorParser] = (), ports: str = "", enabled: bool = True):
+        self.enabled = enabled
+        self._by_name: Dict[str, VendorParser] = {}
+        self._by_vendor: Dict[str, VendorParser] = {}
+        # First character of the prefix -> (prefix, parser), longest prefix first
+        self._by_first_char: Dict[str, List[Tuple[str, VendorParser]]] = {}
+        self._by_port: Dict[int, VendorParser] = {}
+        for parser in parsers:
+            self.register(parser)
+        self.set_ports(ports)
+
+    def register(self, parser: VendorParser):
+        """Add ``parser``, replacing a registered parser of the same name."""
+        previous = self._by_name.get(parser.name)
+        if previous is not None:
+            self._by_vendor = {vendor: p for vendor, p in self._by_vendor.items() if p is not previous}
+            for char, entries in self._by_first_char.items():
+                entries[:] = [entry for entry in entries if entry[1] is not previous]
+            self._by_port = {port: parser if p is previous else p for port, p in self._by_port.items()}
+        self._by_name[parser.name] = parser
+        for vendor in parser.vendors:
+            self._by_vendor[vendor] = parser
+        for prefix in parser.prefixes:
+            entries = self._by_first_char.setdefault(prefix[0], [])
+            entries.append((prefix, parser))
+            entries.sort(key=lambda entry: -len(entry[0]))
+
+    def set_ports(self, ports: str):
+        """Route ports to parsers, from "5514=fortigate,5515=cisco_asa"."""
+        by_port = {}
+        for item in ports.split(","):
+            if not item.strip():
+                continue
+            port, _, name = item.partition("=")
+            if name.strip() not in self._by_name:
+                raise ValueError(f"Unknown vendor parser {name.strip()!r} for port {port.strip()}")
+            by_port[int(port)] = self._by_name[name.strip()]
+        self._by_port = by_port
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def get(self, name: str) -> Optional[VendorParser]:
+        return self._by_name.get(name)
+
+    def by_prefix(self, body: str) -> Optional[VendorParser]:
+        for prefix, parser in self._by_first_char.get(body[:1], ()):
+            if body.startswith(prefix):
+                return parser
+        return None
+
+    def _chosen(self, record: dict, body: str) -> List[VendorParser]:
+        chosen = []
+        port = record.get(PORT_FIELD)
+        if port is not None and self._by_port:
+            try:
+                parser = self._by_port.get(int(port))
+            except (TypeError, ValueError):
+                parser = None
+            if parser is not None:
+                chosen.append(parser)
+        vendor = record.get("vendor")
+        if isinstance(vendor, str):
+            parser = self._by_vendor.get(vendor.lower())
+            if parser is not None and parser not in chosen:
+                chosen.append(parser)
+        parser = self.by_prefix(body)
+        if parser is not None and parser not in chosen:
+            chosen.append(parser)
+        return chosen
+
+    def enrich(self, record: dict) -> Optional[str]:
+        """Add the fields parsed from the record's message; the name of the parser that matched."""
+        message = record.get("message")
+        if not self.enabled or not isinstance(message, str):
+            return None
+        body = message_body(message)
+        for parser in self._chosen(record, body):
+            fields = parser.parse(body)
+            if fields is None:
+                continue
+            for key, value in fields.items():
+                if record.get(key) is None:
+                    record[key] = value
+            return parser.name
+        return None
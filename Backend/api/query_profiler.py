@@ -0,0 +1,284 @@
+"""
+Per-statement query profiling with sampled EXPLAIN ANALYZE.
+
+Every statement run on the shared engine is reduced to a fingerprint: its
+SQL with literals and bind parameters replaced by ``?`` and IN lists
+collapsed, so ``/logs?vendor=Cisco`` and ``/logs?vendor=F5`` share one
+fingerprint while another filter combination gets its own. Each fingerprint
+keeps its call count, total/max time, rows and recent latencies.
+
+When a SELECT takes longer than SLOW_QUERY_SECONDS, and its fingerprint was
+not explained in the last EXPLAIN_SAMPLE_INTERVAL_SECONDS, the same
+statement with the same parameters is run again under
+``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` on a background thread, on a
+connection of its own, and the plan goes into a bounded store together with
+a summary (execution time, rows scanned, buffers, sequential scans). Plans
+are only sampled on PostgreSQL. Everything is per process.
+"""
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from .config import (
+    EXPLAIN_SAMPLE_INTERVAL_SECONDS, QUERY_PROFILER_MAX_FINGERPRINTS, QUERY_PROFILER_MAX_PLANS, SLOW_QUERY_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per fingerprint for percentiles
+RECENT_LATENCIES = 256
+# Statement strings whose fingerprint is cached; SQLAlchemy reuses compiled strings
+FINGERPRINT_CACHE_SIZE = 4096
+EXPLAIN_QUEUE_SIZE = 16
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LISTS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    normalized = _COMMENTS.sub(" ", statement)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _PARAMETERS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _IN_LISTS.sub("IN (...)", normalized)
+    normalized = _VALUES_LISTS.sub(r"\1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_of(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def plan_summary(plan: dict) -> dict:
+    """Rows read, buffer usage and sequential scans of one EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) plan."""
+    rows_scanned = 0
+    seq_scans = []
+    stack = [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Scan" in node["Node Type"]:
+            loops = node.get("Actual Loops", 1)
+            rows_scanned += (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)
+                             + node.get("Rows Removed by Index Recheck", 0)) * loops
+        if node["Node Type"] in ("Seq Scan", "Parallel Seq Scan") and node.get("Relation Name"):
+            seq_scans.append(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    top = plan["Plan"]
+    return {
+        "execution_ms": plan.get("Execution Time", 0.0),
+        "planning_ms": plan.get("Planning Time", 0.0),
+        "rows_scanned": rows_scanned,
+        "shared_hit_blocks": top.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": top.get("Shared Read Blocks", 0),
+        "temp_written_blocks": top.get("Temp Written Blocks", 0),
+        "seq_scans": sorted(set(seq_scans)),
+    }
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class FingerprintStats:
+    def __init__(self, fingerprint: str, query: str):
+        self.fingerprint = fingerprint
+        self.query = query
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.recent = deque(maxlen=RECENT_LATENCIES)
+        self.first_seen = datetime.utcnow()
+        self.last_seen = self.first_seen
+        self.last_explained = 0.0
+        self.last_plan: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        recent = sorted(self.recent)
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "calls": self.calls,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else None,
+            "p50_ms": round(_percentile(recent, 0.5) * 1000, 3) if recent else None,
+            "p95_ms": round(_percentile(recent, 0.95) * 1000, 3) if recent else None,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "rows": self.rows,
+            "first_seen": self.first_seen.isoformat(),
+            "last_seen": self.last_seen.isoformat(),
+            "seq_scans": self.last_plan["summary"]["seq_scans"] if self.last_plan else None,
+        }
+
+
+class QueryProfiler:
+    def __init__(self, slow_seconds: float, sample_interval_seconds: float, max_fingerprints: int, max_plans: int):
+        self.slow_seconds = slow_seconds
+        self.sample_interval_seconds = sample_interval_seconds
+        self.max_fingerprints = max_fingerprints
+        self._stats: "OrderedDict[str, FingerprintStats]" = OrderedDict()
+        self._fingerprints: "OrderedDict[str, tuple]" = OrderedDict()
+        self._plans = deque(maxlen=max_plans)
+        self._lock = threading.Lock()
+        self._engine = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+
+    def attach(self, engine):
+        self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_started", None)
+        if started is not None:
+            self.record(statement, parameters, time.perf_counter() - started, cursor.rowcount, executemany)
+
+    def _fingerprint(self, statement: str) -> tuple:
+        cached = self._fingerprints.get(statement)
+        if cached is None:
+            normalized = normalize(statement)
+            cached = (fingerprint_of(normalized), normalized)
+            self._fingerprints[statement] = cached
+            if len(self._fingerprints) > FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.popitem(last=False)
+        return cached
+
+    def record(self, statement: str, parameters, seconds: float, rows: int, executemany: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            fingerprint, normalized = self._fingerprint(statement)
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = FingerprintStats(fingerprint, normalized)
+                if len(self._stats) > self.max_fingerprints:
+                    # Evict the fingerprint seen least recently
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(fingerprint)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += max(rows, 0)
+            stats.recent.append(seconds)
+            stats.last_seen = datetime.utcnow()
+            if seconds < self.slow_seconds:
+                return
+            stats.slow_calls += 1
+            explain = (not executemany and self._explainable(statement)
+                       and now - stats.last_explained >= self.sample_interval_seconds)
+            if explain:
+                stats.last_explained = now
+        if explain:
+            self._submit(fingerprint, statement, parameters, seconds)
+
+    def _explainable(self, statement: str) -> bool:
+        if self._engine is None or self._engine.dialect.name != "postgresql":
+            return False
+        head = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        # ANALYZE executes the statement, so only plain reads are sampled
+        return head in ("SELECT", "WITH") and " FOR UPDATE" not in statement.upper()
+
+    def _submit(self, fingerprint: str, statement: str, parameters, seconds: float):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._explain_loop, name="query-profiler", daemon=True)
+            self._worker.start()
+        try:
+            self._queue.put_nowait((fingerprint, statement, parameters, seconds))
+        except queue.Full:
+            logger.debug(f"EXPLAIN queue full, not sampling query {fingerprint}")
+
+    def _explain_loop(self):
+        while True:
+            fingerprint, statement, parameters, seconds = self._queue.get()
+            try:
+                self.explain(fingerprint, statement, parameters, seconds)
+            except Exception as e:
+                logger.warning(f"Failed to EXPLAIN slow query {fingerprint}: {str(e)}")
+
+    def explain(self, fingerprint: str, statement: str, parameters, seconds: float) -> dict:
+        # A raw DBAPI connection, so the EXPLAIN itself does not go through the cursor events
+        connection = self._engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+            connection.rollback()
+        finally:
+            connection.close()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]
+        sample = {
+            "fingerprint": fingerprint,
+            "captured_at": datetime.utcnow().isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement,
+            "summary": plan_summary(plan),
+            "plan": plan,
+        }
+        with self._lock:
+            self._plans.append(sample)
+            stats = self._stats.get(fingerprint)
+            if stats is not None:
+                stats.last_plan = sample
+        if sample["summary"]["seq_scans"]:
+            logger.warning(f"Slow query {fingerprint} ({sample['duration_ms']} ms) uses sequential scans on "
+                           f"{', '.join(sample['summary']['seq_scans'])}")
+        return sample
+
+    def top(self, sort_by: str = "total_ms", limit: int = 20) -> List[dict]:
+        with self._lock:
+            rows = [stats.to_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row[sort_by] or 0, reverse=True)[:limit]
+
+    def get(self, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                return None
+            result = stats.to_dict()
+            result["plans"] = [plan for plan in self._plans if plan["fingerprint"] == fingerprint]
+        return result
+
+    def plans(self, seq_scan_only: bool = False, limit: Optional[int] = None) -> List[dict]:
+        """Sampled plans, newest first, without the full plan trees."""
+        with self._lock:
+            samples = list(reversed(self._plans))
+        if seq_scan_only:
+            samples = [sample for sample in samples if sample["summary"]["seq_scans"]]
+        return [{key: value for key, value in sample.items() if key != "plan"} for sample in samples[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+
+
+query_profiler = QueryProfiler(SLOW_QUERY_SECONDS, EXPLAIN_SAMPLE_INTERVAL_SECONDS, QUERY_PROFILER_MAX_FINGERPRINTS,
+                               QUERY_PROFILER_MAX_PLANS)
@@ -0,0 +1,242 @@
+"""
+Per-source token-bucket rate limiting at ingest.
+
+Policies live in the JSON file at INGEST_POLICY_FILE and are reloaded when
+the file changes, without a restart:
+
+    {
+      "rules": [
+        {"key": "cnnid", "match": {"cnnid": "CNN001"}, "rate": 200, "burst": 1000,
+         "action": "sample", "sample_every": 10},
+        {"key": "device", "rate": 50, "burst": 200, "action": "severity", "min_severity": "high"},
+        {"key": "cnnid", "rate": 500, "burst": 2000, "action": "drop"}
+      ]
+    }
+
+Every rule whose ``match`` fields all equal the message's fields applies, with
+one bucket per distinct value of its ``key`` (cnnid, vendor or device). While
+a bucket has tokens messages pass; once it is empty the rule's action decides:
+``drop`` rejects, ``sample`` keeps one in ``sample_every``, ``severity`` keeps
+messages at or above ``min_severity``. A message is kept only if every
+applicable rule keeps it.
+
+Rejected messages are counted per minute, customer, vendor, product, severity
+and action in ``ingest_drops`` so aggregates can be re-weighted. Buckets that
+have been idle long enough to refill completely are indistinguishable from
+new ones and are evicted, so memory stays proportional to active sources.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .config import INGEST_DROP_FLUSH_SECONDS, INGEST_POLICY_FILE, INGEST_POLICY_RELOAD_SECONDS
+from .models import IngestDrop, SeverityEnum
+
+logger = logging.getLogger(__name__)
+
+KEYS = ["cnnid", "vendor", "device"]
+ACTIONS = ["drop", "sample", "severity"]
+SEVERITY_RANK = {severity.value: rank for rank, severity in enumerate(SeverityEnum)}
+SWEEP_SECONDS = 60
+DROP_BUCKET_SECONDS = 60
+
+
+class Rule:
+    def __init__(self, key: str, rate: float, burst: float, action: str = "drop", match: Optional[Dict[str, str]] = None,
+                 sample_every: int = 10, min_severity: str = "high"):
+        if key not in KEYS:
+            raise ValueError(f"Invalid key {key!r}. Must be one of {KEYS}.")
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid action {action!r}. Must be one of {ACTIONS}.")
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        if min_severity not in SEVERITY_RANK:
+            raise ValueError(f"Invalid min_severity {min_severity!r}. Must be one of {list(SEVERITY_RANK)}.")
+        unknown = [field for field in (match or {}) if field not in KEYS]
+        if unknown:
+            raise ValueError(f"Invalid match fields {unknown}. Must be in {KEYS}.")
+        self.key = key
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.action = action
+        self.match = match or {}
+        self.sample_every = max(int(sample_every), 1)
+        self.min_severity = min_severity
+
+    def applies(self, source: Dict[str, str]) -> bool:
+        return all(source.get(field) == value for field, value in self.match.items())
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key, "match": self.match, "rate": self.rate, "burst": self.burst, "action": self.action,
+            "sample_every": self.sample_every, "min_severity": self.min_severity,
+        }
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated", "over_budget")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.over_budget = 0
+
+    def take(self, rule: Rule, now: float) -> bool:
+        self.tokens = min(rule.burst, self.tokens + (now - self.updated) * rule.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.over_budget += 1
+        return False
+
+    def is_full(self, rule: Rule, now: float) -> bool:
+        return self.tokens + (now - self.updated) * rule.rate >= rule.burst
+
+
+class IngestRateLimiter:
+    def __init__(self, policy_file: Optional[str], reload_seconds: float = 5):
+        self.policy_file = policy_file
+        self.reload_seconds = reload_seconds
+        self.rules: List[Rule] = []
+        self._buckets: Dict[Tuple[int, str], TokenBucket] = {}
+        self._policy_mtime: Optional[float] = None
+        self._checked = 0.0
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rules(self, rules: List[Rule]):
+        with self._lock:
+            self.rules = rules
+            self._buckets = {}
+
+    def _reload_if_changed(self, now: float):
+        if not self.policy_file or now - self._checked < self.reload_seconds:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.policy_file).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._policy_mtime:
+            return
+        self._policy_mtime = mtime
+        if mtime is None:
+            logger.info(f"Ingest policy file {self.policy_file} removed, rate limiting disabled")
+            self.rules, self._buckets = [], {}
+            return
+        try:
+            with open(self.policy_file) as f:
+                policies = json.load(f)
+            rules = [Rule(**rule) for rule in policies.get("rules", [])]
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Invalid ingest policy file {self.policy_file}, keeping the current rules: {str(e)}")
+            return
+        self.rules, self._buckets = rules, {}
+        logger.info(f"Loaded {len(rules)} ingest rate limit rules from {self.policy_file}")
+
+    def _sweep(self, now: float):
+        if now - self._swept < SWEEP_SECONDS:
+            return
+        self._swept = now
+        self._buckets = {
+            bucket_key: bucket for bucket_key, bucket in self._buckets.items()
+            if bucket_key[0] < len(self.rules) and not bucket.is_full(self.rules[bucket_key[0]], now)
+        }
+
+    def admit(self, cnnid: str, vendor: str, device: str, severity: str) -> Optional[str]:
+        """Return None if the message may be stored, otherwise the action that rejected it."""
+        now = time.monotonic()
+        source = {"cnnid": cnnid, "vendor": vendor, "device": device}
+        with self._lock:
+            self._reload_if_changed(now)
+            self._sweep(now)
+            rejected = None
+            for index, rule in enumerate(self.rules):
+                if not rule.applies(source):
+                    continue
+                bucket_key = (index, source[rule.key])
+                bucket = self._buckets.get(bucket_key)
+                if bucket is None:
+                    bucket = self._buckets[bucket_key] = TokenBucket(rule.burst, now)
+                if bucket.take(rule, now) or rejected:
+                    continue
+                if rule.action == "sample" and bucket.over_budget % rule.sample_every == 0:
+                    continue
+                if rule.action == "severity" and SEVERITY_RANK.get(str(severity).lower(), -1) >= SEVERITY_RANK[rule.min_severity]:
+                    continue
+                rejected = rule.action
+            return rejected
+
+    def status(self) -> dict:
+        with self._lock:
+            self._reload_if_changed(time.monotonic())
+            return {
+                "policy_file": self.policy_file,
+                "rules": [rule.to_dict() for rule in self.rules],
+                "active_buckets": len(self._buckets),
+            }
+
+
+class DropCounter:
+    """Counts of rejected messages, merged into ingest_drops every ``flush_seconds``."""
+
+    def __init__(self, flush_seconds: int):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[datetime, str, str, str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, timestamp: datetime, cnnid: str, vendor: str, product: str, severity: str, action: str, count: int = 1):
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        epoch = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+        bucket_start = datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % DROP_BUCKET_SECONDS)
+        key = (bucket_start, cnnid, vendor, product, str(severity).lower(), action)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + count
+
+    def flush_if_due(self, db: Session):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush(db)
+
+    def flush(self, db: Session):
+        """Add the pending counts to ingest_drops in one transaction; keep them on failure."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            for (bucket_start, cnnid, vendor, product, severity, action), count in pending.items():
+                row = (
+                    db.query(IngestDrop)
+                    .filter(IngestDrop.bucket_start == bucket_start, IngestDrop.cnnid == cnnid, IngestDrop.vendor == vendor,
+                            IngestDrop.product == product, IngestDrop.severity == severity, IngestDrop.action == action)
+                    .with_for_update()
+                    .first()
+                )
+                if row is None:
+                    db.add(IngestDrop(bucket_start=bucket_start, cnnid=cnnid, vendor=vendor, product=product,
+                                      severity=severity, action=action, count=count))
+                else:
+                    row.count += count
+            db.commit()
+            logger.debug(f"Flushed {len(pending)} ingest drop counters")
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to flush ingest drop counts, keeping them for the next flush: {str(e)}")
+            db.rollback()
+            with self._lock:
+                for key, count in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + count
+
+
+ingest_limiter = IngestRateLimiter(INGEST_POLICY_FILE, INGEST_POLICY_RELOAD_SECONDS)
+drop_counter = DropCounter(INGEST_DROP_FLUSH_SECONDS)
@@ -0,0 +1,293 @@
+"""
+In-memory buffer of the newest logs, for the UI's most frequent reads.
+
+The default log list (/logs sorted by timestamp, newest first) and
+/search/recent are ``ORDER BY timestamp DESC LIMIT n`` queries. RecentLogBuffer
+keeps the newest RECENT_LOGS_BUFFER_SIZE rows of the hot tier in timestamp
+order, with secondary indexes by cnnid, vendor and severity, and answers
+such pages from memory.
+
+The buffer holds every row newer than its floor, the key of the last row it
+evicted. A page is answered only if it can be cut entirely out of that range.
+Otherwise page() returns None and the caller queries the database: deep
+pages, sorts other than newest first, message search, and ranges that reach
+below the floor.
+
+create_log adds the rows it commits. Rows committed by other workers are
+picked up by a cheap sync of new IDs at most every RECENT_LOGS_SYNC_SECONDS.
+Page totals still come from a COUNT query. The count is cached per filter
+for RECENT_LOGS_COUNT_SECONDS, plus the buffered rows added since, so
+deletions show up in totals only when the count is refreshed.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+
+from .cold_storage import naive_utc
+from .config import RECENT_LOGS_BUFFER_SIZE, RECENT_LOGS_COUNT_SECONDS, RECENT_LOGS_SYNC_SECONDS
+from .message_codec import message_codec
+from .models import LogEntry, LogEntryResponse
+
+logger = logging.getLogger(__name__)
+
+# IDs are assigned at flush but committed later, so a sync looks this far back
+# for rows of transactions that committed after a higher ID was seen
+SYNC_LOOKBACK_IDS = 1000
+# Filter combinations whose totals are cached
+MAX_CACHED_TOTALS = 256
+
+INDEXED = ("cnnid", "vendor", "severity")
+RESPONSE_FIELDS = list(LogEntryResponse.__fields__)
+
+# (timestamp, id): the buffer's sort order
+Key = Tuple[datetime, int]
+
+
+def _index_value(name: str, entry: LogEntryResponse) -> Optional[str]:
+    value = getattr(entry, name)
+    if value is None:
+        return None
+    if name == "severity":
+        return value.value
+    # The /logs vendor filter is case-insensitive, cnnid is exact
+    return value.lower() if name == "vendor" else value
+
+
+def _normalize(cnnid=None, vendor=None, device_type=None, severity=None, start_time=None, end_time=None) -> dict:
+    return {
+        "cnnid": cnnid,
+        "vendor": vendor.lower() if vendor else None,
+        "device_type": device_type.lower() if device_type else None,
+        "severity": getattr(severity, "value", severity).lower() if severity else None,
+        "start_time": naive_utc(start_time),
+        "end_time": naive_utc(end_time),
+    }
+
+
+def _matches(entry: LogEntryResponse, filters: dict) -> bool:
+    for name in INDEXED:
+        if filters[name] is not None and _index_value(name, entry) != filters[name]:
+            return False
+    if filters["device_type"] is not None and (entry.device_type or "").lower() != filters["device_type"]:
+        return False
+    if filters["start_time"] is not None and entry.timestamp < filters["start_time"]:
+        return False
+    if filters["end_time"] is not None and entry.timestamp > filters["end_time"]:
+        return False
+    return True
+
+
+def snapshot(db: Session, log: LogEntry, message: Optional[str] = None) -> LogEntryResponse:
+    """
+    The response of a flushed LogEntry, taken before commit expires its
+    attributes. ``message`` is the plain text if the row was stored compressed.
+    """
+    values = {name: getattr(log, name) for name in RESPONSE_FIELDS}
+    if values["message"] is None:
+        values["message"] = message
+    if values["message"] is None and log.message_compressed is not None:
+        values["message"] = message_codec.decompress(db.connection(), log.dictionary_id, log.message_compressed)
+    values["timestamp"], values["last_seen"] = naive_utc(values["timestamp"]), naive_utc(values["last_seen"])
+    return LogEntryResponse(**values)
+
+
+class RecentLogBuffer:
+    def __init__(self, capacity: int, sync_seconds: float, count_seconds: float):
+        self.capacity = capacity
+        self.sync_seconds = sync_seconds
+        self.count_seconds = count_seconds
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _clear(self):
+        self._entries: Dict[int, LogEntryResponse] = {}
+        self._order: List[Key] = []
+        self._indexes: Dict[str, Dict[str, List[Key]]] = {name: {} for name in INDEXED}
+        self._ids: List[int] = []
+        # Every row with a key above the floor is buffered; None means every row
+        self._floor: Optional[Key] = None
+        self._max_id = 0
+        self._loaded = False
+        self._synced = 0.0
+        self._totals: Dict[tuple, Tuple[int, int, float]] = {}
+
+    def _insert(self, entry: LogEntryResponse):
+        key = (entry.timestamp, entry.id)
+        if self._floor is not None and key <= self._floor:
+            return
+        self._max_id = max(self._max_id, entry.id)
+        if entry.id in self._entries:
+            # An update, e.g. a new repeat count; the key does not change
+            self._entries[entry.id] = entry
+            return
+        self._entries[entry.id] = entry
+        insort(self._order, key)
+        insort(self._ids, entry.id)
+        for name in INDEXED:
+            value = _index_value(name, entry)
+            if value is not None:
+                insort(self._indexes[name].setdefault(value, []), key)
+        while len(self._order) > self.capacity:
+            self._evict()
+
+    def _evict(self):
+        key = self._order.pop(0)
+        self._floor = key
+        entry = self._entries.pop(key[1])
+        del self._ids[bisect_left(self._ids, key[1])]
+        for name in INDEXED:
+            value = _index_value(name, entry)
+            if value is None:
+                continue
+            keys = self._indexes[name][value]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del self._indexes[name][value]
+
+    def add(self, entries: List[LogEntryResponse]):
+        """Buffer committed rows."""
+        if not self.enabled or not entries:
+            return
+        with self._lock:
+            for entry in entries:
+                self._insert(entry)
+
+    def add_repeats(self, log_id: int, count: int, last_seen: datetime):
+        """Apply repeats collapsed into an existing row by create_log."""
+        last_seen = naive_utc(last_seen)
+        with self._lock:
+            entry = self._entries.get(log_id)
+            if entry is not None:
+                self._entries[log_id] = entry.copy(update={
+                    "repeat_count": entry.repeat_count + count,
+                    "last_seen": max(entry.last_seen or last_seen, last_seen),
+                })
+
+    def preload(self, db: Session):
+        """Fill the buffer with the newest rows; done on first use otherwise."""
+        if not self.enabled:
+            return
+        logs = db.query(LogEntry).order_by(desc(LogEntry.timestamp), desc(LogEntry.id)).limit(self.capacity).all()
+        max_id = db.query(func.max(LogEntry.id)).scalar() or 0
+        entries = [LogEntryResponse.from_orm(log) for log in logs]
+        with self._lock:
+            self._clear()
+            if len(entries) == self.capacity:
+                # Rows older than the oldest one loaded were not read
+                self._floor = (entries[-1].timestamp, entries[-1].id)
+                entries = entries[:-1]
+            for entry in entries:
+                self._insert(entry)
+            self._max_id = max(self._max_id, max_id)
+            self._loaded = True
+            self._synced = time.monotonic()
+        logger.info("Loaded %d recent logs", len(entries))
+
+    def _sync(self, db: Session):
+        """Buffer rows committed by other workers since the last sync."""
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._synced < self.sync_seconds:
+                return
+            with self._lock:
+                low, floor = self._max_id - SYNC_LOOKBACK_IDS, self._floor
+            query = db.query(LogEntry.id).filter(LogEntry.id > low)
+            if floor is not None:
+                query = query.filter(LogEntry.timestamp >= floor[0])
+            with self._lock:
+                missing = [log_id for (log_id,) in query.all() if log_id not in self._entries]
+            if missing:
+                logs = db.query(LogEntry).filter(LogEntry.id.in_(missing)).all()
+                self.add([LogEntryResponse.from_orm(log) for log in logs])
+            self._synced = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _refresh(self, db: Session):
+        if not self._loaded:
+            with self._sync_lock:
+                if not self._loaded:
+                    self.preload(db)
+        elif self.sync_seconds and time.monotonic() - self._synced >= self.sync_seconds:
+            self._sync(db)
+
+    def page(self, db: Session, offset: int, limit: int, **filters) -> Optional[List[LogEntryResponse]]:
+        """
+        Rows ``offset`` to ``offset + limit`` of the newest-first list matching
+        ``filters`` (cnnid, vendor, device_type, severity, start_time,
+        end_time), or None if the buffer cannot answer the page.
+        """
+        if not self.enabled or offset + limit > self.capacity:
+            return None
+        self._refresh(db)
+        filters = _normalize(**filters)
+        with self._lock:
+            keys = self._order
+            for name in INDEXED:
+                if filters[name] is not None:
+                    candidates = self._indexes[name].get(filters[name], [])
+                    if len(candidates) < len(keys):
+                        keys = candidates
+            end = len(keys)
+            if filters["end_time"] is not None:
+                end = bisect_right(keys, (filters["end_time"], float("inf")))
+            start_time = filters["start_time"]
+            rows = []
+            for position in range(end - 1, -1, -1):
+                timestamp, log_id = keys[position]
+                if start_time is not None and timestamp < start_time:
+                    # Everything at or after start_time has been seen
+                    return rows
+                entry = self._entries[log_id]
+                if not _matches(entry, filters):
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                rows.append(entry)
+                if len(rows) == limit:
+                    return rows
+            # Ran out of rows: complete only if nothing matching is older than the floor
+            if self._floor is None or (start_time is not None and start_time > self._floor[0]):
+                return rows
+            return None
+
+    def total(self, filters: dict, count: Callable[[], int]) -> int:
+        """
+        Number of rows matching ``filters``: ``count()`` (the database count),
+        cached for count_seconds, plus the rows buffered since.
+        """
+        if not self.enabled or not self.count_seconds:
+            return count()
+        key = tuple(sorted(filters.items(), key=lambda item: item[0]))
+        normalized = _normalize(**filters)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._totals.get(key)
+            if cached is not None and now - cached[2] < self.count_seconds:
+                base, max_id, _ = cached
+                newer = self._ids[bisect_right(self._ids, max_id):]
+                return base + sum(1 for log_id in newer if _matches(self._entries[log_id], normalized))
+            max_id = self._max_id
+        base = count()
+        with self._lock:
+            if len(self._totals) >= MAX_CACHED_TOTALS:
+                oldest = min(self._totals, key=lambda cached_key: self._totals[cached_key][2])
+                del self._totals[oldest]
+            self._totals[key] = (base, max_id, now)
+        return base
+
+
+recent_logs = RecentLogBuffer(RECENT_LOGS_BUFFER_SIZE, RECENT_LOGS_SYNC_SECONDS, RECENT_LOGS_COUNT_SECONDS)
@@ -11,10 +11,7 @@ from ..models import User, UserCreate, UserResponse, Token, AuthMethod
 from ..database import get_db
 from ..token_blacklist import token_blacklist
 from ..config import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, LDAP_SERVER, AD_SERVER, AD_DOMAIN
-from ..auth.ldap_auth import authenticate_ldap
-from ..auth.ad_auth import authenticate_active_directory
-from ..auth.sso_auth import authenticate_sso, oauth
-from ..auth.azure_ad_auth import authenticate_azure_ad
+from ..auth import authenticator, load_provider
 import re
 
 router = APIRouter()
@@ -106,15 +103,15 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
         if not verify_password(form_data.password, user.hashed_password):
             raise HTTPException(status_code=400, detail="Incorrect username or password")
     elif user.auth_method == AuthMethod.ldap:
-        if not authenticate_ldap(user.username, form_data.password, LDAP_SERVER):
+        if not authenticator(AuthMethod.ldap)(user.username, form_data.password, LDAP_SERVER):
             raise HTTPException(status_code=400, detail="LDAP authentication failed")
     elif user.auth_method == AuthMethod.active_directory:
-        if not authenticate_active_directory(user.username, form_data.password, AD_SERVER, AD_DOMAIN):
+        if not authenticator(AuthMethod.active_directory)(user.username, form_data.password, AD_SERVER, AD_DOMAIN):
             raise HTTPException(status_code=400, detail="Active Directory authentication failed")
     elif user.auth_method == AuthMethod.sso:
         raise HTTPException(status_code=400, detail="SSO users should use the /login/google endpoint")
     elif user.auth_method == AuthMethod.azure_ad:
-        result = authenticate_azure_ad(user.username, form_data.password)
+        result = authenticator(AuthMethod.azure_ad)(user.username, form_data.password)
         if not result["success"]:
             raise HTTPException(status_code=400, detail="Azure AD authentication failed")
     else:
@@ -134,11 +131,12 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 @router.get('/login/google')
 async def login_google(request: Request):
     redirect_uri = request.url_for('auth_google')
+    oauth = load_provider(AuthMethod.sso).get_oauth()
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 @router.get('/auth/google')
 async def auth_google(request: Request, db: Session = Depends(get_db)):
-    user = await authenticate_sso(request)
+    user = await authenticator(AuthMethod.sso)(request)
     if user:
         db_user = db.query(User).filter(User.email == user['email']).first()
         if not db_user:
@@ -1,23 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from pydantic import BaseModel
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from Backend.api import dashboard_query
+from Backend.api.database import SessionLocal, get_db
+from Backend.api.models import Dashboard, DashboardCreate, DashboardResponse, WidgetSpec
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-class Dashboard(BaseModel):
-    id: int
-    name: str
-    widgets: List[dict]
+def _widgets(dashboard: DashboardCreate) -> List[dict]:
+    for index, widget in enumerate(dashboard.widgets):
+        try:
+            dashboard_query.validate(widget)
+        except dashboard_query.WidgetError as e:
+            raise HTTPException(status_code=400, detail=f"Widget {widget.id or index}: {str(e)}")
+    # Through JSON so absolute times are stored as ISO strings
+    return [json.loads(widget.json(exclude_none=True)) for widget in dashboard.widgets]
+
+def _get(db: Session, dashboard_id: int) -> Dashboard:
+    db_dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
+    if db_dashboard is None:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return db_dashboard
+
+@router.get("/dashboards", response_model=List[DashboardResponse])
+async def get_dashboards(db: Session = Depends(get_db)):
+    return db.query(Dashboard).order_by(Dashboard.id).all()
+
+@router.post("/dashboards", response_model=DashboardResponse, status_code=201)
+async def create_dashboard(dashboard: DashboardCreate, db: Session = Depends(get_db)):
+    db_dashboard = Dashboard(name=dashboard.name, widgets=_widgets(dashboard))
+    try:
+        db.add(db_dashboard)
+        db.commit()
+        db.refresh(db_dashboard)
+        return db_dashboard
+    except SQLAlchemyError as e:
+        logger.error(f"Error creating dashboard: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred while creating the dashboard: {str(e)}")
 
-dashboards_db = []
+@router.get("/dashboards/{dashboard_id}", response_model=DashboardResponse)
+async def get_dashboard(dashboard_id: int, db: Session = Depends(get_db)):
+    return _get(db, dashboard_id)
 
-@router.get("/dashboards", response_model=List[Dashboard])
-async def get_dashboards():
-    return dashboards_db
+@router.put("/dashboards/{dashboard_id}", response_model=DashboardResponse)
+async def update_dashboard(dashboard_id: int, dashboard: DashboardCreate, db: Session = Depends(get_db)):
+    db_dashboard = _get(db, dashboard_id)
+    db_dashboard.name = dashboard.name
+    db_dashboard.widgets = _widgets(dashboard)
+    db.commit()
+    db.refresh(db_dashboard)
+    return db_dashboard
 
-@router.post("/dashboards", response_model=Dashboard, status_code=201)
-async def create_dashboard(dashboard: Dashboard):
-    dashboard.id = len(dashboards_db) + 1
-    dashboards_db.append(dashboard)
-    return dashboard
+@router.delete("/dashboards/{dashboard_id}", response_model=DashboardResponse)
+async def delete_dashboard(dashboard_id: int, db: Session = Depends(get_db)):
+    db_dashboard = _get(db, dashboard_id)
+    response = DashboardResponse.from_orm(db_dashboard)
+    db.delete(db_dashboard)
+    db.commit()
+    return response
 
+@router.get("/dashboards/{dashboard_id}/data", summary="Data for every widget of a dashboard")
+async def get_dashboard_data(
+    dashboard_id: int,
+    start_time: Optional[datetime] = Query(None, description="Overrides the start of every widget's range"),
+    end_time: Optional[datetime] = Query(None, description="Overrides the end of every widget's range"),
+    db: Session = Depends(get_db)
+):
+    """
+    Compute all widgets in one response. Widgets with the same filters and
+    overlapping ranges share one scan, sketch widgets over the same range
+    share one rollup read, and independent groups run concurrently.
+    """
+    if start_time and end_time and start_time > end_time:
+        raise HTTPException(status_code=400, detail="start_time must be before end_time")
+    db_dashboard = _get(db, dashboard_id)
+    widgets = [WidgetSpec(**widget) for widget in db_dashboard.widgets]
+    try:
+        data = await dashboard_query.load(widgets, SessionLocal, start_time=start_time, end_time=end_time)
+    except dashboard_query.WidgetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.debug("Dashboard %s: %d widgets in %d groups", dashboard_id, len(widgets), data["groups"])
+    return {"dashboard_id": dashboard_id, **data}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+from ..database import get_db
+from ..models import IngestDrop
+from ..rate_limiter import ingest_limiter
+
+router = APIRouter()
+
+DROP_GROUPS = ["cnnid", "vendor", "product", "severity", "action"]
+
+@router.get("/ingest/limits", summary="Current ingest rate limit rules")
+async def get_ingest_limits():
+    """
+    Return the rules loaded from the policy file and the number of active token buckets in this worker.
+    """
+    return ingest_limiter.status()
+
+@router.get("/ingest/drops", response_model=Dict[str, int], summary="Counts of messages rejected at ingest")
+async def get_ingest_drops(
+    group_by: str = Query("cnnid", description="cnnid, vendor, product, severity or action"),
+    start_time: Optional[datetime] = Query(None, description="Defaults to 24 hours before end_time"),
+    end_time: Optional[datetime] = None,
+    cnnid: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Count messages dropped or sampled away by the ingest rate limiter, so stored
+    counts can be re-weighted. Counts are written by each worker every
+    INGEST_DROP_FLUSH_SECONDS and bucketed per minute.
+    """
+    if group_by not in DROP_GROUPS:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by: {group_by}. Must be one of {DROP_GROUPS}.")
+    end_time = end_time or datetime.utcnow()
+    start_time = start_time or end_time - timedelta(days=1)
+
+    column = getattr(IngestDrop, group_by)
+    query = (
+        db.query(column, func.sum(IngestDrop.count))
+        .filter(IngestDrop.bucket_start >= start_time, IngestDrop.bucket_start <= end_time)
+    )
+    if cnnid:
+        query = query.filter(IngestDrop.cnnid == cnnid)
+    return {value: int(count) for value, count in query.group_by(column).all() if value is not None}
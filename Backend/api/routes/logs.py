@@ -1,13 +1,31 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, or_, cast, Date, text, column, String
-from Backend.api.database import get_db
+from sqlalchemy import desc, func, or_, cast, Date, column, String, case
+from Backend.api.database import get_db, get_or_create
 from Backend.api.models import LogEntry, LogEntryCreate, LogEntryResponse, PaginatedResponse, Customer, Device, Vendor, SeverityEnum
+from Backend.api.cold_storage import cold_store, merge_sorted
+from Backend.api import analytics, wire_formats
+from Backend.api.sketches import sketch_aggregator
+from Backend.api.template_miner import template_store
+from Backend.api.message_codec import message_codec, message_contains
+from Backend.api.config import MESSAGE_COMPRESSION, INGEST_HASH_BODIES
+from Backend.api.idempotency import batch_key, body_hasher, hashed_chunks, idempotency_store
+from Backend.api.ingest_parser import parallel_parser
+from Backend.api.deduplication import dedup_key, dedup_window
+from Backend.api.rate_limiter import ingest_limiter, drop_counter
+from Backend.api.instrumentation import observe_ingest_batch
+from Backend.api.recent_logs import recent_logs, snapshot
+from Backend.api.sliced_query import TimeSlice, sliced_executor
+from Backend.api.bucket_cache import bucket_cache, fingerprint
+from Backend.api.token_index import token_index
+from Backend.api import attributes, ip_fields
+from Backend.api.parsers import vendor_parsers
+from Backend.api.logging_config import SampledLogger
+from pydantic.datetime_parse import parse_datetime
 from typing import List, Dict, Optional
 import logging
-import json
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.exc import SQLAlchemyError, TimeoutError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError, IntegrityError
 import traceback
 import csv
 from io import StringIO
@@ -15,25 +33,108 @@ from fastapi.responses import Response
 
 router = APIRouter()
 
-# Configure logging
+# Configure logging; the level comes from LOG_LEVEL / LOG_LEVELS
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+# Per-record and per-request debug logs on the ingest and read paths
+sampled_logger = SampledLogger(logger)
+
+# Values kept in the dedup window to re-create a row whose first occurrence is gone;
+# the timestamp also tells which cached bucket a repeat changes
+DEDUP_VALUE_COLUMNS = [
+    "message", "message_compressed", "dictionary_id", "severity", "device_id", "cnnid",
+    "vendor", "product", "device_type", "template_id", "template_params", "timestamp",
+    "src_ip", "dst_ip", "src_port", "dst_port", "attributes",
+]
+
+# Deepest page window (page * page_size) whose rows are k-way merged from parallel time slices
+SLICED_WINDOW_LIMIT = 1000
+
+def _sliced_count(db: Session, db_query, start_time: Optional[datetime], end_time: Optional[datetime]) -> int:
+    """db_query.count(), counted in parallel day slices for wide ranges."""
+    def count_slice(slice_db: Session, time_slice: TimeSlice) -> int:
+        return time_slice.apply(db_query.with_session(slice_db)).count()
+    return sliced_executor.aggregate(db, count_slice, sum, start_time, end_time)
+
+def _hot_window(db: Session, db_query, sort_by: str, descending: bool, window: int,
+                start_time: Optional[datetime], end_time: Optional[datetime]) -> List[LogEntryResponse]:
+    """The first ``window`` rows of the ordered db_query."""
+    if sort_by == "timestamp" or window > SLICED_WINDOW_LIMIT:
+        # A timestamp order is one index scan that stops after ``window`` rows
+        return [LogEntryResponse.from_orm(log) for log in db_query.limit(window).all()]
+    def window_slice(slice_db: Session, time_slice: TimeSlice) -> List[LogEntryResponse]:
+        logs = time_slice.apply(db_query.with_session(slice_db)).limit(window).all()
+        return [LogEntryResponse.from_orm(log) for log in logs]
+    return sliced_executor.top_rows(db, window_slice, sort_by, descending, window, start_time, end_time)
+
+def _replayed(batch) -> dict:
+    return {
+        "status": "success",
+        "message": f"{batch.logs_created} log entries received and processed",
+        "dropped": batch.logs_dropped,
+        "replayed": True,
+    }
+
+async def _iterate(items: list):
+    for item in items:
+        yield item
 
 @router.post("/logs", response_model=dict, summary="Create log entries")
 async def create_log(request: Request, db: Session = Depends(get_db)):
     """
     Create new log entries.
+
+    The body is NDJSON by default; Content-Type and Content-Encoding select
+    msgpack, Fluent Bit/forward protocol and gzip, deflate, zstd or snappy
+    compression (see api/wire_formats.py).
+
+    Send an Idempotency-Key header to make retries safe; without one the batch
+    is keyed by a hash of its body. A batch whose key was already stored is
+    acknowledged with the original result and not stored again.
     """
     try:
-        # Read the raw body content
-        body = await request.body()
-        body_str = body.decode('utf-8')
-        
-        # Split the body into individual JSON objects
-        json_objects = [json.loads(obj) for obj in body_str.strip().split('\n')]
+        content_type = request.headers.get('content-type')
+        content_encoding = request.headers.get('content-encoding')
+        header_key = request.headers.get('idempotency-key') or request.headers.get('x-batch-id')
+        key = batch_key(header_key, None, content_type, content_encoding)
+        # Without a header key the raw body is hashed as it streams in
+        body_digest = body_hasher(content_type, content_encoding) if key is None and INGEST_HASH_BODIES else None
+        if key is not None or body_digest is not None:
+            idempotency_store.purge_if_due(db)
+        if key is not None:
+            stored_batch = idempotency_store.lookup(db, key)
+            if stored_batch:
+                logger.info(f"Ignoring replayed batch of {stored_batch.logs_created} log entries from {stored_batch.created_at}")
+                return _replayed(stored_batch)
+
+        # Decode the body incrementally as it arrives, in the negotiated wire format
+        chunks = request.stream()
+        if body_digest is not None:
+            chunks = hashed_chunks(chunks, body_digest)
+        records = parallel_parser.iter_records(chunks, content_type, content_encoding)
+        if body_digest is not None:
+            # A body's key is only known once it is consumed, so its records are held until the key
+            # is looked up; a replay is dropped before it spends ingest budget or touches templates
+            decoded = [log_data async for log_data in records]
+            key = body_digest.digest()
+            stored_batch = idempotency_store.lookup(db, key)
+            if stored_batch:
+                logger.info(f"Ignoring replayed batch of {stored_batch.logs_created} log entries from {stored_batch.created_at}")
+                return _replayed(stored_batch)
+            records = _iterate(decoded)
         
         logs_created = 0
-        for log_data in json_objects:
+        logs_dropped = 0
+        drops = []
+        observations = []
+        template_counts, template_last_seen = {}, {}
+        # Rows created by this request and repeats of rows stored by earlier requests, by dedup key
+        batch_entries = {}
+        repeats = {}
+        # New rows with their plain-text message, for the recent logs buffer
+        new_logs = []
+        async for log_data in records:
+            # Fields of known vendors' messages fill in what the record lacks
+            vendor_parsers.enrich(log_data)
             cnnid = log_data.get('cnnid')
             vendor_name = log_data.get('vendor')
             product_name = log_data.get('product')
@@ -55,57 +156,153 @@ async def create_log(request: Request, db: Session = Depends(get_db)):
             if not device_type:
                 device_type = "Unknown Device Type"
                 logger.warning(f"Log entry received without device type. Using default: {device_type}")
-            
-            # Ensure customer exists
-            customer = db.query(Customer).filter(Customer.cnnid == cnnid).first()
-            if not customer:
-                customer = Customer(cnnid=cnnid, name=f"Customer {cnnid}")
-                db.add(customer)
-                db.commit()
-                db.refresh(customer)
-                logger.info(f"Created new customer with CNNID: {cnnid}")
-
-            # Ensure vendor exists
-            vendor = db.query(Vendor).filter(Vendor.name == vendor_name).first()
-            if not vendor:
-                vendor = Vendor(name=vendor_name)
-                db.add(vendor)
-                db.commit()
-                db.refresh(vendor)
-                logger.info(f"Created new vendor: {vendor_name}")
-
-            # Ensure product exists
-            product = db.query(Device).filter(Device.name == product_name, Device.vendor == vendor).first()
-            if not product:
-                product = Device(name=product_name, type=device_type, vendor=vendor)
-                db.add(product)
-                db.commit()
-                db.refresh(product)
-                logger.info(f"Created new product: {product_name}")
-
-            # Create log entry 
-            log_entry = LogEntryCreate(
-                timestamp=log_data.get('timestamp', datetime.now().isoformat()),
-                message=log_data.get('message', 'No message provided'),
-                severity=log_data.get('severity', 'unknown'),
-                device_id=product.id,
-                cnnid=cnnid,
-                vendor=vendor_name,
-                product=product_name,
-                device_type=device_type
-            )
-            db_log = LogEntry(**log_entry.dict())
-            db.add(db_log)
+
+            message = log_data.get('message', 'No message provided')
+            severity = log_data.get('severity', 'unknown')
+            timestamp = parse_datetime(log_data.get('timestamp', datetime.now().isoformat()))
+
+            # Enforce the per-source ingest budget; rejected messages are only counted
+            rejected = ingest_limiter.admit(cnnid, vendor_name, product_name, severity)
+            if rejected:
+                drops.append((timestamp, cnnid, vendor_name, product_name, severity, rejected))
+                logs_dropped += 1
+                continue
             logs_created += 1
-            logger.debug(f"Inserted log: {db_log.vendor} - {db_log.timestamp} - {db_log.cnnid} - {db_log.product}")
-        
-        db.commit()
-        logger.info(f"Received and processed {logs_created} log entries")
-        return {"status": "success", "message": f"{logs_created} log entries received and processed"}
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON Decode Error: {str(e)}")
-        logger.error(f"Received body: {body_str}")
-        raise HTTPException(status_code=400, detail=f"Invalid JSON format: {str(e)}")
+            observations.append((timestamp, cnnid, f"{cnnid}/{product_name}", len(message)))
+
+            # Collapse exact repeats within the dedup window into the first row
+            dedup = dedup_key(cnnid, product_name, severity, message) if dedup_window.enabled else None
+            stored = dedup_window.lookup(dedup) if dedup is not None and dedup not in batch_entries else None
+            if dedup in batch_entries:
+                entry = batch_entries[dedup]
+                entry.repeat_count += 1
+                entry.last_seen = max(entry.last_seen, timestamp)
+                template_id = entry.template_id
+            elif stored:
+                log_id, values = stored
+                repeat = repeats.setdefault(log_id, {"key": dedup, "values": values, "count": 0, "first_seen": timestamp, "last_seen": timestamp})
+                repeat["count"] += 1
+                repeat["first_seen"] = min(repeat["first_seen"], timestamp)
+                repeat["last_seen"] = max(repeat["last_seen"], timestamp)
+                template_id = values["template_id"]
+            else:
+                # Ensure customer, vendor and product exist; they are committed on their own
+                _, created = get_or_create(db, Customer, {"name": f"Customer {cnnid}"}, cnnid=cnnid)
+                if created:
+                    logger.info(f"Created new customer with CNNID: {cnnid}")
+
+                vendor, created = get_or_create(db, Vendor, {}, name=vendor_name)
+                if created:
+                    logger.info(f"Created new vendor: {vendor_name}")
+
+                product, created = get_or_create(db, Device, {"type": device_type}, name=product_name, vendor_id=vendor.id)
+                if created:
+                    logger.info(f"Created new product: {product_name}")
+
+                # Assign the message to a template
+                template_id, template_params = template_store.match(db, message)
+
+                # Create log entry 
+                log_entry = LogEntryCreate(
+                    timestamp=timestamp,
+                    message=message,
+                    severity=severity,
+                    device_id=product.id,
+                    cnnid=cnnid,
+                    vendor=vendor_name,
+                    product=product_name,
+                    device_type=device_type,
+                    template_id=template_id,
+                    template_params=template_params,
+                    last_seen=timestamp,
+                    attributes=attributes.extract(log_data),
+                    **ip_fields.extract(log_data, message)
+                )
+                db_log = LogEntry(**log_entry.dict())
+                new_logs.append((db_log, message))
+                if dedup is not None:
+                    batch_entries[dedup] = db_log
+                sampled_logger.debug("Inserted log: %s - %s - %s - %s", vendor_name, timestamp, cnnid, product_name)
+
+            template_counts[template_id] = template_counts.get(template_id, 0) + 1
+            template_last_seen[template_id] = max(template_last_seen.get(template_id, timestamp), timestamp)
+
+        # The batch's new rows are compressed in one pass and added together
+        new_rows = [log for log, _ in new_logs]
+        if MESSAGE_COMPRESSION:
+            message_codec.compress_entries(db, new_rows)
+        db.add_all(new_rows)
+
+        repeated = []
+        # Timestamps of the rows stored or changed, to invalidate cached buckets they fall in
+        changed_times = [log.timestamp for log, _ in new_logs]
+        for log_id, repeat in repeats.items():
+            updated = db.query(LogEntry).filter(LogEntry.id == log_id).update({
+                "repeat_count": LogEntry.repeat_count + repeat["count"],
+                "last_seen": case((LogEntry.last_seen < repeat["last_seen"], repeat["last_seen"]), else_=LogEntry.last_seen),
+            }, synchronize_session=False)
+            if not updated:
+                # The first row is gone (e.g. moved to the cold tier), store the repeats as a new row
+                dedup_window.forget(repeat["key"])
+                db_log = LogEntry(**dict(repeat["values"], timestamp=repeat["first_seen"], last_seen=repeat["last_seen"], repeat_count=repeat["count"]))
+                db.add(db_log)
+                new_logs.append((db_log, None))
+                batch_entries[repeat["key"]] = db_log
+                changed_times.append(repeat["first_seen"])
+            else:
+                repeated.append((log_id, repeat["count"], repeat["last_seen"]))
+                changed_times.append(repeat["values"]["timestamp"])
+
+        # The batch key commits atomically with the logs
+        try:
+            if key is not None:
+                idempotency_store.record(db, key, logs_created, logs_dropped)
+            late = bucket_cache.record(db, changed_times)
+            # Flush first so the new rows have IDs while their attributes are still loaded
+            db.flush()
+            remembered = [
+                (dedup, entry.id, {name: getattr(entry, name) for name in DEDUP_VALUE_COLUMNS})
+                for dedup, entry in batch_entries.items()
+            ]
+            buffered = [snapshot(db, log, message) for log, message in new_logs] if recent_logs.enabled else []
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            stored_batch = idempotency_store.lookup(db, key) if key is not None else None
+            if not stored_batch:
+                raise
+            logger.info("Batch was stored concurrently by another request, discarding this copy")
+            return _replayed(stored_batch)
+        for dedup, log_id, values in remembered:
+            dedup_window.remember(dedup, log_id, values)
+        recent_logs.add(buffered)
+        for repeat in repeated:
+            recent_logs.add_repeats(*repeat)
+        for start, end in late:
+            bucket_cache.invalidate(start, end)
+
+        # Sketches and drop counts only see batches that were actually committed
+        for drop in drops:
+            drop_counter.record(*drop)
+        for observation in observations:
+            sketch_aggregator.observe(*observation)
+        sketch_aggregator.flush_if_due(db)
+        template_store.record_counts(db, template_counts, template_last_seen)
+        drop_counter.flush_if_due(db)
+        token_index.seal_if_due()
+        observe_ingest_batch(logs_created, logs_dropped)
+        if logs_dropped:
+            logger.warning(f"Dropped {logs_dropped} log entries over their ingest budget")
+        logger.info("Received and processed %d log entries", logs_created)
+        return {"status": "success", "message": f"{logs_created} log entries received and processed", "dropped": logs_dropped}
+    except wire_formats.UnsupportedFormatError as e:
+        logger.error(f"Unsupported ingest format: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=415, detail=str(e))
+    except wire_formats.WireFormatError as e:
+        logger.error(f"Failed to decode ingest body: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except SQLAlchemyError as e:
         logger.error(f"Database error in create_log: {str(e)}")
         logger.error(traceback.format_exc())
@@ -119,6 +316,7 @@ async def create_log(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/logs", response_model=PaginatedResponse, summary="Get logs")
 async def get_logs(
+    request: Request,
     query: Optional[str] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
@@ -126,6 +324,12 @@ async def get_logs(
     vendor: Optional[str] = None,
     device_type: Optional[str] = None,
     severity: Optional[str] = None,
+    template_id: Optional[int] = None,
+    token: Optional[str] = Query(None, description="Whole token in the message, e.g. an IP, MAC or request ID"),
+    src_ip: Optional[str] = Query(None, description="Source address or CIDR block, e.g. 10.0.0.0/8"),
+    dst_ip: Optional[str] = Query(None, description="Destination address or CIDR block"),
+    src_port: Optional[int] = None,
+    dst_port: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     sort_by: str = "timestamp",
@@ -134,16 +338,37 @@ async def get_logs(
 ):
     """
     Retrieve logs based on search criteria.
+
+    ``token`` matches messages containing the value between token boundaries
+    and only reads the blocks of rows whose token filter may contain it (see
+    api/token_index.py); ``query`` is a substring match over every row.
+    ``src_ip`` and ``dst_ip`` take an address or a CIDR block.
+    ``attr.<key>=<value>`` parameters filter on vendor-specific fields (see
+    api/attributes.py).
     """
+    # Checked before the query so that a malformed block is a 400, not a 500
+    ip_filters = {"src_ip": src_ip, "dst_ip": dst_ip}
+    ip_conditions = []
+    for name, value in ip_filters.items():
+        if value:
+            try:
+                ip_conditions.append(ip_fields.ip_condition(getattr(LogEntry, name), value, db.bind.dialect.name))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {name}: {str(e)}")
+    try:
+        attr_filters = attributes.parse_filters(request.query_params.multi_items())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        logger.debug(f"Received request with parameters: query={query}, vendor={vendor}, severity={severity}, device_type={device_type}, page={page}, page_size={page_size}, sort_by={sort_by}, sort_order={sort_order}")
+        sampled_logger.debug("Received request with parameters: query=%s, vendor=%s, severity=%s, device_type=%s, page=%s, page_size=%s, sort_by=%s, sort_order=%s",
+                             query, vendor, severity, device_type, page, page_size, sort_by, sort_order)
     
         db_query = db.query(LogEntry)
     
         if query:
             search_term = f"%{query}%"
             db_query = db_query.filter(or_(
-                LogEntry.message.ilike(search_term),
+                message_contains(db, query, start_time, end_time),
                 LogEntry.vendor.ilike(search_term),
                 LogEntry.cnnid.ilike(search_term),
                 LogEntry.device_type.ilike(search_term),
@@ -160,6 +385,18 @@ async def get_logs(
             db_query = db_query.filter(func.lower(LogEntry.device_type) == func.lower(device_type))
         if cnnid:
             db_query = db_query.filter(LogEntry.cnnid == cnnid)
+        if template_id is not None:
+            db_query = db_query.filter(LogEntry.template_id == template_id)
+        if token:
+            db_query = db_query.filter(token_index.condition(db, token, start_time, end_time))
+        for condition in ip_conditions:
+            db_query = db_query.filter(condition)
+        for key, value in attr_filters:
+            db_query = db_query.filter(attributes.attribute_condition(LogEntry.attributes, key, value, db.bind.dialect.name))
+        if src_port is not None:
+            db_query = db_query.filter(LogEntry.src_port == src_port)
+        if dst_port is not None:
+            db_query = db_query.filter(LogEntry.dst_port == dst_port)
         if start_time:
             db_query = db_query.filter(LogEntry.timestamp >= start_time)
         if end_time:
@@ -172,19 +409,58 @@ async def get_logs(
             sort_by = 'timestamp'
     
         sort_column = getattr(LogEntry, sort_by)
-        if sort_order.lower() == "asc":
-            db_query = db_query.order_by(sort_column)
-        else:
+        descending = sort_order.lower() != "asc"
+        if descending:
             db_query = db_query.order_by(desc(sort_column))
+        else:
+            db_query = db_query.order_by(sort_column)
     
-        total = db_query.count()
-        logger.debug(f"Total logs found: {total}")
-    
-        logs = db_query.offset((page - 1) * page_size).limit(page_size).all()
-        logger.debug(f"Logs retrieved: {len(logs)}")
-    
-        log_entries = [LogEntryResponse.from_orm(log) for log in logs]
-        logger.debug(f"Log entries created: {len(log_entries)}")
+        cold_filters = dict(start_time=start_time, end_time=end_time, cnnid=cnnid, vendor=vendor,
+                            device_type=device_type, severity=severity, template_id=template_id, query=query,
+                            token=token, src_port=src_port, dst_port=dst_port, attributes=attr_filters, **ip_filters)
+
+        # Newest-first pages without message search usually come from the recent logs buffer
+        buffered = None
+        field_filters = src_ip or dst_ip or src_port is not None or dst_port is not None or attr_filters
+        if sort_by == "timestamp" and descending and not query and not token and not field_filters and template_id is None:
+            buffer_filters = dict(cnnid=cnnid, vendor=vendor, device_type=device_type, severity=severity,
+                                  start_time=start_time, end_time=end_time)
+            buffered = recent_logs.page(db, (page - 1) * page_size, page_size, **buffer_filters)
+            if buffered is not None:
+                # The page must not have cold rows between its entries
+                oldest = buffered[-1].timestamp if len(buffered) == page_size else start_time
+                if cold_store.has_data(oldest, end_time):
+                    buffered = None
+
+        if buffered is not None:
+            def count_matching():
+                count = _sliced_count(db, db_query, start_time, end_time)
+                if cold_store.has_data(start_time, end_time):
+                    count += cold_store.count(**cold_filters)
+                return count
+            total = recent_logs.total(buffer_filters, count_matching)
+            log_entries = buffered
+            logger.debug("Logs served from the recent logs buffer: %d of %d", len(log_entries), total)
+        elif cold_store.has_data(start_time, end_time):
+            total = _sliced_count(db, db_query, start_time, end_time) + cold_store.count(**cold_filters)
+            # Merge the first page * page_size rows of each tier and cut the page out of that
+            window = page * page_size
+            hot_entries = _hot_window(db, db_query, sort_by, descending, window, start_time, end_time)
+            # A full timestamp-ordered hot window bounds the cold rows that can still make the page
+            boundary = hot_entries[-1].timestamp if sort_by == "timestamp" and len(hot_entries) == window else None
+            cold_rows = cold_store.top_rows(sort_by, descending, window, boundary=boundary, **cold_filters)
+            cold_entries = [LogEntryResponse(**row) for row in cold_rows]
+            log_entries = merge_sorted(hot_entries, cold_entries, sort_by, descending)[(page - 1) * page_size:window]
+            logger.debug("Logs retrieved from hot and cold tiers: %d", len(log_entries))
+        else:
+            total = _sliced_count(db, db_query, start_time, end_time)
+            window = page * page_size
+            if sort_by != "timestamp" and window <= SLICED_WINDOW_LIMIT:
+                log_entries = _hot_window(db, db_query, sort_by, descending, window, start_time, end_time)[(page - 1) * page_size:]
+            else:
+                logs = db_query.offset((page - 1) * page_size).limit(page_size).all()
+                log_entries = [LogEntryResponse.from_orm(log) for log in logs]
+            logger.debug("Logs retrieved: %d", len(log_entries))
     
         response = PaginatedResponse(
             items=log_entries,
@@ -193,8 +469,6 @@ async def get_logs(
             page_size=page_size,
             total_pages=(total + page_size - 1) // page_size
         )
-        logger.debug(f"Response created: {response}")
-    
         return response
     except SQLAlchemyError as e:
         logger.error(f"Database error in get_logs: {str(e)}")
@@ -210,8 +484,8 @@ async def get_log_count(db: Session = Depends(get_db)):
     """
     Get the total count of log entries.
     """
-    count = db.query(LogEntry).count()
-    logger.debug(f"Total log count: {count}")
+    count = db.query(func.coalesce(func.sum(LogEntry.repeat_count), 0)).scalar()
+    logger.debug("Total log count: %s", count)
     return {"total_logs": count}
 
 @router.get("/logs/vendors", response_model=List[str], summary="Get unique vendors")
@@ -221,7 +495,7 @@ async def get_vendors(db: Session = Depends(get_db)):
     """
     vendors = db.query(LogEntry.vendor).distinct().filter(LogEntry.vendor != None).all()
     vendor_list = [vendor[0] for vendor in vendors]
-    logger.debug(f"Unique vendors: {vendor_list}")
+    logger.debug("Unique vendors: %d", len(vendor_list))
     return vendor_list
 
 @router.get("/logs/vendor-counts", response_model=Dict[str, int], summary="Get log counts by vendor")
@@ -230,29 +504,27 @@ def get_log_counts_by_vendor(
     end_date: datetime = Query(default=None, description="End date for the count (inclusive)"),
     db: Session = Depends(get_db)
 ):
-    logger.debug(f"get_log_counts_by_vendor called with start_date={start_date}, end_date={end_date}")
+    logger.debug("get_log_counts_by_vendor called with start_date=%s, end_date=%s", start_date, end_date)
     if start_date:
         start_date = start_date.replace(tzinfo=timezone.utc)
     if end_date:
         end_date = end_date.replace(tzinfo=timezone.utc)
-    logger.debug(f"Adjusted start_date: {start_date}, end_date: {end_date}")
+    logger.debug("Adjusted start_date: %s, end_date: %s", start_date, end_date)
+
+    def count_slice(slice_db: Session, time_slice: TimeSlice) -> Dict[int, Dict[str, int]]:
+        bucket = bucket_cache.bucket_column()
+        query = slice_db.query(bucket, LogEntry.vendor, func.sum(LogEntry.repeat_count).label('count'))
+        query = time_slice.apply(query).filter(LogEntry.vendor != None).group_by(bucket, LogEntry.vendor)
+        counts = {}
+        for bucket_number, vendor, count in query.all():
+            if vendor is not None:
+                counts.setdefault(int(bucket_number), {})[vendor] = int(count)
+        return counts
 
     try:
-        query = db.query(LogEntry.vendor, func.count(LogEntry.id).label('count'))
-        
-        if start_date:
-            query = query.filter(LogEntry.timestamp >= start_date)
-        if end_date:
-            query = query.filter(LogEntry.timestamp <= end_date)
-        
-        query = query.filter(LogEntry.vendor != None).group_by(LogEntry.vendor)
-        
-        logger.debug(f"Executing query: {query}")
-        result = query.all()
-        logger.debug(f"Query execution completed. Raw result: {result}")
-        
-        vendor_counts = {vendor: count for vendor, count in result if vendor is not None}
-        logger.debug(f"Processed vendor counts: {vendor_counts}")
+        # Closed hours come from the bucket cache, missing ones run as parallel day slices
+        vendor_counts = bucket_cache.aggregate(db, fingerprint("vendor-counts"), count_slice, start_date, end_date)
+        logger.debug("Vendor counts for %d vendors", len(vendor_counts))
         return vendor_counts
 
     except SQLAlchemyError as e:
@@ -270,29 +542,25 @@ async def get_severity_distribution(
     end_date: datetime = Query(default=None, description="End date for the distribution (inclusive)"),
     db: Session = Depends(get_db)
 ):
-    logger.debug(f"get_severity_distribution called with start_date={start_date}, end_date={end_date}")
+    logger.debug("get_severity_distribution called with start_date=%s, end_date=%s", start_date, end_date)
     if start_date:
         start_date = start_date.replace(tzinfo=timezone.utc)
     if end_date:
         end_date = end_date.replace(tzinfo=timezone.utc)
-    logger.debug(f"Adjusted start_date: {start_date}, end_date: {end_date}")
-
-    query = text("""
-        SELECT severity, COUNT(*) as count
-        FROM logs
-        WHERE (:start_date IS NULL OR timestamp >= :start_date)
-          AND (:end_date IS NULL OR timestamp <= :end_date)
-        GROUP BY severity
-    """)
+    logger.debug("Adjusted start_date: %s, end_date: %s", start_date, end_date)
 
-    logger.debug(f"SQL Query: {query}")
+    def count_slice(slice_db: Session, time_slice: TimeSlice) -> Dict[int, Dict[str, int]]:
+        bucket = bucket_cache.bucket_column()
+        query = slice_db.query(bucket, LogEntry.severity, func.sum(LogEntry.repeat_count).label('count'))
+        query = time_slice.apply(query).group_by(bucket, LogEntry.severity)
+        counts = {}
+        for bucket_number, severity, count in query.all():
+            if severity is not None:
+                counts.setdefault(int(bucket_number), {})[severity.value] = int(count)
+        return counts
 
-    result = db.execute(query, {"start_date": start_date, "end_date": end_date}).fetchall()
-    
-    logger.debug(f"Raw severity distribution result: {result}")
-    severity_distribution = {severity: count for severity, count in result if severity is not None}
-    logger.debug(f"Processed severity distribution: {severity_distribution}")
-    return severity_distribution
+    # Closed hours come from the bucket cache
+    return bucket_cache.aggregate(db, fingerprint("severity-distribution"), count_slice, start_date, end_date)
 
 @router.get("/logs/time-series", response_model=Dict[str, int], summary="Get log count time series")
 async def get_log_count_time_series(
@@ -301,7 +569,7 @@ async def get_log_count_time_series(
     interval: str = Query("day", description="Interval for the time series (day, hour, or minute)"),
     db: Session = Depends(get_db)
 ):
-    logger.debug(f"get_log_count_time_series called with start_date={start_date}, end_date={end_date}, interval={interval}")
+    logger.debug("get_log_count_time_series called with start_date=%s, end_date=%s, interval=%s", start_date, end_date, interval)
     if interval not in ["day", "hour", "minute"]:
         raise HTTPException(status_code=400, detail="Invalid interval. Must be 'day', 'hour', or 'minute'.")
 
@@ -312,37 +580,61 @@ async def get_log_count_time_series(
 
     start_date = start_date.replace(tzinfo=timezone.utc)
     end_date = end_date.replace(tzinfo=timezone.utc)
-    logger.debug(f"Adjusted start_date: {start_date}, end_date: {end_date}")
-
-    query = text(f"""
-        SELECT strftime(:date_format, timestamp, 'unixepoch') as interval_timestamp, COUNT(*) as count
-        FROM logs
-        WHERE timestamp >= :start_date AND timestamp <= :end_date
-        GROUP BY interval_timestamp
-        ORDER BY interval_timestamp
-    """)
-
-    if interval == "day":
-        date_format = '%Y-%m-%d'
-    elif interval == "hour":
-        date_format = '%Y-%m-%d %H:00:00'
-    else:  # minute
-        date_format = '%Y-%m-%d %H:%M:00'
-
-    logger.debug(f"SQL Query: {query}")
-    logger.debug(f"Query parameters: date_format={date_format}, start_date={start_date}, end_date={end_date}")
-
-    result = db.execute(query, {
-        "date_format": date_format,
-        "start_date": start_date.timestamp(),
-        "end_date": end_date.timestamp()
-    }).fetchall()
-    
-    logger.debug(f"Raw time series result: {result}")
-    time_series = {str(timestamp): count for timestamp, count in result}
-    logger.debug(f"Processed time series: {time_series}")
+    logger.debug("Adjusted start_date: %s, end_date: %s", start_date, end_date)
+
+    def series_slice(slice_db: Session, time_slice: TimeSlice) -> Dict[int, Dict[str, int]]:
+        columns = analytics.load_columns(slice_db, dimensions=[], start_time=time_slice.start, end_time=time_slice.last_instant)
+        return analytics.bucketed_time_series(columns, interval, bucket_cache.bucket_seconds)
+
+    # Closed hours come from the bucket cache; only the edges and the open hour are scanned
+    counts = bucket_cache.aggregate(db, fingerprint("time-series", interval=interval), series_slice, start_date, end_date)
+    time_series = dict(sorted(counts.items()))
+    logger.debug("Time series with %d points", len(time_series))
     return time_series
 
+@router.get("/logs/analytics", response_model=dict, summary="Get histograms, time series and top-N breakdowns")
+async def get_log_analytics(
+    start_date: datetime = Query(default=None, description="Start date (inclusive), defaults to 7 days ago"),
+    end_date: datetime = Query(default=None, description="End date (inclusive), defaults to now"),
+    facets: List[str] = Query(analytics.DIMENSIONS, description="Dimensions to build histograms for"),
+    interval: Optional[str] = Query(None, description="Time series interval (day, hour, or minute)"),
+    series_by: Optional[str] = Query(None, description="Split the time series by this dimension"),
+    top_n: Optional[int] = Query(None, ge=1, description="Keep only the N largest values per facet"),
+    query: Optional[str] = None,
+    cnnid: Optional[str] = None,
+    vendor: Optional[str] = None,
+    device_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Compute all requested facets and the time series from a single fetch of the filtered logs.
+    """
+    unknown = [name for name in facets + ([series_by] if series_by else []) if name not in analytics.DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid dimensions: {unknown}. Must be one of {analytics.DIMENSIONS}.")
+    if interval and interval not in analytics.INTERVAL_SECONDS:
+        raise HTTPException(status_code=400, detail="Invalid interval. Must be 'day', 'hour', or 'minute'.")
+    if series_by and not interval:
+        raise HTTPException(status_code=400, detail="series_by requires an interval.")
+
+    if not start_date:
+        start_date = datetime.now(timezone.utc) - timedelta(days=7)
+    if not end_date:
+        end_date = datetime.now(timezone.utc)
+
+    try:
+        dimensions = sorted(set(facets + ([series_by] if series_by else [])))
+        columns = analytics.load_columns(
+            db, dimensions=dimensions, start_time=start_date, end_time=end_date,
+            query=query, cnnid=cnnid, vendor=vendor, device_type=device_type, severity=severity
+        )
+        return analytics.compute(columns, facets=facets, interval=interval, top_n=top_n, series_by=series_by)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error in get_log_analytics: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Database error occurred: {str(e)}")
+
 @router.get("/logs/export", response_model=None, summary="Export logs as CSV")
 async def export_logs(
     query: Optional[str] = None,
@@ -366,7 +658,7 @@ async def export_logs(
         if query:
             search_term = f"%{query}%"
             db_query = db_query.filter(or_(
-                LogEntry.message.ilike(search_term),
+                message_contains(db, query, start_time, end_time),
                 LogEntry.vendor.ilike(search_term),
                 LogEntry.cnnid.ilike(search_term),
                 LogEntry.device_type.ilike(search_term),
@@ -393,13 +685,20 @@ async def export_logs(
         
         # Apply sorting
         sort_column = getattr(LogEntry, sort_by)
-        if sort_order.lower() == "asc":
-            db_query = db_query.order_by(sort_column)
-        else:
+        descending = sort_order.lower() != "asc"
+        if descending:
             db_query = db_query.order_by(desc(sort_column))
+        else:
+            db_query = db_query.order_by(sort_column)
         
-        # Get all matching logs
+        # Get all matching logs, including archived ones from the cold tier
         logs = db_query.all()
+        if cold_store.has_data(start_time, end_time):
+            cold_rows = cold_store.top_rows(
+                sort_by, descending, None, start_time=start_time, end_time=end_time,
+                cnnid=cnnid, vendor=vendor, device_type=device_type, severity=severity, query=query
+            )
+            logs = merge_sorted(logs, [LogEntryResponse(**row) for row in cold_rows], sort_by, descending)
         
         # Create CSV content
         output = StringIO()
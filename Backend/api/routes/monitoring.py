@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import Response
+from typing import Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from ..instrumentation import slow_requests
+
+# Mounted without the /api/v1 prefix, where Prometheus expects it
+router = APIRouter()
+# The slow request buffer sits with the rest of the API
+api_router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Request, database, ingest and connection pool metrics of this process in Prometheus text format.
+    """
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+@api_router.get("/monitoring/slow-requests", summary="Recent slow requests with their SQL statements")
+async def get_slow_requests(limit: Optional[int] = Query(None, ge=1)):
+    """
+    Return the most recent requests slower than SLOW_REQUEST_SECONDS handled by this
+    worker, newest first, each with the statements it ran and their timings.
+    """
+    return {"threshold_seconds": slow_requests.threshold_seconds, "requests": slow_requests.entries(limit)}
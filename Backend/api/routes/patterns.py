@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Optional
+from datetime import datetime, timedelta
+from ..database import get_db
+from ..models import LogEntry, LogTemplate, LogTemplateResponse, PatternCount
+from ..cold_storage import cold_store
+
+router = APIRouter()
+
+@router.get("/patterns", response_model=List[PatternCount], summary="Get log counts per message template")
+async def get_pattern_counts(
+    start_time: Optional[datetime] = Query(None, description="Defaults to 24 hours before end_time"),
+    end_time: Optional[datetime] = None,
+    new_since: Optional[datetime] = Query(None, description="Only templates first seen at or after this time"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Count logs per template in a time range, most frequent first. With new_since
+    this answers "which message shapes appeared recently".
+    """
+    end_time = end_time or datetime.utcnow()
+    start_time = start_time or end_time - timedelta(days=1)
+
+    rows = (
+        db.query(LogEntry.template_id, func.sum(LogEntry.repeat_count))
+        .filter(LogEntry.timestamp >= start_time, LogEntry.timestamp <= end_time)
+        .filter(LogEntry.template_id != None)
+        .group_by(LogEntry.template_id)
+        .all()
+    )
+    counts = dict(rows)
+    for template_id, count in cold_store.value_counts("template_id", start_time=start_time, end_time=end_time).items():
+        counts[template_id] = counts.get(template_id, 0) + count
+    if not counts:
+        return []
+
+    templates = db.query(LogTemplate).filter(LogTemplate.id.in_(list(counts)))
+    if new_since:
+        templates = templates.filter(LogTemplate.first_seen >= new_since)
+    patterns = [
+        PatternCount(template_id=template.id, template=template.template, count=counts[template.id], first_seen=template.first_seen)
+        for template in templates.all()
+    ]
+    patterns.sort(key=lambda pattern: pattern.count, reverse=True)
+    return patterns[:limit]
+
+@router.get("/patterns/{template_id}", response_model=LogTemplateResponse, summary="Get a message template")
+async def get_pattern(template_id: int, db: Session = Depends(get_db)):
+    template = db.query(LogTemplate).filter(LogTemplate.id == template_id).first()
+    if template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return template
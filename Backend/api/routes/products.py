@@ -24,7 +24,7 @@ router = APIRouter()
 def get_products(db: Session = Depends(get_db)):
     try:
         products = db.query(Device).all()
-        logger.info(f"Retrieved {len(products)} products")
+        logger.debug("Retrieved %d products", len(products))
         if not products:
             logger.warning("No products found in the database")
         product_list = [DeviceResponse(
@@ -33,7 +33,6 @@ def get_products(db: Session = Depends(get_db)):
             type=product.type,
             vendor_name=product.vendor.name if product.vendor else None
         ) for product in products]
-        logger.info(f"Returning product list: {product_list}")
         return product_list
     except Exception as e:
         logger.error(f"Error retrieving products: {str(e)}")
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from ..models import User
+from ..dependencies import get_current_user
+from ..query_profiler import query_profiler
+
+router = APIRouter()
+
+SORT_FIELDS = ["total_ms", "mean_ms", "p95_ms", "max_ms", "calls", "slow_calls", "rows"]
+
+def _require_admin(current_user: User):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can inspect query profiles")
+
+@router.get("/admin/queries", summary="Top SQL statement fingerprints")
+async def get_query_profiles(
+    sort_by: str = Query("total_ms", description="total_ms, mean_ms, p95_ms, max_ms, calls, slow_calls or rows"),
+    limit: int = Query(20, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List the statement fingerprints seen by this worker, by total time spent in them by default.
+    """
+    _require_admin(current_user)
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort_by: {sort_by}. Must be one of {SORT_FIELDS}.")
+    return {
+        "slow_query_seconds": query_profiler.slow_seconds,
+        "queries": query_profiler.top(sort_by, limit),
+    }
+
+@router.get("/admin/queries/plans", summary="Sampled EXPLAIN ANALYZE plans of slow queries")
+async def get_query_plans(
+    seq_scan_only: bool = Query(False, description="Only plans with a sequential scan"),
+    limit: Optional[int] = Query(50, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    _require_admin(current_user)
+    return query_profiler.plans(seq_scan_only, limit)
+
+@router.get("/admin/queries/{fingerprint}", summary="Stats and sampled plans of one fingerprint")
+async def get_query_profile(fingerprint: str, current_user: User = Depends(get_current_user)):
+    _require_admin(current_user)
+    profile = query_profiler.get(fingerprint)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Query fingerprint not found")
+    return profile
+
+@router.delete("/admin/queries", status_code=204, summary="Reset the query profiles")
+async def reset_query_profiles(current_user: User = Depends(get_current_user)):
+    _require_admin(current_user)
+    query_profiler.reset()
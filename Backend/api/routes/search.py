@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, or_
+from sqlalchemy import desc, asc, or_, func
 from typing import List, Optional
 from ..database import get_db
-from ..models import SearchQuery, PaginatedResponse, LogEntry, Device, Vendor, Customer, LogEntryResponse, User, SeverityEnum
+from ..models import SearchQuery, PaginatedResponse, LogEntry, LogEntryResponse, User, SeverityEnum
 from ..dependencies import get_current_user
+from ..recent_logs import recent_logs
+from ..message_codec import message_contains
+from ..ip_fields import ip_condition
+from ..attributes import attribute_condition, parse_filters
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
 @router.get("/search", response_model=PaginatedResponse)
 async def search_logs(
+    request: Request,
     query: str = Query(default=""),
     fields: Optional[List[str]] = Query(None),
     start_time: Optional[datetime] = Query(None),
@@ -19,6 +24,11 @@ async def search_logs(
     vendor: Optional[str] = Query(None),
     device_type: Optional[str] = Query(None),
     severity: Optional[SeverityEnum] = Query(None),
+    template_id: Optional[int] = Query(None),
+    src_ip: Optional[str] = Query(None, description="Source address or CIDR block, e.g. 10.0.0.0/8"),
+    dst_ip: Optional[str] = Query(None, description="Destination address or CIDR block"),
+    src_port: Optional[int] = Query(None),
+    dst_port: Optional[int] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     sort_by: str = Query("timestamp"),
@@ -26,33 +36,57 @@ async def search_logs(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    ip_conditions = []
+    for name, value in (("src_ip", src_ip), ("dst_ip", dst_ip)):
+        if value:
+            try:
+                ip_conditions.append(ip_condition(getattr(LogEntry, name), value, db.bind.dialect.name))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {name}: {str(e)}")
+    # attr.<key>=<value> parameters filter on vendor-specific fields
     try:
-        # Start with a base query
-        base_query = db.query(LogEntry).join(Device).join(Vendor).join(Customer)
+        attr_filters = parse_filters(request.query_params.multi_items())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # Start with a base query; customer, vendor and device type are columns of the log row
+        base_query = db.query(LogEntry)
 
         # Apply filters
         if query:
             if fields:
                 conditions = []
                 for field in fields:
-                    if hasattr(LogEntry, field):
+                    if field == "message":
+                        conditions.append(message_contains(db, query, start_time, end_time))
+                    elif hasattr(LogEntry, field):
                         conditions.append(getattr(LogEntry, field).ilike(f"%{query}%"))
                 base_query = base_query.filter(or_(*conditions))
             else:
-                base_query = base_query.filter(LogEntry.message.ilike(f"%{query}%"))
+                base_query = base_query.filter(message_contains(db, query, start_time, end_time))
 
         if start_time:
             base_query = base_query.filter(LogEntry.timestamp >= start_time)
         if end_time:
             base_query = base_query.filter(LogEntry.timestamp <= end_time)
         if cnnid:
-            base_query = base_query.filter(Customer.cnnid == cnnid)
+            base_query = base_query.filter(LogEntry.cnnid == cnnid)
         if vendor:
-            base_query = base_query.filter(Vendor.name == vendor)
+            base_query = base_query.filter(func.lower(LogEntry.vendor) == func.lower(vendor))
         if device_type:
-            base_query = base_query.filter(Device.type == device_type)
+            base_query = base_query.filter(func.lower(LogEntry.device_type) == func.lower(device_type))
         if severity:
             base_query = base_query.filter(LogEntry.severity == severity)
+        if template_id is not None:
+            base_query = base_query.filter(LogEntry.template_id == template_id)
+        for condition in ip_conditions:
+            base_query = base_query.filter(condition)
+        for key, value in attr_filters:
+            base_query = base_query.filter(attribute_condition(LogEntry.attributes, key, value, db.bind.dialect.name))
+        if src_port is not None:
+            base_query = base_query.filter(LogEntry.src_port == src_port)
+        if dst_port is not None:
+            base_query = base_query.filter(LogEntry.dst_port == dst_port)
 
         # Count total items
         total_items = base_query.count()
@@ -70,19 +104,7 @@ async def search_logs(
         logs = base_query.offset((page - 1) * page_size).limit(page_size).all()
 
         # Prepare response
-        log_entries = [
-            LogEntryResponse(
-                id=log.id,
-                timestamp=log.timestamp,
-                message=log.message,
-                severity=log.severity,
-                device_name=log.device.name,
-                device_type=log.device.type,
-                vendor_name=log.device.vendor.name,
-                customer_cnnid=log.device.vendor.customer.cnnid
-            )
-            for log in logs
-        ]
+        log_entries = [LogEntryResponse.from_orm(log) for log in logs]
 
         return PaginatedResponse(
             items=log_entries,
@@ -91,6 +113,8 @@ async def search_logs(
             page_size=page_size,
             total_pages=((total_items - 1) // page_size) + 1
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while searching logs: {str(e)}")
 
@@ -103,26 +127,19 @@ async def get_search_fields(current_user: User = Depends(get_current_user)):
         "customer_fields": ["cnnid", "name"]
     }
 
-@router.get("/search/recent")
+@router.get("/search/recent", response_model=List[LogEntryResponse])
 async def get_recent_logs(
     limit: int = Query(10, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
-        recent_logs = db.query(LogEntry).order_by(desc(LogEntry.timestamp)).limit(limit).all()
-        return [
-            LogEntryResponse(
-                id=log.id,
-                timestamp=log.timestamp,
-                message=log.message,
-                device_name=log.device.name,
-                device_type=log.device.type,
-                vendor_name=log.device.vendor.name,
-                customer_cnnid=log.device.vendor.customer.cnnid
-            )
-            for log in recent_logs
-        ]
+        # Served from the recent logs buffer whenever it holds the newest ``limit`` rows
+        recent = recent_logs.page(db, 0, limit)
+        if recent is None:
+            logs = db.query(LogEntry).order_by(desc(LogEntry.timestamp)).limit(limit).all()
+            recent = [LogEntryResponse.from_orm(log) for log in logs]
+        return recent
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while fetching recent logs: {str(e)}")
 
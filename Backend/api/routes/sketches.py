@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timedelta
+from ..database import get_db
+from ..cold_storage import naive_utc
+from ..sketches import sketch_aggregator, DIMENSIONS, METRICS
+
+router = APIRouter()
+
+def _window(start_time: Optional[datetime], end_time: Optional[datetime], default: timedelta):
+    # Buckets are naive UTC; a bound with an offset (e.g. "...Z") is converted first
+    start_time, end_time = naive_utc(start_time), naive_utc(end_time)
+    end_time = end_time or datetime.utcnow()
+    start_time = start_time or end_time - default
+    if start_time > end_time:
+        raise HTTPException(status_code=400, detail="start_time must be before end_time")
+    return start_time, end_time
+
+def _check(name: str, allowed: List[str]):
+    if name not in allowed:
+        raise HTTPException(status_code=400, detail=f"Invalid dimension: {name}. Must be one of {allowed}.")
+
+@router.get("/sketches/top", summary="Estimated top-k noisiest customers or devices")
+async def get_top(
+    dimension: str = Query("device", description="customer or device"),
+    k: int = Query(10, ge=1, le=64),
+    start_time: Optional[datetime] = Query(None, description="Defaults to one hour before end_time"),
+    end_time: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Return the k keys with the highest estimated log counts, merged from the bucket sketches.
+    """
+    _check(dimension, DIMENSIONS)
+    start_time, end_time = _window(start_time, end_time, timedelta(hours=1))
+    sketch = sketch_aggregator.query(db, "topk", dimension, start_time, end_time)
+    return {
+        "dimension": dimension,
+        "start_time": start_time,
+        "end_time": end_time,
+        "top": [{"key": key, "count": count} for key, count in sketch.top(k)],
+    }
+
+@router.get("/sketches/distinct", summary="Estimated number of distinct customers or devices")
+async def get_distinct(
+    dimension: str = Query("device", description="customer or device"),
+    start_time: Optional[datetime] = Query(None, description="Defaults to the start of the current UTC day"),
+    end_time: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    _check(dimension, DIMENSIONS)
+    if start_time is None:
+        start_time = datetime.combine((naive_utc(end_time) or datetime.utcnow()).date(), datetime.min.time())
+    start_time, end_time = _window(start_time, end_time, timedelta(days=1))
+    sketch = sketch_aggregator.query(db, "hll", dimension, start_time, end_time)
+    return {"dimension": dimension, "start_time": start_time, "end_time": end_time, "distinct": sketch.cardinality()}
+
+@router.get("/sketches/quantiles", summary="Estimated quantiles of a per-log metric")
+async def get_quantiles(
+    metric: str = Query("message_length"),
+    q: List[float] = Query([0.5, 0.9, 0.99]),
+    start_time: Optional[datetime] = Query(None, description="Defaults to one hour before end_time"),
+    end_time: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    _check(metric, METRICS)
+    if any(value < 0 or value > 1 for value in q):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    start_time, end_time = _window(start_time, end_time, timedelta(hours=1))
+    sketch = sketch_aggregator.query(db, "tdigest", metric, start_time, end_time)
+    return {
+        "metric": metric,
+        "start_time": start_time,
+        "end_time": end_time,
+        "count": sketch.count,
+        "quantiles": {str(value): sketch.quantile(value) for value in q},
+    }
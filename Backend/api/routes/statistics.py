@@ -1,14 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..models import LogEntry, User, Device, Vendor, Customer
+from sqlalchemy import func, select, tuple_
+from ..models import LogEntry, User
 from ..database import get_db
 from ..dependencies import get_current_user
-from typing import List
+from ..cold_storage import cold_store, naive_utc
+from ..sliced_query import TimeSlice, sliced_executor, sum_counts
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
+# Facet name -> column on the denormalized logs table
+FACET_COLUMNS = {
+    "device_type": LogEntry.device_type,
+    "vendor": LogEntry.vendor,
+    "cnnid": LogEntry.cnnid,
+    "severity": LogEntry.severity,
+    "product": LogEntry.product,
+}
+
+def _truncate(counts: Dict[str, int], top_k: Optional[int]) -> Dict[str, int]:
+    ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return dict(ordered[:top_k] if top_k else ordered)
+
+def _hot_facets(db: Session, facets: List[str], time_slice: TimeSlice, daily_since: Optional[datetime]):
+    """Total, facet counts and daily counts of the hot tier in one slice."""
+    day = func.date(LogEntry.timestamp)
+    columns = [FACET_COLUMNS[name] for name in facets]
+    # Rows carry collapsed repeats, so counts are sums of repeat_count
+    log_count = func.sum(LogEntry.repeat_count)
+    daily_count = log_count.filter(LogEntry.timestamp >= daily_since) if daily_since else log_count
+
+    statement = (
+        select(*columns, day, *[func.grouping(column) for column in columns], func.grouping(day), log_count, daily_count)
+        .group_by(func.grouping_sets(*[tuple_(column) for column in columns], tuple_(day), tuple_()))
+    )
+    statement = time_slice.apply(statement)
+
+    total = 0
+    facet_counts = {name: {} for name in facets}
+    daily = {}
+    width = len(columns)
+    for row in db.execute(statement):
+        values, grouped = row[:width + 1], row[width + 1:2 * width + 2]
+        count, day_count = row[-2], row[-1]
+        if all(grouped):
+            total = count or 0
+        elif not grouped[-1]:
+            if values[-1] is not None and day_count:
+                daily[str(values[-1])] = day_count
+        else:
+            index = grouped.index(0)
+            value = values[index]
+            if value is not None:
+                facet_counts[facets[index]][getattr(value, "value", value)] = count
+    return total, facet_counts, daily
+
+def compute_facets(
+    db: Session,
+    facets: List[str],
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    daily_since: Optional[datetime] = None,
+    top_k: Optional[int] = None,
+) -> dict:
+    """
+    Compute the total, one count per value of every facet and the daily series
+    with a single GROUP BY GROUPING SETS scan over logs, then add the cold tier.
+    Days before ``daily_since`` are left out of the daily series. Wide ranges
+    are scanned as parallel day slices whose counts are added up.
+    """
+    parts = sliced_executor.map(db, lambda slice_db, time_slice: _hot_facets(slice_db, facets, time_slice, daily_since),
+                                start_time, end_time)
+    total = sum(part[0] for part in parts)
+    facet_counts = {name: sum_counts([part[1][name] for part in parts]) for name in facets}
+    daily = sum_counts([part[2] for part in parts])
+
+    if cold_store.has_data(start_time, end_time):
+        total += cold_store.event_count(start_time=start_time, end_time=end_time)
+        for name in facets:
+            for value, count in cold_store.value_counts(name, start_time=start_time, end_time=end_time).items():
+                facet_counts[name][value] = facet_counts[name].get(value, 0) + count
+        cold_start = naive_utc(start_time)
+        if daily_since:
+            cold_start = max(cold_start, daily_since) if cold_start else daily_since
+        for bucket, count in cold_store.bucket_counts("%Y-%m-%d", start_time=cold_start, end_time=end_time).items():
+            daily[bucket] = daily.get(bucket, 0) + count
+
+    return {
+        "total": total,
+        "facets": {name: _truncate(counts, top_k) for name, counts in facet_counts.items()},
+        "daily": dict(sorted(daily.items())),
+    }
+
 @router.get("/statistics")
 async def get_log_statistics(
     start_time: datetime = None,
@@ -16,48 +101,31 @@ async def get_log_statistics(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(LogEntry).join(Device).join(Vendor).join(Customer)
-
-    if start_time:
-        query = query.filter(LogEntry.timestamp >= start_time)
-    if end_time:
-        query = query.filter(LogEntry.timestamp <= end_time)
-
-    total_logs = query.count()
-    
-    device_counts = (
-        query.with_entities(Device.type, func.count(LogEntry.id))
-        .group_by(Device.type)
-        .all()
-    )
-    
-    vendor_counts = (
-        query.with_entities(Vendor.name, func.count(LogEntry.id))
-        .group_by(Vendor.name)
-        .all()
-    )
-    
-    customer_counts = (
-        query.with_entities(Customer.cnnid, func.count(LogEntry.id))
-        .group_by(Customer.cnnid)
-        .all()
-    )
-
-    # Get log counts for the last 7 days
-    today = datetime.utcnow().date()
-    last_week = today - timedelta(days=7)
-    daily_counts = (
-        query.with_entities(func.date(LogEntry.timestamp), func.count(LogEntry.id))
-        .filter(func.date(LogEntry.timestamp) >= last_week)
-        .group_by(func.date(LogEntry.timestamp))
-        .all()
-    )
+    # Daily counts only cover the last 7 days
+    last_week = datetime.combine(datetime.utcnow().date() - timedelta(days=7), datetime.min.time())
+    result = compute_facets(db, ["device_type", "vendor", "cnnid"], start_time, end_time, daily_since=last_week)
 
     return {
-        "total_logs": total_logs,
-        "device_type_distribution": dict(device_counts),
-        "vendor_distribution": dict(vendor_counts),
-        "customer_distribution": dict(customer_counts),
-        "daily_log_counts": dict(daily_counts)
+        "total_logs": result["total"],
+        "device_type_distribution": result["facets"]["device_type"],
+        "vendor_distribution": result["facets"]["vendor"],
+        "customer_distribution": result["facets"]["cnnid"],
+        "daily_log_counts": result["daily"]
     }
 
+@router.get("/statistics/facets")
+async def get_log_facets(
+    facets: List[str] = Query(["device_type", "vendor", "cnnid", "severity"]),
+    start_time: datetime = None,
+    end_time: datetime = None,
+    top_k: Optional[int] = Query(None, ge=1, description="Keep only the k largest values per facet"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Return the total, per-facet counts and daily series for a time range in one round trip.
+    """
+    unknown = [name for name in facets if name not in FACET_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid facets: {unknown}. Must be one of {list(FACET_COLUMNS)}.")
+    return compute_facets(db, list(dict.fromkeys(facets)), start_time, end_time, top_k=top_k)
@@ -0,0 +1,330 @@
+"""
+Mergeable probabilistic sketches maintained at ingest time.
+
+Every ingested log updates, for its time bucket:
+
+* a Count-Min sketch plus heavy-hitter candidates per dimension ("customer",
+  "device") answering "top k noisiest" queries,
+* a HyperLogLog per dimension answering "how many distinct" queries,
+* a t-digest of message lengths answering quantile queries.
+
+Each worker accumulates deltas in memory and periodically merges them into
+the ``log_sketches`` table, one row per (bucket, kind, dimension). A query
+for any time window merges the bucket rows it covers, so the answer costs
+O(sketch size) no matter how many logs the window contains.
+"""
+import hashlib
+import json
+import logging
+import math
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .config import SKETCH_BUCKET_SECONDS, SKETCH_FLUSH_SECONDS
+from .models import LogSketch
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ["customer", "device"]
+METRICS = ["message_length"]
+
+
+def _hash(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return struct.unpack("<QQ", digest)
+
+
+class CountMinTopK:
+    """Count-Min sketch that also tracks the ``capacity`` keys with the highest estimates."""
+
+    kind = "topk"
+
+    def __init__(self, width: int = 2048, depth: int = 4, capacity: int = 64):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = np.zeros((depth, width), dtype=np.uint64)
+        self.candidates: Dict[str, int] = {}
+
+    def _columns(self, key: str) -> List[int]:
+        h1, h2 = _hash(key)
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, key: str) -> int:
+        return int(min(self.table[row, column] for row, column in enumerate(self._columns(key))))
+
+    def add(self, key: str, count: int = 1):
+        columns = self._columns(key)
+        for row, column in enumerate(columns):
+            self.table[row, column] += count
+        self._offer(key, int(min(self.table[row, column] for row, column in enumerate(columns))))
+
+    def _offer(self, key: str, estimate: int):
+        if key in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[key] = estimate
+            return
+        smallest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[smallest]:
+            del self.candidates[smallest]
+            self.candidates[key] = estimate
+
+    def merge(self, other: "CountMinTopK"):
+        self.table += other.table
+        keys = set(self.candidates) | set(other.candidates)
+        estimates = sorted(((self.estimate(key), key) for key in keys), reverse=True)[:self.capacity]
+        self.candidates = {key: estimate for estimate, key in estimates}
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_bytes(self) -> bytes:
+        keys = json.dumps(list(self.candidates)).encode("utf-8")
+        header = struct.pack("<IIII", self.width, self.depth, self.capacity, len(keys))
+        return zlib.compress(header + keys + self.table.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinTopK":
+        data = zlib.decompress(data)
+        width, depth, capacity, key_length = struct.unpack_from("<IIII", data)
+        offset = struct.calcsize("<IIII")
+        sketch = cls(width, depth, capacity)
+        keys = json.loads(data[offset:offset + key_length])
+        sketch.table = np.frombuffer(data[offset + key_length:], dtype=np.uint64).reshape(depth, width).copy()
+        sketch.candidates = {key: sketch.estimate(key) for key in keys}
+        return sketch
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2^precision one-byte registers."""
+
+    kind = "hll"
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, key: str, count: int = 1):
+        h1, _ = _hash(key)
+        index = h1 >> (64 - self.precision)
+        remaining = (h1 << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - self.precision + 1 if remaining == 0 else 65 - remaining.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def cardinality(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(struct.pack("<B", self.precision) + self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        data = zlib.decompress(data)
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(data[1:], dtype=np.uint8).copy()
+        return sketch
+
+
+class TDigest:
+    """Merging t-digest for streaming quantile estimates."""
+
+    kind = "tdigest"
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self._buffer: List[Tuple[float, float]] = []
+
+    @property
+    def count(self) -> float:
+        self._compress()
+        return sum(self.weights)
+
+    def add(self, value: float, weight: float = 1):
+        self._buffer.append((float(value), float(weight)))
+        if len(self._buffer) > 10 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        mean, weight = points[0]
+        so_far = 0.0
+        for next_mean, next_weight in points[1:]:
+            q = (so_far + weight + next_weight / 2) / total
+            if weight + next_weight <= max(1.0, 4 * total * q * (1 - q) / self.compression):
+                mean += (next_mean - mean) * next_weight / (weight + next_weight)
+                weight += next_weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                so_far += weight
+                mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * sum(self.weights)
+        cumulative = 0.0
+        for i, weight in enumerate(self.weights):
+            midpoint = cumulative + weight / 2
+            if target <= midpoint:
+                if i == 0:
+                    return self.means[0]
+                previous_midpoint = cumulative - self.weights[i - 1] / 2
+                fraction = (target - previous_midpoint) / (midpoint - previous_midpoint)
+                return self.means[i - 1] + fraction * (self.means[i] - self.means[i - 1])
+            cumulative += weight
+        return self.means[-1]
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = struct.pack("<dI", self.compression, len(self.means))
+        return zlib.compress(header + np.array(self.means, dtype=np.float64).tobytes() + np.array(self.weights, dtype=np.float64).tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        data = zlib.decompress(data)
+        compression, size = struct.unpack_from("<dI", data)
+        offset = struct.calcsize("<dI")
+        values = np.frombuffer(data[offset:], dtype=np.float64)
+        sketch = cls(compression)
+        sketch.means = values[:size].tolist()
+        sketch.weights = values[size:].tolist()
+        return sketch
+
+
+SKETCH_TYPES = {sketch_type.kind: sketch_type for sketch_type in (CountMinTopK, HyperLogLog, TDigest)}
+
+
+def _new_bucket() -> Dict[Tuple[str, str], object]:
+    bucket = {}
+    for dimension in DIMENSIONS:
+        bucket[(CountMinTopK.kind, dimension)] = CountMinTopK()
+        bucket[(HyperLogLog.kind, dimension)] = HyperLogLog()
+    for metric in METRICS:
+        bucket[(TDigest.kind, metric)] = TDigest()
+    return bucket
+
+
+class SketchAggregator:
+    def __init__(self, bucket_seconds: int, flush_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[datetime, Dict[Tuple[str, str], object]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def bucket_start(self, timestamp: datetime) -> datetime:
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        epoch = (timestamp - datetime(1970, 1, 1)).total_seconds()
+        return datetime(1970, 1, 1) + timedelta(seconds=int(epoch // self.bucket_seconds) * self.bucket_seconds)
+
+    def observe(self, timestamp: datetime, customer: str, device: str, message_length: int):
+        with self._lock:
+            bucket = self._pending.setdefault(self.bucket_start(timestamp), _new_bucket())
+            for dimension, key in (("customer", customer), ("device", device)):
+                bucket[(CountMinTopK.kind, dimension)].add(key)
+                bucket[(HyperLogLog.kind, dimension)].add(key)
+            bucket[(TDigest.kind, "message_length")].add(message_length)
+
+    def flush_if_due(self, db: Session):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush(db)
+
+    def flush(self, db: Session):
+        """Merge the pending deltas into log_sketches in one transaction; keep them on failure."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            for bucket_start, sketches in pending.items():
+                for (kind, dimension), sketch in sketches.items():
+                    row = (
+                        db.query(LogSketch)
+                        .filter(LogSketch.bucket_start == bucket_start, LogSketch.kind == kind, LogSketch.dimension == dimension)
+                        .with_for_update()
+                        .first()
+                    )
+                    if row is None:
+                        db.add(LogSketch(bucket_start=bucket_start, kind=kind, dimension=dimension, data=sketch.to_bytes()))
+                    else:
+                        stored = SKETCH_TYPES[kind].from_bytes(row.data)
+                        stored.merge(sketch)
+                        row.data = stored.to_bytes()
+            db.commit()
+            logger.debug(f"Flushed sketches for {len(pending)} buckets")
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to flush sketches, keeping them for the next flush: {str(e)}")
+            db.rollback()
+            with self._lock:
+                for bucket_start, sketches in pending.items():
+                    current = self._pending.setdefault(bucket_start, _new_bucket())
+                    for key, sketch in sketches.items():
+                        current[key].merge(sketch)
+
+    def query(self, db: Session, kind: str, dimension: str, start_time: datetime, end_time: datetime):
+        """Merge every bucket overlapping [start_time, end_time], including this worker's unflushed deltas."""
+        return self.query_many(db, [(kind, dimension)], start_time, end_time)[(kind, dimension)]
+
+    def query_many(self, db: Session, keys: List[Tuple[str, str]], start_time: datetime, end_time: datetime):
+        """query() for several (kind, dimension) pairs over the same window, in one read of log_sketches."""
+        first_bucket = self.bucket_start(start_time)
+        last_bucket = self.bucket_start(end_time)
+        keys = list(dict.fromkeys(keys))
+        merged = {(kind, dimension): SKETCH_TYPES[kind]() for kind, dimension in keys}
+        conditions = [and_(LogSketch.kind == kind, LogSketch.dimension == dimension) for kind, dimension in keys]
+        rows = (
+            db.query(LogSketch.kind, LogSketch.dimension, LogSketch.data)
+            .filter(or_(*conditions))
+            .filter(LogSketch.bucket_start >= first_bucket, LogSketch.bucket_start <= last_bucket)
+            .all()
+        )
+        for kind, dimension, data in rows:
+            merged[(kind, dimension)].merge(SKETCH_TYPES[kind].from_bytes(data))
+        with self._lock:
+            for bucket_start, sketches in self._pending.items():
+                if first_bucket <= bucket_start <= last_bucket:
+                    for key in keys:
+                        merged[key].merge(sketches[key])
+        return merged
+
+
+sketch_aggregator = SketchAggregator(SKETCH_BUCKET_SECONDS, SKETCH_FLUSH_SECONDS)
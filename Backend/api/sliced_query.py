@@ -0,0 +1,173 @@
+"""
+Wide time-range queries split into day-aligned slices run in parallel.
+
+A 30-day aggregate is one serial Postgres query. SlicedExecutor cuts
+[start, end] at QUERY_SLICE_SECONDS boundaries (whole UTC days by default)
+and runs the same query on each slice in its own session. Per-slice partial
+aggregates are then merged (sums of counts, or dicts of sums). Ordered
+listings take the top rows of every slice and k-way merge them.
+
+Slices of one query run at most QUERY_SLICE_PARALLELISM at a time. All
+queries of a worker share QUERY_SLICE_BUDGET threads, and so at most that
+many pool connections: one wide query cannot take the whole pool, and the
+slices of concurrent queries queue behind each other. Ranges covering fewer
+than QUERY_MIN_SLICES slices run as a single query in the caller's session.
+
+Inner slices are half-open, [slice_start, slice_end). The last slice
+includes ``end``, like the ``timestamp <= end_time`` filters of the routes.
+"""
+import contextvars
+import heapq
+import logging
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .cold_storage import naive_utc, sort_key
+from .config import QUERY_MIN_SLICES, QUERY_SLICE_BUDGET, QUERY_SLICE_PARALLELISM, QUERY_SLICE_SECONDS
+from .database import SessionLocal
+from .models import LogEntry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EPOCH = datetime(1970, 1, 1)
+# Longer ranges use slices of a multiple of QUERY_SLICE_SECONDS
+MAX_SLICES = 64
+
+
+class TimeSlice:
+    """[start, end) or [start, end]; a None bound is open, as in a query without that filter."""
+    __slots__ = ("start", "end", "end_inclusive")
+
+    def __init__(self, start: Optional[datetime], end: Optional[datetime], end_inclusive: bool):
+        self.start = start
+        self.end = end
+        self.end_inclusive = end_inclusive
+
+    def apply(self, query, column=LogEntry.timestamp):
+        """Restrict a Query or select() to this slice."""
+        if self.start is not None:
+            query = query.filter(column >= self.start)
+        if self.end is not None:
+            query = query.filter(column <= self.end if self.end_inclusive else column < self.end)
+        return query
+
+    @property
+    def last_instant(self) -> Optional[datetime]:
+        """The end as an inclusive bound, for filters that only take ``timestamp <= end``."""
+        if self.end is None or self.end_inclusive:
+            return self.end
+        return self.end - timedelta(microseconds=1)
+
+    def __repr__(self):
+        return f"TimeSlice({self.start}, {self.end}{']' if self.end_inclusive else ')'})"
+
+
+def split(start: datetime, end: datetime, slice_seconds: int = QUERY_SLICE_SECONDS) -> List[TimeSlice]:
+    """[start, end] cut at multiples of ``slice_seconds`` since the epoch, oldest first."""
+    start, end = naive_utc(start), naive_utc(end)
+    slices = []
+    boundary = EPOCH + timedelta(seconds=((start - EPOCH).total_seconds() // slice_seconds + 1) * slice_seconds)
+    while boundary <= end:
+        slices.append(TimeSlice(start, boundary, False))
+        start, boundary = boundary, boundary + timedelta(seconds=slice_seconds)
+    slices.append(TimeSlice(start, end, True))
+    return slices
+
+
+def sum_counts(parts: List[Dict[str, int]]) -> Dict[str, int]:
+    merged = Counter()
+    for part in parts:
+        merged.update(part)
+    return dict(merged)
+
+
+class SlicedExecutor:
+    def __init__(self, session_factory: Callable[[], Session], budget: int, parallelism: int,
+                 slice_seconds: int, min_slices: int):
+        self.session_factory = session_factory
+        self.parallelism = max(parallelism, 1)
+        self.slice_seconds = slice_seconds
+        self.min_slices = min_slices
+        self._pool = ThreadPoolExecutor(max_workers=max(budget, 1), thread_name_prefix="query-slice")
+
+    def slices(self, db: Session, start: Optional[datetime], end: Optional[datetime]) -> List[TimeSlice]:
+        """
+        The slices of [start, end]. An open start or end is cut at the oldest
+        hot row or now, but the first or last slice stays open-ended.
+        """
+        first = naive_utc(start) or db.query(func.min(LogEntry.timestamp)).scalar()
+        last = naive_utc(end) or datetime.utcnow()
+        if first is None or first > last:
+            # Nothing to split; one slice with the requested bounds
+            return [TimeSlice(naive_utc(start), naive_utc(end), True)]
+        slice_seconds = self.slice_seconds
+        while (last - first).total_seconds() > slice_seconds * MAX_SLICES:
+            slice_seconds *= 2
+        slices = split(first, last, slice_seconds)
+        if start is None:
+            slices[0].start = None
+        if end is None:
+            slices[-1].end = None
+        return slices
+
+    def _run(self, session_factory: Callable[[], Session], fn: Callable[[Session, TimeSlice], T], time_slice: TimeSlice) -> T:
+        db = session_factory()
+        try:
+            return fn(db, time_slice)
+        finally:
+            db.close()
+
+    def map(self, db: Session, fn: Callable[[Session, TimeSlice], T], start: Optional[datetime],
+            end: Optional[datetime]) -> List[T]:
+        """``fn(session, slice)`` for every slice of [start, end], oldest first."""
+        slices = self.slices(db, start, end)
+        if len(slices) < self.min_slices:
+            return [fn(db, TimeSlice(naive_utc(start), naive_utc(end), True))]
+
+        results: List[Optional[T]] = [None] * len(slices)
+        pending = {}
+        position = 0
+        try:
+            while position < len(slices) or pending:
+                # Keep at most ``parallelism`` slices of this query queued or running
+                while position < len(slices) and len(pending) < self.parallelism:
+                    context = contextvars.copy_context()
+                    future = self._pool.submit(context.run, self._run, self.session_factory, fn, slices[position])
+                    pending[future] = position
+                    position += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+        logger.debug("Ran %d slices of %s - %s", len(slices), start, end)
+        return results
+
+    def aggregate(self, db: Session, fn: Callable[[Session, TimeSlice], T], merge: Callable[[List[T]], T],
+                  start: Optional[datetime], end: Optional[datetime]) -> T:
+        """Merge the partial aggregates of all slices."""
+        return merge(self.map(db, fn, start, end))
+
+    def top_rows(self, db: Session, fn: Callable[[Session, TimeSlice], list], sort_by: str, descending: bool,
+                 limit: int, start: Optional[datetime], end: Optional[datetime]) -> list:
+        """
+        The first ``limit`` rows ordered by ``sort_by`` across all slices; ``fn``
+        returns each slice's first ``limit`` rows in that order.
+        """
+        parts = self.map(db, fn, start, end)
+        if sort_by == "timestamp":
+            # Slices are disjoint in time, so concatenating them in order is already sorted
+            ordered = [row for part in (reversed(parts) if descending else parts) for row in part]
+            return ordered[:limit]
+        return list(heapq.merge(*parts, key=sort_key(sort_by), reverse=descending))[:limit]
+
+
+sliced_executor = SlicedExecutor(SessionLocal, QUERY_SLICE_BUDGET, QUERY_SLICE_PARALLELISM, QUERY_SLICE_SECONDS, QUERY_MIN_SLICES)
@@ -0,0 +1,77 @@
+"""
+Work done when a worker starts serving, not when Backend.main is imported.
+
+Importing the application touches neither the database nor the network, so
+workers boot quickly and the app can be imported (by tests, tooling, or
+uvicorn --reload) with no database around. The startup hook then optionally
+creates the schema, fills the connection pool and preloads in-memory caches
+(log templates, recent logs) from the database. None of this is required to
+serve requests, so failures are logged and the worker starts anyway; the
+pool and caches fill lazily as they did before.
+"""
+import logging
+import time
+
+from .config import CREATE_SCHEMA_ON_STARTUP, DB_WARMUP_CONNECTIONS
+from .database import Base, SessionLocal, engine
+from .recent_logs import recent_logs
+from .template_miner import template_store
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema(bind=engine):
+    """create_all for deployments that do not run migrations."""
+    Base.metadata.create_all(bind=bind)
+
+
+def fill_pool(bind=engine, connections: int = DB_WARMUP_CONNECTIONS) -> int:
+    """Open up to ``connections`` pooled connections and return them to the pool; the number opened."""
+    size = getattr(bind.pool, "size", None)
+    if callable(size):
+        connections = min(connections, size())
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = bind.connect()
+            opened.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+def warm_up(bind=engine, session_factory=SessionLocal, connections: int = DB_WARMUP_CONNECTIONS,
+            create: bool = CREATE_SCHEMA_ON_STARTUP) -> bool:
+    """Schema, pool and caches; True if everything succeeded."""
+    started = time.perf_counter()
+    ok = True
+    if create:
+        try:
+            create_schema(bind)
+        except Exception:
+            logger.exception("Could not create the database schema")
+            ok = False
+    try:
+        opened = fill_pool(bind, connections)
+        logger.info("Opened %d database connections", opened)
+    except Exception as e:
+        logger.warning("Database warmup failed, connections will be opened on demand: %s", e)
+        return False
+    db = session_factory()
+    try:
+        template_store.preload(db)
+        recent_logs.preload(db)
+    except Exception:
+        logger.exception("Could not preload the template cache and recent logs")
+        ok = False
+    finally:
+        db.close()
+    logger.info("Warmup finished in %.3fs", time.perf_counter() - started)
+    return ok
+
+
+def shut_down(bind=engine):
+    """Close pooled connections so the database sees a clean disconnect."""
+    bind.dispose()
@@ -0,0 +1,203 @@
+"""
+Online log template mining (Drain).
+
+Messages are tokenized on whitespace and routed through a fixed-depth parse
+tree keyed by token count and the first few tokens. The leaf holds a small
+list of clusters; the message joins the most similar one, turning every
+position that differs into a ``<*>`` wildcard, or starts a new cluster.
+Tokens containing digits are treated as variables up front, and for
+``key=value`` tokens only the value is masked so FortiGate-style fields keep
+their names in the template.
+
+TemplateStore persists clusters in ``log_templates`` so template IDs are
+stable across restarts and shared between workers.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import TEMPLATE_MINER_DEPTH, TEMPLATE_MINER_MAX_CHILDREN, TEMPLATE_MINER_SIMILARITY
+from .database import get_or_create
+from .models import LogTemplate
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = "<*>"
+
+
+def _mask(token: str) -> str:
+    if not any(char.isdigit() for char in token):
+        return token
+    key, separator, value = token.partition("=")
+    if separator and key and not any(char.isdigit() for char in key):
+        return f"{key}={WILDCARD}"
+    return WILDCARD
+
+
+def _matches(template_token: str, token: str) -> bool:
+    if template_token == token or template_token == WILDCARD:
+        return True
+    return template_token.endswith(WILDCARD) and token.startswith(template_token[:-len(WILDCARD)])
+
+
+def _generalize(template_token: str, token: str) -> str:
+    if _matches(template_token, token):
+        return template_token
+    template_key, template_separator, _ = template_token.partition("=")
+    key, separator, _ = token.partition("=")
+    if separator and template_separator and key == template_key:
+        return f"{key}={WILDCARD}"
+    return WILDCARD
+
+
+class LogCluster:
+    __slots__ = ("id", "tokens")
+
+    def __init__(self, tokens: List[str], cluster_id: Optional[int] = None):
+        self.id = cluster_id
+        self.tokens = tokens
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def parameters(self, tokens: List[str]) -> List[str]:
+        params = []
+        for template_token, token in zip(self.tokens, tokens):
+            if template_token == WILDCARD:
+                params.append(token)
+            elif template_token.endswith(WILDCARD) and template_token != token:
+                params.append(token[len(template_token) - len(WILDCARD):])
+        return params
+
+
+class _Node:
+    __slots__ = ("children", "clusters")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.clusters: List[LogCluster] = []
+
+
+class TemplateMiner:
+    def __init__(self, depth: int = 4, similarity_threshold: float = 0.4, max_children: int = 100):
+        # Drain counts the root and length levels in the depth
+        self.token_levels = max(depth - 2, 1)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.root = _Node()
+
+    def _leaf(self, tokens: List[str], create: bool) -> Optional[_Node]:
+        node = self.root.children.get(str(len(tokens)))
+        if node is None:
+            if not create:
+                return None
+            node = self.root.children[str(len(tokens))] = _Node()
+        for token in tokens[:self.token_levels]:
+            key = _mask(token)
+            child = node.children.get(key) or node.children.get(WILDCARD)
+            if child is None:
+                if not create:
+                    return None
+                if len(node.children) >= self.max_children:
+                    key = WILDCARD
+                child = node.children.setdefault(key, _Node())
+            node = child
+        return node
+
+    def _similarity(self, cluster: LogCluster, tokens: List[str]) -> Tuple[float, int]:
+        same = sum(1 for template_token, token in zip(cluster.tokens, tokens) if _matches(template_token, token))
+        wildcards = sum(1 for template_token in cluster.tokens if template_token.endswith(WILDCARD))
+        return (same / len(tokens) if tokens else 1.0), wildcards
+
+    def match(self, tokens: List[str]) -> Optional[LogCluster]:
+        leaf = self._leaf(tokens, create=False)
+        if leaf is None:
+            return None
+        best, best_score = None, (-1.0, 0)
+        for cluster in leaf.clusters:
+            score = self._similarity(cluster, tokens)
+            if score > best_score:
+                best, best_score = cluster, score
+        if best is not None and best_score[0] >= self.similarity_threshold:
+            return best
+        return None
+
+    def add(self, message: str) -> Tuple[LogCluster, bool, bool]:
+        """Assign ``message`` to a cluster; return (cluster, is_new, template_changed)."""
+        tokens = message.split()
+        cluster = self.match(tokens)
+        if cluster is None:
+            cluster = LogCluster([_mask(token) for token in tokens])
+            self._leaf(tokens, create=True).clusters.append(cluster)
+            return cluster, True, False
+
+        merged = [_generalize(template_token, token) for template_token, token in zip(cluster.tokens, tokens)]
+        changed = merged != cluster.tokens
+        cluster.tokens = merged
+        return cluster, False, changed
+
+    def load(self, cluster_id: int, template: str):
+        tokens = template.split()
+        cluster = LogCluster(tokens, cluster_id)
+        self._leaf(tokens, create=True).clusters.append(cluster)
+
+
+class TemplateStore:
+    """TemplateMiner backed by the log_templates table."""
+
+    def __init__(self, miner: TemplateMiner):
+        self.miner = miner
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self, db: Session):
+        templates = db.query(LogTemplate.id, LogTemplate.template).order_by(LogTemplate.id).all()
+        for template_id, template in templates:
+            self.miner.load(template_id, template)
+        self._loaded = True
+        logger.info(f"Loaded {len(templates)} log templates")
+
+    def preload(self, db: Session):
+        """Load the stored templates now rather than on the first ingested message."""
+        with self._lock:
+            if not self._loaded:
+                self._load(db)
+
+    def match(self, db: Session, message: str) -> Tuple[int, List[str]]:
+        """
+        Return the template ID and extracted parameters for ``message``.
+
+        New templates are committed in a short session of their own so their ID
+        can be referenced by the log row without committing the caller's
+        transaction, like create_log does for customers and devices; template
+        text that got generalized is updated in the caller's transaction.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load(db)
+            cluster, is_new, changed = self.miner.add(message)
+            if is_new:
+                existing, created = get_or_create(db, LogTemplate, {"count": 0, "first_seen": datetime.utcnow()},
+                                                  template=cluster.template)
+                if created:
+                    logger.info(f"New log template {existing.id}: {cluster.template}")
+                cluster.id = existing.id
+            elif changed:
+                db.query(LogTemplate).filter(LogTemplate.id == cluster.id).update({"template": cluster.template})
+            return cluster.id, cluster.parameters(message.split())
+
+    def record_counts(self, db: Session, counts: Dict[int, int], last_seen: Dict[int, datetime]):
+        """Add per-template counts for a committed batch of logs."""
+        for template_id, count in counts.items():
+            db.query(LogTemplate).filter(LogTemplate.id == template_id).update({
+                "count": LogTemplate.count + count,
+                "last_seen": last_seen[template_id],
+            }, synchronize_session=False)
+        db.commit()
+
+
+template_store = TemplateStore(TemplateMiner(TEMPLATE_MINER_DEPTH, TEMPLATE_MINER_SIMILARITY, TEMPLATE_MINER_MAX_CHILDREN))
@@ -0,0 +1,310 @@
+"""
+Chunk-level bloom filters of message tokens, for needle-in-haystack search.
+
+/logs?query= is a substring match and reads every message in range. A
+search for one IP, MAC or request ID only needs the few blocks of rows that
+contain it. Log IDs are cut into chunks of TOKEN_INDEX_CHUNK_ROWS. Once a
+chunk is complete (sealed) a bloom filter of all its message tokens is stored
+in ``log_token_blooms``. /logs?token= reads only the chunks whose filter may
+contain every token of the searched value, plus the newest, unsealed rows.
+The cold tier keeps the same kind of filter per Parquet file in its manifest.
+
+Tokens are the maximal runs of ``[0-9A-Za-z_.-]``, lowercased, with leading
+and trailing dots and dashes stripped:
+``src=10.1.2.3:514 user=J.Doe.`` has the tokens ``src``, ``10.1.2.3``, ``514``,
+``user`` and ``j.doe``. A token search matches messages that contain the
+value with a token boundary on both sides, case-insensitively. Such a message
+contains every token of the value, so a chunk whose filter lacks one of them
+is skipped without false negatives.
+
+A chunk is sealed when a row after it is TOKEN_INDEX_SEAL_DELAY_SECONDS old,
+so transactions that still hold IDs of the chunk have committed. Ingest
+seals chunks on a background thread, at most every TOKEN_INDEX_SEAL_SECONDS;
+index_logs.py seals everything at once, e.g. after enabling the index.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import (TOKEN_INDEX_CACHE_MB, TOKEN_INDEX_CHUNK_ROWS, TOKEN_INDEX_FALSE_POSITIVE_RATE,
+                     TOKEN_INDEX_SEAL_DELAY_SECONDS, TOKEN_INDEX_SEAL_SECONDS)
+from .database import SessionLocal
+from .message_codec import compressed_matches, message_codec
+from .models import LogEntry, LogTokenBloom
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CHARACTERS = "0-9A-Za-z_.-"
+TOKEN_PATTERN = re.compile(f"[{TOKEN_CHARACTERS}]+")
+MAX_HASHES = 16
+# Chunks sealed by one background run
+MAX_CHUNKS_PER_SEAL = 4
+READ_BATCH_ROWS = 10000
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    if not text:
+        return set()
+    tokens = {run.strip(".-").lower() for run in TOKEN_PATTERN.findall(text)}
+    tokens.discard("")
+    return tokens
+
+
+def token_pattern(value: str) -> str:
+    """
+    Case-insensitive regular expression for ``value`` with a token boundary on
+    both sides; the same in Postgres, SQLite (Python re) and Arrow (RE2).
+    """
+    boundary = f"[^{TOKEN_CHARACTERS}]"
+    return f"(?i)(^|{boundary})[.-]*{re.escape(value)}[.-]*($|{boundary})"
+
+
+def _hashes(tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    digests = [hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest() for token in tokens]
+    values = np.frombuffer(b"".join(digests), dtype="<u8")
+    # Double hashing: position i is h1 + i * h2, with h2 odd
+    return values & 0xFFFFFFFF, (values >> np.uint64(32)) | np.uint64(1)
+
+
+class BloomFilter:
+    def __init__(self, bits: np.ndarray, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+
+    @property
+    def size(self) -> int:
+        return len(self.bits) * 8
+
+    @classmethod
+    def build(cls, tokens: Set[str], false_positive_rate: float) -> "BloomFilter":
+        count = max(len(tokens), 1)
+        size = max(64, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+        size = (size + 7) // 8 * 8
+        hashes = min(MAX_HASHES, max(1, round(size / count * math.log(2))))
+        bloom = cls(np.zeros(size // 8, dtype=np.uint8), hashes)
+        if tokens:
+            positions = bloom._positions(tokens).ravel()
+            np.bitwise_or.at(bloom.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+        return bloom
+
+    @classmethod
+    def from_bytes(cls, data: bytes, hashes: int) -> "BloomFilter":
+        return cls(np.frombuffer(data, dtype=np.uint8), hashes)
+
+    def to_bytes(self) -> bytes:
+        return self.bits.tobytes()
+
+    def _positions(self, tokens: Iterable[str]) -> np.ndarray:
+        h1, h2 = _hashes(tokens)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        return ((h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.size)).astype(np.int64)
+
+    def contains_all(self, tokens: Set[str]) -> bool:
+        """False only if some token was certainly not added."""
+        if not tokens:
+            return True
+        positions = self._positions(tokens).ravel()
+        return bool(np.all(self.bits[positions >> 3] & (1 << (positions & 7))))
+
+
+class TokenIndex:
+    def __init__(self, chunk_rows: int, false_positive_rate: float, seal_seconds: float, seal_delay_seconds: int,
+                 cache_bytes: int, session_factory: Callable[[], Session]):
+        self.chunk_rows = chunk_rows
+        self.false_positive_rate = false_positive_rate
+        self.seal_seconds = seal_seconds
+        self.seal_delay_seconds = seal_delay_seconds
+        self.cache_bytes = cache_bytes
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._seal_lock = threading.Lock()
+        self._blooms: "OrderedDict[int, BloomFilter]" = OrderedDict()
+        self._cached_bytes = 0
+        self._last_seal = 0.0
+        self._sealer: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.chunk_rows > 0
+
+    def chunk_range(self, chunk: int) -> Tuple[int, int]:
+        return chunk * self.chunk_rows, (chunk + 1) * self.chunk_rows
+
+    # Sealing
+
+    def _next_chunk(self, db: Session) -> Optional[int]:
+        """The oldest chunk with rows that has no filter yet, if it is complete."""
+        frontier = db.query(func.max(LogTokenBloom.chunk)).scalar()
+        first_id = (frontier + 1) * self.chunk_rows if frontier is not None else 0
+        next_id = db.query(func.min(LogEntry.id)).filter(LogEntry.id >= first_id).scalar()
+        if next_id is None:
+            return None
+        chunk = next_id // self.chunk_rows
+        cutoff = datetime.utcnow() - timedelta(seconds=self.seal_delay_seconds)
+        later = (
+            db.query(LogEntry.id)
+            .filter(LogEntry.id >= self.chunk_range(chunk)[1], LogEntry.created_at <= cutoff)
+            .first()
+        )
+        return chunk if later is not None else None
+
+    def seal_chunk(self, db: Session, chunk: int) -> bool:
+        """Build and store the filter of ``chunk``; False if another worker stored it first or it has no rows."""
+        start, end = self.chunk_range(chunk)
+        table = LogEntry.__table__
+        connection = db.connection()
+        result = connection.execution_options(stream_results=True).execute(
+            select(table.c.timestamp, table.c.message, table.c.message_compressed, table.c.dictionary_id)
+            .where(table.c.id >= start, table.c.id < end)
+        )
+        tokens: Set[str] = set()
+        rows, min_timestamp, max_timestamp = 0, None, None
+        for batch in result.partitions(READ_BATCH_ROWS):
+            for timestamp, message, compressed, dictionary_id in batch:
+                if message is None and compressed is not None:
+                    message = message_codec.decompress(connection, dictionary_id, compressed)
+                tokens.update(tokenize(message))
+                rows += 1
+                min_timestamp = timestamp if min_timestamp is None else min(min_timestamp, timestamp)
+                max_timestamp = timestamp if max_timestamp is None else max(max_timestamp, timestamp)
+        if not rows:
+            return False
+        bloom = BloomFilter.build(tokens, self.false_positive_rate)
+        try:
+            db.add(LogTokenBloom(
+                chunk=chunk, rows=rows, min_timestamp=min_timestamp, max_timestamp=max_timestamp,
+                bits=bloom.to_bytes(), hashes=bloom.hashes,
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        logger.info("Sealed log chunk %d: %d rows, %d tokens, %d byte filter", chunk, rows, len(tokens), len(bloom.bits))
+        return True
+
+    def seal(self, db: Session, max_chunks: Optional[int] = None) -> int:
+        """Seal complete chunks, oldest first; returns how many."""
+        if not self.enabled:
+            return 0
+        sealed = 0
+        while max_chunks is None or sealed < max_chunks:
+            chunk = self._next_chunk(db)
+            if chunk is None:
+                break
+            if not self.seal_chunk(db, chunk):
+                # Sealed by another worker, or its rows are gone; the next run goes on
+                break
+            sealed += 1
+        # Filters of chunks moved entirely to the cold tier
+        oldest = db.query(func.min(LogEntry.id)).scalar()
+        if oldest is not None:
+            db.query(LogTokenBloom).filter(LogTokenBloom.chunk < oldest // self.chunk_rows).delete(synchronize_session=False)
+            db.commit()
+        return sealed
+
+    def _seal_in_background(self):
+        if not self._seal_lock.acquire(blocking=False):
+            return
+        db = self.session_factory()
+        try:
+            self.seal(db, MAX_CHUNKS_PER_SEAL)
+        except Exception as e:
+            logger.error(f"Failed to seal log chunks: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+            self._seal_lock.release()
+
+    def seal_if_due(self):
+        """Seal complete chunks on a background thread; called after ingest commits."""
+        if not self.enabled or time.monotonic() - self._last_seal < self.seal_seconds:
+            return
+        self._last_seal = time.monotonic()
+        if self._sealer is None:
+            self._sealer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-index")
+        self._sealer.submit(self._seal_in_background)
+
+    # Searching
+
+    def _cache(self, chunk: int, bloom: BloomFilter):
+        with self._lock:
+            if chunk in self._blooms:
+                return
+            self._blooms[chunk] = bloom
+            self._cached_bytes += len(bloom.bits)
+            while self._cached_bytes > self.cache_bytes and len(self._blooms) > 1:
+                _, evicted = self._blooms.popitem(last=False)
+                self._cached_bytes -= len(evicted.bits)
+
+    def candidate_chunks(self, db: Session, tokens: Set[str], start_time: Optional[datetime] = None,
+                         end_time: Optional[datetime] = None) -> Tuple[List[int], int]:
+        """
+        Sealed chunks in the time range that may contain every token, and the
+        first ID after the sealed chunks.
+        """
+        query = db.query(LogTokenBloom.chunk)
+        if start_time is not None:
+            query = query.filter(LogTokenBloom.max_timestamp >= start_time)
+        if end_time is not None:
+            query = query.filter(LogTokenBloom.min_timestamp <= end_time)
+        chunks = sorted(chunk for (chunk,) in query.all())
+        frontier = db.query(func.max(LogTokenBloom.chunk)).scalar()
+        unsealed = self.chunk_range(frontier)[1] if frontier is not None else 0
+
+        with self._lock:
+            blooms = {chunk: self._blooms[chunk] for chunk in chunks if chunk in self._blooms}
+            for chunk in blooms:
+                self._blooms.move_to_end(chunk)
+        missing = [chunk for chunk in chunks if chunk not in blooms]
+        if missing:
+            rows = db.query(LogTokenBloom.chunk, LogTokenBloom.bits, LogTokenBloom.hashes).filter(LogTokenBloom.chunk.in_(missing))
+            for chunk, bits, hashes in rows:
+                blooms[chunk] = BloomFilter.from_bytes(bits, hashes)
+                self._cache(chunk, blooms[chunk])
+        candidates = [chunk for chunk in chunks if chunk in blooms and blooms[chunk].contains_all(tokens)]
+        logger.debug("Token search reads %d of %d sealed chunks in range", len(candidates), len(chunks))
+        return candidates, unsealed
+
+    def condition(self, db: Session, value: str, start_time: Optional[datetime] = None,
+                  end_time: Optional[datetime] = None):
+        """Filter for logs whose message contains ``value`` as a token, restricted to the chunks that can hold it."""
+        pattern = token_pattern(value)
+        matches = LogEntry.message.regexp_match(pattern)
+        tokens = tokenize(value)
+        scope = []
+        if self.enabled and tokens:
+            chunks, unsealed = self.candidate_chunks(db, tokens, start_time, end_time)
+            ranges: List[List[int]] = []
+            for chunk in chunks:
+                start, end = self.chunk_range(chunk)
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1][1] = end
+                else:
+                    ranges.append([start, end])
+            in_chunks = [and_(LogEntry.id >= start, LogEntry.id < end) for start, end in ranges]
+            scope.append(or_(LogEntry.id >= unsealed, *in_chunks))
+            matches = and_(scope[0], matches)
+        # Compressed messages of the same rows are decoded and matched here
+        if start_time is not None:
+            scope.append(LogEntry.timestamp >= start_time)
+        if end_time is not None:
+            scope.append(LogEntry.timestamp <= end_time)
+        regex = re.compile(pattern)
+        compressed = compressed_matches(db, lambda message: regex.search(message) is not None, *scope)
+        return or_(matches, LogEntry.id.in_(compressed)) if compressed else matches
+
+
+token_index = TokenIndex(TOKEN_INDEX_CHUNK_ROWS, TOKEN_INDEX_FALSE_POSITIVE_RATE, TOKEN_INDEX_SEAL_SECONDS,
+                         TOKEN_INDEX_SEAL_DELAY_SECONDS, TOKEN_INDEX_CACHE_MB * 1024 * 1024, SessionLocal)
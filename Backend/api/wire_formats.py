@@ -0,0 +1,329 @@
+"""
+Streaming decoders for the log ingest wire formats.
+
+create_log negotiates the body format from the request headers:
+
+* ``Content-Encoding``: identity, gzip/x-gzip, deflate, zstd or snappy
+  (framed, or a single raw block), possibly several comma-separated codings
+  applied in order.
+* ``Content-Type``: newline-delimited JSON (the default, any JSON content
+  type; a line may also hold a JSON array of records) or msgpack. A msgpack
+  body is a stream of objects, each a record, an array of records, a Fluent
+  Bit chunk entry (``[time, record]`` or ``[[time, metadata], record]``) or a
+  Fluent forward protocol message (Message, Forward or PackedForward mode,
+  optionally gzip-compressed).
+
+Bodies are decoded chunk by chunk as they arrive, so neither the compressed
+nor the decompressed body is ever held in memory as a whole.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import msgpack
+import zstandard as zstd
+
+NDJSON_TYPES = {"", "application/json", "application/x-ndjson", "application/ndjson", "application/jsonlines",
+                "application/x-jsonlines", "text/plain"}
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack", "application/x-fluent-forward"}
+
+SNAPPY_STREAM_IDENTIFIER = b"\xff\x06\x00\x00sNaPpY"
+
+# Upper bound for a single msgpack object or NDJSON line
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+
+
+class WireFormatError(ValueError):
+    """The body could not be decoded; the client sent malformed data."""
+
+
+class UnsupportedFormatError(WireFormatError):
+    """The Content-Type or Content-Encoding is not one we accept."""
+
+
+class _Identity:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Frames:
+    """
+    Streaming zlib/gzip or zstd decompression. A body may hold several
+    gzip members or zstd frames back to back; a fresh decompressor is started
+    after each one.
+    """
+
+    def __init__(self, factory: Callable[[], object], errors: tuple):
+        self._factory = factory
+        self._errors = errors
+        self._decompressor = factory()
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        output = b""
+        try:
+            while data:
+                self._started = True
+                output += self._decompressor.decompress(data)
+                if not self._decompressor.eof:
+                    break
+                data = self._decompressor.unused_data
+                self._decompressor = self._factory()
+                self._started = False
+        except self._errors as e:
+            raise WireFormatError(f"Invalid compressed body: {str(e)}")
+        return output
+
+    def flush(self) -> bytes:
+        remaining = self._decompressor.flush()
+        if self._started and not self._decompressor.eof:
+            raise WireFormatError("Truncated compressed body")
+        return remaining
+
+
+def _zlib(wbits: int) -> _Frames:
+    return _Frames(lambda: zlib.decompressobj(wbits), (zlib.error,))
+
+
+def _zstd() -> _Frames:
+    return _Frames(lambda: zstd.ZstdDecompressor().decompressobj(), (zstd.ZstdError,))
+
+
+class _Snappy:
+    """Snappy framing format streams incrementally; a raw block is buffered and decoded at the end."""
+
+    def __init__(self):
+        try:
+            import snappy
+        except ImportError:
+            raise UnsupportedFormatError("snappy Content-Encoding requires python-snappy")
+        self._snappy = snappy
+        self._stream = None
+        self._buffer = b""
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._stream is None:
+            self._buffer += data
+            if len(self._buffer) < len(SNAPPY_STREAM_IDENTIFIER):
+                return b""
+            if not self._buffer.startswith(SNAPPY_STREAM_IDENTIFIER):
+                return b""
+            self._stream = self._snappy.StreamDecompressor()
+            data, self._buffer = self._buffer, b""
+        try:
+            return self._stream.decompress(data)
+        except Exception as e:
+            raise WireFormatError(f"Invalid snappy body: {str(e)}")
+
+    def flush(self) -> bytes:
+        if self._stream is not None:
+            try:
+                return self._stream.flush()
+            except Exception as e:
+                raise WireFormatError(f"Invalid snappy body: {str(e)}")
+        if not self._buffer:
+            return b""
+        try:
+            return self._snappy.uncompress(self._buffer)
+        except Exception as e:
+            raise WireFormatError(f"Invalid snappy body: {str(e)}")
+
+
+DECOMPRESSORS: Dict[str, Callable[[], object]] = {
+    "identity": _Identity,
+    "gzip": lambda: _zlib(16 + zlib.MAX_WBITS),
+    "x-gzip": lambda: _zlib(16 + zlib.MAX_WBITS),
+    "deflate": lambda: _zlib(zlib.MAX_WBITS),
+    "zstd": _zstd,
+    "snappy": _Snappy,
+    "x-snappy-framed": _Snappy,
+}
+
+
+class _Chain:
+    """Codings listed in Content-Encoding were applied in order, so undo them in reverse."""
+
+    def __init__(self, stages: List[object]):
+        self._stages = stages
+
+    def decompress(self, data: bytes) -> bytes:
+        for stage in self._stages:
+            data = stage.decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = b""
+        for stage in self._stages:
+            data = stage.decompress(data) + stage.flush()
+        return data
+
+
+def decompressor(content_encoding: Optional[str]):
+    codings = [coding.strip().lower() for coding in (content_encoding or "").split(",") if coding.strip()]
+    unknown = [coding for coding in codings if coding not in DECOMPRESSORS]
+    if unknown:
+        raise UnsupportedFormatError(f"Unsupported Content-Encoding: {', '.join(unknown)}")
+    return _Chain([DECOMPRESSORS[coding]() for coding in reversed(codings)] or [_Identity()])
+
+
+def _event_time(value) -> Optional[str]:
+    if isinstance(value, msgpack.ExtType) and value.code == 0 and len(value.data) == 8:
+        seconds, nanoseconds = int.from_bytes(value.data[:4], "big"), int.from_bytes(value.data[4:], "big")
+        value = seconds + nanoseconds / 1e9
+    elif isinstance(value, msgpack.Timestamp):
+        value = value.to_unix()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+    return None
+
+
+def _with_time(record: dict, time) -> dict:
+    if "timestamp" not in record:
+        timestamp = _event_time(time)
+        if timestamp is not None:
+            record = dict(record, timestamp=timestamp)
+    return record
+
+
+def _text_keys(record: dict) -> dict:
+    # Fluent Bit may send keys and values as msgpack bin
+    return {
+        (key.decode("utf-8", "replace") if isinstance(key, bytes) else key):
+        (value.decode("utf-8", "replace") if isinstance(value, bytes) else value)
+        for key, value in record.items()
+    }
+
+
+def _forward_entries(packed: bytes, option) -> List[dict]:
+    if isinstance(option, dict) and option.get("compressed") == "gzip":
+        # CompressedPackedForward: one or more concatenated gzip members
+        gzip = _zlib(16 + zlib.MAX_WBITS)
+        packed = gzip.decompress(packed) + gzip.flush()
+    records = []
+    unpacker = msgpack.Unpacker(raw=False, max_buffer_size=max(len(packed), 1), strict_map_key=False)
+    unpacker.feed(packed)
+    for entry in unpacker:
+        records.extend(_records(entry))
+    return records
+
+
+def _records(item) -> List[dict]:
+    """Turn one decoded msgpack/JSON value into the records it carries."""
+    if isinstance(item, dict):
+        return [_text_keys(item)]
+    if isinstance(item, list) and item:
+        first = item[0]
+        if isinstance(first, str) and len(item) >= 2:
+            # Fluent forward protocol, [tag, ...] in one of its modes
+            entries = item[1]
+            option = item[2] if len(item) > 2 else None
+            if isinstance(entries, (bytes, bytearray)):
+                # PackedForward / CompressedPackedForward: [tag, msgpack stream, option]
+                return _forward_entries(bytes(entries), option)
+            if isinstance(entries, list):
+                # Forward: [tag, [[time, record], ...], option]
+                records = []
+                for entry in entries:
+                    records.extend(_records(entry))
+                return records
+            if isinstance(option, dict):
+                # Message: [tag, time, record, option]
+                return [_with_time(_text_keys(option), entries)]
+            raise WireFormatError("Malformed forward protocol message")
+        elif len(item) == 2 and isinstance(item[1], dict) and not isinstance(first, dict):
+            # Fluent Bit chunk entry: [time, record] or [[time, metadata], record]
+            time = first[0] if isinstance(first, list) and first else first
+            return [_with_time(_text_keys(item[1]), time)]
+        records = []
+        for entry in item:
+            if not isinstance(entry, dict):
+                raise WireFormatError(f"Unsupported record of type {type(entry).__name__} in array")
+            records.append(_text_keys(entry))
+        return records
+    raise WireFormatError(f"Unsupported record of type {type(item).__name__}")
+
+
+class _NdjsonDecoder:
+    def __init__(self):
+        self._buffer = b""
+
+    def _decode(self, line: bytes) -> List[dict]:
+        line = line.strip()
+        if not line:
+            return []
+        try:
+            return _records(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise WireFormatError(f"Invalid JSON format: {str(e)}")
+
+    def feed(self, data: bytes) -> List[dict]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        if len(self._buffer) > MAX_RECORD_BYTES:
+            raise WireFormatError(f"Line longer than {MAX_RECORD_BYTES} bytes")
+        records = []
+        for line in lines:
+            records.extend(self._decode(line))
+        return records
+
+    def close(self) -> List[dict]:
+        line, self._buffer = self._buffer, b""
+        return self._decode(line)
+
+
+class _MsgpackDecoder:
+    def __init__(self):
+        self._unpacker = msgpack.Unpacker(raw=False, max_buffer_size=MAX_RECORD_BYTES, strict_map_key=False)
+        self._fed = 0
+
+    def feed(self, data: bytes) -> List[dict]:
+        records = []
+        try:
+            self._unpacker.feed(data)
+            self._fed += len(data)
+            for item in self._unpacker:
+                records.extend(_records(item))
+        except WireFormatError:
+            raise
+        except (msgpack.UnpackException, ValueError) as e:
+            raise WireFormatError(f"Invalid msgpack body: {str(e)}")
+        return records
+
+    def close(self) -> List[dict]:
+        # The unpacker keeps an incomplete trailing object buffered
+        if self._unpacker.tell() != self._fed:
+            raise WireFormatError("Truncated msgpack body")
+        return []
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def is_ndjson(content_type: Optional[str]) -> bool:
+    media_type = _media_type(content_type)
+    return media_type in NDJSON_TYPES or media_type.endswith("+json")
+
+
+def record_decoder(content_type: Optional[str]):
+    if _media_type(content_type) in MSGPACK_TYPES:
+        return _MsgpackDecoder()
+    if is_ndjson(content_type):
+        return _NdjsonDecoder()
+    raise UnsupportedFormatError(f"Unsupported Content-Type: {_media_type(content_type)}")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], content_type: Optional[str],
+                       content_encoding: Optional[str]) -> AsyncIterator[dict]:
+    """Yield the records of the body as soon as each one has been received and decoded."""
+    stages = decompressor(content_encoding)
+    decoder = record_decoder(content_type)
+    async for chunk in chunks:
+        for record in decoder.feed(stages.decompress(chunk)):
+            yield record
+    for record in decoder.feed(stages.flush()) + decoder.close():
+        yield record
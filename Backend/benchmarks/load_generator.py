@@ -0,0 +1,467 @@
+"""
+Ingest load generator and benchmark.
+
+Replays a scenario from ingest_scenarios.json against the HTTP ingest
+endpoint or a TCP syslog/Fluent Bit input and reports the sustained send
+rate, acknowledgement latency and the rate at which rows show up in the
+``logs`` table:
+
+    python -m Backend.benchmarks.load_generator run --scenario steady --url http://localhost:8000
+    python -m Backend.benchmarks.load_generator run --scenario tcp_rsyslog --database-url postgresql://...
+    python -m Backend.benchmarks.load_generator compare --scenario steady
+
+Events are generated from a seeded RNG, so a scenario produces the same
+stream on every run. Customers, vendors and devices are drawn with a
+Zipf-like skew (``skew``; 0 is uniform) from pools of the configured
+cardinality, messages from templates, and ``repeat_fraction`` of them
+repeat a recent event verbatim. ``rate`` is the target in events/s (0 sends
+as fast as the server acknowledges) and ``burst`` multiplies it for
+``duration_seconds`` out of every ``every_seconds``.
+
+Ack latency is measured from the time a batch was scheduled to be sent, not
+from when a connection became free, so a server that falls behind shows up
+in the latency instead of silently lowering the send rate. Over TCP there is
+no acknowledgement; the time to hand a batch to the socket is reported
+instead, and the DB row rate is the end-to-end measure.
+
+Results are saved under benchmarks/results/ with the commit they ran on.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from Backend.benchmarks.results import (
+    DEFAULT_TOLERANCE, compare, latency_summary, load_results, print_comparison, save_result,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCHMARK = "ingest"
+SCENARIOS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_scenarios.json")
+INGEST_PATH = "/api/v1/logs"
+
+DEFAULTS = {
+    "description": "",
+    "transport": "http",
+    "host": "localhost",
+    "port": 5014,
+    "duration_seconds": 60,
+    "rate": 1000,
+    "batch_size": 100,
+    "concurrency": 4,
+    "content_encoding": None,
+    "cnnids": 10,
+    "vendors": 5,
+    "devices": 100,
+    "skew": 1.1,
+    "repeat_fraction": 0.0,
+    "burst": None,
+    "templates": None,
+    "seed": 42,
+}
+
+VENDORS = ["Cisco", "Juniper", "Palo Alto", "Fortinet", "Check Point", "F5", "Broadcom"]
+DEVICE_TYPES = ["firewall", "router", "switch", "endpoint", "load_balancer"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+SEVERITY_WEIGHTS = [70, 20, 8, 2]
+TEMPLATES = [
+    "Connection from {ip} port {port} accepted",
+    "Connection from {ip} port {port} denied by policy {n}",
+    "User {user} logged in from {ip}",
+    "Failed password for {user} from {ip} port {port} ssh2",
+    "Interface GigabitEthernet0/{n} changed state to down",
+    "Interface GigabitEthernet0/{n} changed state to up",
+    "CPU utilization {n}% exceeds threshold",
+    "Session {session} closed after {n} seconds, {port} bytes sent",
+    "Configuration changed by {user} from {ip}",
+    "Certificate for {ip} expires in {n} days",
+]
+USERS = ["admin", "operator", "backup", "root", "svc_monitor", "jdoe", "asmith"]
+
+# Recent events kept around to be repeated verbatim
+REPEAT_POOL_SIZE = 64
+DB_POLL_SECONDS = 1.0
+
+
+class Scenario:
+    def __init__(self, name: str, **settings):
+        unknown = [key for key in settings if key not in DEFAULTS]
+        if unknown:
+            raise ValueError(f"Unknown scenario settings {unknown}. Must be in {list(DEFAULTS)}.")
+        values = dict(DEFAULTS, **settings)
+        if values["transport"] not in ("http", "tcp"):
+            raise ValueError(f"Invalid transport {values['transport']!r}. Must be http or tcp.")
+        self.name = name
+        for key, value in values.items():
+            setattr(self, key, value)
+        self.templates = values["templates"] or TEMPLATES
+
+    def to_dict(self) -> dict:
+        return dict({key: getattr(self, key) for key in DEFAULTS}, name=self.name)
+
+    def rate_at(self, elapsed: float) -> float:
+        """Target events/s ``elapsed`` seconds into the run; 0 means unthrottled."""
+        if self.rate and self.burst and elapsed % self.burst["every_seconds"] < self.burst["duration_seconds"]:
+            return self.rate * self.burst["multiplier"]
+        return self.rate
+
+
+def load_scenarios(path: str = SCENARIOS_FILE) -> dict:
+    with open(path) as f:
+        scenarios = json.load(f)["scenarios"]
+    return {scenario["name"]: Scenario(**scenario) for scenario in scenarios}
+
+
+def _cumulative_weights(size: int, skew: float) -> List[float]:
+    total, weights = 0.0, []
+    for rank in range(size):
+        total += 1.0 / (rank + 1) ** skew
+        weights.append(total)
+    return weights
+
+
+class EventGenerator:
+    """Deterministic stream of log records for a scenario."""
+
+    def __init__(self, scenario: Scenario):
+        self.scenario = scenario
+        self.rng = random.Random(scenario.seed)
+        self.cnnids = [f"CNN{index:04d}" for index in range(scenario.cnnids)]
+        self.vendors = [VENDORS[index] if index < len(VENDORS) else f"Vendor {index}" for index in range(scenario.vendors)]
+        # Each device belongs to one customer and vendor, as on a real network
+        self.devices = [
+            {
+                "product": f"dev-{index:06d}",
+                "device_type": self.rng.choice(DEVICE_TYPES),
+                "cnnid": self.cnnids[index % len(self.cnnids)],
+                "vendor": self.vendors[index % len(self.vendors)],
+            }
+            for index in range(scenario.devices)
+        ]
+        self.rng.shuffle(self.devices)
+        self._device_weights = _cumulative_weights(len(self.devices), scenario.skew)
+        self._template_weights = _cumulative_weights(len(scenario.templates), scenario.skew)
+        self._recent: List[dict] = []
+
+    def _message(self) -> str:
+        rng = self.rng
+        template = rng.choices(self.scenario.templates, cum_weights=self._template_weights)[0]
+        return template.format(
+            ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            port=rng.randrange(1024, 65536),
+            user=rng.choice(USERS),
+            n=rng.randrange(100),
+            session=rng.randrange(1 << 32),
+        )
+
+    def event(self, now: datetime) -> dict:
+        timestamp = now.isoformat()
+        if self._recent and self.rng.random() < self.scenario.repeat_fraction:
+            return dict(self.rng.choice(self._recent), timestamp=timestamp)
+        device = self.rng.choices(self.devices, cum_weights=self._device_weights)[0]
+        record = dict(
+            device,
+            timestamp=timestamp,
+            message=self._message(),
+            severity=self.rng.choices(SEVERITIES, weights=SEVERITY_WEIGHTS)[0],
+        )
+        if len(self._recent) < REPEAT_POOL_SIZE:
+            self._recent.append(record)
+        else:
+            self._recent[self.rng.randrange(REPEAT_POOL_SIZE)] = record
+        return record
+
+    def batch(self, size: int) -> List[dict]:
+        now = datetime.now(timezone.utc)
+        return [self.event(now) for _ in range(size)]
+
+
+class Stats:
+    def __init__(self):
+        self.events_sent = 0
+        self.batches_sent = 0
+        self.errors = 0
+        self.status_codes = {}
+        self.latencies: List[float] = []
+        self.service_times: List[float] = []
+
+    def record(self, events: int, scheduled: float, sent: float, done: float, status: Optional[int] = None):
+        self.batches_sent += 1
+        self.events_sent += events
+        self.latencies.append(done - scheduled)
+        self.service_times.append(done - sent)
+        if status is not None:
+            self.status_codes[str(status)] = self.status_codes.get(str(status), 0) + 1
+
+
+async def _produce(scenario: Scenario, generator: EventGenerator, queue: asyncio.Queue, batch_size: int, workers: int):
+    """Put (scheduled time, records) on the queue at the scenario's rate."""
+    start = time.perf_counter()
+    next_send = start
+    while True:
+        now = time.perf_counter()
+        elapsed = now - start
+        if elapsed >= scenario.duration_seconds:
+            break
+        rate = scenario.rate_at(elapsed)
+        if rate:
+            if next_send > now:
+                await asyncio.sleep(next_send - now)
+            scheduled = next_send
+            next_send += batch_size / rate
+        else:
+            scheduled = now
+        # Blocks when the workers fall behind an unthrottled run
+        await queue.put((scheduled, generator.batch(batch_size)))
+    for _ in range(workers):
+        await queue.put(None)
+
+
+def _http_body(records: List[dict], content_encoding: Optional[str]) -> bytes:
+    body = "\n".join(json.dumps(record) for record in records).encode("utf-8") + b"\n"
+    return gzip.compress(body) if content_encoding == "gzip" else body
+
+
+async def _http_worker(client: httpx.AsyncClient, url: str, scenario: Scenario, queue: asyncio.Queue, stats: Stats):
+    headers = {"Content-Type": "application/x-ndjson"}
+    if scenario.content_encoding:
+        headers["Content-Encoding"] = scenario.content_encoding
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        scheduled, records = item
+        body = _http_body(records, scenario.content_encoding)
+        sent = time.perf_counter()
+        try:
+            response = await client.post(url, content=body, headers=dict(headers, **{"Idempotency-Key": str(uuid.uuid4())}))
+            stats.record(len(records), scheduled, sent, time.perf_counter(), response.status_code)
+            if response.status_code != 200:
+                stats.errors += 1
+        except httpx.HTTPError as e:
+            stats.errors += 1
+            logger.warning(f"Ingest request failed: {str(e)}")
+
+
+async def _tcp_worker(scenario: Scenario, queue: asyncio.Queue, stats: Stats):
+    # One persistent connection per worker, like a syslog forwarder
+    reader, writer = await asyncio.open_connection(scenario.host, scenario.port)
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            scheduled, records = item
+            sent = time.perf_counter()
+            writer.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+            await writer.drain()
+            stats.record(len(records), scheduled, sent, time.perf_counter())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+class RowCounter:
+    """Follows the rows (and events, counting repeats) inserted into logs since the run started."""
+
+    def __init__(self, database_url: str):
+        self.engine = create_engine(database_url)
+        with self.engine.connect() as connection:
+            self.start_id = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM logs")).scalar()
+        self.samples = []
+
+    def sample(self) -> tuple:
+        with self.engine.connect() as connection:
+            rows, events = connection.execute(
+                text("SELECT COUNT(*), COALESCE(SUM(repeat_count), 0) FROM logs WHERE id > :start_id"),
+                {"start_id": self.start_id},
+            ).one()
+        self.samples.append((time.perf_counter(), int(rows), int(events)))
+        return self.samples[-1]
+
+    async def follow(self, stop: asyncio.Event):
+        while not stop.is_set():
+            await asyncio.get_event_loop().run_in_executor(None, self.sample)
+            try:
+                await asyncio.wait_for(stop.wait(), DB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self, settle_seconds: float, timeout_seconds: float):
+        """Keep sampling until the row count has not changed for ``settle_seconds``."""
+        deadline = time.perf_counter() + timeout_seconds
+        last_change, last_rows = time.perf_counter(), None
+        while time.perf_counter() < deadline:
+            _, rows, _ = await asyncio.get_event_loop().run_in_executor(None, self.sample)
+            if rows != last_rows:
+                last_change, last_rows = time.perf_counter(), rows
+            elif time.perf_counter() - last_change >= settle_seconds:
+                return
+            await asyncio.sleep(DB_POLL_SECONDS)
+
+    def summary(self, start: float) -> dict:
+        if not self.samples:
+            return {}
+        _, rows, events = self.samples[-1]
+        # The rate runs until the first sample that saw the final count
+        finished = next(at for at, seen, _ in self.samples if seen == rows)
+        elapsed = max(finished - start, 1e-9) if rows else None
+        peak = 0.0
+        for (before_at, before_rows, _), (after_at, after_rows, _) in zip(self.samples, self.samples[1:]):
+            peak = max(peak, (after_rows - before_rows) / max(after_at - before_at, 1e-9))
+        return {
+            "rows": rows,
+            "events": events,
+            "rows_per_second": rows / elapsed if elapsed else 0.0,
+            "events_per_second": events / elapsed if elapsed else 0.0,
+            "peak_rows_per_second": peak,
+        }
+
+
+async def run_scenario(scenario: Scenario, url: str, database_url: Optional[str], settle_seconds: float) -> dict:
+    generator = EventGenerator(scenario)
+    stats = Stats()
+    counter = RowCounter(database_url) if database_url else None
+    batch_size = scenario.batch_size
+    queue = asyncio.Queue(maxsize=2 * scenario.concurrency)
+    stop = asyncio.Event()
+
+    start = time.perf_counter()
+    follower = asyncio.ensure_future(counter.follow(stop)) if counter else None
+    if scenario.transport == "http":
+        limits = httpx.Limits(max_connections=scenario.concurrency, max_keepalive_connections=scenario.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(60.0)) as client:
+            workers = [_http_worker(client, url.rstrip("/") + INGEST_PATH, scenario, queue, stats)
+                       for _ in range(scenario.concurrency)]
+            await asyncio.gather(_produce(scenario, generator, queue, batch_size, scenario.concurrency), *workers)
+    else:
+        workers = [_tcp_worker(scenario, queue, stats) for _ in range(scenario.concurrency)]
+        await asyncio.gather(_produce(scenario, generator, queue, batch_size, scenario.concurrency), *workers)
+    send_seconds = time.perf_counter() - start
+
+    stop.set()
+    if follower:
+        await follower
+        await counter.drain(settle_seconds, timeout_seconds=max(settle_seconds * 10, 60))
+
+    metrics = {
+        "duration_seconds": send_seconds,
+        "events_sent": stats.events_sent,
+        "batches_sent": stats.batches_sent,
+        "errors": stats.errors,
+        "status_codes": stats.status_codes,
+        "events_per_second": stats.events_sent / send_seconds,
+        "target_events_per_second": scenario.rate or None,
+        ("ack_latency" if scenario.transport == "http" else "send_latency"): latency_summary(stats.latencies),
+        "service_time": latency_summary(stats.service_times),
+    }
+    if counter:
+        metrics["db"] = counter.summary(start)
+    return metrics
+
+
+def print_metrics(scenario: Scenario, metrics: dict):
+    latency = metrics.get("ack_latency") or metrics.get("send_latency")
+    print(f"{scenario.name} ({scenario.transport}): {metrics['events_sent']} events in {metrics['duration_seconds']:.1f}s, "
+          f"{metrics['events_per_second']:.0f} events/s sent (target {metrics['target_events_per_second'] or 'max'}), "
+          f"{metrics['errors']} errors")
+    print(f"  {'ack' if 'ack_latency' in metrics else 'send'} latency p50 {latency['p50_ms']} ms, "
+          f"p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    if "db" in metrics and metrics["db"]:
+        db = metrics["db"]
+        print(f"  DB: {db['rows']} rows / {db['events']} events, {db['rows_per_second']:.0f} rows/s, "
+              f"{db['events_per_second']:.0f} events/s, peak {db['peak_rows_per_second']:.0f} rows/s")
+
+
+HIGHER_IS_BETTER = ["events_per_second", "rows_per_second"]
+LOWER_IS_BETTER = ["p50_ms", "p99_ms", "errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest load generator and benchmark")
+    parser.add_argument("--scenarios", default=SCENARIOS_FILE, help="Scenario definitions (JSON)")
+    parser.add_argument("--results-dir", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run scenarios and save the results")
+    run.add_argument("--scenario", action="append", help="Scenario to run (repeatable); default all")
+    run.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    run.add_argument("--database-url", default=os.getenv("DATABASE_URL"),
+                     help="Postgres to count inserted rows in; without it only the send side is measured")
+    run.add_argument("--duration", type=float, help="Override duration_seconds")
+    run.add_argument("--rate", type=float, help="Override rate (events/s, 0 for unthrottled)")
+    run.add_argument("--settle-seconds", type=float, default=5.0,
+                     help="Wait until no new rows arrived for this long before stopping the DB count")
+    run.add_argument("--no-save", action="store_true")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare the last two runs (or a baseline commit) of a scenario")
+    compare_parser.add_argument("--scenario", action="append")
+    compare_parser.add_argument("--baseline", help="Commit of the baseline run; default the previous run")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    subparsers.add_parser("list", help="List the scenarios")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.scenarios)
+    names = getattr(args, "scenario", None) or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"Unknown scenarios {unknown}. Available: {list(scenarios)}")
+    results_kwargs = {"results_dir": args.results_dir} if args.results_dir else {}
+
+    if args.command == "list":
+        for scenario in scenarios.values():
+            print(f"{scenario.name:<20} {scenario.transport:<5} {scenario.description}")
+        return
+
+    if args.command == "compare":
+        regressions = 0
+        for name in names:
+            results = load_results(BENCHMARK, name, **results_kwargs)
+            if len(results) < 2:
+                print(f"{name}: need at least two saved runs, found {len(results)}")
+                continue
+            current = results[-1]
+            if args.baseline:
+                baseline = next((result for result in reversed(results[:-1]) if result.get("commit") == args.baseline), None)
+                if baseline is None:
+                    print(f"{name}: no run on commit {args.baseline}")
+                    continue
+            else:
+                baseline = results[-2]
+            rows = compare(baseline, current, HIGHER_IS_BETTER, LOWER_IS_BETTER, args.tolerance)
+            print_comparison(baseline, current, rows)
+            regressions += sum(row["regression"] for row in rows)
+        raise SystemExit(1 if regressions else 0)
+
+    for name in names:
+        scenario = scenarios[name]
+        if args.duration is not None:
+            scenario.duration_seconds = args.duration
+        if args.rate is not None:
+            scenario.rate = args.rate
+        logger.info(f"Running {name}: {scenario.description}")
+        metrics = asyncio.get_event_loop().run_until_complete(
+            run_scenario(scenario, args.url, args.database_url, args.settle_seconds)
+        )
+        print_metrics(scenario, metrics)
+        if not args.no_save:
+            path = save_result(BENCHMARK, scenario.to_dict(), metrics, **results_kwargs)
+            logger.info(f"Saved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
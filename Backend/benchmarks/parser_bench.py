@@ -0,0 +1,195 @@
+"""
+Throughput benchmark of the vendor parsers in api/parsers/.
+
+Generates messages in every vendor's format from a seeded RNG and times
+each parser on its own (``parse``) and through the registry as create_log
+calls it (``enrich``: dispatch by vendor or prefix plus parse). The
+``unmatched`` set is generic messages of no known vendor, i.e. the cost
+the registry adds to every other log:
+
+    python -m Backend.benchmarks.parser_bench run
+    python -m Backend.benchmarks.parser_bench run --parser fortigate --messages 200000
+    python -m Backend.benchmarks.parser_bench compare
+
+A new parser needs a sample generator in SAMPLES. Results are saved under
+benchmarks/results/ with the commit they ran on, so a parser that slows
+down the hot path shows up as a regression in ``compare``.
+"""
+import argparse
+import logging
+import random
+import time
+from typing import Callable, Dict, List
+
+from Backend.api.parsers import vendor_parsers
+from Backend.benchmarks.results import DEFAULT_TOLERANCE, compare, load_results, print_comparison, save_result
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCHMARK = "parsers"
+UNMATCHED = "unmatched"
+
+
+def _ip(rng: random.Random, private: bool) -> str:
+    if private:
+        return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    return f"{rng.choice([8, 52, 104, 151, 185, 203])}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def fortigate(rng: random.Random) -> str:
+    action = rng.choice(["accept", "close", "deny", "timeout"])
+    return (
+        f'date=2026-05-01 time=12:{rng.randrange(60):02d}:{rng.randrange(60):02d} devname="fw-{rng.randrange(40):02d}" '
+        f'devid="FGT60E{rng.randrange(10 ** 10):010d}" eventtime={rng.randrange(10 ** 18)} tz="+0200" logid="0000000013" '
+        f'type="traffic" subtype="forward" level="{rng.choice(["notice", "warning", "information"])}" vd="root" '
+        f'srcip={_ip(rng, True)} srcport={rng.randrange(1024, 65536)} srcintf="port1" srcintfrole="lan" '
+        f'dstip={_ip(rng, False)} dstport={rng.choice([53, 80, 443, 8443])} dstintf="wan1" dstintfrole="wan" '
+        f'sessionid={rng.randrange(10 ** 8)} proto=6 action="{action}" policyid={rng.randrange(1, 200)} '
+        f'policytype="policy" service="HTTPS" trandisp="snat" duration={rng.randrange(3600)} '
+        f'sentbyte={rng.randrange(10 ** 6)} rcvdbyte={rng.randrange(10 ** 7)} appcat="unscanned"'
+    )
+
+
+def cisco_asa(rng: random.Random) -> str:
+    src, dst = _ip(rng, False), _ip(rng, True)
+    sport, dport = rng.randrange(1024, 65536), rng.choice([22, 443, 3389])
+    if rng.random() < 0.5:
+        return (f"%ASA-6-302013: Built inbound TCP connection {rng.randrange(10 ** 9)} for outside:{src}/{sport} "
+                f"({src}/{sport}) to inside:{dst}/{dport} ({dst}/{dport})")
+    return (f"%ASA-4-106023: Deny tcp src outside:{src}/{sport} dst inside:{dst}/{dport} "
+            f'by access-group "outside_in" [0x0, 0x0]')
+
+
+def palo_alto(rng: random.Random) -> str:
+    log_type = rng.choice(["TRAFFIC", "TRAFFIC", "THREAT"])
+    columns = ["1", "2026/05/01 12:00:00", "012801000001", log_type, "end" if log_type == "TRAFFIC" else "vulnerability",
+               "2561", "2026/05/01 12:00:00", _ip(rng, True), _ip(rng, False), "0.0.0.0", "0.0.0.0", "allow-web",
+               "", "", rng.choice(["ssl", "web-browsing", "dns"]), "vsys1", "trust", "untrust", "ethernet1/2",
+               "ethernet1/1", "Log Forwarding", "", str(rng.randrange(10 ** 6)), "1", str(rng.randrange(1024, 65536)),
+               str(rng.choice([53, 80, 443])), "0", "0", "0x400000", "tcp", rng.choice(["allow", "deny"])]
+    if log_type == "THREAT":
+        columns += ['"example.com/index.html"', "Generic Exploit(30000)", "any", rng.choice(["low", "high", "critical"])]
+    else:
+        columns += [str(rng.randrange(10 ** 6)), str(rng.randrange(10 ** 5)), str(rng.randrange(10 ** 5))]
+    return ",".join(columns)
+
+
+def f5(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"err tmm{rng.randrange(4)}[{rng.randrange(10 ** 5)}]: 01010028:3: No members available for pool /Common/pool_{rng.randrange(50)}"
+    return (f"notice mcpd[{rng.randrange(10 ** 5)}]: 01070638:5: Pool /Common/pool_{rng.randrange(50)} member "
+            f"/Common/{_ip(rng, True)}:{rng.choice([80, 443])} monitor status down.")
+
+
+def check_point(rng: random.Random) -> str:
+    return (f'[action:"{rng.choice(["Accept", "Drop"])}"; flags:"411908"; ifdir:"inbound"; ifname:"eth1"; '
+            f'loguid:"{{0x{rng.randrange(16 ** 8):08x},0x0,0x0,0x0}}"; origin:"{_ip(rng, True)}"; '
+            f'time:"{1777636800 + rng.randrange(86400)}"; version:"5"; dst:"{_ip(rng, True)}"; proto:"6"; '
+            f'product:"VPN-1 & FireWall-1"; rule_name:"Cleanup rule"; s_port:"{rng.randrange(1024, 65536)}"; '
+            f'service:"{rng.choice([22, 443])}"; src:"{_ip(rng, False)}"]')
+
+
+def unmatched(rng: random.Random) -> str:
+    return rng.choice([
+        f"Interface Gi0/{rng.randrange(48)} changed state to {rng.choice(['up', 'down'])}",
+        f"Accepted publickey for admin from {_ip(rng, True)} port {rng.randrange(1024, 65536)} ssh2",
+        f"Connection from {_ip(rng, False)} refused",
+    ])
+
+
+SAMPLES: Dict[str, Callable[[random.Random], str]] = {
+    "fortigate": fortigate, "cisco_asa": cisco_asa, "palo_alto": palo_alto, "f5": f5, "check_point": check_point,
+    UNMATCHED: unmatched,
+}
+
+
+def samples(name: str, count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [SAMPLES[name](rng) for _ in range(count)]
+
+
+def _rate(count: int, seconds: float) -> dict:
+    return {
+        "messages_per_second": round(count / seconds, 1) if seconds else None,
+        "us_per_message": round(seconds / count * 1e6, 3) if count else None,
+    }
+
+
+def bench(name: str, count: int, repeat: int) -> dict:
+    """Best of ``repeat`` timings of parse and enrich over ``count`` messages."""
+    messages = samples(name, count)
+    parser = vendor_parsers.get(name)
+    parse_seconds, enrich_seconds, matched = [], [], 0
+    for _ in range(repeat):
+        if parser is not None:
+            parse = parser.parse
+            started = time.perf_counter()
+            for message in messages:
+                parse(message)
+            parse_seconds.append(time.perf_counter() - started)
+        records = [{"message": message} for message in messages]
+        enrich = vendor_parsers.enrich
+        started = time.perf_counter()
+        for record in records:
+            enrich(record)
+        enrich_seconds.append(time.perf_counter() - started)
+        matched = sum(1 for record in records if "vendor" in record)
+    result = {"messages": count, "matched": matched, "enrich": _rate(count, min(enrich_seconds))}
+    if parse_seconds:
+        result["parse"] = _rate(count, min(parse_seconds))
+    return result
+
+
+HIGHER_IS_BETTER = ["messages_per_second"]
+LOWER_IS_BETTER = ["us_per_message"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendor parser throughput benchmark")
+    parser.add_argument("--results-dir", default=None)
+    parser.add_argument("--name", default="default", help="Name the results are filed under")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Time the parsers and save the results")
+    run.add_argument("--parser", action="append", choices=list(SAMPLES), help="Parser to time (repeatable); default all")
+    run.add_argument("--messages", type=int, default=50000)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--no-save", action="store_true")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare the last two runs (or a baseline commit)")
+    compare_parser.add_argument("--baseline", help="Commit of the baseline run; default the previous run")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    results_kwargs = {"results_dir": args.results_dir} if args.results_dir else {}
+
+    if args.command == "compare":
+        results = load_results(BENCHMARK, args.name, **results_kwargs)
+        if len(results) < 2:
+            raise SystemExit(f"Need at least two saved runs of {args.name}, found {len(results)}")
+        current = results[-1]
+        baseline = results[-2]
+        if args.baseline:
+            baseline = next((result for result in reversed(results[:-1]) if result.get("commit") == args.baseline), None)
+            if baseline is None:
+                raise SystemExit(f"No run of {args.name} on commit {args.baseline}")
+        rows = compare(baseline, current, HIGHER_IS_BETTER, LOWER_IS_BETTER, args.tolerance)
+        print_comparison(baseline, current, rows)
+        raise SystemExit(1 if any(row["regression"] for row in rows) else 0)
+
+    names = args.parser or list(SAMPLES)
+    results = {}
+    for name in names:
+        results[name] = bench(name, args.messages, args.repeat)
+        rates = ", ".join(f"{stage} {results[name][stage]['messages_per_second']:,.0f}/s"
+                          for stage in ("parse", "enrich") if stage in results[name])
+        logger.info(f"{name:<12} {rates} ({results[name]['matched']} of {args.messages} matched)")
+    if not args.no_save:
+        scenario = {"name": args.name, "messages": args.messages, "repeat": args.repeat, "parsers": names}
+        path = save_result(BENCHMARK, scenario, results, **results_kwargs)
+        logger.info(f"Saved results to {path}")
+
+
+if __name__ == "__main__":
+    main()
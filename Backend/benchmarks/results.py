@@ -0,0 +1,126 @@
+"""
+Saving and comparing benchmark results.
+
+Every run is written as one JSON file under benchmarks/results/ (or
+--results-dir) named after the benchmark, scenario, commit and time, and
+holds the scenario definition next to the metrics, so a run can be
+repeated and compared with the same scenario on another commit:
+
+    python -m Backend.benchmarks.load_generator compare --scenario steady
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# A metric is a regression when it is this much worse than the baseline
+DEFAULT_TOLERANCE = 0.10
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, ``q`` in [0, 100]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(math.ceil(q / 100 * len(ordered))), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(seconds: Sequence[float]) -> dict:
+    """p50/p90/p99/max of the given latencies, in milliseconds."""
+    summary = {"count": len(seconds)}
+    for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99), ("max_ms", 100)):
+        value = percentile(seconds, q)
+        summary[name] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def save_result(benchmark: str, scenario: dict, metrics: dict, results_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    started = datetime.utcnow()
+    commit = git_commit()
+    result = {
+        "benchmark": benchmark,
+        "scenario": scenario,
+        "commit": commit,
+        "recorded_at": started.isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "metrics": metrics,
+    }
+    name = f"{benchmark}-{scenario['name']}-{commit or 'nocommit'}-{started.strftime('%Y%m%dT%H%M%S')}.json"
+    path = os.path.join(results_dir, name)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    return path
+
+
+def load_results(benchmark: str, scenario: str, results_dir: str = RESULTS_DIR) -> List[dict]:
+    """All saved runs of a scenario, oldest first."""
+    if not os.path.isdir(results_dir):
+        return []
+    results = []
+    for name in os.listdir(results_dir):
+        if not (name.startswith(f"{benchmark}-{scenario}-") and name.endswith(".json")):
+            continue
+        with open(os.path.join(results_dir, name)) as f:
+            result = json.load(f)
+        if result.get("scenario", {}).get("name") == scenario:
+            results.append(result)
+    return sorted(results, key=lambda result: result["recorded_at"])
+
+
+def _flatten(metrics: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, higher_is_better: Sequence[str], lower_is_better: Sequence[str],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[dict]:
+    """
+    Compare the metrics of two runs. ``higher_is_better`` and
+    ``lower_is_better`` are suffixes of the flattened metric names
+    (e.g. ``events_per_second`` or ``p99_ms``); other metrics are ignored.
+    """
+    before, after = _flatten(baseline["metrics"]), _flatten(current["metrics"])
+    rows = []
+    for name in sorted(set(before) & set(after)):
+        if any(name.endswith(suffix) for suffix in higher_is_better):
+            direction = 1
+        elif any(name.endswith(suffix) for suffix in lower_is_better):
+            direction = -1
+        else:
+            continue
+        old, new = before[name], after[name]
+        change = (new - old) / old if old else 0.0
+        rows.append({
+            "metric": name, "baseline": old, "current": new, "change": change,
+            "regression": change * direction < -tolerance,
+        })
+    return rows
+
+
+def print_comparison(baseline: dict, current: dict, rows: List[dict]):
+    print(f"{current['scenario']['name']}: {baseline.get('commit')} ({baseline['recorded_at']}) -> "
+          f"{current.get('commit')} ({current['recorded_at']})")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"  {row['metric']:<48} {row['baseline']:>12.3f} -> {row['current']:>12.3f} ({row['change']:+.1%}){flag}")
@@ -0,0 +1,36 @@
+"""
+Build the token filters of every complete chunk of log IDs that has none yet,
+e.g. after enabling the token index on an existing database. Ingest seals new
+chunks by itself; this can also be run periodically, e.g. from cron:
+
+    python /app/Backend/index_logs.py
+
+With --promote-attributes it also builds the expression indexes of the
+attribute keys in ATTRIBUTES_INDEXED_KEYS (see api/attributes.py).
+"""
+import argparse
+import logging
+from Backend.api.attributes import create_promoted_indexes
+from Backend.api.database import SessionLocal, engine
+from Backend.api.token_index import token_index
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def index_logs(max_chunks: int):
+    db = SessionLocal()
+    try:
+        sealed = token_index.seal(db, max_chunks or None)
+        logger.info(f"Sealed {sealed} chunks of {token_index.chunk_rows} log IDs")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build token bloom filters for sealed chunks of logs")
+    parser.add_argument("--max-chunks", type=int, default=0, help="Stop after this many chunks (0: no limit)")
+    parser.add_argument("--promote-attributes", action="store_true", help="Also index the ATTRIBUTES_INDEXED_KEYS attributes")
+    args = parser.parse_args()
+    if args.promote_attributes:
+        logger.info(f"Attribute indexes: {create_promoted_indexes(engine)}")
+    index_logs(args.max_chunks)
@@ -1,53 +1,32 @@
-import logging.config
 import logging
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from Backend.api.routes import logs, customers, products, users, groups
-from Backend.api.database import SessionLocal, engine, Base
+from Backend.api.routes import logs, customers, products, users, groups, statistics, sketches, patterns, search, ingest_limits, monitoring, query_profiles, dashboards
+from Backend.api.instrumentation import InstrumentationMiddleware
+from Backend.api.logging_config import configure_logging
+from Backend.api.database import SessionLocal
+from Backend.api.startup import shut_down, warm_up
 from sqlalchemy.orm import Session
 import random
 from datetime import datetime
 
-# Configure logging
-logging.config.dictConfig({
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s'
-        },
-        'simple': {
-            'format': '%(levelname)s %(message)s'
-        },
-    },
-    'handlers': {
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose'
-        },
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': 'debug.log',
-            'formatter': 'verbose'
-        },
-    },
-    'loggers': {
-        '': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-        },
-    }
-})
+# Queued, structured logging configured from LOG_* settings
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI()
 
+# Nothing above touches the database: schema (only with CREATE_SCHEMA_ON_STARTUP),
+# connection pool and caches are set up when the worker starts serving
+@app.on_event("startup")
+def startup():
+    warm_up()
+
+@app.on_event("shutdown")
+def shutdown():
+    shut_down()
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -65,12 +44,24 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Request latency, SQL and response size metrics, served on /metrics
+app.add_middleware(InstrumentationMiddleware)
+
 # Include the routers
 app.include_router(logs.router, prefix="/api/v1", dependencies=[Depends(get_db)])
 app.include_router(customers.router, prefix="/api/v1", dependencies=[Depends(get_db)])
 app.include_router(products.router, prefix="/api/v1", dependencies=[Depends(get_db)])
 app.include_router(users.router, prefix="/api/v1", dependencies=[Depends(get_db)])
 app.include_router(groups.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(statistics.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(sketches.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(patterns.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(search.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(ingest_limits.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(monitoring.api_router, prefix="/api/v1")
+app.include_router(query_profiles.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(dashboards.router, prefix="/api/v1", dependencies=[Depends(get_db)])
+app.include_router(monitoring.router)
 
 @app.get("/")
 async def root():
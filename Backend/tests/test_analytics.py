@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api import analytics
+from Backend.api.cold_storage import ColdStore
+from Backend.api.models import Base, LogEntry
+
+HOUR = "%Y-%m-%d %H:00:00"
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    now = datetime.utcnow().replace(microsecond=0)
+    session.add_all([
+        LogEntry(
+            timestamp=now - timedelta(minutes=37 * i),
+            message=f"Connection from 10.0.0.{i % 7}",
+            severity=["low", "medium", "high", "critical"][i % 4],
+            device_id=1,
+            vendor=["Cisco", "F5", "Fortinet", None][i % 4],
+            device_type=["Firewall", "Router", "Switch"][i % 3],
+            cnnid=f"CNN00{i % 5}",
+            repeat_count=1 + i % 3,
+        )
+        for i in range(600)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def group_by(db, *columns, **filters):
+    query = db.query(*columns, func.sum(LogEntry.repeat_count)).filter(*analytics._conditions(db, **filters))
+    query = query.filter(*[column.isnot(None) for column in columns])
+    return {
+        tuple(getattr(value, "value", value) for value in row[:-1]) if len(columns) > 1 else getattr(row[0], "value", row[0]): row[-1]
+        for row in query.group_by(*columns).all()
+    }
+
+def expected(db, **filters):
+    hour = func.strftime(HOUR, LogEntry.timestamp)
+    total = db.query(func.sum(LogEntry.repeat_count)).filter(*analytics._conditions(db, **filters)).scalar() or 0
+    series_by = {}
+    for (label, vendor), count in group_by(db, hour, LogEntry.vendor, **filters).items():
+        series_by.setdefault(vendor, {})[label] = count
+    return {
+        "total": total,
+        "facets": {name: group_by(db, getattr(LogEntry, name), **filters) for name in analytics.DIMENSIONS},
+        "time_series": group_by(db, hour, **filters),
+        "series_by": series_by,
+    }
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"vendor": "cisco"},
+    {"query": "10.0.0.3", "severity": "HIGH"},
+    {"start_time": datetime.utcnow() - timedelta(days=9), "end_time": datetime.utcnow() - timedelta(days=2)},
+])
+def test_compute_matches_group_by_across_tiers(db_session, tmp_path, monkeypatch, filters):
+    want = expected(db_session, **filters)
+    store = ColdStore(str(tmp_path))
+    assert store.run_tiering(db_session, 7) > 0
+    monkeypatch.setattr(analytics, "cold_store", store)
+
+    columns = analytics.load_columns(db_session, **filters)
+    result = analytics.compute(columns, interval="hour", series_by="vendor")
+    assert result["total"] == want["total"]
+    assert result["facets"] == want["facets"]
+    assert result["time_series"] == want["time_series"]
+    assert {vendor: {label: count for label, count in series.items() if count}
+            for vendor, series in result["series_by"].items()} == want["series_by"]
+
+def test_top_n_keeps_the_largest_values(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "cold_store", ColdStore(str(tmp_path)))
+    columns = analytics.load_columns(db_session, dimensions=["cnnid"])
+    counts = group_by(db_session, LogEntry.cnnid)
+    top = analytics.compute(columns, facets=["cnnid"], top_n=2)["facets"]["cnnid"]
+    assert list(top.values()) == sorted(counts.values(), reverse=True)[:2]
+    assert all(counts[value] == count for value, count in top.items())
+    assert len(analytics.load_columns(db_session, vendor="juniper")) == 0
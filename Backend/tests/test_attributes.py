@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api import attributes
+from Backend.api.cold_storage import ColdStore
+from Backend.api.models import Base, LogEntry, LogEntryResponse
+
+START = datetime(2026, 5, 1)
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        LogEntry(
+            timestamp=START + timedelta(minutes=i),
+            message=f"type=traffic action={['accept', 'deny'][i % 2]}",
+            severity="low",
+            device_id=1,
+            attributes={"devid": f"FGT60E{i % 3}", "action": ["accept", "deny"][i % 2], "policyid": i % 4,
+                        "utm.enabled": i % 5 == 0} if i % 10 else None,
+        )
+        for i in range(1, 61)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def test_extract_keeps_fields_without_a_column():
+    record = {"timestamp": "2026-05-01T00:00:00", "message": "m", "vendor": "Fortinet", "devid": "FGT60E",
+              "country": "NL", "srcintf": None, "duration": 12}
+    assert attributes.extract(record) == {"devid": "FGT60E", "country": "NL", "duration": 12}
+    assert attributes.extract({"message": "m"}) is None
+    # Addresses, ports and the listener port are typed columns or routing data, not attributes
+    typed = {"src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "src_port": 40000, "dst_port": 443, "ingest_port": 5140}
+    assert attributes.extract(dict(typed, devid="FGT60E")) == {"devid": "FGT60E"}
+    assert len(attributes.extract({f"k{i}": i for i in range(10)}, max_keys=4)) == 4
+
+def test_parse_filters():
+    params = [("attr.devid", "FGT60E"), ("vendor", "Fortinet"), ("attr.utm.enabled", "true")]
+    assert attributes.parse_filters(params) == [("devid", "FGT60E"), ("utm.enabled", "true")]
+    with pytest.raises(ValueError):
+        attributes.parse_filters([("attr.a'b", "x")])
+
+def test_postgres_filters_use_the_indexes():
+    dialect = postgresql.dialect()
+    condition = attributes.attribute_condition(LogEntry.attributes, "action", "deny", "postgresql")
+    assert str(condition.compile(dialect=dialect)) == "logs.attributes @> CAST(%(param_1)s AS JSONB)"
+    # A number may be stored as either JSON type
+    condition = attributes.attribute_condition(LogEntry.attributes, "policyid", "3", "postgresql")
+    assert str(condition.compile(dialect=dialect)).count("@>") == 2
+    # Promoted keys compare text, which their expression index is built on
+    condition = attributes.attribute_condition(LogEntry.attributes, "devid", "FGT60E1", "postgresql")
+    assert str(condition.compile(dialect=dialect)) == "(logs.attributes ->> %(param_1)s) = %(param_2)s"
+    assert attributes.index_name("utm.enabled") == "ix_logs_attr_utm_enabled"
+
+@pytest.mark.parametrize("filters", [
+    [("devid", "FGT60E1")],
+    [("action", "deny"), ("policyid", "1")],
+    [("policyid", "0")],
+    [("utm.enabled", "true")],
+    [("missing", "x")],
+])
+def test_sqlite_filters_match_python(db_session, filters):
+    query = db_session.query(LogEntry)
+    for key, value in filters:
+        query = query.filter(attributes.attribute_condition(LogEntry.attributes, key, value, "sqlite"))
+    expected = [log.id for log in db_session.query(LogEntry) if attributes.matches(log.attributes, filters)]
+    assert sorted(log.id for log in query) == sorted(expected)
+    assert filters[0][0] == "missing" or expected
+
+def test_cold_tier_filters_attributes(db_session, tmp_path):
+    db_session.query(LogEntry).update({LogEntry.timestamp: datetime.utcnow() - timedelta(days=30)})
+    db_session.commit()
+    store = ColdStore(str(tmp_path))
+    assert store.run_tiering(db_session, 7) == 60
+    assert store.count(attributes=[("action", "deny")]) == 30
+    assert store.count(attributes=[("action", "deny"), ("policyid", "1")]) == 15
+    rows = store.top_rows("timestamp", True, 3, attributes=[("devid", "FGT60E2")])
+    assert all(LogEntryResponse(**row).attributes["devid"] == "FGT60E2" for row in rows)
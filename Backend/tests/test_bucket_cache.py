@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api import analytics
+from Backend.api.bucket_cache import BucketCache, fingerprint, merge_buckets
+from Backend.api.models import Base, BucketInvalidation, LogEntry
+from Backend.api.sliced_query import SlicedExecutor, TimeSlice, sum_counts
+
+START = datetime(2026, 3, 1)
+NOW = START + timedelta(days=3, hours=5, minutes=30)
+
+@pytest.fixture(scope="function")
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'buckets.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        LogEntry(
+            timestamp=START + timedelta(minutes=37 * i),
+            message=f"Event {i}",
+            severity=["low", "medium", "high", "critical"][i % 4],
+            device_id=1,
+            vendor=["Cisco", "F5", "Fortinet"][i % 3],
+            repeat_count=1 + i % 3,
+        )
+        for i in range(130)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+def _cache(session_factory, **kwargs):
+    executor = SlicedExecutor(session_factory, budget=2, parallelism=2, slice_seconds=86400, min_slices=2)
+    options = dict(bucket_seconds=3600, grace_seconds=300, max_entries=1000, sync_seconds=0, ttl_seconds=86400)
+    options.update(kwargs)
+    return BucketCache(executor=executor, **options)
+
+class VendorCounts:
+    """The vendor-counts query by bucket, recording the slices it was asked for."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.slices = []
+
+    def __call__(self, db, time_slice):
+        self.slices.append(time_slice)
+        bucket = self.cache.bucket_column()
+        query = db.query(bucket, LogEntry.vendor, func.sum(LogEntry.repeat_count)).group_by(bucket, LogEntry.vendor)
+        counts = {}
+        for bucket_number, vendor, count in time_slice.apply(query).all():
+            counts.setdefault(int(bucket_number), {})[vendor] = int(count)
+        return counts
+
+def _direct(db, start, end):
+    query = db.query(LogEntry.vendor, func.sum(LogEntry.repeat_count)).group_by(LogEntry.vendor)
+    return {vendor: int(count) for vendor, count in TimeSlice(start, end, True).apply(query).all()}
+
+@pytest.mark.parametrize("start,end", [
+    (START, NOW),
+    (START + timedelta(minutes=17), START + timedelta(days=2, minutes=45)),
+    (None, None),
+    (START + timedelta(days=1), None),
+    (START + timedelta(hours=2, minutes=10), START + timedelta(hours=2, minutes=50)),
+])
+def test_cached_counts_match_one_query(session_factory, start, end):
+    cache = _cache(session_factory)
+    compute = VendorCounts(cache)
+    db = session_factory()
+    expected = _direct(db, start, end)
+    key = fingerprint("vendor-counts")
+    assert cache.aggregate(db, key, compute, start, end, now=NOW) == expected
+    # The second time only the unaligned edges and open buckets are queried
+    compute.slices.clear()
+    assert cache.aggregate(db, key, compute, start, end, now=NOW) == expected
+    assert len(compute.slices) <= 2
+    for time_slice in compute.slices:
+        assert time_slice.start is None or time_slice.end is None or time_slice.end - time_slice.start <= timedelta(hours=1)
+    db.close()
+
+def test_open_buckets_are_not_cached(session_factory):
+    cache = _cache(session_factory)
+    db = session_factory()
+    cache.aggregate(db, "key", VendorCounts(cache), START, None, now=NOW)
+    # 05:00 is open and 04:00 ended less than the grace period ago
+    open_bucket = cache.bucket(NOW)
+    assert ("key", open_bucket) not in cache._entries
+    assert ("key", open_bucket - 1) in cache._entries
+    db.close()
+
+def test_late_log_invalidates_its_bucket(session_factory):
+    cache = _cache(session_factory)
+    compute = VendorCounts(cache)
+    db = session_factory()
+    before = cache.aggregate(db, "key", compute, START, NOW, now=NOW)
+
+    late_time = START + timedelta(hours=10, minutes=5)
+    db.add(LogEntry(timestamp=late_time, message="late", severity="low", device_id=1, vendor="Late", repeat_count=4))
+    ranges = cache.record(db, [late_time, NOW], now=NOW)
+    db.commit()
+    # Only the closed bucket is invalidated; the open one is computed live anyway
+    assert ranges == [(START + timedelta(hours=10), START + timedelta(hours=11))]
+    for start, end in ranges:
+        cache.invalidate(start, end)
+
+    compute.slices.clear()
+    after = cache.aggregate(db, "key", compute, START, NOW, now=NOW)
+    assert after == dict(before, Late=4)
+    assert after == _direct(db, START, NOW)
+    assert any(s.start == START + timedelta(hours=10) for s in compute.slices)
+    db.close()
+
+def test_invalidations_reach_other_workers(session_factory):
+    writer, reader = _cache(session_factory), _cache(session_factory)
+    db = session_factory()
+    reader.aggregate(db, "key", VendorCounts(reader), START, NOW, now=NOW)
+
+    late_time = START + timedelta(days=1, minutes=1)
+    db.add(LogEntry(timestamp=late_time, message="late", severity="low", device_id=1, vendor="Cisco", repeat_count=2))
+    writer.record(db, [late_time], now=NOW)
+    db.commit()
+    assert db.query(BucketInvalidation).count() == 1
+
+    compute = VendorCounts(reader)
+    assert reader.aggregate(db, "key", compute, START, NOW, now=NOW) == _direct(db, START, NOW)
+    assert any(s.start == START + timedelta(days=1) for s in compute.slices)
+    db.close()
+
+def test_results_computed_across_an_invalidation_are_not_stored(session_factory):
+    cache = _cache(session_factory)
+    db = session_factory()
+
+    class Invalidating(VendorCounts):
+        def __call__(self, slice_db, time_slice):
+            counts = super().__call__(slice_db, time_slice)
+            cache.invalidate(START, START + timedelta(hours=1))
+            return counts
+
+    cache.aggregate(db, "key", Invalidating(cache), START, NOW, now=NOW)
+    assert len(cache) == 0
+    db.close()
+
+def test_least_recently_used_buckets_are_evicted(session_factory):
+    cache = _cache(session_factory, max_entries=10)
+    db = session_factory()
+    assert cache.aggregate(db, "key", VendorCounts(cache), START, NOW, now=NOW) == _direct(db, START, NOW)
+    assert len(cache) == 10
+    assert sum(len(keys) for keys in cache._by_bucket.values()) == 10
+    db.close()
+
+def test_bucketed_time_series_adds_up_to_the_time_series(session_factory):
+    db = session_factory()
+    columns = analytics.load_columns(db, dimensions=[], start_time=START, end_time=NOW)
+    for interval in analytics.INTERVAL_SECONDS:
+        partials = analytics.bucketed_time_series(columns, interval, 3600)
+        assert sum_counts(list(partials.values())) == analytics.compute(columns, facets=[], interval=interval)["time_series"]
+    assert merge_buckets([{1: {"a": 1}}, {1: {"a": 2, "b": 1}, 2: {"a": 1}}]) == {1: {"a": 3, "b": 1}, 2: {"a": 1}}
+    db.close()
@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, LogEntry, LogEntryResponse
+from Backend.api.cold_storage import ColdStore, merge_sorted
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="function")
+def archived(db_session, tmp_path):
+    now = datetime.utcnow()
+    for i in range(30 * 24):
+        db_session.add(LogEntry(
+            timestamp=now - timedelta(hours=i),
+            message=f"Connection from 10.0.0.{i % 7}",
+            severity=["low", "high"][i % 2],
+            device_id=1,
+            vendor=["Cisco", "F5"][i % 2],
+            cnnid=f"CNN00{i % 3}",
+        ))
+    db_session.commit()
+    store = ColdStore(str(tmp_path))
+    moved = store.run_tiering(db_session, 7)
+    return store, moved, now
+
+def test_tiering_moves_old_rows(db_session, archived):
+    store, moved, now = archived
+    assert moved > 0
+    assert db_session.query(LogEntry).count() + moved == 30 * 24
+    assert store.count() == moved
+    cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
+    assert all(datetime.fromisoformat(f["max_timestamp"]) < cutoff for f in store.files())
+
+def test_zone_map_skips_files(archived):
+    store, moved, now = archived
+    assert store.has_data(None, None)
+    assert not store.has_data(now - timedelta(days=1), None)
+    assert store._candidate_files(vendor="juniper") == []
+
+def test_filters_are_pushed_down(archived):
+    store, moved, now = archived
+    assert store.count(vendor="cisco") + store.count(vendor="F5") == moved
+    assert store.count(severity="HIGH") == store.count(vendor="f5")
+    assert store.value_counts("cnnid", query="10.0.0.3")
+    assert sum(store.bucket_counts("%Y-%m-%d").values()) == moved
+
+def test_merge_with_hot_tier(db_session, archived):
+    store, moved, now = archived
+    hot = [LogEntryResponse.from_orm(log) for log in db_session.query(LogEntry).order_by(LogEntry.timestamp.desc()).limit(5)]
+    cold = [LogEntryResponse(**row) for row in store.top_rows("timestamp", True, 5)]
+    merged = merge_sorted(hot, cold, "timestamp", True)
+    assert [entry.timestamp for entry in merged] == sorted((entry.timestamp for entry in merged), reverse=True)
+    assert merged[:5] == hot
+
+@pytest.mark.parametrize("sort_by", ["timestamp", "severity", "cnnid", "id"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_top_rows_read_full_columns_for_the_window_only(archived, sort_by, descending):
+    store, moved, now = archived
+    assert store.top_rows(sort_by, descending, 25) == store.top_rows(sort_by, descending, None)[:25]
+    assert store.top_rows(sort_by, descending, 25, vendor="F5", query="10.0.0.3") == \
+        store.top_rows(sort_by, descending, None, vendor="F5", query="10.0.0.3")[:25]
+
+def test_boundary_of_a_full_hot_window_skips_files(archived, monkeypatch):
+    store, moved, now = archived
+    newest = store.top_rows("timestamp", True, 5)
+    read = []
+    candidate_files = store._candidate_files
+    monkeypatch.setattr(store, "_candidate_files", lambda *args, **kwargs: read.append(candidate_files(*args, **kwargs)) or read[-1])
+    # Hot rows up to the newest cold day leave only that day's rows to merge
+    boundary = newest[-1]["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+    assert store.top_rows("timestamp", True, 5, boundary=boundary) == newest
+    assert len(read[-1]) == 1 < len(store.files())
+    oldest = store.top_rows("timestamp", False, 5)
+    assert store.top_rows("timestamp", False, 5, boundary=oldest[-1]["timestamp"]) == oldest
+    assert len(read[-1]) == 1
+    # Past the boundary nothing of the cold tier can make the window
+    assert store.top_rows("timestamp", True, 5, boundary=now) == []
+
+def test_token_filters_skip_files(db_session, archived):
+    store, moved, now = archived
+    assert all("token_bloom" in f for f in store.files())
+    cold_rows = store.scan(["message"])["message"].to_pylist()
+    assert store.count(token="10.0.0.3") == sum(1 for message in cold_rows if message.endswith("10.0.0.3"))
+    # A prefix of a token is not a token
+    assert store.count(token="10.0.0") == 0
+    assert len(store._candidate_files(token="10.0.0.9")) < len(store.files())
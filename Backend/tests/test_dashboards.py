@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from Backend.api import analytics, dashboard_query
+from Backend.api.database import get_db
+from Backend.api.models import Base, LogEntry, WidgetSpec
+from Backend.api.routes import dashboards
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+@pytest.fixture(scope="function")
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    base = NOW.replace(tzinfo=None)
+    db.add_all([
+        LogEntry(
+            timestamp=base - timedelta(minutes=7 * i),
+            message=f"Event {i}",
+            severity=["low", "high", "critical"][i % 3],
+            device_id=1,
+            vendor=["Cisco", "F5"][i % 2],
+            device_type="Firewall",
+            cnnid=f"CNN00{i % 4}",
+            repeat_count=1 + i % 2,
+        )
+        for i in range(600)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+WIDGETS = [
+    WidgetSpec(id="total", type="total", last="24h"),
+    WidgetSpec(id="severity", type="facet", dimension="severity", last="24h"),
+    WidgetSpec(id="vendors", type="facet", dimension="vendor", last="1h"),
+    WidgetSpec(id="series", type="time_series", interval="hour", series_by="vendor", last="6h"),
+    WidgetSpec(id="cisco", type="total", last="24h", filters={"vendor": "cisco"}),
+    WidgetSpec(id="top", type="top", dimension="customer", last="1h"),
+    WidgetSpec(id="distinct", type="distinct", last="1h"),
+]
+
+def test_plan_shares_scans_and_sketch_reads():
+    groups = dashboard_query.plan(WIDGETS, NOW)
+    # All unfiltered widgets overlap in one scan, the filtered one scans alone, the sketches share one read
+    assert sorted((group.kind, len(group.widgets)) for group in groups) == [("scan", 1), ("scan", 4), ("sketch", 2)]
+    disjoint = [WidgetSpec(type="total", start_time=NOW - timedelta(days=3), end_time=NOW - timedelta(days=2)),
+                WidgetSpec(type="total", last="1h")]
+    assert len(dashboard_query.plan(disjoint, NOW)) == 2
+    # The dashboard time picker puts every widget on the same range
+    groups = dashboard_query.plan(WIDGETS, NOW, start_time=NOW - timedelta(hours=2), end_time=NOW)
+    assert all((widget.start, widget.end) == (NOW - timedelta(hours=2), NOW) for group in groups for widget in group.widgets)
+
+def test_shared_scan_matches_separate_queries(session_factory):
+    data = asyncio.run(dashboard_query.load(WIDGETS, session_factory, now=NOW))
+    assert data["groups"] == 3
+    results = {widget["id"]: widget["data"] for widget in data["widgets"]}
+
+    db = session_factory()
+    def separate(last, **filters):
+        return analytics.load_columns(db, dimensions=analytics.DIMENSIONS, start_time=NOW - last, end_time=NOW, **filters)
+    assert results["total"] == analytics.compute(separate(timedelta(hours=24)), facets=[])["total"]
+    assert results["severity"] == analytics.compute(separate(timedelta(hours=24)), facets=["severity"])["facets"]["severity"]
+    assert results["vendors"] == analytics.compute(separate(timedelta(hours=1)), facets=["vendor"])["facets"]["vendor"]
+    series = analytics.compute(separate(timedelta(hours=6)), facets=[], interval="hour", series_by="vendor")
+    assert results["series"] == {"time_series": series["time_series"], "series_by": series["series_by"]}
+    assert results["cisco"] == analytics.compute(separate(timedelta(hours=24), vendor="cisco"), facets=[])["total"]
+    assert results["top"] == [] and results["distinct"] == 0
+    db.close()
+
+def test_invalid_widgets_are_rejected():
+    for widget in [
+        WidgetSpec(type="facet", dimension="message"),
+        WidgetSpec(type="time_series", interval="week"),
+        WidgetSpec(type="top", dimension="customer", filters={"vendor": "F5"}),
+        WidgetSpec(type="total", filters={"message": "x"}),
+    ]:
+        with pytest.raises(dashboard_query.WidgetError):
+            dashboard_query.validate(widget)
+
+def test_dashboard_endpoints(session_factory, monkeypatch):
+    app = FastAPI()
+    app.include_router(dashboards.router, prefix="/api/v1")
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(dashboards, "SessionLocal", session_factory)
+    client = TestClient(app)
+
+    widgets = [widget.dict(exclude_none=True) for widget in WIDGETS[:3]] + [
+        {"type": "total", "start_time": "2026-03-01T10:00:00", "end_time": "2026-03-01T12:00:00", "layout": {"x": 0}}
+    ]
+    created = client.post("/api/v1/dashboards", json={"name": "Overview", "widgets": widgets})
+    assert created.status_code == 201
+    dashboard_id = created.json()["id"]
+    assert created.json()["widgets"][3]["layout"] == {"x": 0}
+    assert client.post("/api/v1/dashboards", json={"name": "Bad", "widgets": [{"type": "facet"}]}).status_code == 400
+
+    response = client.get(f"/api/v1/dashboards/{dashboard_id}/data")
+    assert response.status_code == 200
+    body = response.json()
+    assert [widget["id"] for widget in body["widgets"]] == ["total", "severity", "vendors", "3"]
+    assert body["widgets"][3]["data"] == sum(1 + i % 2 for i in range(0, 18))
+
+    renamed = client.put(f"/api/v1/dashboards/{dashboard_id}", json={"name": "Renamed", "widgets": []})
+    assert renamed.json()["name"] == "Renamed"
+    assert client.delete(f"/api/v1/dashboards/{dashboard_id}").status_code == 200
+    assert client.get(f"/api/v1/dashboards/{dashboard_id}/data").status_code == 404
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from Backend.api.models import Base, LogEntry
+from Backend.api.deduplication import DedupWindow, dedup_key
+from Backend.api.routes import logs as log_routes
+from Backend.api import analytics
+from Backend.api.bucket_cache import BucketCache
+from Backend.api.sliced_query import SlicedExecutor
+from Backend.api.token_index import TokenIndex
+
+class NdjsonRequest:
+    headers = {"content-type": "application/x-ndjson"}
+
+    def __init__(self, entries):
+        self._body = "\n".join(json.dumps(entry) for entry in entries).encode("utf-8")
+
+    async def body(self):
+        return self._body
+
+    async def stream(self):
+        yield self._body
+
+@pytest.fixture(scope="function")
+def db_session(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    monkeypatch.setattr(log_routes, "dedup_window", DedupWindow(60, 1000))
+    # Aggregates over missing buckets run in their own sessions
+    executor = SlicedExecutor(factory, budget=1, parallelism=1, slice_seconds=86400, min_slices=3)
+    monkeypatch.setattr(log_routes, "bucket_cache", BucketCache(3600, 300, 1000, 0, 86400, executor))
+    monkeypatch.setattr(log_routes, "token_index", TokenIndex(0, 0.01, 0, 60, 0, factory))
+    yield session
+    session.close()
+
+def ingest(db, entries):
+    return asyncio.get_event_loop().run_until_complete(log_routes.create_log(NdjsonRequest(entries), db))
+
+def storm(start, count, message="Interface Gi0/1 changed state to down"):
+    return [
+        {"timestamp": (start + timedelta(seconds=i)).isoformat(), "message": message, "severity": "high",
+         "cnnid": "CNN001", "vendor": "Cisco", "product": "ISR4321", "device_type": "Router"}
+        for i in range(count)
+    ]
+
+def test_key_ignores_whitespace_only():
+    assert dedup_key("CNN001", "ISR", "High", "link  down ") == dedup_key("CNN001", "ISR", "high", "link down")
+    assert dedup_key("CNN001", "ISR", "high", "link down") != dedup_key("CNN002", "ISR", "high", "link down")
+
+def test_window_expires_and_bounds_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("Backend.api.deduplication.time.monotonic", lambda: now[0])
+    window = DedupWindow(60, 2)
+    window.remember(b"a", 1, {})
+    assert window.lookup(b"a") == (1, {})
+    now[0] += 61
+    assert window.lookup(b"a") is None
+    for key in (b"x", b"y", b"z"):
+        window.remember(key, 2, {})
+    assert len(window) == 2 and window.lookup(b"x") is None
+
+def test_storm_collapses_into_one_row(db_session):
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    ingest(db_session, storm(start, 50) + storm(start, 1, "Interface Gi0/2 changed state to down"))
+    ingest(db_session, storm(start + timedelta(seconds=50), 25))
+
+    rows = db_session.query(LogEntry).order_by(LogEntry.id).all()
+    assert [row.repeat_count for row in rows] == [75, 1]
+    assert rows[0].timestamp == start
+    assert rows[0].last_seen == start + timedelta(seconds=74)
+
+    distribution = asyncio.get_event_loop().run_until_complete(log_routes.get_severity_distribution(None, None, db_session))
+    assert distribution == {"high": 76}
+    columns = analytics.load_columns(db_session, dimensions=["severity"])
+    assert analytics.compute(columns, facets=["severity"])["facets"]["severity"] == {"high": 76}
+
+def test_repeat_of_missing_row_is_stored_again(db_session):
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    ingest(db_session, storm(start, 3))
+    db_session.query(LogEntry).delete()
+    db_session.commit()
+    ingest(db_session, storm(start + timedelta(seconds=3), 4))
+    rows = db_session.query(LogEntry).all()
+    assert [(row.repeat_count, row.message) for row in rows] == [(4, "Interface Gi0/1 changed state to down")]
+
+def test_batch_is_compressed_in_one_pass(db_session, monkeypatch):
+    batches = []
+    monkeypatch.setattr(log_routes, "MESSAGE_COMPRESSION", True)
+    monkeypatch.setattr(log_routes.message_codec, "compress_entries", lambda db, entries: batches.append(list(entries)) or 0)
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    ingest(db_session, storm(start, 3) + storm(start, 1, "Interface Gi0/2 changed state to down")
+           + storm(start, 1, "Interface Gi0/3 changed state to down"))
+    assert [len(batch) for batch in batches] == [3]
+    assert db_session.query(LogEntry).count() == 3
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, Device, LogEntry, LogTemplate, IngestBatch
+from Backend.api.idempotency import batch_key, body_hasher, IdempotencyStore
+from Backend.api.deduplication import DedupWindow
+from Backend.api.routes import logs as log_routes
+from Backend.api.template_miner import TemplateMiner, TemplateStore
+
+class BatchRequest:
+    def __init__(self, entries, headers=None):
+        self.headers = dict({"content-type": "application/x-ndjson"}, **(headers or {}))
+        self._body = "\n".join(json.dumps(entry) for entry in entries).encode("utf-8")
+
+    async def body(self):
+        raise AssertionError("the body is hashed as it streams, never read whole")
+
+    async def stream(self):
+        for start in range(0, len(self._body), 64):
+            yield self._body[start:start + 64]
+
+@pytest.fixture(scope="function")
+def db_session(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    monkeypatch.setattr(log_routes, "dedup_window", DedupWindow(0, 0))
+    monkeypatch.setattr(log_routes, "idempotency_store", IdempotencyStore(3600))
+    # Template IDs of other tests' databases must not leak into this one
+    monkeypatch.setattr(log_routes, "template_store", TemplateStore(TemplateMiner()))
+    yield session
+    session.close()
+
+def ingest(db, entries, headers=None):
+    return asyncio.get_event_loop().run_until_complete(log_routes.create_log(BatchRequest(entries, headers), db))
+
+def batch(count, offset=0):
+    return [
+        {"timestamp": f"2024-05-01T12:00:{i:02d}", "message": f"Connection from 10.0.0.{i + offset}", "severity": "low",
+         "cnnid": "CNN001", "vendor": "Cisco", "product": "ASA", "device_type": "Firewall"}
+        for i in range(count)
+    ]
+
+def test_batch_key():
+    assert batch_key("abc", b"x", None, None) == batch_key(" abc ", b"y", "application/msgpack", "gzip")
+    assert batch_key(None, b"x", None, None) != batch_key(None, b"x", None, "gzip")
+    assert len(batch_key(None, b"", None, None)) == 16
+    assert batch_key(None, None, None, None) is None
+    digest = body_hasher(None, "gzip")
+    for chunk in (b"a", b"bc", b""):
+        digest.update(chunk)
+    assert digest.digest() == batch_key(None, b"abc", None, "gzip")
+
+def test_replayed_body_is_not_stored_twice(db_session):
+    first = ingest(db_session, batch(10))
+    replay = ingest(db_session, batch(10))
+    assert "replayed" not in first and replay["replayed"]
+    assert replay["message"] == first["message"]
+    assert db_session.query(LogEntry).count() == 10
+    ingest(db_session, batch(10, offset=100))
+    assert db_session.query(LogEntry).count() == 20
+
+def test_replayed_body_has_no_side_effects(db_session, monkeypatch):
+    first = ingest(db_session, batch(5) + mixed_batch()[1:2])
+    def unexpected(*args):
+        raise AssertionError("a replay is dropped before it is rate limited or templated")
+    monkeypatch.setattr(log_routes.ingest_limiter, "admit", unexpected)
+    monkeypatch.setattr(log_routes.template_store, "match", unexpected)
+    monkeypatch.setattr(log_routes, "get_or_create", unexpected)
+    replay = ingest(db_session, batch(5) + mixed_batch()[1:2])
+    assert replay["replayed"] and replay["message"] == first["message"]
+    assert db_session.query(LogEntry).count() == 6
+
+def test_header_key_wins_over_body(db_session):
+    ingest(db_session, batch(5), {"idempotency-key": "fluent-chunk-1"})
+    assert ingest(db_session, batch(5, offset=50), {"idempotency-key": "fluent-chunk-1"})["replayed"]
+    ingest(db_session, batch(5), {"idempotency-key": "fluent-chunk-2"})
+    assert db_session.query(LogEntry).count() == 10
+
+def test_expired_keys_are_replaced_and_purged(db_session):
+    ingest(db_session, batch(3))
+    db_session.query(IngestBatch).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+    assert "replayed" not in ingest(db_session, batch(3))
+    assert db_session.query(LogEntry).count() == 6
+    assert db_session.query(IngestBatch).count() == 1
+
+    store = IdempotencyStore(3600)
+    db_session.query(IngestBatch).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+    store.purge_if_due(db_session)
+    assert db_session.query(IngestBatch).count() == 0
+
+def test_concurrent_copy_is_acknowledged(db_session, monkeypatch):
+    store = log_routes.idempotency_store
+    key = batch_key(None, BatchRequest(batch(4))._body, "application/x-ndjson", None)
+    # The other copy commits between this request's lookup and its commit
+    calls = []
+    original_lookup = store.lookup
+    monkeypatch.setattr(store, "lookup", lambda db, k: calls.append(k) or (original_lookup(db, k) if len(calls) > 1 else None))
+    db_session.add(IngestBatch(key=key, logs_created=4, logs_dropped=0, expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db_session.commit()
+    assert ingest(db_session, batch(4))["replayed"]
+    assert len(calls) == 2
+    assert db_session.query(LogEntry).count() == 0
+
+def mixed_batch(broken=False):
+    # A new customer, device and template after the first row
+    new_device = {"timestamp": "2024-05-01T12:01:00", "message": "Policy deny for user alice", "severity": "medium",
+                  "cnnid": "CNN002", "vendor": "Cisco", "product": "FTD", "device_type": "Firewall"}
+    last = dict(batch(1, offset=1)[0], timestamp="not a time" if broken else "2024-05-01T12:02:00")
+    return batch(1) + [new_device, last]
+
+def test_failed_batch_commits_nothing_but_reference_rows(db_session):
+    ingest(db_session, batch(1, offset=200))
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+    with pytest.raises(HTTPException):
+        ingest(db_session, mixed_batch(broken=True))
+    # The new customer, device and template were committed on their own, the batch not at all
+    assert commits == []
+    assert db_session.query(Device).filter(Device.name == "FTD").count() == 1
+    assert db_session.query(LogTemplate).filter(LogTemplate.template == "Policy deny for user alice").count() == 1
+    assert db_session.query(LogEntry).count() == 1
+    assert db_session.query(IngestBatch).count() == 1
+
+    assert "replayed" not in ingest(db_session, mixed_batch())
+    assert ingest(db_session, mixed_batch())["replayed"]
+    assert db_session.query(LogEntry).count() == 4
+    assert db_session.query(Device).filter(Device.name == "FTD").count() == 1
+
+def test_concurrent_copy_with_new_device_is_acknowledged(db_session, monkeypatch):
+    store = log_routes.idempotency_store
+    key = batch_key(None, BatchRequest(mixed_batch())._body, "application/x-ndjson", None)
+    calls = []
+    original_lookup = store.lookup
+    monkeypatch.setattr(store, "lookup", lambda db, k: calls.append(k) or (original_lookup(db, k) if len(calls) > 1 else None))
+    db_session.add(IngestBatch(key=key, logs_created=3, logs_dropped=0, expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db_session.commit()
+    assert ingest(db_session, mixed_batch())["replayed"]
+    assert db_session.query(LogEntry).count() == 0
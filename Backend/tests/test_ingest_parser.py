@@ -0,0 +1,67 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+import msgpack
+import pytest
+
+from Backend.api.ingest_parser import ParallelParser
+from Backend.api.wire_formats import WireFormatError
+
+RECORDS = [
+    {"timestamp": "2024-05-01T12:00:00", "message": f"Connection from 10.0.0.{i}", "severity": "low", "cnnid": "CNN001",
+     "vendor": "Cisco", "product": "ASA"}
+    for i in range(200)
+]
+
+@pytest.fixture(scope="module")
+def parser():
+    parser = ParallelParser(2, 1024)
+    yield parser
+    parser.shutdown()
+
+def decode(parser, body: bytes, content_type=None, content_encoding=None, chunk_size=300):
+    async def chunks():
+        for offset in range(0, len(body), chunk_size):
+            yield body[offset:offset + chunk_size]
+
+    async def collect():
+        return [record async for record in parser.iter_records(chunks(), content_type, content_encoding)]
+
+    return asyncio.get_event_loop().run_until_complete(collect())
+
+def ndjson(records):
+    return "\n".join(json.dumps(record) for record in records).encode("utf-8") + b"\n"
+
+def expected(records):
+    return [dict(record, timestamp=datetime.fromisoformat(record["timestamp"])) for record in records]
+
+def test_records_match_body_order(parser):
+    assert decode(parser, ndjson(RECORDS)) == expected(RECORDS)
+    assert decode(parser, gzip.compress(ndjson(RECORDS)), "application/x-ndjson", "gzip") == expected(RECORDS)
+
+def test_timestamps_normalized_or_kept_raw(parser):
+    records = RECORDS + [
+        {"timestamp": "2024-05-01T14:00:00+02:00", "message": "offset", "severity": 3},
+        {"timestamp": "yesterday", "message": "unparseable"},
+        {"message": "no timestamp"},
+    ]
+    parsed = decode(parser, ndjson(records))
+    assert parsed[-3] == {"timestamp": datetime(2024, 5, 1, 12, 0), "message": "offset", "severity": "3"}
+    assert parsed[-2] == {"timestamp": "yesterday", "message": "unparseable"}
+    assert parsed[-1] == {"message": "no timestamp"}
+
+def test_other_fields_are_kept(parser):
+    records = [dict(record, devid="FGT60E", src_ip=f"10.0.0.{i}", policyid=i, source={"port": 53}) for i, record in enumerate(RECORDS)]
+    assert decode(parser, ndjson(records)) == expected(records)
+
+def test_malformed_line_raises(parser):
+    body = ndjson(RECORDS[:100]) + b"{not json\n" + ndjson(RECORDS[100:])
+    with pytest.raises(WireFormatError):
+        decode(parser, body)
+
+def test_msgpack_body_inline():
+    parser = ParallelParser(2, 16)
+    body = b"".join(msgpack.packb(record) for record in RECORDS[:20])
+    assert decode(parser, body, "application/msgpack") == RECORDS[:20]
+    assert parser._pool is None
@@ -0,0 +1,57 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, generate_latest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from Backend.api.instrumentation import InstrumentationMiddleware, instrument_engine, slow_requests
+
+@pytest.fixture()
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    instrument_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO items (id) VALUES (1), (2), (3)"))
+
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        with engine.connect() as connection:
+            rows = connection.execute(text("SELECT id FROM items")).fetchall()
+            connection.execute(text("SELECT id FROM items WHERE id = :id"), {"id": item_id}).fetchall()
+        return {"rows": len(rows)}
+
+    @app.get("/broken")
+    def broken():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT missing FROM items"))
+
+    return TestClient(app, raise_server_exceptions=False)
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_records_route_queries_and_bytes(client):
+    before = sample("http_request_db_queries_sum", method="GET", route="/items/{item_id}")
+    requests_before = sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}", status="200")
+    response = client.get("/items/2")
+    assert response.status_code == 200
+    assert sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}", status="200") == requests_before + 1
+    assert sample("http_request_db_queries_sum", method="GET", route="/items/{item_id}") == before + 2
+    assert sample("http_response_bytes_sum", method="GET", route="/items/{item_id}") >= len(response.content)
+    client.get("/does-not-exist")
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert b"db_pool_checked_out" in generate_latest(REGISTRY)
+
+def test_failed_statement_and_slow_requests(client, monkeypatch):
+    monkeypatch.setattr(slow_requests, "threshold_seconds", 0)
+    assert client.get("/broken").status_code == 500
+    client.get("/items/1")
+    latest = slow_requests.entries(limit=2)
+    assert latest[0]["path"] == "/items/1" and latest[0]["db_queries"] == 2
+    assert latest[0]["queries"][1]["statement"] == "SELECT id FROM items WHERE id = ?"
+    assert latest[1]["route"] == "/broken" and latest[1]["status"] == 500
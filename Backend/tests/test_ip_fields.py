@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api import ip_fields
+from Backend.api.cold_storage import ColdStore
+from Backend.api.models import Base, LogEntry
+from Backend.api.routes import logs as log_routes
+
+START = datetime(2026, 5, 1)
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        LogEntry(
+            timestamp=START + timedelta(minutes=i),
+            message=f"Drop from 10.{i % 3}.0.{i}",
+            severity="low",
+            device_id=1,
+            src_ip=f"10.{i % 3}.0.{i}",
+            dst_ip="192.168.1.1" if i % 2 else "2001:db8::1",
+            src_port=40000 + i,
+            dst_port=[22, 443][i % 2],
+        )
+        for i in range(1, 61)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def test_extract_from_record_fields():
+    record = {"SrcIP": "10.0.0.1", "dst": "[2001:db8::1]:443", "sport": "5353"}
+    assert ip_fields.extract(record, None) == {"src_ip": "10.0.0.1", "dst_ip": "2001:db8::1", "src_port": 5353, "dst_port": 443}
+    ecs = {"source": {"ip": "10.0.0.2", "port": 1234}, "destination": {"ip": "10.0.0.3"}}
+    assert ip_fields.extract(ecs, None) == {"src_ip": "10.0.0.2", "dst_ip": "10.0.0.3", "src_port": 1234, "dst_port": None}
+
+def test_extract_from_message():
+    iptables = "IN=eth0 OUT= SRC=10.1.2.3 DST=10.4.5.6 LEN=60 PROTO=TCP SPT=51234 DPT=22"
+    assert ip_fields.extract({}, iptables) == {"src_ip": "10.1.2.3", "dst_ip": "10.4.5.6", "src_port": 51234, "dst_port": 22}
+    assert ip_fields.extract({}, 'action=deny src="10.0.0.9:5353" dst=8.8.8.8')["src_port"] == 5353
+    # Record fields win over the message, which is only read when enabled
+    assert ip_fields.extract({"src_ip": "10.9.9.9"}, iptables)["src_ip"] == "10.9.9.9"
+    assert ip_fields.extract({}, iptables, from_message=False)["src_ip"] is None
+    assert ip_fields.extract({}, "src=not-an-address dpt=99999")["src_ip"] is None
+
+def test_postgres_filter_uses_inet_containment():
+    condition = ip_fields.ip_condition(LogEntry.src_ip, "10.0.0.0/8", "postgresql")
+    compiled = condition.compile(dialect=postgresql.dialect())
+    assert str(compiled) == "logs.src_ip <<= CAST(%(param_1)s AS INET)"
+    assert compiled.params == {"param_1": "10.0.0.0/8"}
+
+@pytest.mark.parametrize("value", ["10.1.0.0/16", "10.0.0.0/8", "10.2.0.7", "0.0.0.0/0", "2001:db8::1"])
+def test_sqlite_filter_matches_python(db_session, value):
+    network = ip_fields.parse_network(value)
+    for column in ip_fields.IP_COLUMNS:
+        rows = db_session.query(LogEntry).filter(ip_fields.ip_condition(getattr(LogEntry, column), value, "sqlite")).all()
+        expected = [log for log in db_session.query(LogEntry) if ip_fields.in_network(getattr(log, column), network)]
+        assert sorted(log.id for log in rows) == sorted(log.id for log in expected)
+
+def test_invalid_block_is_a_bad_request(db_session):
+    with pytest.raises(ValueError):
+        ip_fields.ip_condition(LogEntry.src_ip, "10.0.0.0/12", "sqlite")
+    with pytest.raises(HTTPException) as error:
+        asyncio.get_event_loop().run_until_complete(log_routes.get_logs(Request({"type": "http", "query_string": b""}), src_ip="10.0.0.300", db=db_session))
+    assert error.value.status_code == 400
+
+def test_cold_tier_filters_by_network(db_session, tmp_path):
+    db_session.query(LogEntry).update({LogEntry.timestamp: datetime.utcnow() - timedelta(days=30)})
+    db_session.commit()
+    store = ColdStore(str(tmp_path))
+    assert store.run_tiering(db_session, 7) == 60
+    assert store.count(src_ip="10.1.0.0/16") == 20
+    assert store.count(src_ip="10.1.0.0/16", dst_port=22) == 10
+    assert store.count(dst_ip="2001:db8::/32") == 30
+    rows = store.top_rows("timestamp", True, 5, dst_ip="192.168.0.0/16")
+    assert len(rows) == 5 and all(row["dst_ip"] == "192.168.1.1" for row in rows)
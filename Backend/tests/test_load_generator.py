@@ -0,0 +1,77 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from Backend.benchmarks.load_generator import EventGenerator, Scenario, load_scenarios, run_scenario
+from Backend.benchmarks.results import compare, latency_summary, percentile
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+def events(scenario, count=2000):
+    generator = EventGenerator(scenario)
+    return [generator.event(NOW) for _ in range(count)]
+
+def test_scenarios_load():
+    scenarios = load_scenarios()
+    assert "steady" in scenarios and scenarios["tcp_rsyslog"].transport == "tcp"
+
+def test_generator_is_deterministic_and_respects_cardinality():
+    scenario = Scenario("test", cnnids=3, vendors=2, devices=10)
+    first, second = events(scenario), events(scenario)
+    assert first == second
+    assert len({event["cnnid"] for event in first}) <= 3
+    assert len({event["vendor"] for event in first}) <= 2
+    assert len({event["product"] for event in first}) <= 10
+    # Every device always reports with the same customer and vendor
+    owners = {(event["product"], event["cnnid"], event["vendor"]) for event in first}
+    assert len(owners) == len({event["product"] for event in first})
+
+def test_skew_and_repeats():
+    skewed = events(Scenario("test", devices=1000, skew=1.5))
+    counts = sorted((sum(1 for event in skewed if event["product"] == product)
+                     for product in {event["product"] for event in skewed}), reverse=True)
+    assert counts[0] > 10 * counts[len(counts) // 2]
+
+    repeated = events(Scenario("test", repeat_fraction=0.9))
+    assert len({event["message"] for event in repeated}) < 0.3 * len(repeated)
+
+def test_burst_rate():
+    scenario = Scenario("test", rate=100, burst={"every_seconds": 30, "duration_seconds": 5, "multiplier": 10})
+    assert scenario.rate_at(2) == 1000 and scenario.rate_at(10) == 100 and scenario.rate_at(32) == 1000
+
+def test_percentiles_and_compare():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert latency_summary([0.001, 0.002])["max_ms"] == 2.0
+    baseline = {"metrics": {"events_per_second": 1000, "ack_latency": {"p99_ms": 10.0}}}
+    current = {"metrics": {"events_per_second": 950, "ack_latency": {"p99_ms": 20.0}}}
+    rows = {row["metric"]: row for row in compare(baseline, current, ["events_per_second"], ["p99_ms"])}
+    assert not rows["events_per_second"]["regression"]
+    assert rows["ack_latency.p99_ms"]["regression"]
+
+def test_tcp_run_against_local_listener():
+    received = []
+
+    async def handle(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            received.append(json.loads(line))
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        scenario = Scenario("tcp", transport="tcp", host="127.0.0.1", port=port, duration_seconds=0.5,
+                            rate=2000, batch_size=50, concurrency=2)
+        metrics = await run_scenario(scenario, "", None, 0)
+        await asyncio.sleep(0.1)
+        server.close()
+        await server.wait_closed()
+        return metrics
+
+    metrics = asyncio.get_event_loop().run_until_complete(run())
+    assert metrics["events_sent"] == len(received) > 0
+    assert metrics["send_latency"]["count"] == metrics["batches_sent"]
+    assert abs(metrics["events_per_second"] - 2000) < 600
@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+
+from Backend.api.logging_config import (
+    DroppingQueueHandler, SampledLogger, configure_logging, parse_levels, shutdown_logging,
+)
+
+def test_json_output_through_queue(tmp_path):
+    log_file = tmp_path / "app.log"
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        configure_logging(level="INFO", levels="tests.quiet=ERROR", log_format="json", log_file=str(log_file))
+        logging.getLogger("tests.app").info("Stored %d rows for %s", 3, "CNN001", extra={"route": "/logs"})
+        logging.getLogger("tests.app").debug("not emitted")
+        logging.getLogger("tests.quiet").warning("below the per-logger level")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("tests.app").exception("Failed")
+        shutdown_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [entry["message"] for entry in entries] == ["Stored 3 rows for CNN001", "Failed"]
+    assert entries[0]["level"] == "INFO" and entries[0]["logger"] == "tests.app" and entries[0]["route"] == "/logs"
+    assert "ValueError: boom" in entries[1]["exception"]
+
+def test_mutable_arguments_are_formatted_on_the_calling_thread():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    payload = {"rows": [1]}
+    handler.handle(logging.LogRecord("tests", logging.INFO, __file__, 1, "Payload %s", (payload,), None))
+    payload["rows"].append(2)
+    record = handler.queue.get_nowait()
+    assert record.getMessage() == "Payload {'rows': [1]}"
+
+    handler.handle(logging.LogRecord("tests", logging.INFO, __file__, 1, "first", None, None))
+    handler.handle(logging.LogRecord("tests", logging.INFO, __file__, 1, "second", None, None))
+    assert handler.dropped == 1
+
+def test_sampled_logger():
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    logger = logging.getLogger("tests.sampled")
+    logger.propagate = False
+    logger.addHandler(Collect())
+    logger.setLevel(logging.DEBUG)
+    sampled = SampledLogger(logger, every=10, per_second=0)
+    for index in range(35):
+        sampled.debug("row %d", index)
+    assert [record.getMessage() for record in records] == ["row 9", "row 19", "row 29"]
+    assert records[1].suppressed == 9
+
+    logger.setLevel(logging.INFO)
+    sampled.debug("filtered by level")
+    assert len(records) == 3
+
+    limited = SampledLogger(logger, every=1, per_second=2)
+    for index in range(50):
+        limited.info("burst %d", index)
+    assert len(records) - 3 in (2, 3)
+
+def test_parse_levels():
+    assert parse_levels("Backend.api=debug, sqlalchemy.engine=WARNING,broken") == {
+        "Backend.api": "DEBUG", "sqlalchemy.engine": "WARNING",
+    }
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, LogEntry
+from Backend.api import analytics, message_codec as message_codec_module
+from Backend.api.message_codec import MessageCodec, message_codec, message_contains, sample_messages
+from Backend.api.cold_storage import ColdStore
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def fortinet_message(i):
+    return (f"date=2024-05-{i % 28 + 1:02d} time=10:{i % 60:02d}:00 devname=FGT-{i % 9} devid=FGT60E{i:08d} "
+            f"logid=0000000013 type=traffic subtype=forward level=notice srcip=10.0.{i % 256}.{i % 7} "
+            f"dstip=192.168.1.{i % 250} action={['accept', 'deny'][i % 2]} policyid={i % 12}")
+
+def test_train_compress_round_trip(db_session):
+    codec = MessageCodec()
+    row, _ = codec.train(db_session, "Fortinet", [fortinet_message(i) for i in range(500)], dictionary_size=8192)
+    assert row.version == 1
+    assert codec.train(db_session, "Fortinet", [fortinet_message(i) for i in range(500, 1000)], dictionary_size=8192)[0].version == 2
+
+    connection = db_session.connection()
+    message = fortinet_message(4242)
+    frame = codec.compress(connection, row.id, message)
+    assert len(frame) < len(message) / 3
+    assert codec.decompress(connection, row.id, frame) == message
+    # A fresh codec loads the older version from the table
+    assert MessageCodec().decompress(connection, row.id, frame) == message
+
+def test_too_few_samples_is_rejected(db_session):
+    with pytest.raises(ValueError):
+        MessageCodec().train(db_session, "Cisco", ["%LINK-3-UPDOWN"] * 10)
+
+def test_reads_and_archive_decompress(db_session, tmp_path):
+    message_codec.train(db_session, "Fortinet", [fortinet_message(i) for i in range(500)], dictionary_size=8192)
+    old = datetime.utcnow() - timedelta(days=30)
+    entries = [
+        LogEntry(timestamp=old, message=fortinet_message(i), severity="low", device_id=1, vendor="Fortinet")
+        for i in range(3)
+    ] + [LogEntry(timestamp=old, message="plain", severity="low", device_id=1, vendor="Cisco")]
+    assert message_codec.compress_entries(db_session, entries) == 3
+    db_session.add_all(entries)
+    db_session.commit()
+    db_session.expunge_all()
+
+    stored = db_session.query(LogEntry).order_by(LogEntry.id).all()
+    assert [log.message for log in stored] == [fortinet_message(i) for i in range(3)] + ["plain"]
+    assert stored[0].message_compressed is not None and stored[3].message_compressed is None
+    # Retraining samples the compressed rows too
+    assert sorted(sample_messages(db_session, "Fortinet")) == sorted(fortinet_message(i) for i in range(3))
+
+    store = ColdStore(str(tmp_path))
+    assert store.run_tiering(db_session, 7) == 4
+    assert sorted(row["message"] for row in store.top_rows("id", False, None)) == sorted(fortinet_message(i) for i in range(3)) + ["plain"]
+
+def test_query_matches_compressed_messages(db_session, tmp_path, monkeypatch):
+    codec = MessageCodec()
+    # A codec of this database only; dictionary IDs of other tests' databases are cached in the shared one
+    monkeypatch.setattr(message_codec_module, "message_codec", codec)
+    monkeypatch.setattr(analytics, "cold_store", ColdStore(str(tmp_path)))
+    codec.train(db_session, "Fortinet", [fortinet_message(i) for i in range(500)], dictionary_size=8192)
+    now = datetime.utcnow()
+    entries = [
+        LogEntry(timestamp=now - timedelta(hours=i), message=fortinet_message(i), severity="low", device_id=1, vendor="Fortinet")
+        for i in range(6)
+    ] + [LogEntry(timestamp=now, message="plain POLICYID=3 line", severity="low", device_id=1, vendor="Cisco")]
+    assert codec.compress_entries(db_session, entries) == 6
+    db_session.add_all(entries)
+    db_session.commit()
+
+    found = db_session.query(LogEntry).filter(message_contains(db_session, "policyid=3")).all()
+    assert sorted(log.message for log in found) == sorted([fortinet_message(3), "plain POLICYID=3 line"])
+    # Compressed rows outside the time range are not decoded
+    recent = message_contains(db_session, "action=deny", start_time=now - timedelta(hours=2, minutes=30))
+    assert [log.message for log in db_session.query(LogEntry).filter(recent)] == [fortinet_message(1)]
+    columns = analytics.load_columns(db_session, query="type=traffic")
+    assert analytics.compute(columns)["facets"]["vendor"] == {"Fortinet": 6}
@@ -0,0 +1,87 @@
+import pytest
+
+from Backend.api import attributes, ip_fields
+from Backend.api.parsers import PARSERS, ParserRegistry, VendorParser, vendor_parsers
+from Backend.api.parsers.registry import message_body
+from Backend.benchmarks.parser_bench import SAMPLES, UNMATCHED, bench, samples
+
+FORTIGATE = ('<189>date=2026-05-01 time=12:00:00 devname="fw-01" devid="FGT60E0000000001" logid="0000000013" '
+             'type="traffic" subtype="forward" level="warning" srcip=10.0.0.1 srcport=51234 dstip=8.8.8.8 '
+             'dstport=53 action="deny" policyid=7 msg="Denied by policy"')
+ASA_OUTBOUND = ("%ASA-6-302013: Built outbound TCP connection 99 for outside:203.0.113.5/443 (203.0.113.5/443) "
+                "to inside:10.0.0.10/51234 (192.0.2.1/51234)")
+PAN_THREAT = ('1,2026/05/01 12:00:00,012801000001,THREAT,vulnerability,2561,2026/05/01 12:00:00,10.0.0.1,203.0.113.9,'
+              '0.0.0.0,0.0.0.0,allow-web,,,web-browsing,vsys1,trust,untrust,ethernet1/2,ethernet1/1,fwd,,4242,1,'
+              '51234,80,0,0,0x400000,tcp,reset-both,"example.com/a,b",Generic Exploit(30000),any,critical')
+F5 = "notice mcpd[5789]: 01070638:5: Pool /Common/pool_web member /Common/10.0.0.21%2:80 monitor status down."
+CHECK_POINT = ('[action:"Drop"; ifdir:"inbound"; origin:"10.0.0.1"; src:"198.51.100.7"; dst:"10.0.0.10"; '
+               's_port:"4444"; service:"22"; product:"VPN-1 & FireWall-1"; rule_name:"Cleanup \\"rule\\""]')
+
+@pytest.mark.parametrize("message,name,expected", [
+    (FORTIGATE, "fortigate", {"vendor": "Fortinet", "device_type": "Firewall", "severity": "medium",
+                              "src_ip": "10.0.0.1", "dst_port": "53", "devid": "FGT60E0000000001", "msg": "Denied by policy"}),
+    (ASA_OUTBOUND, "cisco_asa", {"vendor": "Cisco", "severity": "low", "asa_message_id": "302013", "action": "built",
+                                 "src_ip": "10.0.0.10", "src_port": "51234", "src_interface": "inside", "dst_ip": "203.0.113.5"}),
+    (PAN_THREAT, "palo_alto", {"vendor": "Palo Alto Networks", "log_type": "THREAT", "src_ip": "10.0.0.1",
+                               "dst_port": "80", "action": "reset-both", "url": "example.com/a,b", "severity": "critical"}),
+    (F5, "f5", {"vendor": "F5", "severity": "low", "process": "mcpd", "f5_message_id": "01070638",
+                "object": "/Common/pool_web", "dst_ip": "10.0.0.21", "dst_port": "80"}),
+    (CHECK_POINT, "check_point", {"vendor": "Check Point", "severity": "medium", "src_ip": "198.51.100.7",
+                                  "src_port": "4444", "dst_port": "22", "blade": "VPN-1 & FireWall-1"}),
+])
+def test_prefix_dispatch_and_fields(message, name, expected):
+    record = {"message": message}
+    assert vendor_parsers.enrich(record) == name
+    assert {key: record.get(key) for key in expected} == expected
+    assert record["message"] == message
+    # The addresses reach the typed columns, everything else the attributes
+    assert ip_fields.extract(record, None)["src_ip"] == record.get("src_ip")
+    assert "vendor" not in attributes.extract(record)
+
+def test_record_fields_win():
+    record = {"message": FORTIGATE, "vendor": "Fortinet", "device_type": "NGFW", "severity": "critical"}
+    assert vendor_parsers.enrich(record) == "fortigate"
+    assert (record["device_type"], record["severity"], record["src_ip"]) == ("NGFW", "critical", "10.0.0.1")
+
+def test_port_and_vendor_dispatch():
+    registry = ParserRegistry([parser() for parser in PARSERS], "5514=cisco_asa")
+    # A syslog header hides the prefix; the port or vendor still selects the parser
+    message = "May  1 12:00:00 asa-01 : " + ASA_OUTBOUND
+    assert registry.by_prefix(message) is None
+    assert registry.enrich({"message": message}) is None
+    header = len("May  1 12:00:00 asa-01 : ")
+    assert registry.enrich({"message": ASA_OUTBOUND, "ingest_port": "5514"}) == "cisco_asa"
+    assert registry.enrich({"message": message[header:], "vendor": "CISCO"}) == "cisco_asa"
+    # A parser that does not recognize the message falls through to the prefix table
+    assert registry.enrich({"message": F5, "ingest_port": 5514}) == "f5"
+    with pytest.raises(ValueError):
+        registry.set_ports("5514=juniper")
+
+def test_non_vendor_messages_are_left_alone():
+    for message in ["Interface Gi0/1 changed state to down", "1, 2, 3", "[INFO] started", "info: ok", "<13>", ""]:
+        record = {"message": message, "vendor": "Cisco"}
+        assert vendor_parsers.enrich(record) is None
+        assert record == {"message": message, "vendor": "Cisco"}
+    assert vendor_parsers.enrich({"message": None}) is None
+    assert ParserRegistry([parser() for parser in PARSERS], enabled=False).enrich({"message": FORTIGATE}) is None
+    assert message_body("<134>1,2") == "1,2" and message_body("<x>1") == "<x>1"
+
+def test_registered_parser_replaces_one_of_the_same_name():
+    class Custom(VendorParser):
+        name = "f5"
+        prefixes = ("f5:",)
+
+        def parse(self, message):
+            return {"vendor": "Custom"}
+
+    registry = ParserRegistry([parser() for parser in PARSERS])
+    registry.register(Custom())
+    assert registry.enrich({"message": F5}) is None
+    record = {"message": "f5: hello"}
+    assert registry.enrich(record) == "f5" and record["vendor"] == "Custom"
+
+@pytest.mark.parametrize("name", list(SAMPLES))
+def test_benchmark_samples_parse(name):
+    expected = 0 if name == UNMATCHED else 200
+    assert bench(name, 200, 1)["matched"] == expected
+    assert samples(name, 5) == samples(name, 5)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from Backend.benchmarks.build_dataset import build_sources, copy_value, log_rows, template_text, LOG_COLUMNS
+from Backend.benchmarks.query_bench import build_cases, plan_summary, LOG_FILTERS
+
+NOW = datetime(2024, 5, 1, 12, 0)
+
+def test_sources_are_consistent_and_skewed():
+    customers, vendors, devices = build_sources(customers=50, vendors=10, devices=2000, skew=1.1, seed=1)
+    vendor_owner = {vendor_id: customer_id for vendor_id, _, customer_id in vendors}
+    cnnid_of = {customer_id: cnnid for customer_id, cnnid, _ in customers}
+    vendor_name = {vendor_id: name for vendor_id, name, _ in vendors}
+    for _, _, _, vendor_id, cnnid, name in devices:
+        assert cnnid_of[vendor_owner[vendor_id]] == cnnid and vendor_name[vendor_id] == name
+    top = sum(1 for device in devices if device[4] == customers[0][1])
+    assert top > len(devices) / 10
+
+def test_log_rows_are_deterministic_and_time_ordered():
+    _, _, devices = build_sources(5, 3, 100, 1.1, seed=1)
+    rows = list(log_rows(devices, 1.1, NOW - timedelta(hours=1), NOW, 500, seed=7, now=NOW))
+    assert rows == list(log_rows(devices, 1.1, NOW - timedelta(hours=1), NOW, 500, seed=7, now=NOW))
+    assert len(rows) == 500 and all(len(row) == len(LOG_COLUMNS) for row in rows)
+    timestamps = [row[0] for row in rows]
+    assert timestamps == sorted(timestamps) and NOW - timedelta(hours=1) <= timestamps[0] and timestamps[-1] <= NOW
+
+def test_copy_encoding_and_templates():
+    assert copy_value(None) == "\\N"
+    assert copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_value(NOW) == "2024-05-01 12:00:00"
+    assert template_text("Connection from {ip} port {port} accepted") == "Connection from <*> port <*> accepted"
+
+def test_cases_cover_every_filter_combination():
+    cases = build_cases({"last": NOW, "cnnid": "CNN00000", "rare_cnnid": "CNN00049", "vendor": "Cisco",
+                         "rare_vendor": "Vendor 9", "device_type": "firewall"})
+    names = [name for name, _, _ in cases]
+    assert len(names) == len(set(names))
+    assert sum(name.startswith("logs/filter/") and "rare" not in name for name in names) == 2 ** len(LOG_FILTERS)
+    params = dict((name, params) for name, _, params in cases)
+    assert params["logs/filter/cnnid+time"]["cnnid"] == "CNN00000"
+    assert params["logs/page/10000"]["page"] == 10000
+
+def test_plan_summary():
+    plan = {
+        "Planning Time": 0.2, "Execution Time": 12.5,
+        "Plan": {
+            "Node Type": "Limit", "Shared Hit Blocks": 90, "Shared Read Blocks": 10,
+            "Plans": [{
+                "Node Type": "Nested Loop", "Plans": [
+                    {"Node Type": "Seq Scan", "Actual Rows": 100, "Actual Loops": 1, "Rows Removed by Filter": 900},
+                    {"Node Type": "Index Scan", "Actual Rows": 1, "Actual Loops": 100},
+                ],
+            }],
+        },
+    }
+    summary = plan_summary(plan)
+    assert summary["rows_scanned"] == 1100
+    assert summary["shared_hit_blocks"] == 90 and summary["shared_read_blocks"] == 10
+    assert summary["execution_ms"] == 12.5
@@ -0,0 +1,50 @@
+from sqlalchemy import create_engine, text
+
+from Backend.api.query_profiler import QueryProfiler, fingerprint_of, normalize, plan_summary
+
+def test_normalize_groups_statements_by_shape():
+    first = normalize("SELECT * FROM logs WHERE vendor = 'Cisco' AND id IN (1, 2, 3) LIMIT 10 -- page 1")
+    second = normalize("SELECT *\n  FROM logs WHERE vendor = 'F5' AND id IN (7) LIMIT 100")
+    assert first == second == "SELECT * FROM logs WHERE vendor = ? AND id IN (...) LIMIT ?"
+    assert normalize("SELECT logs_1.id FROM logs AS logs_1 WHERE logs_1.cnnid = %(cnnid_1)s") == \
+        "SELECT logs_1.id FROM logs AS logs_1 WHERE logs_1.cnnid = ?"
+    assert normalize("SELECT timestamp::date FROM logs WHERE vendor = :vendor") == "SELECT timestamp::date FROM logs WHERE vendor = ?"
+    assert normalize("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert fingerprint_of(first) != fingerprint_of(normalize("SELECT * FROM logs WHERE cnnid = 'x'"))
+
+def test_stats_per_fingerprint_and_eviction():
+    profiler = QueryProfiler(slow_seconds=1, sample_interval_seconds=60, max_fingerprints=2, max_plans=10)
+    engine = create_engine("sqlite://")
+    profiler.attach(engine)
+    with engine.connect() as connection:
+        for value in range(3):
+            connection.execute(text(f"SELECT {value}"))
+        connection.execute(text("SELECT 1 WHERE 1 = :x"), {"x": 1})
+    top = profiler.top("calls")
+    assert top[0]["query"] == "SELECT ?" and top[0]["calls"] == 3
+    assert profiler.get(top[0]["fingerprint"])["plans"] == []
+
+    profiler.record("SELECT a FROM b", None, 0.1, 1)
+    profiler.record("SELECT c FROM d", None, 0.1, 1)
+    assert len(profiler.top()) == 2 and profiler.get(top[0]["fingerprint"]) is None
+
+def test_slow_selects_are_sampled_once_per_interval():
+    profiler = QueryProfiler(slow_seconds=0.5, sample_interval_seconds=60, max_fingerprints=10, max_plans=10)
+    submitted = []
+    profiler._explainable = lambda statement: statement.startswith("SELECT")
+    profiler._submit = lambda fingerprint, statement, parameters, seconds: submitted.append((statement, parameters))
+    profiler.record("SELECT * FROM logs WHERE vendor = %(v)s", {"v": "Cisco"}, 0.1, 10)
+    profiler.record("SELECT * FROM logs WHERE vendor = %(v)s", {"v": "F5"}, 0.9, 10)
+    profiler.record("SELECT * FROM logs WHERE vendor = %(v)s", {"v": "F5"}, 2.0, 10)
+    profiler.record("UPDATE logs SET repeat_count = 2", {}, 3.0, 1)
+    assert submitted == [("SELECT * FROM logs WHERE vendor = %(v)s", {"v": "F5"})]
+    select = next(stats for stats in profiler.top() if stats["query"].startswith("SELECT"))
+    assert select["calls"] == 3 and select["slow_calls"] == 2
+
+def test_plan_summary_reports_seq_scans():
+    plan = {"Execution Time": 5.0, "Plan": {"Node Type": "Aggregate", "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "logs", "Actual Rows": 10, "Actual Loops": 1, "Rows Removed by Filter": 90},
+        {"Node Type": "Index Scan", "Relation Name": "devices", "Actual Rows": 1, "Actual Loops": 10},
+    ]}}
+    summary = plan_summary(plan)
+    assert summary["seq_scans"] == ["logs"] and summary["rows_scanned"] == 110
@@ -0,0 +1,96 @@
+import json
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, IngestDrop
+from Backend.api.rate_limiter import IngestRateLimiter, DropCounter, Rule
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("Backend.api.rate_limiter.time.monotonic", lambda: now[0])
+    return now
+
+def admitted(limiter, count, cnnid="CNN001", severity="low", device="FW1"):
+    return sum(limiter.admit(cnnid, "Fortinet", device, severity) is None for _ in range(count))
+
+def test_drop_over_budget_and_refill(clock):
+    limiter = IngestRateLimiter(None)
+    limiter.set_rules([Rule("cnnid", rate=10, burst=20, action="drop")])
+    assert admitted(limiter, 100) == 20
+    # Other tenants have their own bucket
+    assert admitted(limiter, 5, cnnid="CNN002") == 5
+    clock[0] += 1
+    assert admitted(limiter, 100) == 10
+
+def test_sample_and_severity_actions(clock):
+    limiter = IngestRateLimiter(None)
+    limiter.set_rules([Rule("device", rate=1, burst=10, action="sample", sample_every=5)])
+    assert admitted(limiter, 110) == 10 + 20
+
+    limiter.set_rules([Rule("device", rate=1, burst=10, action="severity", min_severity="high")])
+    assert admitted(limiter, 10) == 10
+    assert admitted(limiter, 10, severity="medium") == 0
+    assert admitted(limiter, 10, severity="critical") == 10
+    assert limiter.admit("CNN001", "Fortinet", "FW1", "low") == "severity"
+
+def test_match_limits_rule_to_sources(clock):
+    limiter = IngestRateLimiter(None)
+    limiter.set_rules([Rule("cnnid", rate=1, burst=1, match={"cnnid": "CNN001"})])
+    assert admitted(limiter, 10) == 1
+    assert admitted(limiter, 10, cnnid="CNN002") == 10
+
+def test_idle_buckets_are_evicted(clock):
+    limiter = IngestRateLimiter(None)
+    limiter.set_rules([Rule("device", rate=10, burst=10)])
+    for i in range(1000):
+        limiter.admit("CNN001", "Fortinet", f"FW{i}", "low")
+    assert limiter.status()["active_buckets"] == 1000
+    clock[0] += 61
+    limiter.admit("CNN001", "Fortinet", "FW-new", "low")
+    assert limiter.status()["active_buckets"] == 1
+
+def test_policy_file_is_hot_reloaded(clock, tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"rules": [{"key": "cnnid", "rate": 1, "burst": 2}]}))
+    limiter = IngestRateLimiter(str(path), reload_seconds=5)
+    assert admitted(limiter, 10) == 2
+
+    path.write_text(json.dumps({"rules": [{"key": "cnnid", "rate": 1, "burst": 5}]}))
+    os.utime(path, (2000, 2000))
+    assert admitted(limiter, 10) == 0
+    clock[0] += 5
+    assert admitted(limiter, 10) == 5
+
+    path.write_text("{not json")
+    os.utime(path, (3000, 3000))
+    clock[0] += 5
+    assert limiter.status()["rules"][0]["burst"] == 5
+
+    path.unlink()
+    clock[0] += 5
+    assert admitted(limiter, 10) == 10
+
+def test_invalid_rule_is_rejected():
+    with pytest.raises(ValueError):
+        Rule("customer", rate=1, burst=1)
+    with pytest.raises(ValueError):
+        Rule("cnnid", rate=1, burst=1, action="queue")
+
+def test_drop_counts_are_merged_into_table():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    counter = DropCounter(flush_seconds=10)
+    for second in range(3):
+        counter.record(datetime(2024, 5, 1, 12, 0, second), "CNN001", "Fortinet", "FW", "low", "drop")
+    counter.flush(db)
+    counter.record(datetime(2024, 5, 1, 12, 0, 30), "CNN001", "Fortinet", "FW", "LOW", "drop", count=4)
+    counter.record(datetime(2024, 5, 1, 12, 1, 0), "CNN001", "Fortinet", "FW", "low", "sample")
+    counter.flush(db)
+    rows = db.query(IngestDrop).order_by(IngestDrop.bucket_start).all()
+    assert [(row.bucket_start.minute, row.action, row.count) for row in rows] == [(0, "drop", 7), (1, "sample", 1)]
+    db.close()
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, LogEntry, LogEntryResponse
+from Backend.api.recent_logs import RecentLogBuffer, snapshot
+
+START = datetime(2026, 1, 1)
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def _add_logs(db, count, offset=0, seed=1):
+    rng = random.Random(seed)
+    logs = [
+        LogEntry(
+            timestamp=START + timedelta(seconds=offset + i + rng.randint(-30, 30)),
+            message=f"Event {offset + i}",
+            severity=rng.choice(["low", "medium", "high", "critical"]),
+            device_id=1,
+            vendor=rng.choice(["Cisco", "F5", "Fortinet"]),
+            device_type=rng.choice(["Firewall", "Router"]),
+            cnnid=f"CNN00{rng.randint(0, 4)}",
+        )
+        for i in range(count)
+    ]
+    db.add_all(logs)
+    db.commit()
+    return logs
+
+def _from_db(db, offset, limit, cnnid=None, vendor=None, severity=None, start_time=None):
+    query = db.query(LogEntry)
+    if cnnid:
+        query = query.filter(LogEntry.cnnid == cnnid)
+    if vendor:
+        query = query.filter(func.lower(LogEntry.vendor) == vendor.lower())
+    if severity:
+        query = query.filter(LogEntry.severity == severity)
+    if start_time:
+        query = query.filter(LogEntry.timestamp >= start_time)
+    return [log.id for log in query.order_by(desc(LogEntry.timestamp), desc(LogEntry.id)).offset(offset).limit(limit)]
+
+def test_pages_match_the_database(db_session):
+    _add_logs(db_session, 500)
+    buffer = RecentLogBuffer(200, 0, 0)
+    for filters in [{}, {"cnnid": "CNN002"}, {"vendor": "cisco"}, {"severity": "high", "vendor": "F5"}]:
+        for offset in (0, 10):
+            page = buffer.page(db_session, offset, 10, **filters)
+            assert [entry.id for entry in page] == _from_db(db_session, offset, 10, **filters)
+    # Deeper than the buffer, or reaching below its floor
+    assert buffer.page(db_session, 200, 10) is None
+    assert buffer.page(db_session, 0, 100, cnnid="CNN001") is None
+    # A range the buffer covers is answered even when it has fewer rows than asked for
+    start_time = START + timedelta(seconds=450)
+    page = buffer.page(db_session, 0, 100, start_time=start_time, cnnid="CNN001")
+    assert [entry.id for entry in page] == _from_db(db_session, 0, 100, cnnid="CNN001", start_time=start_time)
+
+def test_ingested_rows_and_eviction(db_session):
+    buffer = RecentLogBuffer(50, 0, 0)
+    assert buffer.page(db_session, 0, 10) == []
+    logs = _add_logs(db_session, 120)
+    buffer.add([snapshot(db_session, log) for log in logs])
+    assert [entry.id for entry in buffer.page(db_session, 0, 50)] == _from_db(db_session, 0, 50)
+    assert buffer.page(db_session, 45, 10) is None
+
+    newest = buffer.page(db_session, 0, 1)[0]
+    buffer.add_repeats(newest.id, 3, newest.timestamp + timedelta(minutes=1))
+    assert buffer.page(db_session, 0, 1)[0].repeat_count == newest.repeat_count + 3
+
+def test_sync_picks_up_rows_from_other_workers(db_session):
+    _add_logs(db_session, 20)
+    buffer = RecentLogBuffer(100, 0.01, 0)
+    assert len(buffer.page(db_session, 0, 100)) == 20
+    _add_logs(db_session, 5, offset=1000, seed=2)
+    buffer._synced = 0.0
+    assert [entry.id for entry in buffer.page(db_session, 0, 10)] == _from_db(db_session, 0, 10)
+
+def test_total_is_cached_and_advanced_by_new_rows(db_session):
+    _add_logs(db_session, 30)
+    buffer = RecentLogBuffer(100, 0, 60)
+    buffer.page(db_session, 0, 10)
+    counted = []
+    def count():
+        counted.append(1)
+        return db_session.query(LogEntry).filter(LogEntry.vendor == "Cisco").count()
+    filters = {"vendor": "Cisco"}
+    expected = count()
+    assert buffer.total(filters, count) == expected
+    new = _add_logs(db_session, 10, offset=2000, seed=3)
+    buffer.add([LogEntryResponse.from_orm(log) for log in new])
+    assert buffer.total(filters, count) == expected + sum(1 for log in new if log.vendor == "Cisco")
+    assert len(counted) == 2
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from Backend.api.database import get_db
+from Backend.api.dependencies import get_current_user
+from Backend.api.deduplication import DedupWindow
+from Backend.api.idempotency import IdempotencyStore
+from Backend.api.models import Base, LogEntry
+from Backend.api.routes import logs as log_routes, search
+from Backend.api.template_miner import TemplateMiner, TemplateStore
+
+class NdjsonRequest:
+    headers = {"content-type": "application/x-ndjson"}
+
+    def __init__(self, entries):
+        self._body = "\n".join(json.dumps(entry) for entry in entries).encode("utf-8")
+
+    async def stream(self):
+        yield self._body
+
+def records():
+    fortigate = [
+        {"timestamp": f"2026-05-01T12:00:{i:02d}", "cnnid": f"CNN00{i % 2}", "product": "FGT60E", "severity": "low",
+         "message": f'devid="FGT60E{i % 3}" type="traffic" srcip=10.{i % 3}.0.{i + 1} srcport={40000 + i} '
+                    f'dstip={["192.168.1.1", "8.8.8.8"][i % 2]} dstport={[22, 443][i % 2]} '
+                    f'action="{["accept", "deny"][i % 2]}" policyid={i % 4}'}
+        for i in range(12)
+    ]
+    cisco = [
+        {"timestamp": f"2026-05-01T12:01:{i:02d}", "cnnid": "CNN001", "vendor": "Cisco", "product": "ISR4321",
+         "device_type": "Router", "severity": "high", "message": f"Interface Gi0/{i} changed state to down"}
+        for i in range(4)
+    ]
+    return fortigate + cisco
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(log_routes, "dedup_window", DedupWindow(0, 0))
+    monkeypatch.setattr(log_routes, "idempotency_store", IdempotencyStore(3600))
+    # Template IDs of other tests' databases must not leak into this one
+    monkeypatch.setattr(log_routes, "template_store", TemplateStore(TemplateMiner()))
+    db = factory()
+    asyncio.get_event_loop().run_until_complete(log_routes.create_log(NdjsonRequest(records()), db))
+    db.close()
+
+    app = FastAPI()
+    app.include_router(search.router, prefix="/api/v1")
+    def override_get_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: None
+    test_client = TestClient(app)
+    test_client.factory = factory
+    return test_client
+
+def found(client, **params):
+    response = client.get("/api/v1/search", params=dict({"page_size": 100}, **params))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_filters_on_the_log_row(client):
+    body = found(client)
+    assert body["total"] == 16
+    first = body["items"][0]
+    assert (first["vendor"], first["cnnid"], first["product"]) == ("Cisco", "CNN001", "ISR4321")
+    assert found(client, cnnid="CNN001")["total"] == 10
+    # Vendor and device type match case-insensitively, like /logs
+    assert found(client, vendor="fortinet")["total"] == 12
+    assert found(client, vendor="Cisco", device_type="router", cnnid="CNN001")["total"] == 4
+    assert found(client, query="Gi0/2")["total"] == 1
+
+    db = client.factory()
+    template_id = db.query(LogEntry.template_id).filter(LogEntry.vendor == "Cisco").first()[0]
+    db.close()
+    assert {item["vendor"] for item in found(client, template_id=template_id)["items"]} == {"Cisco"}
+    assert client.get("/api/v1/search", params={"sort_by": "nope"}).status_code == 400
+
+def test_filters_by_address_and_port(client):
+    assert found(client, src_ip="10.1.0.0/16")["total"] == 4
+    assert found(client, dst_ip="192.168.1.1")["total"] == 6
+    assert found(client, src_ip="10.0.0.0/8", dst_port=443, cnnid="CNN001")["total"] == 6
+    item = found(client, src_port=40003)["items"]
+    assert [(log["src_ip"], log["dst_ip"], log["dst_port"]) for log in item] == [("10.0.0.4", "8.8.8.8", 443)]
+    assert client.get("/api/v1/search", params={"src_ip": "10.0.0.300"}).status_code == 400
+
+def test_filters_by_attributes(client):
+    assert found(client, **{"attr.action": "deny"})["total"] == 6
+    assert found(client, **{"attr.devid": "FGT60E0", "attr.action": "deny"})["total"] == 2
+    items = found(client, **{"attr.devid": "FGT60E1", "vendor": "Fortinet"})["items"]
+    assert len(items) == 4 and all(item["attributes"]["devid"] == "FGT60E1" for item in items)
+    assert found(client, **{"attr.devid": "FGT60E9"})["total"] == 0
+    assert client.get("/api/v1/search", params={"attr.a'b": "x"}).status_code == 400
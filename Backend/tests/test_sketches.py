@@ -0,0 +1,114 @@
+import random
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from Backend.api.database import get_db
+from Backend.api.models import Base
+from Backend.api.routes import sketches as sketch_routes
+from Backend.api.sketches import CountMinTopK, HyperLogLog, TDigest, SketchAggregator
+
+def test_count_min_finds_heavy_hitters():
+    sketch = CountMinTopK(capacity=16)
+    for i in range(5000):
+        sketch.add(f"device-{i % 500}")
+    for _ in range(3):
+        for key in ("noisy-1", "noisy-2"):
+            for _ in range(400):
+                sketch.add(key)
+    top = sketch.top(2)
+    assert {key for key, _ in top} == {"noisy-1", "noisy-2"}
+    assert all(count >= 1200 for _, count in top)
+
+def test_count_min_merge_and_round_trip():
+    first, second = CountMinTopK(), CountMinTopK()
+    for _ in range(100):
+        first.add("a")
+        second.add("a")
+        second.add("b")
+    first.merge(second)
+    restored = CountMinTopK.from_bytes(first.to_bytes())
+    assert restored.estimate("a") == 200
+    assert restored.top(1) == [("a", 200)]
+
+def test_hyperloglog_cardinality():
+    first, second = HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        first.add(f"key-{i}")
+    for i in range(10000, 30000):
+        second.add(f"key-{i}")
+    first.merge(second)
+    restored = HyperLogLog.from_bytes(first.to_bytes())
+    assert abs(restored.cardinality() - 30000) < 30000 * 0.05
+    assert len(first.to_bytes()) < 5000
+
+def test_tdigest_quantiles():
+    random.seed(42)
+    values = [random.gauss(200, 50) for _ in range(20000)]
+    first, second = TDigest(), TDigest()
+    for i, value in enumerate(values):
+        (first if i % 2 else second).add(value)
+    first.merge(second)
+    restored = TDigest.from_bytes(first.to_bytes())
+    values.sort()
+    for q in (0.5, 0.9, 0.99):
+        assert abs(restored.quantile(q) - values[int(q * len(values))]) < 5
+    assert restored.count == 20000
+
+def test_aggregator_flush_and_query():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    aggregator = SketchAggregator(bucket_seconds=300, flush_seconds=0)
+    now = datetime.utcnow()
+    for i in range(600):
+        aggregator.observe(now - timedelta(seconds=i), f"CNN00{i % 3}", f"CNN00{i % 3}/fw-{i % 10}", 40 + i % 20)
+    aggregator.flush(db)
+    aggregator.observe(now, "CNN009", "CNN009/fw-0", 100)
+
+    top = aggregator.query(db, "topk", "customer", now - timedelta(minutes=15), now)
+    assert {key for key, _ in top.top(3)} == {"CNN000", "CNN001", "CNN002"}
+    assert top.top(4)[-1] == ("CNN009", 1)
+    distinct = aggregator.query(db, "hll", "device", now - timedelta(minutes=15), now)
+    assert distinct.cardinality() == 31
+    lengths = aggregator.query(db, "tdigest", "message_length", now - timedelta(minutes=15), now)
+    assert lengths.count == 601
+    db.close()
+
+def test_routes_accept_bounds_with_an_offset(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    aggregator = SketchAggregator(bucket_seconds=300, flush_seconds=0)
+    now = datetime.utcnow()
+    for i in range(30):
+        aggregator.observe(now - timedelta(minutes=i), "CNN001", f"CNN001/fw-{i % 3}", 40)
+    db = factory()
+    aggregator.flush(db)
+    db.close()
+    monkeypatch.setattr(sketch_routes, "sketch_aggregator", aggregator)
+
+    app = FastAPI()
+    app.include_router(sketch_routes.router, prefix="/api/v1")
+    def override_get_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    since = (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    response = client.get("/api/v1/sketches/distinct", params={"start_time": since})
+    assert response.status_code == 200, response.text
+    assert response.json()["distinct"] == 3
+    # +02:00 is two hours ahead of UTC, so this end_time is an hour before start_time
+    later = (now - timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%S")
+    response = client.get("/api/v1/sketches/top", params={"start_time": since, "end_time": later + "+02:00"})
+    assert response.status_code == 400
+    until = (now + timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    top = client.get("/api/v1/sketches/top", params={"dimension": "customer", "end_time": until}).json()["top"]
+    assert top == [{"key": "CNN001", "count": 30}]
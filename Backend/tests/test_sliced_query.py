@@ -0,0 +1,109 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.cold_storage import sort_key
+from Backend.api.models import Base, LogEntry, LogEntryResponse
+from Backend.api.sliced_query import SlicedExecutor, TimeSlice, split, sum_counts
+
+START = datetime(2026, 2, 1)
+
+@pytest.fixture(scope="function")
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sliced.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        LogEntry(
+            timestamp=START + timedelta(hours=5 * i),
+            message=f"Event {i}",
+            severity=["low", "medium", "high", "critical"][i % 4],
+            device_id=1,
+            vendor=["Cisco", "F5", "Fortinet"][i % 3],
+            repeat_count=1 + i % 3,
+        )
+        for i in range(200)
+    ])
+    # Exactly on a day boundary, and in the future
+    db.add(LogEntry(timestamp=datetime(2026, 2, 10), message="midnight", severity="low", device_id=1, vendor="F5"))
+    db.add(LogEntry(timestamp=datetime(2099, 1, 1), message="future", severity="low", device_id=1, vendor="F5"))
+    db.commit()
+    db.close()
+    return factory
+
+def _vendor_counts(db, time_slice):
+    query = time_slice.apply(db.query(LogEntry.vendor, func.sum(LogEntry.repeat_count)).group_by(LogEntry.vendor))
+    return dict(query.all())
+
+def test_split_is_day_aligned_and_closed_at_the_end():
+    slices = split(datetime(2026, 2, 1, 18), datetime(2026, 2, 4, 6))
+    assert [(s.start, s.end, s.end_inclusive) for s in slices] == [
+        (datetime(2026, 2, 1, 18), datetime(2026, 2, 2), False),
+        (datetime(2026, 2, 2), datetime(2026, 2, 3), False),
+        (datetime(2026, 2, 3), datetime(2026, 2, 4), False),
+        (datetime(2026, 2, 4), datetime(2026, 2, 4, 6), True),
+    ]
+    assert len(split(datetime(2026, 2, 1, 1), datetime(2026, 2, 1, 2))) == 1
+
+@pytest.mark.parametrize("start,end", [
+    (START, START + timedelta(days=30)),
+    (START + timedelta(hours=7), datetime(2026, 2, 10)),
+    (None, None),
+    (START + timedelta(days=20), None),
+])
+def test_sliced_aggregates_match_one_query(session_factory, start, end):
+    executor = SlicedExecutor(session_factory, budget=3, parallelism=2, slice_seconds=86400, min_slices=2)
+    db = session_factory()
+    expected = _vendor_counts(db, TimeSlice(start, end, True))
+    assert executor.aggregate(db, _vendor_counts, sum_counts, start, end) == expected
+    assert len(executor.slices(db, start, end)) > 2
+    db.close()
+
+@pytest.mark.parametrize("sort_by,descending", [("vendor", False), ("vendor", True), ("timestamp", True), ("timestamp", False)])
+def test_top_rows_merge_matches_one_ordered_query(session_factory, sort_by, descending):
+    executor = SlicedExecutor(session_factory, budget=4, parallelism=4, slice_seconds=86400, min_slices=2)
+    db = session_factory()
+    column = getattr(LogEntry, sort_by)
+    ordered = db.query(LogEntry).order_by(desc(column) if descending else column, LogEntry.id)
+    def window(slice_db, time_slice):
+        logs = time_slice.apply(ordered.with_session(slice_db)).limit(25).all()
+        return [LogEntryResponse.from_orm(log) for log in logs]
+    start, end = START, START + timedelta(days=40)
+    merged = executor.top_rows(db, window, sort_by, descending, 25, start, end)
+    expected = [LogEntryResponse.from_orm(log) for log in TimeSlice(start, end, True).apply(ordered).limit(25)]
+    key = sort_key(sort_by)
+    assert [key(row) for row in merged] == [key(row) for row in expected]
+    if sort_by == "timestamp":
+        assert [row.id for row in merged] == [row.id for row in expected]
+    db.close()
+
+def test_concurrency_budget(session_factory):
+    executor = SlicedExecutor(session_factory, budget=3, parallelism=2, slice_seconds=86400, min_slices=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+    def slow(slice_db, time_slice):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return 1
+
+    db = session_factory()
+    assert sum(executor.map(db, slow, START, START + timedelta(days=10))) == 11
+    assert peak[0] == 2
+    peak[0] = 0
+    threads = [threading.Thread(target=executor.map, args=(session_factory(), slow, START, START + timedelta(days=10)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 3
+    db.close()
@@ -0,0 +1,105 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.cold_storage import ColdStore
+from Backend.api.models import Base, Device, LogEntry, SeverityEnum, Vendor
+from Backend.api.routes import statistics
+from Backend.api.sliced_query import SlicedExecutor, TimeSlice
+
+# GROUPING SETS needs Postgres; the tests using it are skipped when it is not reachable
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "postgresql://loguser:logpassword@db:5432/logdb")
+
+@pytest.fixture(scope="function")
+def pg_factory():
+    schema = f"test_statistics_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(TEST_DATABASE_URL, connect_args={"connect_timeout": 3})
+    try:
+        with admin.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {schema}"))
+    except OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+def _group_by(db, column):
+    query = db.query(column, func.sum(LogEntry.repeat_count)).filter(column.isnot(None))
+    return {getattr(value, "value", value): count for value, count in query.group_by(column).all()}
+
+def test_facets_match_plain_group_by_across_tiers(pg_factory, tmp_path, monkeypatch):
+    now = datetime.utcnow()
+    db = pg_factory()
+    device = Device(name="ASA", type="Firewall", vendor=Vendor(name="Cisco"))
+    db.add(device)
+    db.commit()
+    db.add_all([
+        LogEntry(
+            timestamp=now - timedelta(hours=7 * i),
+            message=f"Event {i}",
+            severity=["low", "medium", "high", "critical"][i % 4],
+            device_id=device.id,
+            vendor=["Cisco", "F5", "Fortinet", None][i % 4],
+            device_type=["Firewall", "Router"][i % 2],
+            cnnid=f"CNN00{i % 3}",
+            repeat_count=1 + i % 3,
+        )
+        for i in range(300)
+    ])
+    db.commit()
+    daily_since = datetime.combine(now.date() - timedelta(days=20), datetime.min.time())
+    facets = list(statistics.FACET_COLUMNS)
+    expected = {
+        "total": db.query(func.sum(LogEntry.repeat_count)).scalar(),
+        "facets": {name: _group_by(db, statistics.FACET_COLUMNS[name]) for name in facets},
+        "daily": {str(day): count for day, count in db.query(func.date(LogEntry.timestamp), func.sum(LogEntry.repeat_count))
+                  .filter(LogEntry.timestamp >= daily_since).group_by(func.date(LogEntry.timestamp)).all()},
+    }
+
+    store = ColdStore(str(tmp_path))
+    assert store.run_tiering(db, 7) > 0
+    monkeypatch.setattr(statistics, "cold_store", store)
+    monkeypatch.setattr(statistics, "sliced_executor",
+                        SlicedExecutor(pg_factory, budget=2, parallelism=2, slice_seconds=86400, min_slices=2))
+    result = statistics.compute_facets(db, facets, daily_since=daily_since)
+    assert result["total"] == expected["total"]
+    assert result["facets"] == expected["facets"]
+    assert result["daily"] == dict(sorted(expected["daily"].items()))
+    top = statistics.compute_facets(db, ["vendor"], top_k=2)["facets"]["vendor"]
+    assert list(top.values()) == sorted(expected["facets"]["vendor"].values(), reverse=True)[:2]
+    db.close()
+
+class GroupingSetsResult:
+    """Rows in the shape Postgres returns for _hot_facets' GROUPING SETS statement."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, statement):
+        return self.rows
+
+def test_grouping_flags_are_decoded():
+    # vendor, severity, day, GROUPING() of each, sum(repeat_count), daily sum
+    rows = [
+        (None, None, None, 1, 1, 1, 42, 30),
+        ("Cisco", None, None, 0, 1, 1, 30, 20),
+        (None, None, None, 0, 1, 1, 12, 10),
+        (None, SeverityEnum.high, None, 1, 0, 1, 42, 30),
+        (None, None, "2026-05-01", 1, 1, 0, 40, 28),
+        (None, None, "2026-04-01", 1, 1, 0, 2, None),
+    ]
+    total, facet_counts, daily = statistics._hot_facets(GroupingSetsResult(rows), ["vendor", "severity"], TimeSlice(None, None, True), None)
+    assert total == 42
+    # A NULL value of a grouped column is left out, not mistaken for the total
+    assert facet_counts == {"vendor": {"Cisco": 30}, "severity": {"high": 42}}
+    # Days before daily_since have no daily count
+    assert daily == {"2026-05-01": 28}
@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api.models import Base, LogTemplate
+from Backend.api.template_miner import TemplateMiner, TemplateStore
+
+def test_variable_tokens_become_wildcards():
+    miner = TemplateMiner()
+    first, is_new, _ = miner.add("Test log message from firewall")
+    second, is_new_again, changed = miner.add("Test log message from router")
+    assert is_new and not is_new_again and changed
+    assert first is second
+    assert second.template == "Test log message from <*>"
+    assert second.parameters("Test log message from switch".split()) == ["switch"]
+
+def test_key_value_fields_keep_their_names():
+    miner = TemplateMiner()
+    cluster, _, _ = miner.add("devid=FGT60E4Q16000000 srcip=10.0.0.1 action=deny")
+    assert cluster.template == "devid=<*> srcip=<*> action=deny"
+    cluster, _, changed = miner.add("devid=FGT60E4Q16000001 srcip=10.0.0.9 action=accept")
+    assert changed
+    assert cluster.template == "devid=<*> srcip=<*> action=<*>"
+    assert cluster.parameters("devid=FGT1 srcip=10.0.0.2 action=deny".split()) == ["FGT1", "10.0.0.2", "deny"]
+
+def test_different_shapes_get_different_templates():
+    miner = TemplateMiner()
+    login, _, _ = miner.add("User login successful")
+    error, _, _ = miner.add("Database connection error on port 5432")
+    assert login is not error
+    assert miner.add("User login successful")[0] is login
+
+def test_store_keeps_ids_across_restarts():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    store = TemplateStore(TemplateMiner())
+    first_id, params = store.match(db, "Connection from 10.0.0.1 closed")
+    assert params == ["10.0.0.1"]
+    assert store.match(db, "Connection from 10.0.0.2 closed")[0] == first_id
+    other_id, _ = store.match(db, "Disk usage above threshold")
+    db.commit()
+    assert other_id != first_id
+    assert db.query(LogTemplate).count() == 2
+
+    restarted = TemplateStore(TemplateMiner())
+    assert restarted.match(db, "Connection from 10.9.9.9 closed") == (first_id, ["10.9.9.9"])
+    db.close()
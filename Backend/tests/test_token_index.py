@@ -0,0 +1,128 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.api import message_codec as message_codec_module, token_index as token_index_module
+from Backend.api.message_codec import MessageCodec
+from Backend.api.models import Base, LogEntry, LogTokenBloom
+from Backend.api.token_index import BloomFilter, TokenIndex, token_pattern, tokenize
+
+START = datetime(2026, 4, 1)
+
+@pytest.fixture(scope="function")
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tokens.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        LogEntry(
+            id=i,
+            timestamp=START + timedelta(minutes=i),
+            message=f"Session req-{i:05d} from 10.{i % 3}.0.{i % 50}:514 user=J.Doe.",
+            severity="low",
+            device_id=1,
+            created_at=START,
+        )
+        for i in range(1, 451)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+def _index(session_factory, **kwargs):
+    options = dict(chunk_rows=100, false_positive_rate=0.01, seal_seconds=0, seal_delay_seconds=60,
+                   cache_bytes=1 << 20, session_factory=session_factory)
+    options.update(kwargs)
+    return TokenIndex(**options)
+
+def test_tokenize():
+    assert tokenize("src=10.1.2.3:514 user=J.Doe. -- mac aa:bb") == {"src", "10.1.2.3", "514", "user", "j.doe", "mac", "aa", "bb"}
+    assert tokenize(None) == set()
+
+@pytest.mark.parametrize("message", [
+    "from 10.1.2.3:514", "src=10.1.2.3", "10.1.2.3.", "x 10.1.2.33", "110.1.2.3", "ip:10.1.2.3,", "..10.1.2.3-",
+])
+@pytest.mark.parametrize("value", ["10.1.2.3", "1.2", "ip:10.1.2.3"])
+def test_pattern_matches_imply_tokens(message, value):
+    # Whenever the search pattern matches, the message has every token of the value
+    if re.search(token_pattern(value), message):
+        assert tokenize(value) <= tokenize(message)
+    assert bool(re.search(token_pattern("10.1.2.3"), message)) == ("10.1.2.3" in tokenize(message))
+
+def test_bloom_filter_has_no_false_negatives():
+    tokens = {f"req-{i}" for i in range(5000)}
+    bloom = BloomFilter.build(tokens, 0.01)
+    assert all(bloom.contains_all({token}) for token in tokens)
+    restored = BloomFilter.from_bytes(bloom.to_bytes(), bloom.hashes)
+    false_positives = sum(restored.contains_all({f"other-{i}"}) for i in range(5000))
+    assert false_positives < 150
+
+def test_complete_chunks_are_sealed_once(session_factory):
+    index = _index(session_factory)
+    db = session_factory()
+    # IDs 1-99, 100-199, ..., 300-399; 400-450 have no row after them yet
+    assert index.seal(db) == 4
+    assert [row.chunk for row in db.query(LogTokenBloom).order_by(LogTokenBloom.chunk)] == [0, 1, 2, 3]
+    assert db.query(LogTokenBloom).filter(LogTokenBloom.chunk == 1).one().rows == 100
+    assert index.seal(db) == 0
+    # Rows newer than the seal delay do not seal the chunk before them
+    db.add(LogEntry(id=501, timestamp=START, message="new", severity="low", device_id=1, created_at=datetime.utcnow()))
+    db.commit()
+    assert index.seal(db) == 0
+    db.close()
+
+@pytest.mark.parametrize("value", ["req-00042", "REQ-00042", "req-00420", "10.2.0.7", "j.doe", "req-0004", "missing-token"])
+def test_search_reads_only_candidate_chunks(session_factory, value):
+    index = _index(session_factory)
+    db = session_factory()
+    index.seal(db)
+    expected = sorted(log.id for log in db.query(LogEntry) if re.search(token_pattern(value), log.message))
+    found = sorted(log.id for log in db.query(LogEntry).filter(index.condition(db, value)))
+    assert found == expected
+    chunks, unsealed = index.candidate_chunks(db, tokenize(value))
+    assert unsealed == 400
+    if value.lower() in ("req-00042", "req-00420", "missing-token"):
+        assert len(chunks) <= 1
+    db.close()
+
+def test_time_range_limits_chunks(session_factory):
+    index = _index(session_factory)
+    db = session_factory()
+    index.seal(db)
+    chunks, _ = index.candidate_chunks(db, {"j.doe"}, START + timedelta(minutes=150), START + timedelta(minutes=250))
+    assert chunks == [1, 2]
+    db.close()
+
+@pytest.mark.parametrize("chunk_rows", [100, 0])
+def test_compressed_messages_are_matched(session_factory, monkeypatch, chunk_rows):
+    codec = MessageCodec()
+    # A codec of this database only; dictionary IDs of other tests' databases are cached in the shared one
+    monkeypatch.setattr(message_codec_module, "message_codec", codec)
+    monkeypatch.setattr(token_index_module, "message_codec", codec)
+    db = session_factory()
+    codec.train(db, "Fortinet", [f"Compressed needle 172.31.{i % 200}.{i % 250} action=deny policyid={i}" for i in range(300)],
+                dictionary_size=8192)
+    entries = [
+        LogEntry(id=451 + i, timestamp=START + timedelta(minutes=451 + i), message=f"Compressed needle 172.31.99.{40 + i} req-00042",
+                 severity="low", device_id=1, vendor="Fortinet", created_at=START)
+        for i in range(3)
+    ]
+    entries.append(LogEntry(id=600, timestamp=START, message="after", severity="low", device_id=1, created_at=START))
+    assert codec.compress_entries(db, entries) == 3
+    db.add_all(entries)
+    db.commit()
+    index = _index(session_factory, chunk_rows=chunk_rows)
+    index.seal(db)
+    db.expunge_all()
+    for value in ("172.31.99.42", "needle", "req-00042", "missing-token"):
+        expected = sorted(log.id for log in db.query(LogEntry) if re.search(token_pattern(value), log.message))
+        found = sorted(log.id for log in db.query(LogEntry).filter(index.condition(db, value)))
+        assert found == expected
+    assert len(expected) == 0 and db.query(LogEntry).filter(index.condition(db, "172.31.99.42")).one().id == 453
+    # The time range bounds the compressed rows that are decoded too
+    assert db.query(LogEntry).filter(index.condition(db, "needle", end_time=START + timedelta(minutes=451))).count() == 1
+    db.close()
@@ -0,0 +1,90 @@
+import asyncio
+import gzip
+import json
+import struct
+import zlib
+import msgpack
+import pytest
+import zstandard
+
+from Backend.api.wire_formats import iter_records, WireFormatError, UnsupportedFormatError
+
+RECORDS = [
+    {"timestamp": "2024-05-01T12:00:00", "message": f"Connection from 10.0.0.{i}", "severity": "low", "cnnid": "CNN001"}
+    for i in range(50)
+]
+
+def decode(body: bytes, content_type=None, content_encoding=None, chunk_size=7):
+    async def chunks():
+        for offset in range(0, len(body), chunk_size):
+            yield body[offset:offset + chunk_size]
+
+    async def collect():
+        return [record async for record in iter_records(chunks(), content_type, content_encoding)]
+
+    return asyncio.get_event_loop().run_until_complete(collect())
+
+def ndjson(records):
+    return "\n".join(json.dumps(record) for record in records).encode("utf-8") + b"\n"
+
+def test_ndjson_default_and_json_array():
+    assert decode(ndjson(RECORDS)) == RECORDS
+    assert decode(json.dumps(RECORDS).encode("utf-8"), "application/json") == RECORDS
+
+@pytest.mark.parametrize("encoding,compress", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("zstd", lambda data: zstandard.ZstdCompressor().compress(data)),
+])
+def test_compressed_ndjson(encoding, compress):
+    assert decode(compress(ndjson(RECORDS)), "application/x-ndjson", encoding) == RECORDS
+
+def test_stacked_encodings_and_multi_member_gzip():
+    body = gzip.compress(ndjson(RECORDS[:10])) + gzip.compress(ndjson(RECORDS[10:]))
+    assert decode(body, None, "gzip") == RECORDS
+    stacked = zstandard.ZstdCompressor().compress(gzip.compress(ndjson(RECORDS)))
+    assert decode(stacked, None, "gzip, zstd") == RECORDS
+
+def test_snappy_framed():
+    snappy = pytest.importorskip("snappy")
+    body = snappy.StreamCompressor().compress(ndjson(RECORDS))
+    assert decode(body, None, "snappy") == RECORDS
+
+def test_msgpack_records_and_arrays():
+    body = b"".join(msgpack.packb(record) for record in RECORDS[:10]) + msgpack.packb(RECORDS[10:])
+    assert decode(body, "application/msgpack") == RECORDS
+
+def event_time(seconds, nanoseconds=0):
+    return msgpack.ExtType(0, struct.pack(">II", seconds, nanoseconds))
+
+def test_fluent_bit_chunks_and_forward_protocol():
+    record = {"message": "link down", "cnnid": "CNN001"}
+    expected = dict(record, timestamp="2023-11-14T22:13:20+00:00")
+    chunk = msgpack.packb([event_time(1700000000), record]) + msgpack.packb([[event_time(1700000000), {}], record])
+    assert decode(chunk, "application/msgpack") == [expected, expected]
+
+    message_mode = msgpack.packb(["syslog", 1700000000, record, {}])
+    forward_mode = msgpack.packb(["syslog", [[event_time(1700000000), record]] * 3])
+    entries = msgpack.packb([event_time(1700000000), record]) * 2
+    packed_mode = msgpack.packb(["syslog", entries, {"size": 2}])
+    compressed_mode = msgpack.packb(["syslog", gzip.compress(entries), {"compressed": "gzip"}])
+    records = decode(message_mode + forward_mode + packed_mode + compressed_mode, "application/x-fluent-forward")
+    assert records == [expected] * 8
+
+def test_existing_timestamp_is_kept():
+    record = {"message": "x", "timestamp": "2024-01-01T00:00:00"}
+    assert decode(msgpack.packb([1700000000, record]), "application/msgpack") == [record]
+
+def test_malformed_bodies():
+    with pytest.raises(UnsupportedFormatError):
+        decode(b"", "application/xml")
+    with pytest.raises(UnsupportedFormatError):
+        decode(b"", None, "br")
+    with pytest.raises(WireFormatError):
+        decode(b'{"message": "x"}\n{"message": ', None)
+    with pytest.raises(WireFormatError):
+        decode(gzip.compress(ndjson(RECORDS))[:-20], None, "gzip")
+    with pytest.raises(WireFormatError):
+        decode(msgpack.packb(RECORDS)[:-5], "application/msgpack")
+    with pytest.raises(WireFormatError):
+        decode(msgpack.packb([1, 2, 3]), "application/msgpack")
@@ -0,0 +1,30 @@
+"""
+Move log rows older than COLD_TIER_AFTER_DAYS from the logs table into the
+Parquet cold tier under COLD_STORAGE_DIR. Meant to be run periodically, e.g.
+from cron:
+
+    python /app/Backend/tier_logs.py --older-than-days 7
+"""
+import argparse
+import logging
+from Backend.api.database import SessionLocal
+from Backend.api.cold_storage import cold_store
+from Backend.api.config import COLD_TIER_AFTER_DAYS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def tier_logs(older_than_days: int):
+    db = SessionLocal()
+    try:
+        archived = cold_store.run_tiering(db, older_than_days)
+        logger.info(f"Moved {archived} log entries to the cold tier at {cold_store.root}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move aged logs into the columnar cold tier")
+    parser.add_argument("--older-than-days", type=int, default=COLD_TIER_AFTER_DAYS)
+    args = parser.parse_args()
+    tier_logs(args.older_than_days)
@@ -0,0 +1,91 @@
+"""
+Train a new zstd dictionary version per vendor from recent plain-text
+messages and report how well it does on a held-out sample:
+
+    python /app/Backend/train_dictionaries.py
+    python /app/Backend/train_dictionaries.py --vendor Fortinet --dictionary-size 32768
+
+The report compares the compression ratio with and without the dictionary
+and measures decode throughput. New rows use the new version once workers
+pick it up (within a minute); existing rows keep their old version.
+"""
+import argparse
+import logging
+import time
+from typing import List
+
+import zstandard as zstd
+from Backend.api.database import SessionLocal
+from Backend.api.models import LogEntry
+from Backend.api.message_codec import message_codec, sample_messages, DEFAULT_DICTIONARY_SIZE, DEFAULT_SAMPLE_SIZE
+from Backend.api.config import COMPRESSION_LEVEL
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HOLDOUT_FRACTION = 0.2
+MIN_BENCHMARK_SECONDS = 0.5
+
+def evaluate(dictionary: zstd.ZstdCompressionDict, messages: List[str]) -> dict:
+    raw = [message.encode("utf-8") for message in messages]
+    raw_bytes = sum(len(data) for data in raw)
+    with_dictionary = zstd.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary, write_content_size=True)
+    without_dictionary = zstd.ZstdCompressor(level=COMPRESSION_LEVEL, write_content_size=True)
+    frames = [with_dictionary.compress(data) for data in raw]
+    plain_frames_bytes = sum(len(without_dictionary.compress(data)) for data in raw)
+
+    decompressor = zstd.ZstdDecompressor(dict_data=dictionary)
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for frame in frames:
+            decompressor.decompress(frame)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_BENCHMARK_SECONDS:
+            break
+
+    compressed_bytes = sum(len(frame) for frame in frames)
+    return {
+        "messages": len(messages),
+        "ratio": raw_bytes / compressed_bytes,
+        "ratio_without_dictionary": raw_bytes / plain_frames_bytes,
+        "decode_mb_per_second": raw_bytes * rounds / elapsed / 1e6,
+        "decode_messages_per_second": len(frames) * rounds / elapsed,
+    }
+
+def train_dictionaries(vendors: List[str], sample_size: int, dictionary_size: int):
+    db = SessionLocal()
+    try:
+        if not vendors:
+            vendors = [vendor for (vendor,) in db.query(LogEntry.vendor).filter(LogEntry.vendor.isnot(None)).distinct()]
+        for vendor in vendors:
+            messages = sample_messages(db, vendor, sample_size)
+            holdout_size = int(len(messages) * HOLDOUT_FRACTION)
+            training, holdout = messages[holdout_size:], messages[:holdout_size]
+            try:
+                row, dictionary = message_codec.train(db, vendor, training, dictionary_size)
+            except ValueError as e:
+                logger.warning(f"Skipping {vendor}: {str(e)}")
+                continue
+            if not holdout:
+                continue
+            report = evaluate(dictionary, holdout)
+            row.compression_ratio = report["ratio"]
+            db.commit()
+            logger.info(
+                f"{vendor} v{row.version}: ratio {report['ratio']:.2f}x "
+                f"(without dictionary {report['ratio_without_dictionary']:.2f}x) on {report['messages']} held-out messages, "
+                f"decode {report['decode_mb_per_second']:.1f} MB/s ({report['decode_messages_per_second']:.0f} messages/s)"
+            )
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain per-vendor zstd dictionaries for message compression")
+    parser.add_argument("--vendor", action="append", default=[], help="Vendor to train; repeat for several, default is every vendor")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE)
+    parser.add_argument("--dictionary-size", type=int, default=DEFAULT_DICTIONARY_SIZE)
+    args = parser.parse_args()
+    train_dictionaries(args.vendor, args.sample_size, args.dictionary_size)